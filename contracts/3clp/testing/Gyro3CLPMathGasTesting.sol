@@ -0,0 +1,34 @@
+// SPDX-License-Identifier: LicenseRef-Gyro-1.0
+// for information on licensing please see the README in the GitHub repository <https://github.com/gyrostable/concentrated-lps>.
+pragma solidity 0.7.6;
+pragma experimental ABIEncoderV2;
+
+/// @dev Measures the gas of the math library over many inputs in a single call: the function is called in a loop, and
+/// the gas of each call is the difference of gasleft() before and after it. The free memory pointer is reset after each
+/// call, so all calls see the same memory state; the first call additionally pays for memory expansion. See
+/// tests/support/gas_measurement.py for the driver.
+
+import "../Gyro3CLPMath.sol";
+
+contract Gyro3CLPMathGasTesting {
+    function measureCalculateInvariant(uint256[][] memory balances, uint256 root3Alpha)
+        external
+        view
+        returns (uint256[] memory invariants, uint256[] memory gasUsed)
+    {
+        invariants = new uint256[](balances.length);
+        gasUsed = new uint256[](balances.length);
+        for (uint256 i = 0; i < balances.length; i++) {
+            uint256 freeMemoryPointer;
+            assembly {
+                freeMemoryPointer := mload(0x40)
+            }
+            uint256 gasBefore = gasleft();
+            invariants[i] = Gyro3CLPMath._calculateInvariant(balances[i], root3Alpha);
+            gasUsed[i] = gasBefore - gasleft();
+            assembly {
+                mstore(0x40, freeMemoryPointer)
+            }
+        }
+    }
+}
@@ -0,0 +1,42 @@
+// SPDX-License-Identifier: LicenseRef-Gyro-1.0
+// for information on licensing please see the README in the GitHub repository <https://github.com/gyrostable/concentrated-lps>.
+
+pragma solidity 0.7.6;
+pragma experimental ABIEncoderV2;
+
+/// @dev Measures the gas of the math library over many inputs in a single call, like Gyro3CLPMathGasTesting. See
+/// tests/support/gas_measurement.py for the driver.
+
+import "../GyroECLPMath.sol";
+
+contract GyroECLPMathGasTesting {
+    function measureCalculateInvariantWithError(
+        uint256[][] memory balances,
+        GyroECLPMath.Params memory params,
+        GyroECLPMath.DerivedParams memory derived
+    )
+        external
+        view
+        returns (
+            int256[] memory invariants,
+            int256[] memory errors,
+            uint256[] memory gasUsed
+        )
+    {
+        invariants = new int256[](balances.length);
+        errors = new int256[](balances.length);
+        gasUsed = new uint256[](balances.length);
+        for (uint256 i = 0; i < balances.length; i++) {
+            uint256 freeMemoryPointer;
+            assembly {
+                freeMemoryPointer := mload(0x40)
+            }
+            uint256 gasBefore = gasleft();
+            (invariants[i], errors[i]) = GyroECLPMath.calculateInvariantWithError(balances[i], params, derived);
+            gasUsed[i] = gasBefore - gasleft();
+            assembly {
+                mstore(0x40, freeMemoryPointer)
+            }
+        }
+    }
+}
@@ -0,0 +1,88 @@
+# Rebuilds the gas reports of scripts/show_gas_usage_*.py from the traces they stored (see tests.support.trace_store),
+# without a chain. Needs the build/ directory of the same build the traces were recorded with.
+#
+# Usage (from the repo root):
+#   python -m scripts.analyze_gas_traces [pool ...] [--maxlvl N] [--root DIR] [--profile] [--breakdown]
+#
+# With --profile, the call trees of all scenarios of a pool are also merged into one profile (see
+# tests.support.call_profile), e.g. to see how much the swaps vary. With --breakdown, each scenario also gets a table of
+# the gas of each function by kind: storage reads and writes, calls, memory expansion and compute.
+
+import argparse
+import sys
+
+from tabulate import tabulate
+
+from tests.support.call_profile import CallProfile
+from tests.support.trace_analyzer import GAS_KINDS, Sources
+from tests.support.trace_store import DEFAULT_ROOT, TraceStore
+
+
+def breakdown_table(ctx) -> str:
+    rows = [
+        (function, *row.values())
+        for function, row in sorted(
+            ctx.gas_by_function().items(),
+            key=lambda item: -sum(item[1][kind] for kind in GAS_KINDS),
+        )
+    ]
+    return tabulate(rows, headers=("Function", "Calls") + GAS_KINDS, intfmt=",")
+
+
+def report(stored, sources, maxlvl=None, profile=None, breakdown=False):
+    """Print the report of one scenario like show_gas_usage_*.py does and return its row of the summary table."""
+    print(f"----- {stored.label} -----\n")
+    print(f"Total Gas: {stored.gas_used}")
+    print()
+    try:
+        ctx = stored.tracer(sources).trace(stored.contract_name, stored.trace)
+        assert len(ctx.children) == 1
+        ctx1 = ctx.children[0][1]
+        row = (stored.label, ctx1.qualified_function_name, ctx1.total_gas_consumed)
+        print(ctx.format(maxlvl=maxlvl))
+        if breakdown:
+            print(breakdown_table(ctx))
+            print()
+        if profile is not None:
+            profile.add(ctx)
+    except Exception:
+        row = (stored.label, "(total tx)", stored.gas_used)
+    print()
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pools", nargs="*", help="e.g. 2clp 3clp eclp; default all")
+    parser.add_argument("--maxlvl", type=int, default=None)
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--breakdown", action="store_true")
+    args = parser.parse_args(argv)
+
+    sources = Sources.load()
+    store = TraceStore.for_sources(sources, args.root)
+    pools = args.pools or store.pools()
+    if not pools:
+        available = ", ".join(store.available_code_hashes()) or "none"
+        sys.exit(
+            f"No traces for the current build ({store.code_hash}) in {args.root}; "
+            f"stored builds: {available}. Run scripts/run_gas_measurements.sh first."
+        )
+
+    for pool in pools:
+        profile = CallProfile() if args.profile else None
+        summary_table = [
+            report(s, sources, args.maxlvl, profile, args.breakdown)
+            for s in store.load_all(pool)
+        ]
+        print(f"Summary ({pool}):\n")
+        print(tabulate(summary_table, headers=("Operation", "Function", "Gas")))
+        print()
+        if profile is not None:
+            print(f"Profile ({pool}, {profile.transactions} transactions):\n")
+            print(profile.format(maxlvl=args.maxlvl))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,8 @@ from tests.support.types import (
     TwoPoolParams,
 )
 
-from tests.support.trace_analyzer import Tracer
+from tests.support.trace_analyzer import Tracer, fetch_trace
+from tests.support.trace_store import TraceStore
 
 from tabulate import tabulate
 
@@ -149,6 +150,7 @@ def main():
     )
 
     tracer = Tracer.load()
+    trace_store = TraceStore.for_sources(tracer.sources)
     summary_headers = ("Operation", "Function", "Gas")
     summary_table = []
 
@@ -159,7 +161,12 @@ def main():
         # The gas tracer isn't super reliable, so we just let it crash if it has to; we still get the totals without it
         # at least.
         try:
-            ctx = tracer.trace_tx(tx)
+            # Keep the trace, so the report can be rebuilt with scripts/analyze_gas_traces.py without a chain.
+            trace = fetch_trace(tx.txid)
+            trace_store.save(
+                "2clp", label, tx.contract_name, trace, tracer.deployments, tx.gas_used
+            )
+            ctx = tracer.trace(tx.contract_name, trace)
             assert len(ctx.children) == 1
             ctx1 = ctx.children[0][1]
             summary_table.append(
@@ -11,6 +11,8 @@ from tests.support.quantized_decimal_100 import QuantizedDecimal as D3
 from tests.support.types import (
     CEMMMathParams,
     CEMMPoolParams,
+    ECLPMathParams,
+    ECLPPoolParams,
     GyroCEMMMathDerivedParams,
     ThreePoolParams,
     TwoPoolBaseParams,
@@ -19,7 +21,7 @@ from tests.support.types import (
     TwoPoolFactoryCreateParams,
 )
 
-from tests.geclp import cemm_prec_implementation
+from tests.geclp import eclp_prec_implementation
 
 TOKENS_PER_USER = 1000 * 10**18
 
@@ -27,6 +29,32 @@ TOKENS_PER_USER = 1000 * 10**18
 pytest.register_assert_rewrite("tests.geclp.util", "tests.g3clp.util")
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--inprocess-evm",
+        action="store_true",
+        help="Call the pure math testing contracts in an in-process EVM instead of on the node",
+    )
+
+
+def deploy_math_testing(request, contract_name: str, libraries: Tuple[str, ...] = ()):
+    """The math testing contract, deployed on the node or, with --inprocess-evm, as an InProcessContract. Only for
+    calls to pure functions. With --inprocess-evm, reverts raise PoolRevert rather than VirtualMachineError; check them
+    with tests.support.reverts.reverts(), which accepts both.
+
+    libraries: the libraries with public functions that the contract calls. brownie links the most recently deployed
+    ones, so they're deployed first; the InProcessContract links them from the build directory by itself."""
+    if request.config.getoption("--inprocess-evm"):
+        # Only import py-evm when it's used.
+        from tests.support.evm_executor import InProcessContract
+
+        return InProcessContract.from_build(contract_name)
+    admin = request.getfixturevalue("admin")
+    for library in libraries:
+        admin.deploy(request.getfixturevalue(library))
+    return admin.deploy(request.getfixturevalue(contract_name))
+
+
 @pytest.fixture(scope="session")
 def admin(accounts):
     return accounts[0]
@@ -48,8 +76,8 @@ def bob(accounts):
 
 
 @pytest.fixture(scope="module")
-def gyro_two_math_testing(admin, Gyro2CLPMathTesting):
-    return admin.deploy(Gyro2CLPMathTesting)
+def gyro_two_math_testing(request):
+    return deploy_math_testing(request, "Gyro2CLPMathTesting")
 
 
 @pytest.fixture(scope="module")
@@ -58,8 +86,23 @@ def gyro_cemm_math_testing(admin, GyroCEMMMathTesting):
 
 
 @pytest.fixture(scope="module")
-def gyro_three_math_testing(admin, Gyro3CLPMathTesting):
-    return admin.deploy(Gyro3CLPMathTesting)
+def gyro_eclp_math_testing(request):
+    return deploy_math_testing(request, "GyroECLPMathTesting", ("GyroECLPMath",))
+
+
+@pytest.fixture(scope="module")
+def gyro_three_math_testing(request):
+    return deploy_math_testing(request, "Gyro3CLPMathTesting")
+
+
+@pytest.fixture(scope="module")
+def gyro_three_math_gas_testing(request):
+    return deploy_math_testing(request, "Gyro3CLPMathGasTesting")
+
+
+@pytest.fixture(scope="module")
+def gyro_eclp_math_gas_testing(request):
+    return deploy_math_testing(request, "GyroECLPMathGasTesting", ("GyroECLPMath",))
 
 
 class ContractAsPureWrapper:
@@ -314,18 +357,18 @@ def balancer_vault_pool3(
 
 
 @pytest.fixture(scope="module")
-def math_testing(admin, MathTesting):
-    return admin.deploy(MathTesting)
+def math_testing(request):
+    return deploy_math_testing(request, "MathTesting")
 
 
 @pytest.fixture(scope="module")
-def signed_math_testing(admin, SignedMathTesting):
-    return admin.deploy(SignedMathTesting)
+def signed_math_testing(request):
+    return deploy_math_testing(request, "SignedMathTesting")
 
 
 @pytest.fixture(scope="module")
-def gyro_fixed_point_testing(admin, GyroFixedPointTesting):
-    return admin.deploy(GyroFixedPointTesting)
+def gyro_fixed_point_testing(request):
+    return deploy_math_testing(request, "GyroFixedPointTesting")
 
 
 @pytest.fixture(scope="module")
@@ -372,7 +415,7 @@ def cemm_pool(
         s=D("0.7071067811865475244"),
         l=D("2"),
     )
-    derived_cemm_params = cemm_prec_implementation.calc_derived_values(cemm_params)
+    derived_cemm_params = eclp_prec_implementation.calc_derived_values(cemm_params)
     args = CEMMPoolParams(
         two_pool_base_params,
         scale_cemm_params(cemm_params),
@@ -383,6 +426,49 @@ def cemm_pool(
     )
 
 
+@pytest.fixture
+def eclp_pool(
+    admin,
+    GyroECLPPool,
+    GyroECLPMath,
+    gyro_erc20_funded,
+    mock_vault,
+    mock_gyro_config,
+    deployed_query_processor,
+):
+    two_pool_base_params = TwoPoolBaseParams(
+        vault=mock_vault.address,
+        name="GyroECLPTwoPool",  # string
+        symbol="GCTP",  # string
+        token0=gyro_erc20_funded[0].address,  # IERC20
+        token1=gyro_erc20_funded[1].address,  # IERC20
+        swapFeePercentage=1 * 10**15,  # 0.1%
+        pauseWindowDuration=0,  # uint256
+        bufferPeriodDuration=0,  # uint256
+        oracleEnabled=False,  # bool
+        owner=admin,  # address
+    )
+
+    eclp_params = ECLPMathParams(
+        alpha=D("0.97"),
+        beta=D("1.02"),
+        c=D("0.7071067811865475244"),
+        s=D("0.7071067811865475244"),
+        l=D("2"),
+    )
+    derived_eclp_params = eclp_prec_implementation.calc_derived_values(eclp_params)
+    args = ECLPPoolParams(
+        two_pool_base_params,
+        scale_eclp_params(eclp_params),
+        scale_derived_values(derived_eclp_params),
+    )
+    # The pool calls the public functions of GyroECLPMath, which brownie links to its latest deployment.
+    admin.deploy(GyroECLPMath)
+    return admin.deploy(
+        GyroECLPPool, args, mock_gyro_config.address, gas_limit=11250000
+    )
+
+
 @pytest.fixture(autouse=True)
 def isolation(fn_isolation):
     pass
@@ -408,7 +494,7 @@ class DerivedParams(NamedTuple):
     # dBeta: D2
 
 
-def scale_cemm_params(p: Params) -> Params:
+def scale_eclp_params(p: Params) -> Params:
     params = Params(
         alpha=p.alpha * D("1e18"),
         beta=p.beta * D("1e18"),
@@ -419,6 +505,10 @@ def scale_cemm_params(p: Params) -> Params:
     return params
 
 
+# Legacy alias
+scale_cemm_params = scale_eclp_params
+
+
 class Vector2(NamedTuple):
     x: D2
     y: D2
@@ -3,11 +3,10 @@
 #
 # Run using `brownie test`.
 from copy import copy
-from typing import Union, Tuple
+from typing import Optional, Tuple
 
 from brownie import *
 from brownie.test import given
-import pandas as pd
 from hypothesis import settings, example
 from hypothesis import strategies as st
 from toolz import groupby, first, second, valmap
@@ -16,11 +15,15 @@ from tests.geclp import util
 from tests.geclp import test_cemm_properties
 from tests.geclp.util import gen_params
 from tests.support.util_common import gen_balances, BasicPoolParameters
+from tests.support.error_collector import ErrorValueCollector
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.support.types import CEMMMathParams
 from tests.support.utils import qdecimals
 
-error_values: Union[None, list[dict]]  # None means disabled.
+ERROR_VALUES_DIR = "data/errors_solidity"
+ERROR_VALUES_SCHEMA = {"loss_ub": float, "loss_ub_sol": float}
+
+error_values: Optional[ErrorValueCollector]  # None means disabled.
 error_values = None
 
 bpool_params = BasicPoolParameters(min_balance_ratio=D("1e-5"))  # Almost a dummy
@@ -29,7 +32,7 @@ bpool_params = BasicPoolParameters(min_balance_ratio=D("1e-5"))  # Almost a dumm
 def push_error_values(row: dict):
     global error_values
     if error_values is not None:
-        error_values.append(row)
+        error_values.push(row)
 
 
 @settings(max_examples=1_000)
@@ -72,9 +75,10 @@ def my_test_calcOutGivenIn(
 
 
 def test_main(gyro_cemm_math_testing):
+    # Values are written to disk in chunks while the test runs. Read them back using
+    # tests.support.error_collector.load_error_values(ERROR_VALUES_DIR).
     global error_values
-    error_values = []
-    my_test_calcOutGivenIn(gyro_cemm_math_testing)
-
-    df = pd.DataFrame(error_values)
-    df.to_feather("data/errors_solidity.feather")
+    with ErrorValueCollector(ERROR_VALUES_DIR, ERROR_VALUES_SCHEMA) as error_values:
+        error_values.clear()
+        my_test_calcOutGivenIn(gyro_cemm_math_testing)
+    error_values = None
@@ -0,0 +1,143 @@
+# Array version of the 2CLP math (Gyro2CLPMath.sol), for evaluating many pool states and trades at once.
+#
+# All functions work element-wise (with broadcasting) on either representation of tests.support.fixed_point_array:
+# exact arrays (python ints, 18 decimals) reproduce the contract bit by bit, including rounding directions, and float64
+# arrays are the fast mode. Rows where the contract would revert are set to `invalid` (None resp. NaN) instead of
+# raising, so one bad row doesn't prevent evaluating the others: in exact mode, this covers every revert, since the
+# checked GyroFixedPoint operations of fixed_point_array give None where they would revert (overflow, underflow,
+# division by zero). Float mode has no overflows and only marks the reverts checked here explicitly
+# (ASSET_BOUNDS_EXCEEDED and the zero denominator in calcInGivenOut). The debugging checks of math_implementation and
+# GyroPoolMath._sqrt() are only run with check=True.
+
+import numpy as np
+
+from tests.support import fixed_point_array as fp
+
+
+def invalid(like: np.ndarray):
+    return None if fp.is_exact(like) else np.nan
+
+
+def _valid_and(a: np.ndarray, condition) -> np.ndarray:
+    """condition(a) where `a` is valid, False elsewhere."""
+    valid = fp.is_valid(a)
+    return valid & condition(np.where(valid, a, fp.fixed(0, a)))
+
+
+def calculateQuadraticTerms(
+    x: np.ndarray, y: np.ndarray, sqrtAlpha: np.ndarray, sqrtBeta: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    one = fp.fixed(1, x)
+    a = fp.sub(one, fp.div_down(sqrtAlpha, sqrtBeta))
+    mb = fp.add(fp.div_down(y, sqrtBeta), fp.mul_down(x, sqrtAlpha))
+    mc = fp.mul_down(x, y)
+
+    bSquare = fp.mul_down(fp.mul_down(fp.mul_down(x, x), sqrtAlpha), sqrtAlpha)
+    bSq2 = fp.div_down(
+        fp.mul_down(fp.mul_down(fp.mul_down(x, y), fp.fixed(2, x)), sqrtAlpha),
+        sqrtBeta,
+    )
+    bSq3 = fp.div_down(fp.mul_down(y, y), fp.mul_up(sqrtBeta, sqrtBeta))
+    return a, mb, fp.add(fp.add(bSquare, bSq2), bSq3), mc
+
+
+def calculateQuadratic(
+    a: np.ndarray,
+    mb: np.ndarray,
+    bSquare: np.ndarray,
+    mc: np.ndarray,
+    check: bool = False,
+) -> np.ndarray:
+    if check:
+        assert np.all(a > 0) and np.all(mb > 0) and np.all(mc >= 0)
+        assert np.allclose(
+            fp.exact_to_float(mb) ** 2 if fp.is_exact(mb) else mb**2,
+            fp.exact_to_float(bSquare) if fp.is_exact(bSquare) else bSquare,
+        )
+    denominator = fp.mul_up(a, fp.fixed(2, a))
+    addTerm = fp.mul_down(fp.mul_down(mc, fp.fixed(4, mc)), a)
+    radicand = fp.add(bSquare, addTerm)
+    sqrResult = fp.sqrt(radicand, 5, check=check)
+    numerator = fp.add(mb, sqrResult)
+    return fp.div_down(numerator, denominator)
+
+
+def calculateInvariant(
+    x: np.ndarray,
+    y: np.ndarray,
+    sqrtAlpha: np.ndarray,
+    sqrtBeta: np.ndarray,
+    check: bool = False,
+) -> np.ndarray:
+    a, mb, bSquare, mc = calculateQuadraticTerms(x, y, sqrtAlpha, sqrtBeta)
+    return calculateQuadratic(a, mb, bSquare, mc, check)
+
+
+def calculateVirtualParameter0(invariant: np.ndarray, sqrtBeta: np.ndarray):
+    return fp.div_down(invariant, sqrtBeta)
+
+
+def calculateVirtualParameter1(invariant: np.ndarray, sqrtAlpha: np.ndarray):
+    return fp.mul_down(invariant, sqrtAlpha)
+
+
+def _safety_margins(balanceIn, balanceOut, virtualParamIn, virtualParamOut):
+    # 1 + 2e-18 and 1 - 1e-18, which have no effect in float.
+    if fp.is_exact(balanceIn):
+        virtInOver = fp.add(balanceIn, fp.mul_up(virtualParamIn, fp.ONE + 2))
+        virtOutUnder = fp.add(balanceOut, fp.mul_down(virtualParamOut, fp.ONE - 1))
+    else:
+        virtInOver = balanceIn + virtualParamIn
+        virtOutUnder = balanceOut + virtualParamOut
+    return virtInOver, virtOutUnder
+
+
+def calcOutGivenIn(
+    balanceIn: np.ndarray,
+    balanceOut: np.ndarray,
+    amountIn: np.ndarray,
+    virtualParamIn: np.ndarray,
+    virtualParamOut: np.ndarray,
+) -> np.ndarray:
+    """Amounts out, or `invalid` where the contract reverts, e.g. with ASSET_BOUNDS_EXCEEDED."""
+    virtInOver, virtOutUnder = _safety_margins(
+        balanceIn, balanceOut, virtualParamIn, virtualParamOut
+    )
+    amountOut = fp.div_down(
+        fp.mul_down(virtOutUnder, amountIn), fp.add(virtInOver, amountIn)
+    )
+    ok = _valid_and(amountOut, lambda v: v <= balanceOut)
+    return np.where(ok, amountOut, invalid(amountOut))
+
+
+def calcInGivenOut(
+    balanceIn: np.ndarray,
+    balanceOut: np.ndarray,
+    amountOut: np.ndarray,
+    virtualParamIn: np.ndarray,
+    virtualParamOut: np.ndarray,
+) -> np.ndarray:
+    """Amounts in, or `invalid` where the contract reverts, e.g. with ASSET_BOUNDS_EXCEEDED, or in divUp()
+    (ZERO_DIVISION) when the trade would take out the whole virtual balance."""
+    virtInOver, virtOutUnder = _safety_margins(
+        balanceIn, balanceOut, virtualParamIn, virtualParamOut
+    )
+    ok = amountOut <= balanceOut
+    # Keep the division well-defined for the rows we discard anyway.
+    amountOut_safe = np.where(ok, amountOut, 0 * amountOut)
+    denominator = fp.sub(virtOutUnder, amountOut_safe)
+    ok = ok & _valid_and(denominator, lambda v: v > 0)
+    denominator = np.where(ok, denominator, fp.fixed(1, denominator))
+    amountIn = fp.div_up(fp.mul_up(virtInOver, amountOut_safe), denominator)
+    return np.where(ok, amountIn, invalid(amountIn))
+
+
+def calcSpotPriceAinB(
+    balanceA: np.ndarray,
+    virtualParameterA: np.ndarray,
+    balanceB: np.ndarray,
+    virtualParameterB: np.ndarray,
+) -> np.ndarray:
+    return fp.div_up(
+        fp.add(balanceB, virtualParameterB), fp.add(balanceA, virtualParameterA)
+    )
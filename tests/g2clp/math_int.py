@@ -0,0 +1,194 @@
+# Bit-exact port of Gyro2CLPMath on python ints as uint256.
+#
+# Unlike math_implementation (QuantizedDecimal, with a Decimal square root) and the exact mode of math_array (which only
+# marks reverting rows invalid, without the reason), this follows the contract operation by operation, including the
+# checked arithmetic of GyroFixedPoint and the Babylonian square root of GyroPoolMath._sqrt(), and raises PoolRevert
+# with the contract's reason where it would revert. calculateInvariantWithIterations() also reports after how many steps the square root
+# had converged, and calculateInvariants() / calcOutGivenIns() / calcInGivenOuts() evaluate many inputs at once.
+
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from tests.libraries import pool_math_int
+from tests.libraries.fixed_point_int import (
+    ONE,
+    PoolRevert,
+    add,
+    divDown,
+    divUp,
+    mulDown,
+    mulUp,
+    sub,
+)
+
+ASSET_BOUNDS_EXCEEDED = "GYR#357"
+
+
+class QuadraticResult(NamedTuple):
+    invariant: int
+    sqrt_iterations: int  # see pool_math_int.sqrtWithIterations()
+
+
+def calculateInvariant(balances: Sequence[int], sqrtAlpha: int, sqrtBeta: int) -> int:
+    return calculateInvariantWithIterations(balances, sqrtAlpha, sqrtBeta).invariant
+
+
+def calculateInvariantWithIterations(
+    balances: Sequence[int], sqrtAlpha: int, sqrtBeta: int
+) -> QuadraticResult:
+    a, mb, bSquare, mc = calculateQuadraticTerms(balances, sqrtAlpha, sqrtBeta)
+    return calculateQuadraticWithIterations(a, mb, bSquare, mc)
+
+
+def calculateQuadraticTerms(
+    balances: Sequence[int], sqrtAlpha: int, sqrtBeta: int
+) -> tuple[int, int, int, int]:
+    x, y = balances
+    a = sub(ONE, divDown(sqrtAlpha, sqrtBeta))
+    bterm0 = divDown(y, sqrtBeta)
+    bterm1 = mulDown(x, sqrtAlpha)
+    mb = add(bterm0, bterm1)
+    mc = mulDown(x, y)
+
+    bSquare = mulDown(mulDown(mulDown(x, x), sqrtAlpha), sqrtAlpha)
+    bSq2 = divDown(mulDown(mulDown(mulDown(x, y), 2 * ONE), sqrtAlpha), sqrtBeta)
+    bSq3 = divDown(mulDown(y, y), mulUp(sqrtBeta, sqrtBeta))
+    bSquare = add(add(bSquare, bSq2), bSq3)
+    return a, mb, bSquare, mc
+
+
+def calculateQuadratic(a: int, mb: int, bSquare: int, mc: int) -> int:
+    return calculateQuadraticWithIterations(a, mb, bSquare, mc).invariant
+
+
+def calculateQuadraticWithIterations(
+    a: int, mb: int, bSquare: int, mc: int
+) -> QuadraticResult:
+    denominator = mulUp(a, 2 * ONE)
+    addTerm = mulDown(mulDown(mc, 4 * ONE), a)
+    radicand = add(bSquare, addTerm)
+    sqrResult, iterations = pool_math_int.sqrtWithIterations(radicand, 5)
+    numerator = add(mb, sqrResult)
+    return QuadraticResult(divDown(numerator, denominator), iterations)
+
+
+def _virtualBalances(
+    balanceIn: int, balanceOut: int, virtualOffsetIn: int, virtualOffsetOut: int
+) -> tuple[int, int]:
+    virtInOver = add(balanceIn, mulUp(virtualOffsetIn, ONE + 2))
+    virtOutUnder = add(balanceOut, mulDown(virtualOffsetOut, ONE - 1))
+    return virtInOver, virtOutUnder
+
+
+def calcOutGivenIn(
+    balanceIn: int,
+    balanceOut: int,
+    amountIn: int,
+    virtualOffsetIn: int,
+    virtualOffsetOut: int,
+) -> int:
+    virtInOver, virtOutUnder = _virtualBalances(
+        balanceIn, balanceOut, virtualOffsetIn, virtualOffsetOut
+    )
+    amountOut = divDown(mulDown(virtOutUnder, amountIn), add(virtInOver, amountIn))
+    if not (amountOut <= balanceOut):
+        raise PoolRevert(ASSET_BOUNDS_EXCEEDED)
+    return amountOut
+
+
+def calcInGivenOut(
+    balanceIn: int,
+    balanceOut: int,
+    amountOut: int,
+    virtualOffsetIn: int,
+    virtualOffsetOut: int,
+) -> int:
+    if not (amountOut <= balanceOut):
+        raise PoolRevert(ASSET_BOUNDS_EXCEEDED)
+    virtInOver, virtOutUnder = _virtualBalances(
+        balanceIn, balanceOut, virtualOffsetIn, virtualOffsetOut
+    )
+    return divUp(mulUp(virtInOver, amountOut), sub(virtOutUnder, amountOut))
+
+
+def calculateVirtualParameter0(invariant: int, sqrtBeta: int) -> int:
+    return divDown(invariant, sqrtBeta)
+
+
+def calculateVirtualParameter1(invariant: int, sqrtAlpha: int) -> int:
+    return mulDown(invariant, sqrtAlpha)
+
+
+def calcSpotPriceAinB(
+    balanceA: int, virtualParameterA: int, balanceB: int, virtualParameterB: int
+) -> int:
+    return divUp(add(balanceB, virtualParameterB), add(balanceA, virtualParameterA))
+
+
+def _columns(*args) -> list[np.ndarray]:
+    """Broadcast scalars and sequences of ints to 1-d object arrays of the same length."""
+    return [
+        a.ravel()
+        for a in np.broadcast_arrays(*(np.asarray(a, dtype=object) for a in args))
+    ]
+
+
+def calculateInvariants(
+    balances: Sequence[Sequence[int]], sqrtAlpha, sqrtBeta
+) -> tuple[np.ndarray, np.ndarray]:
+    """calculateInvariantWithIterations() for many pools: (invariants, sqrt_iterations). `sqrtAlpha` and `sqrtBeta`
+    are one value for all pools or one per pool. Where the contract would revert, the invariant is None and the
+    iteration count is -1."""
+    x, y = np.asarray(balances, dtype=object).reshape(-1, 2).T
+    x, y, sqrtAlphas, sqrtBetas = _columns(x, y, sqrtAlpha, sqrtBeta)
+    invariants = np.empty(len(x), dtype=object)
+    iterations = np.full(len(x), -1, dtype=np.int64)
+    for k in range(len(x)):
+        try:
+            result = calculateInvariantWithIterations(
+                [int(x[k]), int(y[k])], int(sqrtAlphas[k]), int(sqrtBetas[k])
+            )
+        except PoolRevert:
+            continue
+        invariants[k], iterations[k] = result
+    return invariants, iterations
+
+
+def _evaluate(f, *args) -> np.ndarray:
+    columns = _columns(*args)
+    results = np.empty(len(columns[0]), dtype=object)
+    for k, row in enumerate(zip(*columns)):
+        try:
+            results[k] = f(*(int(v) for v in row))
+        except PoolRevert:
+            pass
+    return results
+
+
+def calcOutGivenIns(
+    balanceIn, balanceOut, amountIn, virtualOffsetIn, virtualOffsetOut
+) -> np.ndarray:
+    """calcOutGivenIn() element-wise, with broadcasting; None where the contract would revert."""
+    return _evaluate(
+        calcOutGivenIn,
+        balanceIn,
+        balanceOut,
+        amountIn,
+        virtualOffsetIn,
+        virtualOffsetOut,
+    )
+
+
+def calcInGivenOuts(
+    balanceIn, balanceOut, amountOut, virtualOffsetIn, virtualOffsetOut
+) -> np.ndarray:
+    """calcInGivenOut() element-wise, with broadcasting; None where the contract would revert."""
+    return _evaluate(
+        calcInGivenOut,
+        balanceIn,
+        balanceOut,
+        amountOut,
+        virtualOffsetIn,
+        virtualOffsetOut,
+    )
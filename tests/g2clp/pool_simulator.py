@@ -0,0 +1,94 @@
+# In-process model of Gyro2CLPPool, see tests/support/pool_simulator.py.
+#
+# The math is math_int, the bit-exact port of Gyro2CLPMath with the contract's checked arithmetic, so the whole state
+# transition matches the contract bit by bit, and the simulator reverts with the contract's reason wherever the pool
+# does, including overflows.
+
+from typing import Sequence
+
+from tests.g2clp import math_int
+from tests.support.pool_simulator import ONE, PoolSimulator, mul_down
+from tests.support.swap_models import ConstantProductSwapModel
+from tests.support.swap_table import hyperbola_curve
+
+
+class Gyro2CLPPoolSimulator(PoolSimulator):
+    """`sqrt_alpha`, `sqrt_beta` are raw 18-decimal values, as passed to the contract."""
+
+    n_tokens = 2
+
+    def __init__(self, sqrt_alpha: int, sqrt_beta: int, swap_fee: int, **kwargs):
+        super().__init__(swap_fee, **kwargs)
+        self.sqrt_alpha = sqrt_alpha
+        self.sqrt_beta = sqrt_beta
+
+    def calculate_current_values(self, balances: Sequence[int]) -> tuple[int, int, int]:
+        """(invariant, virtualParam0, virtualParam1) for upscaled balances."""
+        invariant = math_int.calculateInvariant(
+            balances, self.sqrt_alpha, self.sqrt_beta
+        )
+        a = math_int.calculateVirtualParameter0(invariant, self.sqrt_beta)
+        b = math_int.calculateVirtualParameter1(invariant, self.sqrt_alpha)
+        return invariant, a, b
+
+    def calculate_invariant(self, balances: list[int]) -> int:
+        return self.calculate_current_values(balances)[0]
+
+    def _calc_initial_bpt(self, amounts_in: list[int]) -> tuple[int, int]:
+        invariant, a, b = self.calculate_current_values(amounts_in)
+        spot_price = self._spot_price(amounts_in, a, b)
+        return mul_down(amounts_in[0], spot_price) + amounts_in[1], invariant
+
+    @staticmethod
+    def _spot_price(balances: Sequence[int], a: int, b: int) -> int:
+        return math_int.calcSpotPriceAinB(balances[0], a, balances[1], b)
+
+    def _spot_prices(self, balances: list[int]) -> list[int]:
+        _, a, b = self.calculate_current_values(balances)
+        return [self._spot_price(balances, a, b), ONE]
+
+    def _swap_model(self, balances, i_in, i_out):
+        _, *virtual_params = self.calculate_current_values(balances)
+        return ConstantProductSwapModel(
+            (balances[i_in] + virtual_params[i_in]) / ONE,
+            (balances[i_out] + virtual_params[i_out]) / ONE,
+            balances[i_out] / ONE,
+            self.swap_fee / ONE,
+        )
+
+    def _swap_curve(self, balances, i_in, i_out):
+        invariant, *virtual_params = (
+            v / ONE for v in self.calculate_current_values(balances)
+        )
+        return hyperbola_curve(
+            "hyperbola",
+            u_min=virtual_params[i_in] / invariant,
+            u_max=invariant / virtual_params[i_out],
+            u0=(balances[i_in] / ONE + virtual_params[i_in]) / invariant,
+            scale=invariant,
+            fee=self.swap_fee / ONE,
+        )
+
+    def _calc_out_given_in(self, balances, i_in, i_out, amount_in):
+        _, *virtual_params = self.calculate_current_values(balances)
+        return math_int.calcOutGivenIn(
+            balances[i_in],
+            balances[i_out],
+            amount_in,
+            virtual_params[i_in],
+            virtual_params[i_out],
+        )
+
+    def _calc_in_given_out(self, balances, i_in, i_out, amount_out):
+        _, *virtual_params = self.calculate_current_values(balances)
+        return math_int.calcInGivenOut(
+            balances[i_in],
+            balances[i_out],
+            amount_out,
+            virtual_params[i_in],
+            virtual_params[i_out],
+        )
+
+    def get_price(self) -> int:
+        """Spot price of token 0 in units of token 1, as getPrice()."""
+        return self._spot_prices(self.upscaled_balances())[0]
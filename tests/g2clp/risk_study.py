@@ -0,0 +1,140 @@
+# LP risk study for the 2CLP, for use with tests/support/monte_carlo.py.
+#
+# A scenario is a parameter set (price range and fee), a geometric Brownian motion of the external price and a sequence
+# of noise trades. At every step, an arbitrageur first moves the pool price into the no-arbitrage band around the
+# external price (computed in float from the virtual reserves, then executed exactly by the simulator), then a noise
+# trader buys a lognormally distributed fraction (at most half) of the pool's balance of a random token.
+#
+# Scope: only the 2CLP is covered; the 3CLP and ECLP simulators would need their own arbitrage trade (for the ECLP,
+# along the ellipse). The study doesn't measure the error of the pool's invariant calculation either:
+# min_invariant_change, the smallest relative change of the invariant over a swap, is a proxy that turns negative when
+# rounding works against the LPs.
+#
+# Run as `python -m tests.g2clp.risk_study [n_scenarios]` for a table of the metrics.
+
+import math
+import sys
+from dataclasses import dataclass
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+from tests.g2clp.pool_simulator import Gyro2CLPPoolSimulator
+from tests.support.monte_carlo import FAILED, MonteCarloStudy, format_stats, run_monte_carlo
+from tests.support.pool_simulator import ONE, PoolRevert
+
+FEES = (10**14, 5 * 10**14, 10**15, 3 * 10**15)
+
+LP = "lp"
+
+
+class Scenario(NamedTuple):
+    sqrt_alpha: int
+    sqrt_beta: int
+    swap_fee: int
+    prices: np.ndarray  # external price of token 0 in token 1 at each step, starting at 1
+    noise_fractions: np.ndarray
+    noise_token_in: np.ndarray
+
+
+@dataclass
+class TwoCLPRiskStudy(MonteCarloStudy):
+    n_steps: int = 100
+    min_alpha: float = 0.5
+    max_beta: float = 2.0
+    max_volatility: float = 0.05  # per step
+    noise_trade_median: float = 1e-3  # fraction of the balance out
+    noise_trade_sigma: float = 1.5
+    liquidity: int = 1_000_000 * ONE
+
+    def draw(self, rng: np.random.Generator) -> Scenario:
+        alpha = rng.uniform(self.min_alpha, 0.999)
+        beta = rng.uniform(1.001, self.max_beta)
+        volatility = rng.uniform(0, self.max_volatility)
+        increments = rng.normal(-volatility**2 / 2, volatility, self.n_steps)
+        return Scenario(
+            sqrt_alpha=int(math.sqrt(alpha) * ONE),
+            sqrt_beta=int(math.sqrt(beta) * ONE),
+            swap_fee=int(rng.choice(FEES)),
+            prices=np.exp(np.cumsum(increments)),
+            noise_fractions=np.minimum(
+                np.exp(rng.normal(math.log(self.noise_trade_median), self.noise_trade_sigma, self.n_steps)),
+                0.5,
+            ),
+            noise_token_in=rng.integers(0, 2, self.n_steps),
+        )
+
+    def initial_balances(self, scenario: Scenario) -> list[int]:
+        """Balances with price 1 and invariant `liquidity`."""
+        sqrt_alpha, sqrt_beta = scenario.sqrt_alpha / ONE, scenario.sqrt_beta / ONE
+        return [
+            int(self.liquidity * (1 - 1 / sqrt_beta)),
+            int(self.liquidity * (1 - sqrt_alpha)),
+        ]
+
+    def evaluate(self, scenario: Scenario) -> Dict[str, float]:
+        sim = Gyro2CLPPoolSimulator(scenario.sqrt_alpha, scenario.sqrt_beta, scenario.swap_fee)
+        initial_balances = self.initial_balances(scenario)
+        try:
+            sim.initialize(LP, initial_balances)
+        except PoolRevert:
+            return dict(lp_return_vs_hodl=FAILED, fee_return=FAILED, min_invariant_change=FAILED, revert_rate=FAILED)
+
+        n_swaps = n_reverts = 0
+        min_invariant_change = math.inf
+        for step, price in enumerate(scenario.prices):
+            trades = [self._arbitrage_trade(sim, price)]
+            token_in = int(scenario.noise_token_in[step])
+            amount_out = int(sim.balances[1 - token_in] * scenario.noise_fractions[step])
+            trades.append((sim.swap_given_out, token_in, 1 - token_in, amount_out))
+            for swap, i_in, i_out, amount in trades:
+                if amount <= 0:
+                    continue
+                invariant_before = sim.get_invariant()
+                n_swaps += 1
+                try:
+                    swap(i_in, i_out, amount)
+                except PoolRevert:
+                    n_reverts += 1
+                    continue
+                change = (sim.get_invariant() - invariant_before) / invariant_before
+                min_invariant_change = min(min_invariant_change, change)
+
+        final_price = scenario.prices[-1]
+
+        def value(balances):
+            return balances[0] / ONE * final_price + balances[1] / ONE
+
+        return dict(
+            lp_return_vs_hodl=value(sim.balances) / value(initial_balances) - 1,
+            fee_return=value(sim.swap_fees_collected) / value(initial_balances),
+            min_invariant_change=min_invariant_change if n_swaps > n_reverts else FAILED,
+            revert_rate=n_reverts / n_swaps if n_swaps else 0.0,
+        )
+
+    @staticmethod
+    def _arbitrage_trade(sim: Gyro2CLPPoolSimulator, price: float):
+        """(swap, i_in, i_out, amount) that moves the pool price to the edge of the no-arbitrage band around `price`."""
+        invariant, a, b = (v / ONE for v in sim.calculate_current_values(sim.upscaled_balances()))
+        pool_price = sim.get_price() / ONE
+        gamma = 1 - sim.swap_fee / ONE
+        alpha, beta = (sim.sqrt_alpha / ONE) ** 2, (sim.sqrt_beta / ONE) ** 2
+        if pool_price < price * gamma:
+            target = min(price * gamma, beta)
+        elif pool_price > price / gamma:
+            target = max(price / gamma, alpha)
+        else:
+            return None, 0, 1, 0
+        # On the curve (x + a) (y + b) = L^2, the price (y + b) / (x + a) is `target` at these balances.
+        x_max = invariant / math.sqrt(alpha) - a
+        x_target = min(max(invariant / math.sqrt(target) - a, 0), x_max)
+        x = sim.balances[0] / ONE
+        # Stay a bit short of the target so that rounding doesn't take us past the price bounds.
+        if x_target < x:
+            return sim.swap_given_out, 1, 0, int((x - x_target) * (1 - 1e-9) * ONE)
+        return sim.swap_given_in, 0, 1, int((x_target - x) * (1 - 1e-9) * ONE)
+
+
+if __name__ == "__main__":
+    n_scenarios = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    print(format_stats(run_monte_carlo(TwoCLPRiskStudy(), n_scenarios, chunk_size=20)))
@@ -0,0 +1,135 @@
+import hypothesis.strategies as st
+import numpy as np
+from brownie.test import given
+from hypothesis import assume, settings
+
+from tests.g2clp import math_array, math_implementation
+from tests.g2clp.test_math_implementations_match import faulty_params
+from tests.support import fixed_point_array as fp
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.reverts import reverts
+from tests.support.utils import scale, to_decimal
+
+billion_balance_strategy = st.integers(min_value=1, max_value=100_000_000_000)
+
+pool_state_strategy = st.tuples(
+    st.tuples(billion_balance_strategy, billion_balance_strategy),
+    st.decimals(min_value="0.02", max_value="0.99995", places=18),
+    st.decimals(min_value="1.00005", max_value="1.8", places=18),
+)
+
+
+def _pool_arrays(states, to_array):
+    balances, sqrt_alphas, sqrt_betas = zip(*states)
+    x, y = zip(*balances)
+    return to_array(x), to_array(y), to_array(sqrt_alphas), to_array(sqrt_betas)
+
+
+@settings(max_examples=50)
+@given(states=st.lists(pool_state_strategy, min_size=1, max_size=20))
+def test_invariant_matches_scalar(states):
+    for balances, sqrt_alpha, sqrt_beta in states:
+        assume(not faulty_params(balances, sqrt_alpha, sqrt_beta))
+
+    expected = [
+        math_implementation.calculateInvariant(
+            to_decimal(balances), to_decimal(sqrt_alpha), to_decimal(sqrt_beta)
+        )
+        for balances, sqrt_alpha, sqrt_beta in states
+    ]
+
+    invariant = math_array.calculateInvariant(
+        *_pool_arrays(states, fp.to_exact), check=True
+    )
+    for v, e in zip(fp.from_exact(invariant), expected):
+        assert v == e.approxed(rel=D("1e-15"))
+
+    invariant_float = math_array.calculateInvariant(*_pool_arrays(states, fp.to_float))
+    assert np.allclose(invariant_float, [float(e) for e in expected], rtol=1e-12)
+
+
+@settings(max_examples=50)
+@given(
+    states=st.lists(pool_state_strategy, min_size=1, max_size=20),
+    amount_frac=st.decimals(min_value="0.0001", max_value="2", places=4),
+)
+def test_swaps_float_close_to_exact(states, amount_frac):
+    for balances, sqrt_alpha, sqrt_beta in states:
+        assume(not faulty_params(balances, sqrt_alpha, sqrt_beta))
+
+    results = []
+    for to_array in (fp.to_exact, fp.to_float):
+        x, y, sqrt_alpha, sqrt_beta = _pool_arrays(states, to_array)
+        invariant = math_array.calculateInvariant(x, y, sqrt_alpha, sqrt_beta)
+        a = math_array.calculateVirtualParameter0(invariant, sqrt_beta)
+        b = math_array.calculateVirtualParameter1(invariant, sqrt_alpha)
+        amount = fp.mul_down(y, to_array(amount_frac))
+        results.append(
+            (
+                math_array.calcOutGivenIn(x, y, amount, a, b),
+                math_array.calcInGivenOut(x, y, amount, a, b),
+                math_array.calcSpotPriceAinB(x, a, y, b),
+            )
+        )
+
+    for exact, approx in zip(*results):
+        exact_is_invalid = np.array([v is None for v in exact])
+        assert np.array_equal(exact_is_invalid, np.isnan(approx))
+        exact_valid = fp.exact_to_float(exact[~exact_is_invalid])
+        assert np.allclose(exact_valid, approx[~exact_is_invalid], rtol=1e-9)
+
+
+@given(states=st.lists(pool_state_strategy, min_size=1, max_size=10))
+def test_exact_matches_solidity(gyro_two_math_testing, states):
+    for balances, sqrt_alpha, sqrt_beta in states:
+        assume(not faulty_params(balances, sqrt_alpha, sqrt_beta))
+
+    x, y, sqrt_alpha, sqrt_beta = _pool_arrays(states, fp.to_exact)
+    invariant = math_array.calculateInvariant(x, y, sqrt_alpha, sqrt_beta)
+    a = math_array.calculateVirtualParameter0(invariant, sqrt_beta)
+    b = math_array.calculateVirtualParameter1(invariant, sqrt_alpha)
+    amount_in = x // 10
+    amount_out = math_array.calcOutGivenIn(x, y, amount_in, a, b)
+
+    for i, (balances, sa, sb) in enumerate(states):
+        invariant_sol = gyro_two_math_testing.calculateInvariant(
+            scale(balances), scale(sa), scale(sb)
+        )
+        assert invariant_sol == invariant[i]
+        args = (x[i], y[i], amount_in[i], a[i], b[i])
+        if amount_out[i] is None:
+            with reverts("GYR#357"):  # ASSET_BOUNDS_EXCEEDED
+                gyro_two_math_testing.calcOutGivenIn(*args)
+        else:
+            assert gyro_two_math_testing.calcOutGivenIn(*args) == amount_out[i]
+
+
+@given(input=st.integers(min_value=0, max_value=10**26))
+def test_sqrt_matches_solidity(gyro_two_math_testing, input):
+    sqrt = fp.sqrt(np.array([input], dtype=object))[0]
+    assert sqrt == gyro_two_math_testing.sqrt(input)
+
+
+def test_in_given_out_whole_virtual_balance_is_invalid():
+    # Without virtual parameters, taking out the whole balance divides by zero in the contract's divUp().
+    for to_array in (fp.to_exact, fp.to_float):
+        balances, zero = to_array([100, 100]), to_array([0, 0])
+        amount_in = math_array.calcInGivenOut(
+            balances, balances, to_array([100, 50]), zero, zero
+        )
+        assert [v is None or v != v for v in amount_in] == [True, False]
+
+
+def test_exact_reverts_are_invalid():
+    # Each row where the checked contract operation reverts is None, and None propagates.
+    one = fp.ONE
+    a = np.array([1, 2, 2**255, 1], dtype=object)
+    b = np.array([one, 0, 4 * one, None], dtype=object)
+    assert list(fp.div_down(a, b)) == [1, None, None, None]
+    assert list(fp.mul_down(a, b)) == [1, 0, None, None]
+    assert list(fp.sub(a, np.array([0, 3, 0, 0], dtype=object))) == [1, None, 2**255, 1]
+
+    # A swap whose virtual balances overflow reverts in the contract's add().
+    big = np.array([2**255, 10 * one], dtype=object)
+    amount_out = math_array.calcOutGivenIn(big, big, big // 2**200, big, big)
+    assert amount_out[0] is None and amount_out[1] is not None
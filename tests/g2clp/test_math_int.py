@@ -0,0 +1,138 @@
+import hypothesis.strategies as st
+import numpy as np
+from brownie.test import given
+from hypothesis import settings
+
+from tests.g2clp import math_array, math_int
+from tests.libraries import pool_math_int
+from tests.support.pool_simulator import UINT256_MAX, PoolRevert
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.reverts import outcome
+from tests.support.utils import scale
+
+balance_strategy = st.integers(min_value=1, max_value=100_000_000_000 * 10**18)
+sqrt_alpha_strategy = st.integers(min_value=2 * 10**16, max_value=99995 * 10**13)
+sqrt_beta_strategy = st.integers(min_value=100005 * 10**13, max_value=18 * 10**17)
+
+
+@settings(max_examples=50)
+@given(
+    balances=st.tuples(balance_strategy, balance_strategy),
+    sqrt_alpha=sqrt_alpha_strategy,
+    sqrt_beta=sqrt_beta_strategy,
+)
+def test_invariant_matches_contract(
+    gyro_two_math_testing, balances, sqrt_alpha, sqrt_beta
+):
+    terms = math_int.calculateQuadraticTerms(balances, sqrt_alpha, sqrt_beta)
+    assert terms == tuple(
+        gyro_two_math_testing.calculateQuadraticTerms(balances, sqrt_alpha, sqrt_beta)
+    )
+    assert outcome(
+        math_int.calculateInvariant, balances, sqrt_alpha, sqrt_beta
+    ) == outcome(
+        gyro_two_math_testing.calculateInvariant, balances, sqrt_alpha, sqrt_beta
+    )
+
+
+@settings(max_examples=50)
+@given(
+    balances=st.tuples(balance_strategy, balance_strategy),
+    amount=balance_strategy,
+    virtual_params=st.tuples(balance_strategy, balance_strategy),
+)
+def test_swaps_match_contract(gyro_two_math_testing, balances, amount, virtual_params):
+    args = (*balances, amount, *virtual_params)
+    assert outcome(math_int.calcOutGivenIn, *args) == outcome(
+        gyro_two_math_testing.calcOutGivenIn, *args
+    )
+    assert outcome(math_int.calcInGivenOut, *args) == outcome(
+        gyro_two_math_testing.calcInGivenOut, *args
+    )
+
+
+@settings(max_examples=50)
+@given(input=st.integers(min_value=0, max_value=UINT256_MAX))
+def test_sqrt_matches_contract(math_testing, input):
+    assert pool_math_int.makeInitialGuess(input) == math_testing.sqrtNewtonInitialGuess(
+        input
+    )
+    assert outcome(pool_math_int.sqrt, input, 5) == outcome(
+        math_testing.sqrtNewton, input, 5
+    )
+
+
+def _sqrt_inputs(rng, n):
+    mantissas = rng.integers(1, 10**9, n)
+    exponents = rng.integers(0, 62, n)
+    return [0, 1, 10**18] + [
+        int(m) * 10 ** int(e) for m, e in zip(mantissas, exponents)
+    ]
+
+
+def test_sqrts_match_scalar():
+    inputs = _sqrt_inputs(np.random.default_rng(0), 2000)
+    roots, iterations = pool_math_int.sqrts(inputs, 5)
+    for input, root, k in zip(inputs, roots, iterations):
+        try:
+            assert (root, k) == pool_math_int.sqrtWithIterations(input, 5)
+        except PoolRevert:
+            assert root is None
+    # The contract's 7 steps always suffice unless input * ONE wraps around.
+    in_range = np.array([input * 10**18 <= UINT256_MAX for input in inputs])
+    assert np.all(iterations[in_range] <= pool_math_int.SQRT_ITERATIONS)
+    assert all(root is not None for root in roots[in_range])
+
+
+def test_compare_initial_guesses():
+    inputs = [
+        input
+        for input in _sqrt_inputs(np.random.default_rng(1), 1000)
+        if input * 10**18 <= UINT256_MAX
+    ]
+    iterations = pool_math_int.compareInitialGuesses(inputs)
+    assert set(iterations) == set(pool_math_int.INITIAL_GUESSES)
+    assert iterations["contract"].max() <= pool_math_int.SQRT_ITERATIONS
+    assert iterations["bit_length"].max() <= pool_math_int.SQRT_ITERATIONS
+    # Without an input-dependent guess, the number of steps grows with the order of magnitude.
+    assert iterations["one"].mean() > 2 * iterations["contract"].mean()
+
+
+def _raw(values):
+    return np.array(values, dtype=object)
+
+
+def test_matches_array_version():
+    rng = np.random.default_rng(2)
+    n = 200
+    x = [int(b) * 10**15 for b in rng.integers(1, 10**9, n)]
+    y = [int(b) * 10**15 for b in rng.integers(1, 10**9, n)]
+    sqrt_alpha = [int(scale(D(float(v)))) for v in rng.uniform(0.02, 0.99995, n)]
+    sqrt_beta = [int(scale(D(float(v)))) for v in rng.uniform(1.00005, 1.8, n)]
+    invariants, iterations = math_int.calculateInvariants(
+        list(zip(x, y)), sqrt_alpha, sqrt_beta
+    )
+    expected = math_array.calculateInvariant(
+        *(_raw(v) for v in (x, y, sqrt_alpha, sqrt_beta))
+    )
+    assert np.array_equal(invariants, expected)
+    assert np.all((0 <= iterations) & (iterations <= pool_math_int.SQRT_ITERATIONS))
+
+    virtual_in = [
+        math_int.calculateVirtualParameter0(l, b) for l, b in zip(invariants, sqrt_beta)
+    ]
+    virtual_out = [
+        math_int.calculateVirtualParameter1(l, a)
+        for l, a in zip(invariants, sqrt_alpha)
+    ]
+    amounts = [v // 10 for v in x]
+    amounts_out = math_int.calcOutGivenIns(x, y, amounts, virtual_in, virtual_out)
+    assert np.array_equal(
+        amounts_out,
+        math_array.calcOutGivenIn(
+            *(_raw(v) for v in (x, y, amounts, virtual_in, virtual_out))
+        ),
+    )
+    # More than the balance out reverts.
+    amounts_in = math_int.calcInGivenOuts(x, y, _raw(y) + 1, 0, 0)
+    assert all(v is None for v in amounts_in)
@@ -0,0 +1,110 @@
+import pytest
+
+from tests.g2clp.pool_simulator import Gyro2CLPPoolSimulator
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.simulator_conformance import (
+    VaultDriver,
+    run_conformance,
+    set_protocol_swap_fee,
+    speedup,
+)
+from tests.support.types import CapParams, TwoPoolBaseParams, TwoPoolParams
+
+PROTOCOL_SWAP_FEE = 5 * 10**17
+
+CAP_PARAMS = CapParams(
+    cap_enabled=True, per_address_cap=300 * 10**18, global_cap=500 * 10**18
+)
+
+# Pausing is only possible within the pause window, and unpausing within the buffer period after it.
+PAUSE_WINDOW_DURATION = 30 * 24 * 3600
+BUFFER_PERIOD_DURATION = 30 * 24 * 3600
+
+
+@pytest.fixture
+def capped_pausable_pool(
+    admin,
+    Gyro2CLPPool,
+    SimpleERC20,
+    SimpleERC20CustomDecimal,
+    mock_vault,
+    mock_gyro_config,
+    deployed_query_processor,
+):
+    """(pool, tokens): a pool with a liquidity cap, a 6-decimal token and `admin` as its pause manager."""
+    tokens = sorted(
+        [admin.deploy(SimpleERC20CustomDecimal, 6), admin.deploy(SimpleERC20)],
+        key=lambda token: token.address.lower(),
+    )
+    args = TwoPoolParams(
+        baseParams=TwoPoolBaseParams(
+            vault=mock_vault.address,
+            name="Gyro2CLPPool",  # string
+            symbol="GTP",  # string
+            token0=tokens[0].address,  # IERC20
+            token1=tokens[1].address,  # IERC20
+            swapFeePercentage=D(1) * 10**15,
+            pauseWindowDuration=PAUSE_WINDOW_DURATION,  # uint256
+            bufferPeriodDuration=BUFFER_PERIOD_DURATION,  # uint256
+            oracleEnabled=False,  # bool
+            owner=admin,  # address
+        ),
+        sqrtAlpha=D("0.97") * 10**18,  # uint256
+        sqrtBeta=D("1.02") * 10**18,  # uint256
+        cap_params=CAP_PARAMS,
+        pauseManager=admin,
+    )
+    return admin.deploy(Gyro2CLPPool, args, mock_gyro_config.address), tokens
+
+
+def make_sim(pool, **kwargs) -> Gyro2CLPPoolSimulator:
+    sqrt_alpha, sqrt_beta = pool.getSqrtParameters()
+    return Gyro2CLPPoolSimulator(
+        sqrt_alpha,
+        sqrt_beta,
+        pool.getSwapFeePercentage(),
+        protocol_swap_fee=PROTOCOL_SWAP_FEE,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_simulator_matches_pool(
+    users, mock_vault, mock_vault_pool, mock_gyro_config, gyro_erc20_funded, seed
+):
+    set_protocol_swap_fee(mock_gyro_config, PROTOCOL_SWAP_FEE)
+    sim = make_sim(mock_vault_pool)
+    driver = VaultDriver(mock_vault, mock_vault_pool, gyro_erc20_funded)
+    run_conformance(
+        driver, sim, users[:2], [100 * 10**18, 80 * 10**18], seed, n_steps=30
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_simulator_matches_capped_pausable_pool(
+    admin, users, mock_vault, capped_pausable_pool, mock_gyro_config, seed
+):
+    set_protocol_swap_fee(mock_gyro_config, PROTOCOL_SWAP_FEE)
+    pool, tokens = capped_pausable_pool
+    decimals = [token.decimals() for token in tokens]
+    assert sorted(decimals) == [6, 18]
+    sim = make_sim(pool, token_decimals=decimals, cap_params=CAP_PARAMS)
+    driver = VaultDriver(mock_vault, pool, tokens)
+    run_conformance(
+        driver,
+        sim,
+        users[:2],
+        [100 * 10 ** decimals[0], 80 * 10 ** decimals[1]],
+        seed,
+        n_steps=30,
+        pause_manager=admin,
+    )
+
+
+def test_faster_than_vault(users, mock_vault, mock_vault_pool, gyro_erc20_funded):
+    driver = VaultDriver(mock_vault, mock_vault_pool, gyro_erc20_funded)
+    initial_amounts = [100 * 10**18, 80 * 10**18]
+    assert (
+        speedup(driver, make_sim(mock_vault_pool), users[0], initial_amounts, 10**18)
+        > 100
+    )
@@ -0,0 +1,86 @@
+# Benchmark and bit-exactness report for the invariant backends in v3_math_implementation.
+#
+# Run as `python -m tests.g3clp.invariant_backends [n_samples]`.
+
+import sys
+import time
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+from tabulate import tabulate
+
+from tests.g3clp import v3_math_implementation as mimpl
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+ROOT_ALPHA_MIN = 0.2
+ROOT_ALPHA_MAX = 0.99996666555
+
+
+def sample_pools(rng: np.random.Generator, n: int) -> list[tuple[list[D], D]]:
+    """Log-uniform balances in [1, 1e11] and uniform root3Alpha, rounded to 18 decimals."""
+    pools = []
+    for _ in range(n):
+        balances = [D(float(b)) for b in np.exp(rng.uniform(0, np.log(1e11), size=3))]
+        root3Alpha = D(float(rng.uniform(ROOT_ALPHA_MIN, ROOT_ALPHA_MAX)))
+        pools.append((balances, root3Alpha))
+    return pools
+
+
+def compare_backends(pools: Iterable[tuple[list[D], D]], reference: str = "newton"):
+    """Runs all backends on all pools. Returns per-backend timing and, compared to `reference`, a Counter of the
+    differences in units of 1e-18."""
+    pools = list(pools)
+    terms = [mimpl.calculateCubicTerms(b, r) for b, r in pools]
+    results = {}
+    for name, fn in mimpl.INVARIANT_BACKENDS.items():
+        t0 = time.perf_counter()
+        outputs = [
+            fn(*t, root3Alpha, balances)
+            for t, (balances, root3Alpha) in zip(terms, pools)
+        ]
+        dt = time.perf_counter() - t0
+        results[name] = dict(
+            time=dt,
+            invariants=[l for l, _ in outputs],
+            n_steps=[len(log) for _, log in outputs],
+        )
+    for name, res in results.items():
+        res["ulp_diffs"] = Counter(
+            int((l.raw - l_ref.raw) * 10**18)
+            for l, l_ref in zip(res["invariants"], results[reference]["invariants"])
+        )
+    return results
+
+
+def main(n: int = 1000):
+    rng = np.random.default_rng(0)
+    pools = sample_pools(rng, n)
+    results = compare_backends(pools)
+    rows = []
+    for name, res in results.items():
+        rows.append(
+            (
+                name,
+                f"{res['time'] / n * 1e3:.3f}",
+                f"{np.mean(res['n_steps']):.2f}",
+                f"{res['ulp_diffs'][0] / n:.2%}",
+                max(abs(k) for k in res["ulp_diffs"]),
+            )
+        )
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "backend",
+                "ms / invariant",
+                "mean steps",
+                "bit-exact vs newton",
+                "max |diff| (1e-18)",
+            ],
+        )
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,212 @@
+# Bit-exact port of Gyro3CLPMath on python ints as uint256 (unlike v3_math_implementation, which works on
+# QuantizedDecimal and doesn't mirror the Newton iteration of the contract).
+#
+# All rounding directions, the unchecked arithmetic and the revert conditions are the ones of the contract, so
+# calculateInvariant() returns exactly what Gyro3CLPMathTesting.calculateInvariant() returns. In addition, the Newton
+# iteration reports how many steps it took (each step is one call of _calcNewtonDelta(), the dominant variable cost
+# in gas), and how many of these were in the branch for large invariants, which uses the more expensive
+# mulDownLargeSmall / divDownLarge operations. calculateInvariants() evaluates this for many pools at once.
+
+from typing import NamedTuple, Sequence, Union
+
+import numpy as np
+
+from tests.libraries.fixed_point_int import (
+    ONE,
+    add,
+    divDown,
+    divDownLargeU,
+    divDownU,
+    divUp,
+    divUpU,
+    mulDown,
+    mulDownLargeSmallU,
+    mulDownU,
+    mulUp,
+    mulUpU,
+    sub,
+    wrap,
+)
+from tests.libraries.pool_math_int import sqrt
+from tests.support.pool_simulator import PoolRevert
+
+INVARIANT_DIDNT_CONVERGE = "GYR#352"
+ASSET_BOUNDS_EXCEEDED = "GYR#357"
+INVARIANT_TOO_LARGE = "GYR#361"
+BALANCES_TOO_LARGE = "GYR#362"
+INVARIANT_UNDERFLOW = "GYR#363"
+
+_INVARIANT_SHRINKING_FACTOR_PER_STEP = 8
+_INVARIANT_MIN_ITERATIONS = 5
+
+_MAX_BALANCES = 10**29
+
+_L_THRESHOLD_SIMPLE_NUMERICS = 2 * 10**31
+_L_MAX = 10**34
+_L_VS_LPLUS_MIN = 13 * 10**17
+
+
+class NewtonResult(NamedTuple):
+    root: int
+    iterations: int  # number of _calcNewtonDelta() calls
+    large_iterations: int  # of which with rootEst > _L_THRESHOLD_SIMPLE_NUMERICS
+
+
+def calculateInvariant(balances: Sequence[int], root3Alpha: int) -> int:
+    return calculateInvariantWithIterations(balances, root3Alpha).root
+
+
+def calculateInvariantWithIterations(
+    balances: Sequence[int], root3Alpha: int
+) -> NewtonResult:
+    if any(not (b <= _MAX_BALANCES) for b in balances):
+        raise PoolRevert(BALANCES_TOO_LARGE)
+    a, mb, mc, md = calculateCubicTerms(balances, root3Alpha)
+    return calculateCubic(a, mb, mc, md, root3Alpha)
+
+
+def calculateCubicTerms(
+    balances: Sequence[int], root3Alpha: int
+) -> tuple[int, int, int, int]:
+    x, y, z = balances
+    a = wrap(ONE - mulDownU(mulDownU(root3Alpha, root3Alpha), root3Alpha))
+    bterm = wrap(x + y + z)
+    mb = mulDownU(mulDownU(bterm, root3Alpha), root3Alpha)
+    cterm = wrap(mulDownU(x, y) + mulDownU(y, z) + mulDownU(z, x))
+    mc = mulDownU(cterm, root3Alpha)
+    md = mulDownU(mulDownU(x, y), z)
+    return a, mb, mc, md
+
+
+def calculateCubic(a: int, mb: int, mc: int, md: int, root3Alpha: int) -> NewtonResult:
+    l_lower, rootEst = calculateCubicStartingPoint(a, mb, mc, md)
+    result = runNewtonIteration(mb, mc, md, root3Alpha, l_lower, rootEst)
+    if not (result.root <= _L_MAX):
+        raise PoolRevert(INVARIANT_TOO_LARGE)
+    return result
+
+
+def calculateCubicStartingPoint(a: int, mb: int, mc: int, md: int) -> tuple[int, int]:
+    """(l_lower, l0)"""
+    radic = wrap(mulUpU(mb, mb) + mulUpU(a, wrap(mc * 3)))
+    lplus = divUpU(wrap(mb + sqrt(radic, 5)), wrap(a * 3))
+    alpha = wrap(ONE - a)
+    l0 = mulUpU(lplus, 15 * 10**17 if alpha >= 5 * 10**17 else 2 * ONE)
+    l_lower = mulUpU(lplus, _L_VS_LPLUS_MIN)
+    return l_lower, l0
+
+
+def runNewtonIteration(
+    mb: int, mc: int, md: int, root3Alpha: int, l_lower: int, rootEst: int
+) -> NewtonResult:
+    deltaAbsPrev = 0
+    large_iterations = 0
+    for iteration in range(255):
+        large_iterations += rootEst > _L_THRESHOLD_SIMPLE_NUMERICS
+        deltaAbs, deltaIsPos = calcNewtonDelta(mb, mc, md, root3Alpha, l_lower, rootEst)
+        result = NewtonResult(rootEst, iteration + 1, large_iterations)
+        if deltaAbs <= 1:
+            return result
+        if iteration >= _INVARIANT_MIN_ITERATIONS and deltaIsPos:
+            return result
+        if (
+            iteration >= _INVARIANT_MIN_ITERATIONS
+            and deltaAbs >= deltaAbsPrev // _INVARIANT_SHRINKING_FACTOR_PER_STEP
+        ):
+            return result
+        deltaAbsPrev = deltaAbs
+        rootEst = add(rootEst, deltaAbs) if deltaIsPos else sub(rootEst, deltaAbs)
+    raise PoolRevert(INVARIANT_DIDNT_CONVERGE)
+
+
+def _mulDownRoot3AlphaCubed(x: int, root3Alpha: int, mul=mulDownU) -> int:
+    return mul(mul(mul(x, root3Alpha), root3Alpha), root3Alpha)
+
+
+def calcNewtonDelta(
+    mb: int, mc: int, md: int, root3Alpha: int, l_lower: int, rootEst: int
+) -> tuple[int, bool]:
+    """(deltaAbs, deltaIsPos)"""
+    if not (rootEst <= _L_MAX):
+        raise PoolRevert(INVARIANT_TOO_LARGE)
+    if not (rootEst >= l_lower):
+        raise PoolRevert(INVARIANT_UNDERFLOW)
+
+    rootEst2 = mulDownU(rootEst, rootEst)
+
+    dfRootEst = mulDown(wrap(rootEst * 3), rootEst)
+    dfRootEst = wrap(dfRootEst - _mulDownRoot3AlphaCubed(dfRootEst, root3Alpha))
+    dfRootEst = wrap(dfRootEst - wrap(2 * mulDownU(rootEst, mb)) - mc)
+
+    if rootEst <= _L_THRESHOLD_SIMPLE_NUMERICS:
+        deltaMinus = mulDownU(rootEst2, rootEst)
+        deltaMinus = wrap(deltaMinus - _mulDownRoot3AlphaCubed(deltaMinus, root3Alpha))
+        deltaMinus = divDownU(deltaMinus, dfRootEst)
+
+        deltaPlus = mulDownU(rootEst2, mb)
+        deltaPlus = divDownU(wrap(deltaPlus + mulDownU(rootEst, mc)), dfRootEst)
+        deltaPlus = wrap(deltaPlus + divDownU(md, dfRootEst))
+    else:
+        deltaMinus = mulDownLargeSmallU(rootEst2, rootEst)
+        deltaMinus = wrap(
+            deltaMinus
+            - _mulDownRoot3AlphaCubed(deltaMinus, root3Alpha, mulDownLargeSmallU)
+        )
+        deltaMinus = divDownLargeU(deltaMinus, dfRootEst)
+
+        deltaPlus = mulDownLargeSmallU(rootEst2, mb)
+        deltaPlus = wrap(deltaPlus + mulDownU(mc, rootEst))
+        deltaPlus = divDownLargeU(deltaPlus, dfRootEst, 10**12, 10**6)
+        deltaPlus = wrap(deltaPlus + divDownU(md, dfRootEst))
+
+    deltaIsPos = deltaPlus >= deltaMinus
+    deltaAbs = deltaPlus - deltaMinus if deltaIsPos else deltaMinus - deltaPlus
+    return deltaAbs, deltaIsPos
+
+
+def calcOutGivenIn(
+    balanceIn: int, balanceOut: int, amountIn: int, virtualOffset: int
+) -> int:
+    virtInOver = wrap(balanceIn + mulUpU(virtualOffset, ONE + 2))
+    virtOutUnder = wrap(balanceOut + mulDownU(virtualOffset, ONE - 1))
+    amountOut = divDown(mulDown(virtOutUnder, amountIn), add(virtInOver, amountIn))
+    if not (amountOut <= balanceOut):
+        raise PoolRevert(ASSET_BOUNDS_EXCEEDED)
+    return amountOut
+
+
+def calcInGivenOut(
+    balanceIn: int, balanceOut: int, amountOut: int, virtualOffset: int
+) -> int:
+    if not (amountOut <= balanceOut):
+        raise PoolRevert(ASSET_BOUNDS_EXCEEDED)
+    virtInOver = wrap(balanceIn + mulUpU(virtualOffset, ONE + 2))
+    virtOutUnder = wrap(balanceOut + mulDownU(virtualOffset, ONE - 1))
+    return divUp(mulUp(virtInOver, amountOut), sub(virtOutUnder, amountOut))
+
+
+def calcSpotPrice01in2(balances: Sequence[int], virtualOffset: int) -> tuple[int, int]:
+    virt2 = wrap(balances[2] + virtualOffset)
+    spotPrice0 = divUp(virt2, add(balances[0], virtualOffset))
+    spotPrice1 = divUp(virt2, add(balances[1], virtualOffset))
+    return spotPrice0, spotPrice1
+
+
+def calculateInvariants(
+    balances: Sequence[Sequence[int]], root3Alpha: Union[int, Sequence[int]]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """calculateInvariantWithIterations() for many pools: (invariants, iterations, large_iterations). `root3Alpha` is
+    one value for all pools or one per pool. Where the contract would revert, the invariant is None and the iteration
+    counts are -1."""
+    n = len(balances)
+    root3Alphas = [root3Alpha] * n if isinstance(root3Alpha, int) else root3Alpha
+    invariants = np.empty(n, dtype=object)
+    iterations = np.full(n, -1, dtype=np.int64)
+    large_iterations = np.full(n, -1, dtype=np.int64)
+    for k, (b, r) in enumerate(zip(balances, root3Alphas)):
+        try:
+            result = calculateInvariantWithIterations([int(v) for v in b], int(r))
+        except PoolRevert:
+            continue
+        invariants[k], iterations[k], large_iterations[k] = result
+    return invariants, iterations, large_iterations
@@ -0,0 +1,106 @@
+# In-process model of Gyro3CLPPool, see tests/support/pool_simulator.py.
+#
+# With the default backend, the invariant, spot prices and swap amounts come from math_int, the bit-exact port of
+# Gyro3CLPMath, so the simulator agrees with the pool exactly. The other invariant backends of v3_math_implementation
+# agree with the contract up to a few 1e-18; everything downstream of the invariant is exact with them, too.
+
+import math
+from typing import Sequence
+
+from tests.g3clp import math_int
+from tests.g3clp import v3_math_implementation as math_implementation
+from tests.support.pool_simulator import (
+    ONE,
+    PoolSimulator,
+    mul_down,
+)
+from tests.support.swap_models import ConstantProductSwapModel
+from tests.support.swap_table import hyperbola_curve
+from tests.support.utils import scale, unscale
+
+
+class Gyro3CLPPoolSimulator(PoolSimulator):
+    """`root3_alpha` is a raw 18-decimal value, as passed to the contract. `backend` selects the invariant
+    computation, see v3_math_implementation.INVARIANT_BACKENDS."""
+
+    n_tokens = 3
+
+    def __init__(
+        self, root3_alpha: int, swap_fee: int, backend: str = "exact", **kwargs
+    ):
+        super().__init__(swap_fee, **kwargs)
+        self.root3_alpha = root3_alpha
+        self.backend = backend
+
+    def calculate_invariant(self, balances: list[int]) -> int:
+        if self.backend == "exact":
+            return math_int.calculateInvariant(balances, self.root3_alpha)
+        invariant = math_implementation.calculateInvariant(
+            unscale(list(balances)), unscale(self.root3_alpha), self.backend
+        )
+        return int(scale(invariant))
+
+    def virtual_offset(self, invariant: int) -> int:
+        return mul_down(invariant, self.root3_alpha)
+
+    def _calc_initial_bpt(self, amounts_in: list[int]) -> tuple[int, int]:
+        invariant = self.calculate_invariant(amounts_in)
+        spot_price0, spot_price1 = self._spot_prices_01in2(
+            amounts_in, self.virtual_offset(invariant)
+        )
+        bpt_out = (
+            mul_down(amounts_in[0], spot_price0)
+            + mul_down(amounts_in[1], spot_price1)
+            + amounts_in[2]
+        )
+        return bpt_out, invariant
+
+    @staticmethod
+    def _spot_prices_01in2(
+        balances: Sequence[int], virtual_offset: int
+    ) -> tuple[int, int]:
+        return math_int.calcSpotPrice01in2(balances, virtual_offset)
+
+    def _spot_prices(self, balances: list[int]) -> list[int]:
+        virtual_offset = self.virtual_offset(self.calculate_invariant(balances))
+        return [*self._spot_prices_01in2(balances, virtual_offset), ONE]
+
+    def _swap_model(self, balances, i_in, i_out):
+        virtual_offset = self.virtual_offset(self.calculate_invariant(balances))
+        return ConstantProductSwapModel(
+            (balances[i_in] + virtual_offset) / ONE,
+            (balances[i_out] + virtual_offset) / ONE,
+            balances[i_out] / ONE,
+            self.swap_fee / ONE,
+        )
+
+    def _swap_curve(self, balances, i_in, i_out):
+        # With the third balance z fixed, (x + a) (y + a) = L^3 / (z + a).
+        invariant = self.calculate_invariant(balances)
+        virtual_offset = self.virtual_offset(invariant) / ONE
+        z = balances[3 - i_in - i_out] / ONE
+        sqrt_k = math.sqrt((invariant / ONE) ** 3 / (z + virtual_offset))
+        return hyperbola_curve(
+            "hyperbola",
+            u_min=virtual_offset / sqrt_k,
+            u_max=sqrt_k / virtual_offset,
+            u0=(balances[i_in] / ONE + virtual_offset) / sqrt_k,
+            scale=sqrt_k,
+            fee=self.swap_fee / ONE,
+        )
+
+    def _calc_out_given_in(self, balances, i_in, i_out, amount_in):
+        virtual_offset = self.virtual_offset(self.calculate_invariant(balances))
+        return math_int.calcOutGivenIn(
+            balances[i_in], balances[i_out], amount_in, virtual_offset
+        )
+
+    def _calc_in_given_out(self, balances, i_in, i_out, amount_out):
+        virtual_offset = self.virtual_offset(self.calculate_invariant(balances))
+        return math_int.calcInGivenOut(
+            balances[i_in], balances[i_out], amount_out, virtual_offset
+        )
+
+    def get_prices(self) -> tuple[int, int]:
+        """Spot prices of tokens 0 and 1 in units of token 2, as getPrices()."""
+        return tuple(self._spot_prices(self.upscaled_balances())[:2])
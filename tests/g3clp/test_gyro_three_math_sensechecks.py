@@ -1,11 +1,11 @@
 from operator import add
 
 import hypothesis.strategies as st
-from brownie import reverts  # type: ignore
 from brownie.test import given
 from hypothesis import example
 
 from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.reverts import reverts  # type: ignore
 from tests.support.util_common import gen_balances, BasicPoolParameters
 from tests.support.utils import qdecimals, scale, to_decimal, unscale
 
@@ -6,10 +6,10 @@ import numpy as np
 from hypothesis import settings, assume, example
 
 import tests.g3clp.v3_math_implementation as math_implementation
-from brownie import reverts
 from brownie.test import given
 from pytest import mark
 
+from tests.support.reverts import reverts
 from tests.support.utils import scale, to_decimal, unscale, qdecimals
 
 from tests.support.quantized_decimal import QuantizedDecimal as D
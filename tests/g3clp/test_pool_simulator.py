@@ -0,0 +1,45 @@
+import pytest
+
+from tests.g3clp.pool_simulator import Gyro3CLPPoolSimulator
+from tests.support.simulator_conformance import (
+    VaultDriver,
+    run_conformance,
+    set_protocol_swap_fee,
+    speedup,
+)
+
+PROTOCOL_SWAP_FEE = 5 * 10**17
+
+
+def make_sim(pool) -> Gyro3CLPPoolSimulator:
+    return Gyro3CLPPoolSimulator(
+        pool.getRoot3Alpha(),
+        pool.getSwapFeePercentage(),
+        protocol_swap_fee=PROTOCOL_SWAP_FEE,
+    )
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_simulator_matches_pool(
+    users, mock_vault, mock_vault_pool3, mock_gyro_config, gyro_erc20_funded3, seed
+):
+    set_protocol_swap_fee(mock_gyro_config, PROTOCOL_SWAP_FEE)
+    sim = make_sim(mock_vault_pool3)
+    driver = VaultDriver(mock_vault, mock_vault_pool3, gyro_erc20_funded3)
+    run_conformance(
+        driver,
+        sim,
+        users[:2],
+        [100 * 10**18, 80 * 10**18, 90 * 10**18],
+        seed,
+        n_steps=15,
+    )
+
+
+def test_faster_than_vault(users, mock_vault, mock_vault_pool3, gyro_erc20_funded3):
+    driver = VaultDriver(mock_vault, mock_vault_pool3, gyro_erc20_funded3)
+    initial_amounts = [100 * 10**18, 80 * 10**18, 90 * 10**18]
+    assert (
+        speedup(driver, make_sim(mock_vault_pool3), users[0], initial_amounts, 10**18)
+        > 100
+    )
@@ -103,3 +103,23 @@ def test_calculateInvariant_reconstruction_alt(args):
 
     invariant = float(invariant)
     assert invariant_re == approx(invariant, rel=5e-12)
+
+
+@settings(max_examples=500)
+@given(
+    balances=gen_balances(3, bpool_params),
+    root3Alpha=qdecimals(ROOT_ALPHA_MIN, ROOT_ALPHA_MAX),
+)
+@example(balances=[D("1e11"), D("1e11"), D("1e11")], root3Alpha=D(ROOT_ALPHA_MAX))
+@example(balances=[D("1e11"), D(0), D("1e11")], root3Alpha=D(ROOT_ALPHA_MAX))
+@example(balances=[D("1e11"), D(0), D(0)], root3Alpha=D(ROOT_ALPHA_MAX))
+@example(balances=[D(1), D(1), D("1e-18")], root3Alpha=D(ROOT_ALPHA_MIN))
+def test_calculateInvariant_analytic_match(balances: Iterable[D], root3Alpha: D):
+    """The analytic backend agrees with Newton to the last digit in the vast majority of cases, see
+    tests/g3clp/invariant_backends.py. For tiny balances, f(l) is too small to resolve in 18 decimals and the two
+    can differ in the last few digits."""
+    invariant_newton = mimpl.calculateInvariant(balances, root3Alpha)
+    invariant_analytic = mimpl.calculateInvariant(
+        balances, root3Alpha, backend="analytic"
+    )
+    assert invariant_analytic == invariant_newton.approxed(abs=D("1e-18"), rel=D("1e-13"))
@@ -2,7 +2,6 @@ from typing import Tuple
 
 import hypothesis.strategies as st
 from brownie.test import given
-from brownie import reverts
 from hypothesis import assume, settings, example, HealthCheck, event
 import tests.g3clp.v3_math_implementation as math_implementation
 from tests.libraries import pool_math_implementation
@@ -12,6 +11,7 @@ from tests.g3clp.util import (
     gen_synthetic_balances_2assets,
     equal_balances_at_invariant,
 )
+from tests.support.reverts import reverts
 from tests.support.util_common import BasicPoolParameters
 from tests.support.utils import scale, to_decimal, qdecimals, unscale
 
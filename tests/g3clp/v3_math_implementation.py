@@ -1,3 +1,4 @@
+import decimal
 from logging import warning
 from math import sqrt
 from typing import Iterable, List, Tuple, Callable
@@ -5,6 +6,7 @@ from typing import Iterable, List, Tuple, Callable
 from tests.support.utils import scale, to_decimal, unscale, qdecimals
 
 import numpy as np
+from tests.g3clp import math_int
 from tests.support.quantized_decimal import QuantizedDecimal as D
 
 _MAX_IN_RATIO = D("0.3")
@@ -13,9 +15,11 @@ _MAX_OUT_RATIO = D("0.3")
 prec_convergence = D("1E-18")
 
 
-def calculateInvariant(balances: Iterable[D], root3Alpha: D) -> D:
+def calculateInvariant(
+    balances: Iterable[D], root3Alpha: D, backend: str = "newton"
+) -> D:
     (a, mb, mc, md) = calculateCubicTerms(balances, root3Alpha)
-    return calculateCubic(a, mb, mc, md, root3Alpha, balances)
+    return calculateCubic(a, mb, mc, md, root3Alpha, balances, backend)
 
 
 def calculateCubicTerms(balances: Iterable[D], root3Alpha: D) -> tuple[D, D, D, D]:
@@ -30,9 +34,18 @@ def calculateCubicTerms(balances: Iterable[D], root3Alpha: D) -> tuple[D, D, D,
 
 # Doesn't completely mirror _calculateCubic in Gyro3CLPMath.sol
 def calculateCubic(
-    a: D, mb: D, mc: D, md: D, root3Alpha: D, balances: Iterable[D]
+    a: D,
+    mb: D,
+    mc: D,
+    md: D,
+    root3Alpha: D,
+    balances: Iterable[D],
+    backend: str = "newton",
 ) -> D:
-    invariant, log_steps = calculateInvariantNewton(a, mb, mc, md, root3Alpha, balances)
+    """backend: key of INVARIANT_BACKENDS."""
+    invariant, log_steps = INVARIANT_BACKENDS[backend](
+        a, mb, mc, md, root3Alpha, balances
+    )
     return invariant
 
 
@@ -124,6 +137,145 @@ def calculateInvariantNewton(
         delta_pre = delta
 
 
+# Working precision (significant digits) of the analytic solver. The coefficients have up to ~35 significant digits
+# and solving the cubic loses at most about as many to cancellation, so this leaves a wide margin.
+ANALYTIC_PRECISION = 110
+
+
+def _decimal_pi() -> decimal.Decimal:
+    """pi to the current precision. From the `decimal` module documentation."""
+    with decimal.localcontext() as ctx:
+        ctx.prec += 2
+        three = decimal.Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    return +s
+
+
+def _decimal_cos(x: decimal.Decimal) -> decimal.Decimal:
+    """Taylor series. Meant for |x| <= pi, where it converges fast."""
+    with decimal.localcontext() as ctx:
+        ctx.prec += 2
+        i, lasts, s, fact, num, sign = 0, 0, 1, 1, 1, 1
+        while s != lasts:
+            lasts = s
+            i += 2
+            fact *= i * (i - 1)
+            num *= x * x
+            sign *= -1
+            s += num / fact * sign
+    return +s
+
+
+def _decimal_atan(x: decimal.Decimal) -> decimal.Decimal:
+    """Taylor series after argument reduction via atan(x) = 2 atan(x / (1 + sqrt(1 + x^2)))."""
+    with decimal.localcontext() as ctx:
+        ctx.prec += 5
+        if abs(x) > 1:
+            half_pi = _decimal_pi() / 2
+            return +((half_pi if x > 0 else -half_pi) - _decimal_atan(1 / x))
+        n_halvings = 0
+        while abs(x) > decimal.Decimal("0.1"):
+            x = x / (1 + (1 + x * x).sqrt())
+            n_halvings += 1
+        i, lasts, s, num = 1, 0, x, x
+        while s != lasts:
+            lasts = s
+            i += 2
+            num *= -x * x
+            s += num / i
+        s *= 2**n_halvings
+    return +s
+
+
+def _decimal_acos(x: decimal.Decimal) -> decimal.Decimal:
+    with decimal.localcontext() as ctx:
+        ctx.prec += 5
+        if x >= 1:
+            return decimal.Decimal(0)
+        if x <= -1:
+            return +_decimal_pi()
+        # acos(x) = pi/2 - asin(x) = pi/2 - atan(x / sqrt(1 - x^2))
+        ret = _decimal_pi() / 2 - _decimal_atan(x / (1 - x * x).sqrt())
+    return +ret
+
+
+def _decimal_cbrt(x: decimal.Decimal) -> decimal.Decimal:
+    if x == 0:
+        return x
+    if x < 0:
+        return -_decimal_cbrt(-x)
+    return (x.ln() / 3).exp()
+
+
+def solveCubicAnalytic(a, b, c, d) -> decimal.Decimal:
+    """Largest real root of a l^3 + b l^2 + c l + d, computed with ANALYTIC_PRECISION significant digits. Accepts
+    anything that converts to Decimal.
+
+    We substitute l = t - b / (3a) to get the depressed cubic t^3 + p t + q. If it has one real root, we use Cardano's
+    formula, otherwise the trigonometric form (k = 0 gives the largest root)."""
+    with decimal.localcontext() as ctx:
+        ctx.prec = ANALYTIC_PRECISION
+        a, b, c, d = (decimal.Decimal(str(v)) for v in (a, b, c, d))
+        shift = -b / (3 * a)
+        p = (3 * a * c - b * b) / (3 * a * a)
+        q = (2 * b * b * b - 9 * a * b * c + 27 * a * a * d) / (27 * a * a * a)
+        disc = (q / 2) ** 2 + (p / 3) ** 3
+        if disc >= 0:
+            # Choose the sign that avoids cancellation and get the second cube root from u * v = -p / 3.
+            sqrt_disc = disc.sqrt()
+            u = _decimal_cbrt(-q / 2 - sqrt_disc if q > 0 else -q / 2 + sqrt_disc)
+            t = u - p / (3 * u) if u != 0 else decimal.Decimal(0)
+        else:
+            m = 2 * (-p / 3).sqrt()
+            theta = _decimal_acos(3 * q / (p * m))
+            t = m * _decimal_cos(theta / 3)
+        ret = t + shift
+    return +ret
+
+
+def calculateInvariantAnalytic(
+    a: D, mb: D, mc: D, md: D, alpha1: D, balances: Iterable[D]
+) -> tuple[D, list]:
+    """Alternative to calculateInvariantNewton() with the same signature: solve the cubic analytically at elevated
+    precision, round up to 18 decimals (Newton approaches the root from above), and do one step of the same Newton
+    iteration to land on the fixed-point root.
+
+    Note that the Newton iteration stops as soon as the errors in assets are below 1e-18, so it doesn't always find
+    the same fixed-point value as this; see tests/g3clp/invariant_backends.py for how often they agree."""
+    b = -mb
+    c = -mc
+    d = -md
+
+    # Use a = 1 - alpha1^3 in high precision, rather than the rounded value of `a`, to get the "true" root.
+    alpha1_hp = D(alpha1).raw
+    with decimal.localcontext() as ctx:
+        ctx.prec = ANALYTIC_PRECISION
+        a_hp = 1 - alpha1_hp * alpha1_hp * alpha1_hp
+    root = solveCubicAnalytic(a_hp, b.raw, c.raw, d.raw)
+    # Newton approaches the root from above, so we round up to start on the same side.
+    l = D(root)
+    if l.raw < root:
+        l += D("1e-18")
+    log = [dict(l=l, stage="analytic")]
+
+    # One Newton step, identical to calculateInvariantNewton().
+    l3 = l**3
+    l2 = l**2
+    f_l = l3 - l3 * alpha1 * alpha1 * alpha1 + l2 * b + c * l + d
+    df_l = 3 * l2 - 3 * l2 * alpha1 * alpha1 * alpha1 + l * b * 2 + c
+    delta = -f_l / df_l
+    l += delta
+
+    log.append(dict(l=l, delta=delta, f_l=f_l, stage="polish"))
+    return l, log
+
+
 def invariantErrorsInAssets(l, balances: Iterable, root3Alpha):
     """Error of l measured in assets. This is ONE way to do it.
 
@@ -142,6 +294,26 @@ def invariantErrorsInAssets(l, balances: Iterable, root3Alpha):
     return x1 - x, y1 - y, z1 - z
 
 
+def calculateInvariantExact(
+    a: D, mb: D, mc: D, md: D, alpha1: D, balances: Iterable[D]
+) -> tuple[D, list]:
+    """Alternative to calculateInvariantNewton() with the same signature: Gyro3CLPMath._calculateInvariant() bit by bit,
+    see math_int. The cubic terms are recomputed from the balances in integer arithmetic, so a, mb, mc, md are unused.
+    The log has one entry per step of the contract's Newton iteration."""
+    result = math_int.calculateInvariantWithIterations(
+        [int(scale(b)) for b in balances], int(scale(alpha1))
+    )
+    log = [dict(stage="newton")] * result.iterations
+    return unscale(result.root), log
+
+
+INVARIANT_BACKENDS: dict[str, Callable[..., tuple[D, list]]] = {
+    "newton": calculateInvariantNewton,
+    "analytic": calculateInvariantAnalytic,
+    "exact": calculateInvariantExact,
+}
+
+
 def invariantFunctionsFloat(
     balances: Iterable[D], root3Alpha: D
 ) -> tuple[Callable, Callable]:
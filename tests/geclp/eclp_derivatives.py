@@ -6,7 +6,7 @@ from tests.geclp import eclp_prec_implementation as prec_impl
 
 # Derivative calculations used in the SOR. See `E-CLP SOR derivatives.pdf`. These calculations are all in 18 decimals
 # and they have *not* been optimized for precision. So don't expect super high prec from them (which we also don't
-# need)
+# need). For evaluating them over many balances at once, use eclp_derivatives_array.
 
 # Note: There are four ways of computing the price of x as a derivative, and they are pairwise equal and pairwise
 # different by a factor 1/f where f=1-fee. Also, there are a lot of almost-duplications of code b/c of the inherent
@@ -0,0 +1,147 @@
+# Array version of eclp_derivatives, for evaluating the SOR formulas over many balances / trade sizes at once (e.g.
+# price-impact surfaces).
+#
+# The pool-level quantities that the Decimal functions recompute in _setup() on every call (derived params, virtual
+# offsets, stretch terms) are computed once per pool by setup(); the functions then only take the balance they depend
+# on, as a float64 array (or scalar), and work element-wise. Like eclp_numpy, this is float math without directed
+# rounding: expect relative errors around 1e-12 compared to eclp_derivatives, more near the ends of the price range.
+#
+# To evaluate at the state after a trade, pass the balance after the trade, e.g. for a surface of the marginal price
+# of x ito. y after swapping in amounts of y (fees included) at several balances:
+#
+#     st = setup(params, fee, r)
+#     prices = dxin_dyout(st, y0[:, None] + st.f * amounts[None, :])
+
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+
+from tests.geclp import eclp_numpy
+from tests.support.types import ECLPMathParams
+
+ArrayLike = Union[float, np.ndarray]
+
+
+class Setup(NamedTuple):
+    c: np.ndarray
+    s: np.ndarray
+    l: np.ndarray
+    a: np.ndarray  # virtual offsets
+    b: np.ndarray
+    ls: np.ndarray  # 1 - 1 / l^2
+    f: np.ndarray  # 1 - fee
+    r: np.ndarray
+    x_term: np.ndarray  # 1 - ls s^2
+    y_term: np.ndarray  # 1 - ls c^2
+
+
+def setup(
+    params: Union[ECLPMathParams, eclp_numpy.Params],
+    fee: ArrayLike,
+    r: Optional[ArrayLike] = None,
+    balances: Optional[tuple[ArrayLike, ArrayLike]] = None,
+) -> Setup:
+    """Everything the formulas need about a pool (or, with array params, about several pools). Give either the
+    invariant `r` (e.g. r_vec[1] for consistency with eclp_derivatives) or the `balances` to compute it from.
+    """
+    if not isinstance(params, eclp_numpy.Params):
+        params = eclp_numpy.make_params(*(float(v) for v in params))
+    derived = eclp_numpy.calc_derived_values(params)
+    if r is None:
+        r = eclp_numpy.calculateInvariant(*map(np.asarray, balances), params, derived)
+    r = np.asarray(r, dtype=np.float64)
+    ls = 1 - 1 / params.l**2
+    return Setup(
+        c=params.c,
+        s=params.s,
+        l=params.l,
+        a=eclp_numpy.virtualOffset0(params, derived, r),
+        b=eclp_numpy.virtualOffset1(params, derived, r),
+        ls=ls,
+        f=1 - np.asarray(fee, dtype=np.float64),
+        r=r,
+        x_term=1 - ls * params.s**2,
+        y_term=1 - ls * params.c**2,
+    )
+
+
+def R_x(st: Setup, x: ArrayLike) -> np.ndarray:
+    return np.sqrt(st.r**2 * st.x_term - (x - st.a) ** 2 / st.l**2)
+
+
+def R_y(st: Setup, y: ArrayLike) -> np.ndarray:
+    return np.sqrt(st.r**2 * st.y_term - (y - st.b) ** 2 / st.l**2)
+
+
+def _slope_x(st: Setup, x: ArrayLike) -> np.ndarray:
+    return st.ls * st.s * st.c - (x - st.a) / (st.l**2 * R_x(st, x))
+
+
+def _slope_y(st: Setup, y: ArrayLike) -> np.ndarray:
+    return st.ls * st.s * st.c - (y - st.b) / (st.l**2 * R_y(st, y))
+
+
+def _curvature_x(st: Setup, x: ArrayLike) -> np.ndarray:
+    R = R_x(st, x)
+    return 1 / (st.l**2 * R) + (x - st.a) ** 2 / (st.l**4 * R**3)
+
+
+def _curvature_y(st: Setup, y: ArrayLike) -> np.ndarray:
+    R = R_y(st, y)
+    return 1 / (st.l**2 * R) + (y - st.b) ** 2 / (st.l**4 * R**3)
+
+
+def dyin_dxout(st: Setup, x: ArrayLike) -> np.ndarray:
+    """Price of x ito. y including fees, at x balance x. See eclp_derivatives.dyin_dxout()."""
+    return _slope_x(st, x) / (st.f * st.x_term)
+
+
+def dxin_dyout(st: Setup, y: ArrayLike) -> np.ndarray:
+    """Price of y ito. x including fees, at y balance y."""
+    return _slope_y(st, y) / (st.f * st.y_term)
+
+
+def dyout_dxin(st: Setup, x: ArrayLike) -> np.ndarray:
+    return st.f * _slope_x(st, x) / st.x_term
+
+
+def dxout_dyin(st: Setup, y: ArrayLike) -> np.ndarray:
+    return st.f * _slope_y(st, y) / st.y_term
+
+
+def dpx_dxout(st: Setup, x: ArrayLike) -> np.ndarray:
+    """d^2 yin / d xout^2, without compounding of fees."""
+    return _curvature_x(st, x) / (st.f * st.x_term)
+
+
+def dpy_dyout(st: Setup, y: ArrayLike) -> np.ndarray:
+    """d^2 xin / d yout^2, without compounding of fees."""
+    return _curvature_y(st, y) / (st.f * st.y_term)
+
+
+def dpy_dxin(st: Setup, x: ArrayLike) -> np.ndarray:
+    """d (1 / (d yout / d xin)) / d xin."""
+    return st.x_term * _curvature_x(st, x) / _slope_x(st, x) ** 2
+
+
+def dpx_dyin(st: Setup, y: ArrayLike) -> np.ndarray:
+    """d (1 / (d xout / d yin)) / d yin."""
+    return st.y_term * _curvature_y(st, y) / _slope_y(st, y) ** 2
+
+
+def normalized_liquidity_xin(st: Setup, x: ArrayLike) -> np.ndarray:
+    R = R_x(st, x)
+    return (
+        R
+        * (st.ls * st.s * st.c * st.l**2 * R - (x - st.a)) ** 2
+        / (st.x_term * (st.l**2 * R**2 + (x - st.a) ** 2))
+    )
+
+
+def normalized_liquidity_yin(st: Setup, y: ArrayLike) -> np.ndarray:
+    R = R_y(st, y)
+    return (
+        R
+        * (st.ls * st.s * st.c * st.l**2 * R - (y - st.b)) ** 2
+        / (st.y_term * (st.l**2 * R**2 + (y - st.b) ** 2))
+    )
@@ -0,0 +1,386 @@
+# Vectorized float64 version of the ECLP math, for exploratory analytics (liquidity curves, parameter screening) where
+# we need to evaluate many (params, balances) rows quickly and don't care about the last digits.
+#
+# The formulas are those of eclp_prec_implementation (and thus of GyroECLPMath.sol), without the directed rounding.
+# All functions operate element-wise on numpy arrays and broadcast, so one call can evaluate one pool
+# at many balances, many pools at one balance, or one row per (pool, balances) pair.
+#
+# Precision: this is *not* a replacement for the prec implementation. Relative errors are typically around 1e-15
+# but grow with lambda and with 1/(invariant denominator); calculateInvariantWithError() bounds the error of the
+# invariant, and deviation_report() (or running this module) shows how far off we are for a given region of the
+# parameter space.
+
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp.util import (
+    MIN_INVARIANT_DENOMINATOR,
+    calc_invariant_denominator_float_tolerance,
+)
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import ECLPMathParamsQD
+
+EPS = np.finfo(np.float64).eps
+
+
+class Params(NamedTuple):
+    alpha: np.ndarray
+    beta: np.ndarray
+    c: np.ndarray
+    s: np.ndarray
+    l: np.ndarray
+
+
+class DerivedParams(NamedTuple):
+    # Unlike in the prec implementation, c and s are normalized to c^2 + s^2 = 1 in make_params(), so dSq = 1 and we
+    # don't carry it around.
+    tauAlpha: tuple[np.ndarray, np.ndarray]
+    tauBeta: tuple[np.ndarray, np.ndarray]
+    u: np.ndarray
+    v: np.ndarray
+    w: np.ndarray
+    z: np.ndarray
+
+
+def make_params(alpha, beta, c, s, l) -> Params:
+    """Arguments can be scalars or array-likes of matching (broadcastable) shape."""
+    alpha, beta, c, s, l = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (alpha, beta, c, s, l))
+    )
+    d = np.sqrt(c * c + s * s)
+    return Params(alpha, beta, c / d, s / d, l)
+
+
+def params_from_qd(params: Iterable[ECLPMathParamsQD]) -> Params:
+    """Stack a sequence of (decimal) params into one Params of 1d arrays."""
+    return make_params(*np.array([[float(v) for v in p] for p in params]).T)
+
+
+def balances_from_qd(balances: Iterable[Sequence[D]]) -> tuple[np.ndarray, np.ndarray]:
+    x, y = np.array([[float(b) for b in bs] for bs in balances]).T
+    return x, y
+
+
+def tau(p: Params, px: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    dPx = 1 / np.sqrt((p.c + px * p.s) ** 2 / p.l**2 + (px * p.c - p.s) ** 2)
+    return (px * p.c - p.s) * dPx, (p.c + p.s * px) * dPx / p.l
+
+
+def calc_derived_values(p: Params) -> DerivedParams:
+    tauAlpha = tau(p, p.alpha)
+    tauBeta = tau(p, p.beta)
+    s, c = p.s, p.c
+    return DerivedParams(
+        tauAlpha=tauAlpha,
+        tauBeta=tauBeta,
+        u=s * c * (tauBeta[0] - tauAlpha[0]),
+        v=s * s * tauBeta[1] + c * c * tauAlpha[1],
+        w=s * c * (tauBeta[1] - tauAlpha[1]),
+        z=c * c * tauBeta[0] + s * s * tauAlpha[0],
+    )
+
+
+def calcAChi(p: Params, d: DerivedParams) -> tuple[np.ndarray, np.ndarray]:
+    return d.w / p.l + d.z, p.l * d.u + d.v
+
+
+def calcInvariantDenominator(p: Params, d: DerivedParams) -> np.ndarray:
+    """(A chi)^2 - 1. The contracts require this to be at least MIN_INVARIANT_DENOMINATOR."""
+    AChi = calcAChi(p, d)
+    return AChi[0] ** 2 + AChi[1] ** 2 - 1
+
+
+def mulA(p: Params, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return (p.c * x - p.s * y) / p.l, p.s * x + p.c * y
+
+
+def calcInvariantSqrt(
+    x: np.ndarray, y: np.ndarray, p: Params, d: DerivedParams
+) -> tuple[np.ndarray, np.ndarray]:
+    """sqrt of the discriminant (A t . A chi)^2 - ((A chi)^2 - 1) (A t)^2, computed as
+    (A t)^2 - (At_x AChi_y - At_y AChi_x)^2, which avoids most of the cancellation, and the error of the discriminant as
+    in the prec implementation."""
+    At = mulA(p, x, y)
+    AChi = calcAChi(p, d)
+    cross = At[0] * AChi[1] - At[1] * AChi[0]
+    val = np.maximum(At[0] ** 2 + At[1] ** 2 - cross**2, 0)
+    err = (x * x + y * y) * EPS
+    return np.sqrt(val), err
+
+
+def calculateInvariantWithError(
+    x: np.ndarray, y: np.ndarray, p: Params, d: DerivedParams
+) -> tuple[np.ndarray, np.ndarray]:
+    """Solves (A t - A chi r)^2 = r^2 for r, together with a bound on the absolute error of r.
+
+    The error bound is that of prec_impl.calculateInvariantWithError() with the float64 epsilon in place of the 1e-38
+    of the Xp values. Its second term dominates for large lambda: tau is only accurate to about lambda * eps when beta
+    is close to tan(phi), and (A chi)_y = lambda * u + v multiplies this by lambda again, so the denominator is off by
+    up to about lambda^2 eps. Unlike the prec implementation, r is not shifted down by the error.
+    """
+    At = mulA(p, x, y)
+    AChi = calcAChi(p, d)
+    AtAChi = At[0] * AChi[0] + At[1] * AChi[1]
+    sqrt, err = calcInvariantSqrt(x, y, p, d)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        err = np.where(sqrt > 0, (err + EPS) / (2 * sqrt), np.sqrt(err))
+    err = (p.l * (x + y) * EPS + err + EPS) * 20
+
+    denominator = calcInvariantDenominator(p, d)
+    invariant = (AtAChi + sqrt) / denominator
+    err = err / denominator + invariant / denominator * p.l * p.l * 40 * EPS
+    return invariant, err
+
+
+def calculateInvariant(
+    x: np.ndarray, y: np.ndarray, p: Params, d: DerivedParams
+) -> np.ndarray:
+    invariant, _ = calculateInvariantWithError(x, y, p, d)
+    return invariant
+
+
+def virtualOffset0(p: Params, d: DerivedParams, r: np.ndarray) -> np.ndarray:
+    return r * (p.l * p.c * d.tauBeta[0] + p.s * d.tauBeta[1])
+
+
+def virtualOffset1(p: Params, d: DerivedParams, r: np.ndarray) -> np.ndarray:
+    return r * (-p.l * p.s * d.tauAlpha[0] + p.c * d.tauAlpha[1])
+
+
+def maxBalances0(p: Params, d: DerivedParams, r: np.ndarray) -> np.ndarray:
+    return r * (
+        p.l * p.c * (d.tauBeta[0] - d.tauAlpha[0])
+        + p.s * (d.tauBeta[1] - d.tauAlpha[1])
+    )
+
+
+def maxBalances1(p: Params, d: DerivedParams, r: np.ndarray) -> np.ndarray:
+    return r * (
+        p.l * p.s * (d.tauBeta[0] - d.tauAlpha[0])
+        + p.c * (d.tauAlpha[1] - d.tauBeta[1])
+    )
+
+
+def solveQuadraticSwap(
+    lam: np.ndarray,
+    x: np.ndarray,
+    s: np.ndarray,
+    c: np.ndarray,
+    r: np.ndarray,
+    ab: tuple[np.ndarray, np.ndarray],
+) -> np.ndarray:
+    """Lower branch of the quadratic for the other coordinate, see Prop. 11 in the writeup. The discriminant is written
+    as r^2 (1 - lamBar s^2) - (x - a)^2 / lam^2, as in eclp_derivatives. Like the prec implementation, a negative
+    discriminant (x beyond the max balance) is clamped to 0."""
+    lamBar = 1 - 1 / lam**2
+    xp = x - ab[0]
+    sTerm = 1 - lamBar * s * s
+    disc = np.maximum(r * r * sTerm - xp * xp / lam**2, 0)
+    return (-xp * s * c * lamBar - np.sqrt(disc)) / sTerm + ab[1]
+
+
+def calcYGivenX(
+    x: np.ndarray, p: Params, d: DerivedParams, r: np.ndarray
+) -> np.ndarray:
+    ab = (virtualOffset0(p, d, r), virtualOffset1(p, d, r))
+    return solveQuadraticSwap(p.l, x, p.s, p.c, r, ab)
+
+
+def calcXGivenY(
+    y: np.ndarray, p: Params, d: DerivedParams, r: np.ndarray
+) -> np.ndarray:
+    ba = (virtualOffset1(p, d, r), virtualOffset0(p, d, r))
+    return solveQuadraticSwap(p.l, y, p.c, p.s, r, ba)
+
+
+def calcSpotPrice0in1(
+    x: np.ndarray, y: np.ndarray, p: Params, d: DerivedParams, r: np.ndarray
+) -> np.ndarray:
+    """Price of token 0 in units of token 1, as in GyroECLPMath.calcSpotPrice0in1()."""
+    vec = mulA(p, x - virtualOffset0(p, d, r), y - virtualOffset1(p, d, r))
+    pc = vec[0] / vec[1]
+    return (pc * p.c / p.l + p.s) / (-pc * p.s / p.l + p.c)
+
+
+def sample_params(
+    rng: np.random.Generator,
+    n: int,
+    price_range=(0.05, 20.0),
+    phi_degrees_range=(10.0, 80.0),
+    l_range=(1.0, 1e8),
+    around_one: bool = True,
+) -> Params:
+    """n random parameter sets that pass the contracts' validation (with a safety margin for float error).
+
+    Log-uniform prices and lambda. With around_one (the default), only price ranges with alpha < 1 < beta are kept, as
+    for pools of assets that are pegged to each other; the contracts don't require this. This samples by rejection, so
+    it is meant for benchmarks and screening, not as a hypothesis strategy; use util.gen_params_valid() for that.
+    """
+    rows = []
+    n_found = 0
+    while n_found < n:
+        m = 2 * (n - n_found) + 16
+        prices = np.exp(rng.uniform(*np.log(price_range), size=(2, m)))
+        phi = np.radians(rng.uniform(*phi_degrees_range, size=m))
+        l = np.exp(rng.uniform(*np.log(l_range), size=m))
+        p = make_params(
+            prices.min(axis=0), prices.max(axis=0), np.cos(phi), np.sin(phi), l
+        )
+        threshold = float(MIN_INVARIANT_DENOMINATOR) + 2 * (
+            calc_invariant_denominator_float_tolerance(p.l)
+        )
+        valid = calcInvariantDenominator(p, calc_derived_values(p)) >= threshold
+        if around_one:
+            valid &= (p.alpha < 1) & (p.beta > 1)
+        rows.append(np.stack(p)[:, valid])
+        n_found += int(valid.sum())
+    return Params(*np.concatenate(rows, axis=1)[:, :n])
+
+
+def sample_balances(
+    rng: np.random.Generator,
+    n: int,
+    balance_range=(1.0, 1e11),
+    min_balance_ratio: float = 1e-5,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Log-uniform balances with y / x in [min_balance_ratio, 1 / min_balance_ratio]."""
+    log_lo, log_hi = np.log(balance_range)
+    x = np.exp(rng.uniform(log_lo, log_hi, size=n))
+    log_ratio = np.log(min_balance_ratio)
+    y = x * np.exp(rng.uniform(log_ratio, -log_ratio, size=n))
+    return x, np.clip(y, *balance_range)
+
+
+class Deviation(NamedTuple):
+    """Worst case of |float value - prec value| / scale across a sample, and the index where it occurs."""
+
+    max: float
+    argmax: int
+    median: float
+
+
+def _deviation(val: np.ndarray, ref: np.ndarray, scale: np.ndarray) -> Deviation:
+    dev = np.abs(val - ref) / np.abs(scale)
+    i = int(np.argmax(dev))
+    return Deviation(float(dev[i]), i, float(np.median(dev)))
+
+
+def deviation_report(
+    params: Sequence[ECLPMathParamsQD],
+    balances: Sequence[Sequence[D]],
+    n_prec: Optional[int] = None,
+) -> dict[str, Deviation]:
+    """Compare this implementation against eclp_prec_implementation on a sample of (params, balances) rows.
+
+    The invariant and the spot price are compared relative to their own value. Offsets, max balances and
+    calcYGivenX / calcXGivenY (evaluated at the current balances, so they should reproduce the other balance) are
+    compared relative to x + y; relative to the value itself, errors would be unbounded for balances close to 0. Note
+    that for very large lambda, the invariant can be tiny (say 1e-8) and then the prec implementation's own rounding
+    to 18 decimals dominates the deviation. The "invariant / bound" row compares the invariant against the middle of
+    the range [r, r + 2 err] of the prec implementation, relative to both implementations' error bounds.
+
+    The float calculations use the *same* r as the prec ones, so errors in the invariant don't propagate to the other
+    rows. n_prec: only use the first n_prec rows (the prec implementation is slow)."""
+    params, balances = list(params)[:n_prec], list(balances)[:n_prec]
+
+    ref = {
+        k: []
+        for k in [
+            "invariant",
+            "virtualOffset0",
+            "virtualOffset1",
+            "maxBalances0",
+            "maxBalances1",
+            "calcYGivenX",
+            "calcXGivenY",
+            "calcSpotPrice0in1",
+        ]
+    }
+    invariant_err = []
+    for pq, bq in zip(params, balances):
+        dq = prec_impl.calc_derived_values(pq)
+        r, err = prec_impl.calculateInvariantWithError(bq, pq, dq)
+        ref["invariant"].append(r)
+        invariant_err.append(float(err))
+        ref["virtualOffset0"].append(prec_impl.virtualOffset0(pq, dq, (r, r)))
+        ref["virtualOffset1"].append(prec_impl.virtualOffset1(pq, dq, (r, r)))
+        ref["maxBalances0"].append(prec_impl.maxBalances0(pq, dq, (r, r)))
+        ref["maxBalances1"].append(prec_impl.maxBalances1(pq, dq, (r, r)))
+        ref["calcYGivenX"].append(prec_impl.calcYGivenX(bq[0], pq, dq, (r, r)))
+        ref["calcXGivenY"].append(prec_impl.calcXGivenY(bq[1], pq, dq, (r, r)))
+        ref["calcSpotPrice0in1"].append(prec_impl.calcSpotPrice0in1(bq, pq, dq, r))
+    ref = {k: np.array([float(v) for v in vs]) for k, vs in ref.items()}
+
+    p = params_from_qd(params)
+    d = calc_derived_values(p)
+    x, y = balances_from_qd(balances)
+    r = ref["invariant"]
+    invariant, err = calculateInvariantWithError(x, y, p, d)
+    val = {
+        "invariant": invariant,
+        "virtualOffset0": virtualOffset0(p, d, r),
+        "virtualOffset1": virtualOffset1(p, d, r),
+        "maxBalances0": maxBalances0(p, d, r),
+        "maxBalances1": maxBalances1(p, d, r),
+        "calcYGivenX": calcYGivenX(x, p, d, r),
+        "calcXGivenY": calcXGivenY(y, p, d, r),
+        "calcSpotPrice0in1": calcSpotPrice0in1(x, y, p, d, r),
+    }
+    report = {
+        k: _deviation(
+            val[k],
+            ref[k],
+            ref[k] if k in ("invariant", "calcSpotPrice0in1") else x + y,
+        )
+        for k in val
+    }
+    # Should be <= 1.
+    invariant_err = np.array(invariant_err)
+    report["invariant / bound"] = _deviation(
+        invariant, r + invariant_err, invariant_err + err
+    )
+    return report
+
+
+def _qd_rows(p: Params, x: np.ndarray, y: np.ndarray):
+    params = [ECLPMathParamsQD(*map(D, row)) for row in np.stack(p).T]
+    balances = [(D(xi), D(yi)) for xi, yi in zip(x, y)]
+    return params, balances
+
+
+if __name__ == "__main__":
+    import time
+
+    from tabulate import tabulate
+
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    p = sample_params(rng, n)
+    x, y = sample_balances(rng, n)
+
+    t0 = time.perf_counter()
+    d = calc_derived_values(p)
+    r = calculateInvariant(x, y, p, d)
+    calcYGivenX(x, p, d, r)
+    calcXGivenY(y, p, d, r)
+    calcSpotPrice0in1(x, y, p, d, r)
+    maxBalances0(p, d, r)
+    maxBalances1(p, d, r)
+    dt = time.perf_counter() - t0
+    print(f"{n} rows in {dt:.3f}s ({n / dt:,.0f} rows/s)\n")
+
+    n_prec = 2_000
+    report = deviation_report(
+        *_qd_rows(Params(*(v[:n_prec] for v in p)), x[:n_prec], y[:n_prec])
+    )
+    print(
+        tabulate(
+            [
+                (k, f"{v.max:.2e}", f"{v.median:.2e}", v.argmax)
+                for k, v in report.items()
+            ],
+            headers=["", "max deviation", "median", "at row"],
+        )
+    )
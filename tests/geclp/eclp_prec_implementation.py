@@ -5,6 +5,7 @@ import pytest
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.support.quantized_decimal_38 import QuantizedDecimal as D2
 from tests.support.quantized_decimal_100 import QuantizedDecimal as D3
+from tests.libraries import signed_fixed_point_int
 from tests.libraries.signed_fixed_point import add_mag, mul_array
 from tests.support.types import ECLPMathDerivedParamsQD38, ECLPMathParamsQD
 from tests.support.utils import scale, unscale
@@ -390,50 +391,46 @@ def calcXGivenY(y: D, p: Params, d: DerivedParams, r: Iterable[D]) -> D:
     return x
 
 
+def mulA(p: Params, t: Iterable[D]) -> tuple[D, D]:
+    return (
+        D(p.c) * t[0] / p.l - D(p.s) * t[1] / p.l,
+        D(p.s) * t[0] + D(p.c) * t[1],
+    )
+
+
+def calcSpotPrice0in1(balances: Iterable[D], p: Params, d: DerivedParams, r: D) -> D:
+    """Price of token 0 in units of token 1, as in GyroECLPMath.calcSpotPrice0in1()."""
+    ab = (virtualOffset0(p, d, (r, r)), virtualOffset1(p, d, (r, r)))
+    vec = mulA(p, (D(balances[0]) - ab[0], D(balances[1]) - ab[1]))
+    pc = vec[0] / vec[1]
+    ex, ey = mulA(p, (D(1), D(0))), mulA(p, (D(0), D(1)))
+    return (pc * ex[0] + ex[1]) / (pc * ey[0] + ey[1])
+
+
 def invariantOverestimate(rDown: D) -> D:
     return D(rDown) + D(rDown).mul_up(D("1e-12"))
 
 
 def mulXp(a: int, b: int) -> int:
-    product = int(a) * int(b) // int(D("1e38"))
-    return product
+    return signed_fixed_point_int.mulXpU(int(a), int(b))
 
 
 def divXp(a: int, b: int) -> int:
     if a == 0:
         return 0
-    a_inflated = int(a) * int(D("1e38"))
-    return a_inflated // int(b)
+    return signed_fixed_point_int.divXpU(int(a), int(b))
 
 
 def mulDownXpToNp(a: D, b: D2) -> D:
     a = int(D(a) * D("1e18"))
     b = int(b * D2("1e38"))
-    b1 = b // int(D("1e19"))
-    b2 = b - b1 * int(D("1e19")) if b1 != 0 else b
-    prod1 = a * b1
-    prod2 = a * b2
-    if prod1 >= 0 and prod2 >= 0:
-        prod = (prod1 + prod2 // int(D("1e19"))) // int(D("1e19"))
-    else:
-        # have to use double minus signs b/c of how // operator works
-        prod = -((-prod1 - prod2 // int(D("1e19")) - 1) // int(D("1e19"))) - 1
-    return D(prod) / D("1e18")
+    return D(signed_fixed_point_int.mulDownXpToNpU(a, b)) / D("1e18")
 
 
 def mulUpXpToNp(a: D, b: D2) -> D:
     a = int(D(a) * D("1e18"))
     b = int(b * D2("1e38"))
-    b1 = b // int(D("1e19"))
-    b2 = b - b1 * int(D("1e19")) if b1 != 0 else b
-    prod1 = a * b1
-    prod2 = a * b2
-    if prod1 <= 0 and prod2 <= 0:
-        # have to use double minus signs b/c of how // operator works
-        prod = -((-prod1 + -prod2 // int(D("1e19"))) // int(D("1e19")))
-    else:
-        prod = (prod1 + prod2 // int(D("1e19")) - 1) // int(D("1e19")) + 1
-    return D(prod) / D("1e18")
+    return D(signed_fixed_point_int.mulUpXpToNpU(a, b)) / D("1e18")
 
 
 def tauXp(p: Params, px: D, dPx: D2) -> tuple[D2, D2]:
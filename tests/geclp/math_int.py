@@ -0,0 +1,407 @@
+# Bit-exact port of GyroECLPMath on python ints as int256.
+#
+# Like g2clp/math_int and g3clp/math_int: this follows the contract operation by operation on top of
+# signed_fixed_point_int (with the unchecked "U" variants where the contract uses them), GyroFixedPoint for the
+# unsigned balance arithmetic and GyroPoolMath._sqrt(), and raises PoolRevert with the contract's reason where it
+# would revert. Unlike eclp_prec_implementation (QuantizedDecimal), results are identical to GyroECLPMathTesting,
+# which is what GyroECLPPoolSimulator needs to be compared to the pool with ==.
+#
+# Params are scaled to 18 decimals and derived params to 38 decimals, as they're passed to the contract (see
+# eclp_prec_implementation.scale_derived_values()). Vectors (tauAlpha, tauBeta, the invariant vector r) can be any
+# pair; r is (overestimate, underestimate) as in the contract. Plain +, - and * on int256 are unchecked in the
+# contract; since they're exact modulo 2^256, it's enough to wrap() the result of each chain of them.
+
+from typing import Callable, Sequence
+
+from tests.libraries import fixed_point_int as fp
+from tests.libraries import pool_math_int
+from tests.libraries.signed_fixed_point_int import (
+    ONE,
+    ONE_XP,
+    add,
+    div,
+    divDownMag,
+    divDownMagU,
+    divUpMagU,
+    divXpU,
+    mulDownMag,
+    mulDownMagU,
+    mulDownXpToNpU,
+    mulUpMagU,
+    mulUpXpToNpU,
+    mulXpU,
+    wrap,
+)
+from tests.support.pool_simulator import PoolRevert
+from tests.support.types import ECLPMathDerivedParams as DerivedParams
+from tests.support.types import ECLPMathParams as Params
+
+ASSET_BOUNDS_EXCEEDED = "GYR#357"
+MAX_ASSETS_EXCEEDED = "GYR#363"
+MAX_INVARIANT_EXCEEDED = "GYR#363"
+
+SAFE_CAST_INT256 = "SafeCast: value doesn't fit in an int256"
+SAFE_CAST_UINT256 = "SafeCast: value must be positive"
+
+_MAX_BALANCES = 10**34
+_MAX_INVARIANT = 3 * 10**37
+
+Vector2 = tuple[int, int]
+
+
+def toInt256(value: int) -> int:
+    if value >= 2**255:
+        raise PoolRevert(SAFE_CAST_INT256)
+    return value
+
+
+def toUint256(value: int) -> int:
+    if value < 0:
+        raise PoolRevert(SAFE_CAST_UINT256)
+    return value
+
+
+def scalarProd(t1: Vector2, t2: Vector2) -> int:
+    return add(mulDownMag(t1[0], t2[0]), mulDownMag(t1[1], t2[1]))
+
+
+def mulA(p: Params, tp: Vector2) -> Vector2:
+    return (
+        wrap(
+            divDownMagU(mulDownMagU(p.c, tp[0]), p.l)
+            - divDownMagU(mulDownMagU(p.s, tp[1]), p.l)
+        ),
+        wrap(mulDownMagU(p.s, tp[0]) + mulDownMagU(p.c, tp[1])),
+    )
+
+
+def virtualOffset0(p: Params, d: DerivedParams, r: Vector2) -> int:
+    termXp = divXpU(d.tauBeta[0], d.dSq)
+    if d.tauBeta[0] > 0:
+        a = mulUpXpToNpU(mulUpMagU(mulUpMagU(r[0], p.l), p.c), termXp)
+    else:
+        a = mulUpXpToNpU(mulDownMagU(mulDownMagU(r[1], p.l), p.c), termXp)
+    return wrap(a + mulUpXpToNpU(mulUpMagU(r[0], p.s), divXpU(d.tauBeta[1], d.dSq)))
+
+
+def virtualOffset1(p: Params, d: DerivedParams, r: Vector2) -> int:
+    termXp = divXpU(d.tauAlpha[0], d.dSq)
+    if d.tauAlpha[0] < 0:
+        b = mulUpXpToNpU(mulUpMagU(mulUpMagU(r[0], p.l), p.s), wrap(-termXp))
+    else:
+        b = mulUpXpToNpU(mulDownMagU(mulDownMagU(wrap(-r[1]), p.l), p.s), termXp)
+    return wrap(b + mulUpXpToNpU(mulUpMagU(r[0], p.c), divXpU(d.tauAlpha[1], d.dSq)))
+
+
+def maxBalances0(p: Params, d: DerivedParams, r: Vector2) -> int:
+    termXp1 = divXpU(wrap(d.tauBeta[0] - d.tauAlpha[0]), d.dSq)
+    termXp2 = divXpU(wrap(d.tauBeta[1] - d.tauAlpha[1]), d.dSq)
+    xp = mulDownXpToNpU(mulDownMagU(mulDownMagU(r[1], p.l), p.c), termXp1)
+    term = mulDownMagU(r[1], p.s) if termXp2 > 0 else mulUpMagU(r[0], p.s)
+    return wrap(xp + mulDownXpToNpU(term, termXp2))
+
+
+def maxBalances1(p: Params, d: DerivedParams, r: Vector2) -> int:
+    termXp1 = divXpU(wrap(d.tauBeta[0] - d.tauAlpha[0]), d.dSq)
+    termXp2 = divXpU(wrap(d.tauAlpha[1] - d.tauBeta[1]), d.dSq)
+    yp = mulDownXpToNpU(mulDownMagU(mulDownMagU(r[1], p.l), p.s), termXp1)
+    term = mulDownMagU(r[1], p.c) if termXp2 > 0 else mulUpMagU(r[0], p.c)
+    return wrap(yp + mulDownXpToNpU(term, termXp2))
+
+
+def calculateInvariantWithError(
+    balances: Sequence[int], p: Params, d: DerivedParams
+) -> tuple[int, int]:
+    x, y = toInt256(balances[0]), toInt256(balances[1])
+    if not add(x, y) <= _MAX_BALANCES:
+        raise PoolRevert(MAX_ASSETS_EXCEEDED)
+
+    AtAChi = calcAtAChi(x, y, p, d)
+    sqrt, err = calcInvariantSqrt(x, y, p, d)
+    if sqrt > 0:
+        err = divUpMagU(wrap(err + 1), wrap(2 * sqrt))
+    else:
+        err = toInt256(pool_math_int.sqrt(toUint256(err), 5)) if err > 0 else 10**9
+    err = wrap((div(mulUpMagU(p.l, wrap(x + y)), ONE_XP) + err + 1) * 20)
+
+    mulDenominator = divXpU(ONE_XP, wrap(calcAChiAChiInXp(p, d) - ONE_XP))
+    invariant = mulDownXpToNpU(wrap(AtAChi + sqrt - err), mulDenominator)
+    err = mulUpXpToNpU(err, mulDenominator)
+    lambdaSq = div(wrap(p.l * p.l), 10**36)
+    err = wrap(
+        err
+        + div(wrap(mulUpXpToNpU(invariant, mulDenominator) * lambdaSq * 40), ONE_XP)
+        + 1
+    )
+
+    if not add(invariant, err) <= _MAX_INVARIANT:
+        raise PoolRevert(MAX_INVARIANT_EXCEEDED)
+    return invariant, err
+
+
+def calculateInvariant(balances: Sequence[int], p: Params, d: DerivedParams) -> int:
+    invariant, _ = calculateInvariantWithError(balances, p, d)
+    return toUint256(invariant)
+
+
+def calcAtAChi(x: int, y: int, p: Params, d: DerivedParams) -> int:
+    dSq2 = mulXpU(d.dSq, d.dSq)
+
+    termXp = divXpU(divDownMagU(wrap(divDownMagU(d.w, p.l) + d.z), p.l), dSq2)
+    val = mulDownXpToNpU(wrap(mulDownMagU(x, p.c) - mulDownMagU(y, p.s)), termXp)
+
+    termNp = wrap(
+        mulDownMagU(mulDownMagU(x, p.l), p.s) + mulDownMagU(mulDownMagU(y, p.l), p.c)
+    )
+    val = wrap(val + mulDownXpToNpU(termNp, divXpU(d.u, dSq2)))
+
+    termNp = wrap(mulDownMagU(x, p.s) + mulDownMagU(y, p.c))
+    return wrap(val + mulDownXpToNpU(termNp, divXpU(d.v, dSq2)))
+
+
+def calcAChiAChiInXp(p: Params, d: DerivedParams) -> int:
+    dSq3 = mulXpU(mulXpU(d.dSq, d.dSq), d.dSq)
+
+    val = mulUpMagU(p.l, divXpU(mulXpU(wrap(2 * d.u), d.v), dSq3))
+    u1 = wrap(d.u + 1)
+    val = wrap(val + mulUpMagU(mulUpMagU(divXpU(mulXpU(u1, u1), dSq3), p.l), p.l))
+    val = wrap(val + divXpU(mulXpU(d.v, d.v), dSq3))
+
+    termXp = wrap(divUpMagU(d.w, p.l) + d.z)
+    return wrap(val + divXpU(mulXpU(termXp, termXp), dSq3))
+
+
+def _dSq4(d: DerivedParams) -> int:
+    return mulXpU(mulXpU(mulXpU(d.dSq, d.dSq), d.dSq), d.dSq)
+
+
+def calcMinAtxAChiySqPlusAtxSq(x: int, y: int, p: Params, d: DerivedParams) -> int:
+    termNp = wrap(
+        mulUpMagU(mulUpMagU(mulUpMagU(x, x), p.c), p.c)
+        + mulUpMagU(mulUpMagU(mulUpMagU(y, y), p.s), p.s)
+    )
+    termNp = wrap(
+        termNp - mulDownMagU(mulDownMagU(mulDownMagU(x, y), wrap(p.c * 2)), p.s)
+    )
+
+    termXp = wrap(
+        mulXpU(d.u, d.u)
+        + divDownMagU(mulXpU(wrap(2 * d.u), d.v), p.l)
+        + divDownMagU(divDownMagU(mulXpU(d.v, d.v), p.l), p.l)
+    )
+    termXp = divXpU(termXp, _dSq4(d))
+    val = mulDownXpToNpU(wrap(-termNp), termXp)
+
+    return wrap(
+        val
+        + mulDownXpToNpU(
+            divDownMagU(divDownMagU(wrap(termNp - 9), p.l), p.l),
+            divXpU(ONE_XP, d.dSq),
+        )
+    )
+
+
+def calc2AtxAtyAChixAChiy(x: int, y: int, p: Params, d: DerivedParams) -> int:
+    termNp = mulDownMagU(
+        mulDownMagU(wrap(mulDownMagU(x, x) - mulUpMagU(y, y)), wrap(2 * p.c)), p.s
+    )
+    xy = mulDownMagU(y, wrap(2 * x))
+    termNp = wrap(
+        termNp
+        + mulDownMagU(mulDownMagU(xy, p.c), p.c)
+        - mulDownMagU(mulDownMagU(xy, p.s), p.s)
+    )
+
+    termXp = wrap(
+        mulXpU(d.z, d.u) + divDownMagU(divDownMagU(mulXpU(d.w, d.v), p.l), p.l)
+    )
+    termXp = wrap(termXp + divDownMagU(wrap(mulXpU(d.w, d.u) + mulXpU(d.z, d.v)), p.l))
+    termXp = divXpU(termXp, _dSq4(d))
+
+    return mulDownXpToNpU(termNp, termXp)
+
+
+def calcMinAtyAChixSqPlusAtySq(x: int, y: int, p: Params, d: DerivedParams) -> int:
+    termNp = wrap(
+        mulUpMagU(mulUpMagU(mulUpMagU(x, x), p.s), p.s)
+        + mulUpMagU(mulUpMagU(mulUpMagU(y, y), p.c), p.c)
+    )
+    termNp = wrap(termNp + mulUpMagU(mulUpMagU(mulUpMagU(x, y), wrap(p.s * 2)), p.c))
+
+    termXp = wrap(
+        mulXpU(d.z, d.z) + divDownMagU(divDownMagU(mulXpU(d.w, d.w), p.l), p.l)
+    )
+    termXp = wrap(termXp + divDownMagU(mulXpU(wrap(2 * d.z), d.w), p.l))
+    termXp = divXpU(termXp, _dSq4(d))
+    val = mulDownXpToNpU(wrap(-termNp), termXp)
+
+    return wrap(val + mulDownXpToNpU(wrap(termNp - 9), divXpU(ONE_XP, d.dSq)))
+
+
+def calcInvariantSqrt(x: int, y: int, p: Params, d: DerivedParams) -> tuple[int, int]:
+    val = wrap(
+        calcMinAtxAChiySqPlusAtxSq(x, y, p, d)
+        + calc2AtxAtyAChixAChiy(x, y, p, d)
+        + calcMinAtyAChixSqPlusAtySq(x, y, p, d)
+    )
+    err = div(wrap(mulUpMagU(x, x) + mulUpMagU(y, y)), ONE_XP)
+    val = toInt256(pool_math_int.sqrt(toUint256(val), 5)) if val > 0 else 0
+    return val, err
+
+
+def calcSpotPrice0in1(
+    balances: Sequence[int], p: Params, d: DerivedParams, invariant: int
+) -> int:
+    r = (invariant, invariant)
+    ab = (virtualOffset0(p, d, r), virtualOffset1(p, d, r))
+    vec = (
+        wrap(toInt256(balances[0]) - ab[0]),
+        wrap(toInt256(balances[1]) - ab[1]),
+    )
+    vec = mulA(p, vec)
+    pc = (divDownMagU(vec[0], vec[1]), ONE)
+
+    pgx = scalarProd(pc, mulA(p, (ONE, 0)))
+    return toUint256(divDownMag(pgx, scalarProd(pc, mulA(p, (0, ONE)))))
+
+
+def checkAssetBounds(
+    p: Params, d: DerivedParams, invariant: Vector2, newBal: int, assetIndex: int
+):
+    maxBalance = (maxBalances0, maxBalances1)[assetIndex](p, d, invariant)
+    if not (newBal <= _MAX_BALANCES and newBal <= maxBalance):
+        raise PoolRevert(ASSET_BOUNDS_EXCEEDED)
+
+
+CalcGiven = Callable[[int, Params, DerivedParams, Vector2], int]
+
+
+def calcOutGivenIn(
+    balances: Sequence[int],
+    amountIn: int,
+    tokenInIsToken0: bool,
+    p: Params,
+    d: DerivedParams,
+    invariant: Vector2,
+) -> int:
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    calcGiven: CalcGiven = calcYGivenX if tokenInIsToken0 else calcXGivenY
+
+    balInNew = toInt256(fp.add(balances[ixIn], amountIn))
+    checkAssetBounds(p, d, invariant, balInNew, ixIn)
+    balOutNew = calcGiven(balInNew, p, d, invariant)
+    return fp.sub(balances[ixOut], toUint256(balOutNew))
+
+
+def calcInGivenOut(
+    balances: Sequence[int],
+    amountOut: int,
+    tokenInIsToken0: bool,
+    p: Params,
+    d: DerivedParams,
+    invariant: Vector2,
+) -> int:
+    ixIn, ixOut = (0, 1) if tokenInIsToken0 else (1, 0)
+    calcGiven: CalcGiven = calcXGivenY if tokenInIsToken0 else calcYGivenX
+
+    if not amountOut <= balances[ixOut]:
+        raise PoolRevert(ASSET_BOUNDS_EXCEEDED)
+    balOutNew = toInt256(balances[ixOut] - amountOut)
+    balInNew = calcGiven(balOutNew, p, d, invariant)
+    checkAssetBounds(p, d, invariant, balInNew, ixIn)
+    return fp.sub(toUint256(balInNew), balances[ixIn])
+
+
+def solveQuadraticSwap(
+    lam: int,
+    x: int,
+    s: int,
+    c: int,
+    r: Vector2,
+    ab: Vector2,
+    tauBeta: Vector2,
+    dSq: int,
+) -> int:
+    lamBar = (
+        wrap(ONE_XP - divDownMagU(divDownMagU(ONE_XP, lam), lam)),
+        wrap(ONE_XP - divUpMagU(divUpMagU(ONE_XP, lam), lam)),
+    )
+    xp = wrap(x - ab[0])
+    if xp > 0:
+        qb = mulUpXpToNpU(
+            mulDownMagU(mulDownMagU(wrap(-xp), s), c), divXpU(lamBar[1], dSq)
+        )
+    else:
+        qb = mulUpXpToNpU(
+            mulUpMagU(mulUpMagU(wrap(-xp), s), c), wrap(divXpU(lamBar[0], dSq) + 1)
+        )
+
+    sTermX = divXpU(mulDownMagU(mulDownMagU(lamBar[1], s), s), dSq)
+    sTermY = mulUpMagU(lamBar[0], s)
+    sTermY = wrap(divXpU(mulUpMagU(sTermY, s), wrap(dSq + 1)) + 1)
+    sTerm = (wrap(ONE_XP - sTermX), wrap(ONE_XP - sTermY))
+
+    qc = wrap(-calcXpXpDivLambdaLambda(x, r, lam, s, c, tauBeta, dSq))
+    qc = wrap(qc + mulDownXpToNpU(mulDownMagU(r[1], r[1]), sTerm[1]))
+    qc = toInt256(pool_math_int.sqrt(toUint256(qc), 5)) if qc > 0 else 0
+
+    if wrap(qb - qc) > 0:
+        qa = mulUpXpToNpU(wrap(qb - qc), wrap(divXpU(ONE_XP, sTerm[1]) + 1))
+    else:
+        qa = mulUpXpToNpU(wrap(qb - qc), divXpU(ONE_XP, sTerm[0]))
+    return wrap(qa + ab[1])
+
+
+def calcXpXpDivLambdaLambda(
+    x: int, r: Vector2, lam: int, s: int, c: int, tauBeta: Vector2, dSq: int
+) -> int:
+    dSq2, rxSq = mulXpU(dSq, dSq), mulUpMagU(r[0], r[0])
+
+    termXp = divXpU(mulXpU(tauBeta[0], tauBeta[1]), dSq2)
+    if termXp > 0:
+        qa = mulUpMagU(rxSq, wrap(2 * s))
+        qa = mulUpXpToNpU(mulUpMagU(qa, c), wrap(termXp + 7))
+    else:
+        qa = mulDownMagU(mulDownMagU(r[1], r[1]), wrap(2 * s))
+        qa = mulUpXpToNpU(mulDownMagU(qa, c), termXp)
+
+    if tauBeta[0] < 0:
+        qb = mulUpXpToNpU(
+            mulUpMagU(mulUpMagU(r[0], x), wrap(2 * c)),
+            wrap(-divXpU(tauBeta[0], dSq) + 3),
+        )
+    else:
+        qb = mulUpXpToNpU(
+            mulDownMagU(mulDownMagU(wrap(-r[1]), x), wrap(2 * c)),
+            divXpU(tauBeta[0], dSq),
+        )
+    qa = wrap(qa + qb)
+
+    termXp = wrap(divXpU(mulXpU(tauBeta[1], tauBeta[1]), dSq2) + 7)
+    qb = mulUpXpToNpU(mulUpMagU(mulUpMagU(rxSq, s), s), termXp)
+
+    qc = mulUpXpToNpU(
+        mulDownMagU(mulDownMagU(wrap(-r[1]), x), wrap(2 * s)),
+        divXpU(tauBeta[1], dSq),
+    )
+
+    qb = wrap(qb + qc + mulUpMagU(x, x))
+    qb = divUpMagU(qb, lam) if qb > 0 else divDownMagU(qb, lam)
+
+    qa = wrap(qa + qb)
+    qa = divUpMagU(qa, lam) if qa > 0 else divDownMagU(qa, lam)
+
+    termXp = wrap(divXpU(mulXpU(tauBeta[0], tauBeta[0]), dSq2) + 7)
+    val = mulUpMagU(mulUpMagU(rxSq, c), c)
+    return wrap(mulUpXpToNpU(val, termXp) + qa)
+
+
+def calcYGivenX(x: int, p: Params, d: DerivedParams, r: Vector2) -> int:
+    ab = (virtualOffset0(p, d, r), virtualOffset1(p, d, r))
+    return solveQuadraticSwap(p.l, x, p.s, p.c, r, ab, d.tauBeta, d.dSq)
+
+
+def calcXGivenY(y: int, p: Params, d: DerivedParams, r: Vector2) -> int:
+    ba = (virtualOffset1(p, d, r), virtualOffset0(p, d, r))
+    tauAlpha = (wrap(-d.tauAlpha[0]), d.tauAlpha[1])
+    return solveQuadraticSwap(p.l, y, p.c, p.s, r, ba, tauAlpha, d.dSq)
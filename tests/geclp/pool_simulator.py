@@ -0,0 +1,225 @@
+# In-process model of GyroECLPPool, see tests/support/pool_simulator.py.
+#
+# The math comes from math_int, the bit-exact port of GyroECLPMath, so like the pool-level logic around it (rate
+# scaling, fees, BPT) it's exact. Only the swap model and curve (for routing) are approximations in float (eclp_numpy).
+
+import math
+from typing import Optional, Sequence
+
+from tests.geclp import eclp_derivatives_array as derivatives_array
+from tests.geclp import eclp_numpy
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import math_int
+from tests.support.pool_simulator import (
+    ONE,
+    PoolSimulator,
+    div_down,
+    mul_down,
+)
+from tests.support.swap_models import MAX_IN_MARGIN, SwapModel
+from tests.support.swap_table import SwapCurve, ellipse_d4_bound
+from tests.support.types import ECLPMathDerivedParams
+from tests.support.utils import scale
+
+# In units of the token, for the float models.
+_MAX_BALANCES = math_int._MAX_BALANCES / ONE
+
+
+class ECLPSwapModel(SwapModel):
+    """Swap curve of the ECLP in float, for token `i_in` in. The derivatives are those of eclp_derivatives_array,
+    evaluated at the balance in after the trade."""
+
+    def __init__(
+        self,
+        p: eclp_numpy.Params,
+        d: eclp_numpy.DerivedParams,
+        balances,
+        i_in: int,
+        fee: float,
+    ):
+        self.p, self.d, self.i_in = p, d, i_in
+        self.r = eclp_numpy.calculateInvariant(*balances, p, d)
+        self.setup = derivatives_array.setup(p, fee, r=self.r)
+        self.t0 = balances[i_in]
+        self.f = 1 - fee
+        max_balance = (eclp_numpy.maxBalances0, eclp_numpy.maxBalances1)[i_in](
+            p, d, self.r
+        )
+        max_in = min(float(max_balance), float(_MAX_BALANCES))
+        self.x_max = max((max_in - self.t0) / self.f * (1 - MAX_IN_MARGIN), 0.0)
+        self._other0 = self._other(self.t0)
+
+    def _other(self, t: float) -> float:
+        calc_given = (
+            eclp_numpy.calcYGivenX if self.i_in == 0 else eclp_numpy.calcXGivenY
+        )
+        return float(calc_given(t, self.p, self.d, self.r))
+
+    def out(self, x):
+        return self._other0 - self._other(self.t0 + self.f * x)
+
+    def d_out(self, x):
+        d_out = (
+            derivatives_array.dyout_dxin
+            if self.i_in == 0
+            else derivatives_array.dxout_dyin
+        )
+        return float(d_out(self.setup, self.t0 + self.f * x))
+
+    def d2_out(self, x):
+        # d/dx of d_out(t0 + f x); dpx_dxout / dpy_dyout are the derivative of the price with the fee divided out.
+        dp = (
+            derivatives_array.dpx_dxout
+            if self.i_in == 0
+            else derivatives_array.dpy_dyout
+        )
+        return -float(self.f**3 * dp(self.setup, self.t0 + self.f * x))
+
+    def normalized_liquidity(self):
+        nl = (
+            derivatives_array.normalized_liquidity_xin
+            if self.i_in == 0
+            else derivatives_array.normalized_liquidity_yin
+        )
+        return float(nl(self.setup, self.t0))
+
+
+class GyroECLPPoolSimulator(PoolSimulator):
+    """`params` are unscaled (as in eclp_prec_implementation). `derived` are the derived params as passed to the pool
+    (38 decimals, e.g. from getECLPParams()); by default they're computed from `params` like for deployment. `rates`
+    are the current values of rateProvider{0,1}.getRate() (raw, 18 decimals), or None where the pool has no rate
+    provider. They can be changed between calls."""
+
+    n_tokens = 2
+
+    def __init__(
+        self,
+        params: prec_impl.Params,
+        swap_fee: int,
+        rates: Sequence[Optional[int]] = (None, None),
+        derived: Optional[ECLPMathDerivedParams] = None,
+        **kwargs,
+    ):
+        super().__init__(swap_fee, **kwargs)
+        self.params = params
+        self.rates = list(rates)
+        if derived is None:
+            derived = prec_impl.scale_derived_values(
+                prec_impl.calc_derived_values(params)
+            )
+        self._int_params = math_int.Params(*(int(v) for v in scale(list(params))))
+        self._int_derived = ECLPMathDerivedParams(
+            tuple(int(v) for v in derived[0]),
+            tuple(int(v) for v in derived[1]),
+            *(int(v) for v in derived[2:]),
+        )
+        self._float_params = eclp_numpy.make_params(*(float(v) for v in params))
+        self._float_derived = eclp_numpy.calc_derived_values(self._float_params)
+
+    def scaling_factors(self) -> list[int]:
+        return [
+            factor if rate is None else mul_down(factor, rate)
+            for factor, rate in zip(super().scaling_factors(), self.rates)
+        ]
+
+    def calculate_invariant_with_error(
+        self, balances: Sequence[int]
+    ) -> tuple[int, int]:
+        return math_int.calculateInvariantWithError(
+            balances, self._int_params, self._int_derived
+        )
+
+    def calculate_invariant(self, balances: list[int]) -> int:
+        return math_int.calculateInvariant(
+            balances, self._int_params, self._int_derived
+        )
+
+    def _spot_price(self, balances: Sequence[int], invariant: int) -> int:
+        return math_int.calcSpotPrice0in1(
+            balances, self._int_params, self._int_derived, invariant
+        )
+
+    def _calc_initial_bpt(self, amounts_in: list[int]) -> tuple[int, int]:
+        invariant = self.calculate_invariant(amounts_in)
+        spot_price = self._spot_price(amounts_in, invariant)
+        return mul_down(amounts_in[0], spot_price) + amounts_in[1], invariant
+
+    def _spot_prices(self, balances: list[int]) -> list[int]:
+        invariant = self.calculate_invariant(balances)
+        return [self._spot_price(balances, invariant), ONE]
+
+    def _swap_model(self, balances, i_in, i_out):
+        return ECLPSwapModel(
+            self._float_params,
+            self._float_derived,
+            [b / ONE for b in balances],
+            i_in,
+            self.swap_fee / ONE,
+        )
+
+    def _swap_curve(self, balances, i_in, i_out):
+        # The curve scales with the invariant, so g is the curve for r = 1.
+        p, d = self._float_params, self._float_derived
+        r = float(eclp_numpy.calculateInvariant(*(b / ONE for b in balances), p, d))
+        calc_given = eclp_numpy.calcYGivenX if i_in == 0 else eclp_numpy.calcXGivenY
+        d_out = (
+            derivatives_array.dyout_dxin if i_in == 0 else derivatives_array.dxout_dyin
+        )
+        st = derivatives_array.setup(p, 0.0, r=1.0)
+        max_balance = (eclp_numpy.maxBalances0, eclp_numpy.maxBalances1)[i_in](
+            p, d, 1.0
+        )
+        # g(u) = affine - sqrt(R^2 - (u - a)^2) / (lam sTerm), see eclp_numpy.solveQuadraticSwap().
+        lam, sv = float(p.l), float(p.s if i_in == 0 else p.c)
+        offset = (eclp_numpy.virtualOffset0, eclp_numpy.virtualOffset1)[i_in](p, d, 1.0)
+        s_term = 1 - (1 - 1 / lam**2) * sv * sv
+        return SwapCurve(
+            shape=("eclp", i_in, tuple(float(v) for v in self.params)),
+            g=lambda u: calc_given(u, p, d, 1.0),
+            dg=lambda u: -d_out(st, u),
+            d4_bound=ellipse_d4_bound(
+                float(offset), lam * math.sqrt(s_term), 1 / (lam * s_term)
+            ),
+            u_min=0.0,
+            u_max=min(float(max_balance), float(_MAX_BALANCES) / r),
+            u0=balances[i_in] / ONE / r,
+            scale=r,
+            fee=self.swap_fee / ONE,
+        )
+
+    def _invariant_vector(self, balances) -> tuple[int, int]:
+        # Overestimate in x, underestimate in y, as in onSwap().
+        invariant, err = self.calculate_invariant_with_error(balances)
+        return invariant + 2 * err, invariant
+
+    def _calc_out_given_in(self, balances, i_in, i_out, amount_in):
+        return math_int.calcOutGivenIn(
+            balances,
+            amount_in,
+            i_in == 0,
+            self._int_params,
+            self._int_derived,
+            self._invariant_vector(balances),
+        )
+
+    def _calc_in_given_out(self, balances, i_in, i_out, amount_out):
+        return math_int.calcInGivenOut(
+            balances,
+            amount_out,
+            i_in == 0,
+            self._int_params,
+            self._int_derived,
+            self._invariant_vector(balances),
+        )
+
+    def get_price(self) -> int:
+        """Spot price of token 0 in units of token 1 before rate scaling, as getPrice()."""
+        price = self._spot_prices(self.upscaled_balances())[0]
+        if self.rates[0] is not None:
+            price = mul_down(price, self.rates[0])
+        if self.rates[1] is not None:
+            price = div_down(price, self.rates[1])
+        return price
+
+    def get_token_rates(self) -> tuple[int, int]:
+        return tuple(ONE if rate is None else rate for rate in self.rates)
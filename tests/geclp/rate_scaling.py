@@ -0,0 +1,186 @@
+# Rate-provider-aware scaling for batched ECLP pool states, as GyroECLPPool._scalingFactor() and _adjustPrice().
+#
+# The ECLP math (eclp_prec_implementation, eclp_numpy) works on upscaled balances, i.e. raw balances times the
+# scaling factor 10^(18 - decimals) * rateProvider.getRate() (or without the rate where the pool has no rate
+# provider). Here the rates are given as a RateSeries per token: getRate() as a step function of the block number,
+# which covers ConstRateProvider (a constant, changed with setRate()) and MockRateProvider (mockRate() at given
+# blocks). No rate provider is the same as a constant rate of ONE, since mulDown(f, ONE) = f.
+#
+# ECLPScaling applies this to arrays of (block, raw balances) rows:
+# - upscale() / downscale_down() / downscale_up() / adjust_price() are exact (object arrays of python ints, with the
+#   contract's rounding) and match GyroECLPPoolSimulator with its `rates` set to the rates at the block.
+# - scaled_states() additionally computes the float invariant for eclp_numpy, and quote_given_in() uses it for
+#   approximate swap quotes on raw amounts. Both cache the scaled state per (block, rates, raw balances), so quoting
+#   many amounts (or repeatedly) at the same pool state doesn't repeat the rescaling and the invariant computation.
+
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from tests.geclp import eclp_numpy
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.support import fixed_point_array as fp
+from tests.support.pool_simulator import ONE, scaling_factor_for_decimals
+
+
+class RateSeries:
+    """getRate() of one rate provider by block: `rates[k]` from `blocks[k]` on. Before the first block, the rate is
+    the first one."""
+
+    def __init__(self, blocks: Sequence[int], rates: Sequence[int]):
+        assert len(blocks) == len(rates) > 0
+        assert all(b1 > b0 for b0, b1 in zip(blocks, blocks[1:]))
+        self.blocks = np.asarray(blocks, dtype=np.int64)
+        self.rates = np.array([int(r) for r in rates], dtype=object)
+
+    @classmethod
+    def constant(cls, rate: int = ONE) -> "RateSeries":
+        return cls([0], [rate])
+
+    def set_rate(self, block: int, rate: int):
+        """setRate() / mockRate() at `block` (not before the last change)."""
+        if block == self.blocks[-1]:
+            self.rates[-1] = int(rate)
+            return
+        assert block > self.blocks[-1]
+        self.blocks = np.append(self.blocks, block)
+        self.rates = np.append(self.rates, np.array([int(rate)], dtype=object))
+
+    def at(self, blocks) -> np.ndarray:
+        index = np.searchsorted(self.blocks, np.asarray(blocks), side="right") - 1
+        return self.rates[np.maximum(index, 0)]
+
+
+class ScaledState(NamedTuple):
+    rates: tuple[int, int]
+    balances: tuple[int, int]  # upscaled
+    invariant: float  # of the upscaled balances / ONE, from eclp_numpy
+
+
+class ECLPScaling:
+    """`rate_providers` are RateSeries, or None for tokens without a rate provider. `params` (unscaled, as for
+    GyroECLPPoolSimulator) and `swap_fee` (raw) are only needed for scaled_states() and quote_given_in().
+    """
+
+    def __init__(
+        self,
+        token_decimals: Sequence[int] = (18, 18),
+        rate_providers: Sequence[Optional[RateSeries]] = (None, None),
+        params: Optional[prec_impl.Params] = None,
+        swap_fee: int = 0,
+        cache_size: int = 100_000,
+    ):
+        self.decimal_factors = [scaling_factor_for_decimals(d) for d in token_decimals]
+        self.has_rate_provider = [provider is not None for provider in rate_providers]
+        self.rate_providers = [
+            RateSeries.constant() if provider is None else provider
+            for provider in rate_providers
+        ]
+        self.swap_fee = swap_fee
+        if params is not None:
+            self._p = eclp_numpy.make_params(*(float(v) for v in params))
+            self._d = eclp_numpy.calc_derived_values(self._p)
+        self._cache: OrderedDict = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # Exact
+
+    def rates_at(self, blocks) -> np.ndarray:
+        """(..., 2) object array of the rates of both tokens."""
+        return np.stack([_exact(p.at(blocks)) for p in self.rate_providers], axis=-1)
+
+    def scaling_factors(self, blocks) -> np.ndarray:
+        """(..., 2) object array, as _scalingFactor(token0), _scalingFactor(!token0)."""
+        rates = self.rates_at(blocks)
+        factors = np.array(self.decimal_factors, dtype=object)
+        return fp.mul_down(np.broadcast_to(factors, rates.shape).copy(), rates)
+
+    def upscale(self, balances: np.ndarray, blocks) -> np.ndarray:
+        """Raw (..., 2) balances (or amounts) to upscaled ones, as _upscale()."""
+        return fp.mul_down(_exact(balances), self.scaling_factors(blocks))
+
+    def downscale_down(self, amounts: np.ndarray, blocks) -> np.ndarray:
+        return fp.div_down(_exact(amounts), self.scaling_factors(blocks))
+
+    def downscale_up(self, amounts: np.ndarray, blocks) -> np.ndarray:
+        return fp.div_up(_exact(amounts), self.scaling_factors(blocks))
+
+    def adjust_price(self, prices: np.ndarray, blocks) -> np.ndarray:
+        """Spot prices of token 0 in token 1 for upscaled balances to prices before rate scaling, as _adjustPrice()."""
+        rates = self.rates_at(blocks)
+        # _exact() again since 0-d products come back as plain ints, which fixed_point_array would treat as floats.
+        adjusted = _exact(fp.mul_down(_exact(prices), rates[..., 0]))
+        return fp.div_down(adjusted, rates[..., 1])
+
+    # Float, cached
+
+    def scaled_states(self, blocks, balances) -> list[ScaledState]:
+        """The scaled state for each row of (blocks (n,), raw balances (n, 2))."""
+        blocks = np.asarray(blocks, dtype=np.int64)
+        rates = self.rates_at(blocks)
+        keys = [
+            (int(block), r0, r1, int(b0), int(b1))
+            for block, (r0, r1), (b0, b1) in zip(blocks, rates, balances)
+        ]
+        # Rows with the same key (e.g. many amounts quoted at one state) are computed once.
+        missing = {}
+        for k, key in enumerate(keys):
+            if key not in self._cache and key not in missing:
+                missing[key] = k
+        self.cache_misses += len(missing)
+        self.cache_hits += len(keys) - len(missing)
+        computed = {}
+        if missing:
+            rows = list(missing.values())
+            upscaled = self.upscale(
+                np.array([keys[k][3:] for k in rows], dtype=object), blocks[rows]
+            )
+            x, y = (fp.exact_to_float(upscaled[:, i]) for i in range(2))
+            invariants = eclp_numpy.calculateInvariant(x, y, self._p, self._d)
+            for key, upscaled_row, invariant in zip(missing, upscaled, invariants):
+                computed[key] = ScaledState(
+                    key[1:3], tuple(upscaled_row), float(invariant)
+                )
+        states = []
+        for key in keys:
+            state = computed.get(key) or self._cache[key]
+            self._cache[key] = state
+            self._cache.move_to_end(key)
+            states.append(state)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return states
+
+    def quote_given_in(self, blocks, balances, amounts_in, i_in: int) -> np.ndarray:
+        """Approximate raw amounts out of swap_given_in(i_in, 1 - i_in, amount_in) for each row, NaN where the
+        amount in exceeds the pool's range."""
+        states = self.scaled_states(blocks, balances)
+        i_out = 1 - i_in
+        rates = np.array([s.rates for s in states], dtype=float)
+        # Upscaled amount / ONE per raw unit.
+        factors = np.array(self.decimal_factors, dtype=float) * rates / ONE**3
+        upscaled = np.array([s.balances for s in states], dtype=float) / ONE
+        r = np.array([s.invariant for s in states])
+
+        amounts = np.asarray(amounts_in, dtype=float) * (1 - self.swap_fee / ONE)
+        balance_in = upscaled[:, i_in] + amounts * factors[:, i_in]
+        calc_given = eclp_numpy.calcYGivenX if i_in == 0 else eclp_numpy.calcXGivenY
+        max_balance = (eclp_numpy.maxBalances0, eclp_numpy.maxBalances1)[i_in]
+        balance_out = calc_given(balance_in, self._p, self._d, r)
+        out = (upscaled[:, i_out] - balance_out) / factors[:, i_out]
+        return np.where(balance_in <= max_balance(self._p, self._d, r), out, np.nan)
+
+    def apply(self, sim, block: int):
+        """Sets the rates of a GyroECLPPoolSimulator to getRate() at `block`."""
+        rates = self.rates_at(block)
+        sim.rates = [
+            int(rate) if has_provider else None
+            for rate, has_provider in zip(rates, self.has_rate_provider)
+        ]
+
+
+def _exact(values) -> np.ndarray:
+    return np.asarray(values, dtype=object)
@@ -0,0 +1,59 @@
+import numpy as np
+from brownie.test import given
+from hypothesis import settings
+from hypothesis import strategies as st
+
+from tests.geclp import eclp_derivatives as derivatives
+from tests.geclp import eclp_derivatives_array as derivatives_array
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp.opt_test_eclp_sor_formulas import bpool_params, gen_fee, gen_params
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import ECLPMathParams
+from tests.support.util_common import gen_balances
+
+# (name of the function in both eclp_derivatives_array and eclp_derivatives, index of the balance it depends on).
+FUNCTIONS = [
+    ("dyin_dxout", 0),
+    ("dxin_dyout", 1),
+    ("dyout_dxin", 0),
+    ("dxout_dyin", 1),
+    ("dpx_dxout", 0),
+    ("dpy_dyout", 1),
+    ("dpy_dxin", 0),
+    ("dpx_dyin", 1),
+    ("normalized_liquidity_xin", 0),
+    ("normalized_liquidity_yin", 1),
+]
+
+
+@settings(max_examples=50)
+@given(
+    balances=gen_balances(2, bpool_params, min_balance=D(1)),
+    params=gen_params(bpool_params),
+    fee=gen_fee(),
+    function_ix=st.integers(0, len(FUNCTIONS) - 1),
+)
+def test_matches_decimal(balances, params, fee, function_ix):
+    derived = prec_impl.calc_derived_values(params)
+    r, err = prec_impl.calculateInvariantWithError(balances, params, derived)
+    r_vec = (r + 2 * err, r)
+
+    name, ix = FUNCTIONS[function_ix]
+    expected = getattr(derivatives, name)(balances, params, fee, r_vec)
+    st_ = derivatives_array.setup(params, float(fee), r=float(r))
+    value = getattr(derivatives_array, name)(st_, float(balances[ix]))
+    assert D(float(value)) == expected.approxed(rel=D("1e-8"), abs=D("1e-8"))
+
+
+def test_surface_broadcasting():
+    params = ECLPMathParams(
+        alpha=D("0.5"), beta=D("1.5"), c=1 / D(2).sqrt(), s=1 / D(2).sqrt(), l=D(2)
+    )
+    st_ = derivatives_array.setup(params, 0.001, balances=(1000.0, 1000.0))
+    y0 = np.linspace(500, 1500, 7)
+    amounts = np.linspace(0, 100, 11)
+    surface = derivatives_array.dxin_dyout(st_, y0[:, None] + st_.f * amounts[None, :])
+    assert surface.shape == (7, 11)
+    # The price of y ito. x falls as more y is in the pool.
+    assert np.all(np.diff(surface, axis=0) < 0)
+    assert np.all(np.diff(surface, axis=1) < 0)
@@ -0,0 +1,111 @@
+import numpy as np
+from brownie.test import given
+from hypothesis import example, settings
+
+from tests.geclp import eclp_numpy as npimpl
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import util
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import ECLPMathParams
+from tests.support.util_common import BasicPoolParameters, gen_balances
+
+# Checks the float64 implementation against the prec implementation. No chain needed.
+
+bpool_params = BasicPoolParameters(
+    min_price_separation=D("0.001"),
+    max_in_ratio=D("0.3"),
+    max_out_ratio=D("0.3"),
+    min_balance_ratio=D("1e-5"),
+    min_fee=D("0.0001"),
+    max_balances=int(D("1e11")),
+)
+
+
+# Tolerances in units of eps. Offsets, max balances and swaps are typically accurate to about lambda r eps, but for
+# large lambda, tau is only accurate to about lambda^2 eps when beta is close to tan(phi) (see
+# npimpl.calculateInvariantWithError()); the spot price is affected relative to its value. The factors leave a margin
+# of about 2 over the worst cases found by hypothesis.
+TOLERANCE_FACTORS = (60, 0.5)  # (a, b) for r (a lambda + b lambda^2) eps
+SPOT_PRICE_TOLERANCE_FACTOR = 40  # for lambda^2 eps, relative
+
+
+@settings(max_examples=200)
+@given(
+    params=util.gen_params_valid(),
+    balances=gen_balances(2, bpool_params, min_balance=D(1)),
+)
+@example(
+    params=ECLPMathParams(
+        alpha=D("0.05"),
+        beta=D("0.176326801071310505"),
+        c=D("0.984807753012208020"),
+        s=D("0.173648177666930331"),
+        l=D("99746236.897611"),
+    ),
+    balances=(D(1), D(5)),
+)
+@example(
+    params=ECLPMathParams(
+        alpha=D("0.05"),
+        beta=D("0.295943198383705870"),
+        c=D("0.984807753012208020"),
+        s=D("0.173648177666930331"),
+        l=D("99746236.897611"),
+    ),
+    balances=(D(1), D(1)),
+)
+def test_matches_prec_impl(params, balances):
+    derived = prec_impl.calc_derived_values(params)
+    r, err = prec_impl.calculateInvariantWithError(balances, params, derived)
+
+    p = npimpl.params_from_qd([params])
+    d = npimpl.calc_derived_values(p)
+    x, y = npimpl.balances_from_qd([balances])
+    r_float, err_float = npimpl.calculateInvariantWithError(x, y, p, d)
+
+    # The exact invariant lies in [r, r + 2 err]. For tiny invariants (large lambda), err is a few units in the 18th
+    # decimal, and the float value can be anywhere in that interval, so allow one more unit for the rounding of r.
+    assert abs(r_float[0] - float(r + err)) <= float(err) + err_float[0] + 1e-18
+
+    r_vec = (r, r)
+    r_ref = np.array([float(r)])
+    eps, lam = npimpl.EPS, p.l[0]
+    a, b = TOLERANCE_FACTORS
+    tol = (a * lam + b * lam**2) * eps * float(r) + 1e-17
+
+    for np_fun, prec_fun in [
+        (npimpl.virtualOffset0, prec_impl.virtualOffset0),
+        (npimpl.virtualOffset1, prec_impl.virtualOffset1),
+        (npimpl.maxBalances0, prec_impl.maxBalances0),
+        (npimpl.maxBalances1, prec_impl.maxBalances1),
+    ]:
+        ref = prec_fun(params, derived, r_vec)
+        assert abs(np_fun(p, d, r_ref)[0] - float(ref)) <= tol
+    y_ref = prec_impl.calcYGivenX(balances[0], params, derived, r_vec)
+    assert abs(npimpl.calcYGivenX(x, p, d, r_ref)[0] - float(y_ref)) <= tol
+    x_ref = prec_impl.calcXGivenY(balances[1], params, derived, r_vec)
+    assert abs(npimpl.calcXGivenY(y, p, d, r_ref)[0] - float(x_ref)) <= tol
+    px_ref = float(prec_impl.calcSpotPrice0in1(balances, params, derived, r))
+    px = npimpl.calcSpotPrice0in1(x, y, p, d, r_ref)[0]
+    assert abs(px - px_ref) <= SPOT_PRICE_TOLERANCE_FACTOR * eps * lam**2 * px_ref
+
+
+def test_broadcasting():
+    rng = np.random.default_rng(0)
+    p = npimpl.sample_params(rng, 100)
+    x, y = npimpl.sample_balances(rng, 100)
+
+    d = npimpl.calc_derived_values(p)
+    r = npimpl.calculateInvariant(x, y, p, d)
+
+    # One pool at many balances gives the same as the row-wise calculation.
+    p0 = npimpl.make_params(*(v[0] for v in p))
+    d0 = npimpl.calc_derived_values(p0)
+    r0 = npimpl.calculateInvariant(x, y, p0, d0)
+    assert r0[0] == r[0]
+    assert r0.shape == x.shape
+
+    # Balances on the curve are reproduced.
+    assert np.allclose(npimpl.calcYGivenX(x, p, d, r), y, rtol=1e-6)
+    assert np.all(npimpl.maxBalances0(p, d, r) >= x * (1 - 1e-9))
+    assert np.all(npimpl.maxBalances1(p, d, r) >= y * (1 - 1e-9))
@@ -6,9 +6,9 @@ from typing import Tuple
 import hypothesis.strategies as st
 from _pytest.python_api import ApproxDecimal
 from brownie.test import given
-from brownie import reverts
 from hypothesis import assume, settings
 from tests.geclp import eclp as mimpl
+from tests.support.reverts import reverts
 from tests.support.utils import scale, to_decimal, qdecimals, unscale
 from tests.support.types import *
 from tests.support.quantized_decimal import QuantizedDecimal as D
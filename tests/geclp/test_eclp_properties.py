@@ -9,10 +9,10 @@ from _pytest.python_api import ApproxDecimal
 
 # from pyrsistent import Invariant
 from brownie.test import given
-from brownie import reverts
 from hypothesis import assume, settings, event, example, HealthCheck
 import pytest
 
+from tests.support.reverts import reverts
 from tests.support.util_common import BasicPoolParameters, gen_balances
 from tests.geclp import eclp as mimpl
 from tests.geclp import eclp_prec_implementation as prec_impl
@@ -0,0 +1,70 @@
+from brownie.test import given
+from hypothesis import settings
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import util
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.quantized_decimal_38 import QuantizedDecimal as D2
+from tests.support.util_common import BasicPoolParameters, gen_balances
+
+# Checks that the constructive strategies only produce values that the contracts accept. These tests don't need a
+# chain; the limits are those of GyroECLPMath.validateParams() and validateDerivedParamsLimits().
+
+bpool_params = BasicPoolParameters(
+    min_price_separation=D("0.001"),
+    max_in_ratio=D("0.3"),
+    max_out_ratio=D("0.3"),
+    min_balance_ratio=D("1e-5"),
+    min_fee=D("0.0001"),
+)
+
+
+@settings(max_examples=200)
+@given(params=util.gen_params_valid(verify=True))
+def test_gen_params_valid(params):
+    assert D(0) <= params.s <= D(1) and D(0) <= params.c <= D(1)
+    assert (params.c * params.c + params.s * params.s - 1) == D(0).approxed(
+        abs=D("1e-15")
+    )
+    assert D(1) <= params.l <= util.MAX_STRETCH_FACTOR
+    assert params.beta - params.alpha >= util.MIN_PRICE_SEPARATION
+
+    derived = prec_impl.calc_derived_values(params)
+    denominator = prec_impl.calcAChiAChiInXp(params, derived) - D2(1)
+    assert denominator >= D2(util.MIN_INVARIANT_DENOMINATOR.raw)
+
+
+@settings(max_examples=100)
+@given(
+    params=util.gen_params_valid(
+        price_range=("0.9", "1.1"), phi_degrees_range=(1, 89), verify=True
+    )
+)
+def test_gen_params_valid_narrow_range(params):
+    # phi is clamped s.t. the peg bounds fit into the price range, and lambda s.t. the range is wide enough.
+    peg = params.s / params.c
+    eps = D("1e-15")
+    assert D("0.9") <= params.alpha <= peg * D("1.3") + eps
+    assert peg * D("0.7") - eps <= params.beta <= D("1.1")
+
+
+@settings(max_examples=200)
+@given(params=util.gen_params())
+def test_invariant_denominator_float(params):
+    derived = prec_impl.calc_derived_values(params)
+    denominator = prec_impl.calcAChiAChiInXp(params, derived) - D2(1)
+    denominator_float = util.calc_invariant_denominator_float(*map(float, params))
+    tolerance = util.calc_invariant_denominator_float_tolerance(float(params.l))
+    assert D(denominator_float) == D(denominator.raw).approxed(
+        abs=D(tolerance), rel=D("1e-12")
+    )
+
+
+@given(balances=gen_balances(2, bpool_params, min_balance=D(1), min_sum=D(100)))
+def test_gen_balances_bounds(balances):
+    x, y = balances
+    assert x >= 1 and y >= 1
+    assert x + y >= 100
+    assert y >= x * bpool_params.min_balance_ratio
+    assert x >= y * bpool_params.min_balance_ratio
+    assert max(balances) <= bpool_params.max_balances
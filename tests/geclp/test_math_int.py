@@ -0,0 +1,104 @@
+import hypothesis.strategies as st
+import numpy as np
+from brownie.test import given
+from hypothesis import assume, settings
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp import math_int
+from tests.geclp.util import gen_params
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.reverts import outcome
+from tests.support.types import ECLPMathDerivedParams
+from tests.support.utils import scale, unscale
+
+balance_strategy = st.integers(min_value=1, max_value=100_000_000_000 * 10**18)
+
+
+def _int_params(params) -> tuple[math_int.Params, ECLPMathDerivedParams]:
+    """`params` (unscaled) and their derived params, scaled as passed to the contract."""
+    derived = prec_impl.scale_derived_values(prec_impl.calc_derived_values(params))
+    derived = ECLPMathDerivedParams(
+        tuple(int(v) for v in derived.tauAlpha),
+        tuple(int(v) for v in derived.tauBeta),
+        *(int(v) for v in derived[2:]),
+    )
+    return math_int.Params(*(int(v) for v in scale(list(params)))), derived
+
+
+@settings(max_examples=50)
+@given(
+    params=gen_params(),
+    balances=st.tuples(balance_strategy, balance_strategy),
+)
+def test_invariant_matches_contract(gyro_eclp_math_testing, params, balances):
+    p, d = _int_params(params)
+    assert outcome(math_int.calculateInvariantWithError, balances, p, d) == outcome(
+        gyro_eclp_math_testing.calculateInvariantWithError, balances, p, d
+    )
+    invariant = outcome(math_int.calculateInvariant, balances, p, d)
+    if not isinstance(invariant, str):
+        assert math_int.calcSpotPrice0in1(
+            balances, p, d, invariant
+        ) == gyro_eclp_math_testing.calculatePrice(balances, p, d, invariant)
+
+
+@settings(max_examples=50)
+@given(
+    params=gen_params(),
+    balances=st.tuples(balance_strategy, balance_strategy),
+    amount=balance_strategy,
+    token_in_is_token0=st.booleans(),
+)
+def test_swaps_match_contract(
+    gyro_eclp_math_testing, params, balances, amount, token_in_is_token0
+):
+    p, d = _int_params(params)
+    result = outcome(math_int.calculateInvariantWithError, balances, p, d)
+    assume(not isinstance(result, str))
+    invariant, err = result
+    args = (
+        balances,
+        amount,
+        token_in_is_token0,
+        p,
+        d,
+        (invariant + 2 * err, invariant),
+    )
+    assert outcome(math_int.calcOutGivenIn, *args) == outcome(
+        gyro_eclp_math_testing.calcOutGivenIn, *args
+    )
+    assert outcome(math_int.calcInGivenOut, *args) == outcome(
+        gyro_eclp_math_testing.calcInGivenOut, *args
+    )
+
+
+def test_matches_prec_implementation():
+    """eclp_prec_implementation follows the same steps in QuantizedDecimal, which rounds like the contract for the
+    values of a pool with moderate balances."""
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        phi = rng.uniform(0.1, 1.4)
+        c, s = D(float(np.cos(phi))), D(float(np.sin(phi)))
+        norm = (c * c + s * s).sqrt()
+        params = prec_impl.Params(
+            D(float(rng.uniform(0.5, 0.99))),
+            D(float(rng.uniform(1.01, 2))),
+            c / norm,
+            s / norm,
+            D(float(rng.uniform(1, 50))),
+        )
+        derived = prec_impl.calc_derived_values(params)
+        p, d = _int_params(params)
+        balances = [int(b) * 10**12 for b in rng.integers(10**6, 10**12, 2)]
+
+        invariant, err = math_int.calculateInvariantWithError(balances, p, d)
+        expected = prec_impl.calculateInvariantWithError(
+            unscale(balances), params, derived
+        )
+        assert (invariant, err) == tuple(int(scale(v)) for v in expected)
+
+        r = (invariant + 2 * err, invariant)
+        new_x = balances[0] + balances[0] // 10
+        y = math_int.calcYGivenX(new_x, p, d, r)
+        expected = prec_impl.calcYGivenX(unscale(new_x), params, derived, unscale(r))
+        assert y == int(scale(expected))
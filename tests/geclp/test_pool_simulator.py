@@ -0,0 +1,145 @@
+import pytest
+
+from tests.conftest import scale_derived_values, scale_eclp_params
+from tests.geclp import eclp_prec_implementation
+from tests.geclp.pool_simulator import GyroECLPPoolSimulator
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.simulator_conformance import (
+    VaultDriver,
+    run_conformance,
+    set_protocol_swap_fee,
+    speedup,
+)
+from tests.support.types import (
+    CapParams,
+    ECLPMathParams,
+    ECLPMathParamsQD,
+    ECLPPoolParams,
+    TwoPoolBaseParams,
+)
+from tests.support.utils import unscale
+
+PROTOCOL_SWAP_FEE = 5 * 10**17
+
+RATE = 15 * 10**17
+
+CAP_PARAMS = CapParams(
+    cap_enabled=True, per_address_cap=300 * 10**18, global_cap=500 * 10**18
+)
+
+# Pausing is only possible within the pause window, and unpausing within the buffer period after it.
+PAUSE_WINDOW_DURATION = 30 * 24 * 3600
+BUFFER_PERIOD_DURATION = 30 * 24 * 3600
+
+
+@pytest.fixture
+def rate_provider(admin, ConstRateProvider):
+    provider = admin.deploy(ConstRateProvider)
+    provider.setRate(RATE)
+    return provider
+
+
+@pytest.fixture
+def eclp_pool_with_rate(
+    admin,
+    GyroECLPPool,
+    GyroECLPMath,
+    gyro_erc20_funded,
+    mock_vault,
+    mock_gyro_config,
+    deployed_query_processor,
+    rate_provider,
+):
+    """Like eclp_pool, but with `rate_provider` for token 0, a liquidity cap and `admin` as the pause manager."""
+    two_pool_base_params = TwoPoolBaseParams(
+        vault=mock_vault.address,
+        name="GyroECLPTwoPool",  # string
+        symbol="GCTP",  # string
+        token0=gyro_erc20_funded[0].address,  # IERC20
+        token1=gyro_erc20_funded[1].address,  # IERC20
+        swapFeePercentage=1 * 10**15,  # 0.1%
+        pauseWindowDuration=PAUSE_WINDOW_DURATION,  # uint256
+        bufferPeriodDuration=BUFFER_PERIOD_DURATION,  # uint256
+        oracleEnabled=False,  # bool
+        owner=admin,  # address
+    )
+    # The same parameters as eclp_pool; they apply to the rate-scaled balances.
+    eclp_params = ECLPMathParams(
+        alpha=D("0.97"),
+        beta=D("1.02"),
+        c=D("0.7071067811865475244"),
+        s=D("0.7071067811865475244"),
+        l=D("2"),
+    )
+    derived_eclp_params = eclp_prec_implementation.calc_derived_values(eclp_params)
+    args = ECLPPoolParams(
+        two_pool_base_params,
+        scale_eclp_params(eclp_params),
+        scale_derived_values(derived_eclp_params),
+        rateProvider0=rate_provider.address,
+        capParams=CAP_PARAMS,
+        pauseManager=admin,
+    )
+    admin.deploy(GyroECLPMath)
+    return admin.deploy(
+        GyroECLPPool, args, mock_gyro_config.address, gas_limit=11250000
+    )
+
+
+def make_sim(pool, **kwargs) -> GyroECLPPoolSimulator:
+    sparams, sderived = pool.getECLPParams()
+    return GyroECLPPoolSimulator(
+        ECLPMathParamsQD(*unscale(list(sparams))),
+        pool.getSwapFeePercentage(),
+        derived=sderived,
+        protocol_swap_fee=PROTOCOL_SWAP_FEE,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_simulator_matches_pool(
+    users, mock_vault, eclp_pool, mock_gyro_config, gyro_erc20_funded, seed
+):
+    set_protocol_swap_fee(mock_gyro_config, PROTOCOL_SWAP_FEE)
+    sim = make_sim(eclp_pool)
+    driver = VaultDriver(mock_vault, eclp_pool, gyro_erc20_funded)
+    run_conformance(
+        driver,
+        sim,
+        users[:2],
+        [100 * 10**18, 80 * 10**18],
+        seed,
+        n_steps=15,
+    )
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_simulator_matches_pool_with_rate(
+    admin,
+    users,
+    mock_vault,
+    eclp_pool_with_rate,
+    mock_gyro_config,
+    gyro_erc20_funded,
+    seed,
+):
+    set_protocol_swap_fee(mock_gyro_config, PROTOCOL_SWAP_FEE)
+    sim = make_sim(eclp_pool_with_rate, rates=(RATE, None), cap_params=CAP_PARAMS)
+    assert sim.get_token_rates() == tuple(eclp_pool_with_rate.getTokenRates())
+    driver = VaultDriver(mock_vault, eclp_pool_with_rate, gyro_erc20_funded)
+    run_conformance(
+        driver,
+        sim,
+        users[:2],
+        [60 * 10**18, 80 * 10**18],
+        seed,
+        n_steps=15,
+        pause_manager=admin,
+    )
+
+
+def test_faster_than_vault(users, mock_vault, eclp_pool, gyro_erc20_funded):
+    driver = VaultDriver(mock_vault, eclp_pool, gyro_erc20_funded)
+    initial_amounts = [100 * 10**18, 80 * 10**18]
+    assert speedup(driver, make_sim(eclp_pool), users[0], initial_amounts, 10**18) > 20
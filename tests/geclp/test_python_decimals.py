@@ -10,7 +10,6 @@ if __name__ == "__main__":
 
     brownie.reverts = None
 
-import pandas as pd
 from brownie.test import given
 from hypothesis import settings, assume, example, HealthCheck
 from hypothesis import strategies as st
@@ -27,6 +26,7 @@ from tests.support.util_common import (
     BasicPoolParameters,
 )
 from tests.support import quantized_decimal
+from tests.support.error_collector import ErrorValueCollector
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.support.types import ECLPMathParams
 from tests.support.utils import qdecimals
@@ -42,8 +42,9 @@ bpool_params = BasicPoolParameters(
     MIN_PRICE_SEPARATION, D("0.3"), D("0.3"), MIN_BALANCE_RATIO, MIN_FEE
 )
 
-# Ad-hoc hack to collect error values while running tests. Should be refactored somehow at some point.
+# Collects error values while running tests when set to an ErrorValueCollector (see main below).
 error_values = None
+ERROR_VALUES_DIR = "data/errors_single_decimal"
 
 # MIN_BALANCE_RATIO = D(0)
 # MIN_FEE = D(0)
@@ -213,7 +214,7 @@ def mtest_invariant_across_calcOutGivenIn(params, balances, amountIn, tokenInIsT
 
     global error_values
     if error_values is not None:
-        error_values.append(loss_ub)
+        error_values.push(dict(error=loss_ub))
 
     return loss_ub  # Convenient sometimes and irrelevant in tests.
 
@@ -308,8 +309,10 @@ def test_invariant_across_calcOutGivenIn_float(
 if __name__ == "__main__":
     # When run directly, run this with python from the `vaults/` toplevel dir.
     # (also works with pytest, then this is ignored)
-    with debug_postmortem_on_exc():
-        error_values = []
+    with debug_postmortem_on_exc(), ErrorValueCollector(
+        ERROR_VALUES_DIR, {"error": float}
+    ) as error_values:
+        error_values.clear()
         # quantized_decimal.set_decimals(2 * 18)
         test_invariant_across_calcOutGivenIn()
         # err = mtest_invariant_across_calcOutGivenIn(
@@ -329,5 +332,4 @@ if __name__ == "__main__":
         #     tokenInIsToken0=False,
         # )  # Fails
         # print(err)
-        df = pd.DataFrame({"error": list(map(float, error_values))})
-        df.to_feather("data/errors_single_decimal.feather")
+    # Load with tests.support.error_collector.load_error_values(ERROR_VALUES_DIR).
@@ -0,0 +1,103 @@
+import copy
+
+import numpy as np
+import pytest
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.geclp.pool_simulator import GyroECLPPoolSimulator
+from tests.geclp.rate_scaling import ECLPScaling, RateSeries
+from tests.support.pool_simulator import ONE, div_down, div_up
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+PARAMS = prec_impl.Params(
+    D("0.97"), D("1.02"), D("0.7071067811865475244"), D("0.7071067811865475244"), D(2)
+)
+SWAP_FEE = 5 * 10**14
+DECIMALS = (6, 18)
+
+
+def make_scaling():
+    """Token 0 with a rate provider that changes over time (as MockRateProvider), token 1 without one."""
+    rates = RateSeries([0, 100, 200], [ONE, 105 * 10**16, 98 * 10**16])
+    return ECLPScaling(DECIMALS, (rates, None), PARAMS, SWAP_FEE)
+
+
+def make_sim(scaling, block, balances):
+    sim = GyroECLPPoolSimulator(PARAMS, SWAP_FEE, token_decimals=DECIMALS)
+    scaling.apply(sim, block)
+    sim.initialize("lp", balances)
+    return sim
+
+
+def test_rate_series_steps():
+    series = RateSeries([10, 20], [2 * ONE, 3 * ONE])
+    assert list(series.at([0, 10, 19, 20, 1000])) == [2 * ONE] * 3 + [3 * ONE] * 2
+    series.set_rate(20, 4 * ONE)
+    series.set_rate(30, 5 * ONE)
+    assert list(series.at([25, 30])) == [4 * ONE, 5 * ONE]
+    with pytest.raises(AssertionError):
+        series.set_rate(29, ONE)
+    assert list(RateSeries.constant().at([0, 10**9])) == [ONE, ONE]
+
+
+def test_scaling_matches_simulator():
+    scaling = make_scaling()
+    rng = np.random.default_rng(0)
+    blocks = np.array([0, 99, 100, 150, 200, 10_000])
+    balances = [
+        [int(x), int(x * rng.uniform(0.5, 2)) * 10**12]
+        for x in rng.integers(10**6, 10**12, len(blocks))
+    ]
+    upscaled = scaling.upscale(balances, blocks)
+    for block, row, upscaled_row in zip(blocks, balances, upscaled):
+        sim = make_sim(scaling, block, row)
+        assert list(upscaled_row) == sim.upscaled_balances()
+        factors = sim.scaling_factors()
+        assert list(scaling.scaling_factors(block)) == factors
+        assert list(scaling.downscale_down(upscaled_row, block)) == [
+            div_down(u, f) for u, f in zip(upscaled_row, factors)
+        ]
+        assert list(scaling.downscale_up(upscaled_row, block)) == [
+            div_up(u, f) for u, f in zip(upscaled_row, factors)
+        ]
+        price = sim._spot_prices(sim.upscaled_balances())[0]
+        assert scaling.adjust_price(price, block) == sim.get_price()
+
+
+def test_quotes_match_simulator():
+    scaling = make_scaling()
+    balances = [200 * 10**6, 200 * 10**18]
+    blocks = np.array([50, 150, 250])
+    for i_in in (0, 1):
+        unit = 10 ** DECIMALS[i_in]
+        amounts = np.array([1, 5, 20]) * unit
+        for block in blocks:
+            quotes = scaling.quote_given_in(
+                np.full(len(amounts), block), [balances] * len(amounts), amounts, i_in
+            )
+            sim = make_sim(scaling, block, balances)
+            for amount, quote in zip(amounts, quotes):
+                out = copy.deepcopy(sim).swap_given_in(i_in, 1 - i_in, int(amount))
+                assert quote == pytest.approx(out, rel=1e-9, abs=1)
+        # Far beyond the pool's range.
+        too_large = scaling.quote_given_in([0], [balances], [10**6 * unit], i_in)
+        assert np.isnan(too_large[0])
+
+
+def test_scaled_states_are_cached():
+    scaling = make_scaling()
+    balances = [[200 * 10**6, 200 * 10**18]] * 5
+    scaling.quote_given_in([150] * 5, balances, np.arange(1, 6) * 10**6, 0)
+    assert (scaling.cache_misses, scaling.cache_hits) == (1, 4)
+    scaling.quote_given_in([150], balances[:1], [10**6], 0)
+    assert (scaling.cache_misses, scaling.cache_hits) == (1, 5)
+
+    # A changed rate at the same block is a new state.
+    scaling.scaled_states([250], balances[:1])
+    scaling.rate_providers[0].set_rate(200, 101 * 10**16)
+    scaling.scaled_states([250, 150], balances[:2])
+    assert (scaling.cache_misses, scaling.cache_hits) == (3, 6)
+
+    scaling.cache_size = 1
+    scaling.scaled_states([0, 1, 2], [[1, 1], [2, 2], [3, 3]])
+    assert len(scaling._cache) == 1
@@ -1,16 +1,19 @@
-from math import pi, sin, cos, tan, acos
+from math import acos, atan, cos, degrees, pi, sin, sqrt, tan
 
 from hypothesis import strategies as st, assume, event
 
-from brownie import reverts
-
 from tests.geclp import eclp as mimpl
 from tests.geclp import eclp_prec_implementation as prec_impl
 from tests.libraries import pool_math_implementation
 from tests.support.quantized_decimal import QuantizedDecimal as D
 from tests.support.quantized_decimal_38 import QuantizedDecimal as D2
+from tests.support.reverts import reverts
 from tests.support.types import ECLPMathParams, ECLPMathDerivedParams, Vector2
-from tests.support.util_common import BasicPoolParameters, gen_balances
+from tests.support.util_common import (
+    AcceptanceStats,
+    BasicPoolParameters,
+    gen_balances,
+)
 from tests.support.utils import qdecimals, scale, to_decimal, unscale
 
 MIN_PRICE_SEPARATION = D("0.001")
@@ -37,26 +40,166 @@ def mathParams2DerivedParams(mparams: mimpl.Params) -> ECLPMathDerivedParams:
     )  # Type mismatch but "duck" compatible.
 
 
+# Lower bound on calcAChiAChiInXp() - 1 enforced by GyroECLPMath.validateDerivedParamsLimits(), which requires
+# 1 / (AChiAChi - 1) <= _MAX_INV_INVARIANT_DENOMINATOR_XP = 1e5.
+MIN_INVARIANT_DENOMINATOR = D("1e-5")
+MAX_STRETCH_FACTOR = D("1e8")
+
+
+gen_params_stats = AcceptanceStats("gen_params")
+
+
+def calc_invariant_denominator_float(
+    alpha: float, beta: float, c: float, s: float, l: float
+) -> float:
+    """Float approximation of `prec_impl.calcAChiAChiInXp(params, derived) - 1`, without computing the derived params
+    in high precision. See calc_invariant_denominator_float_tolerance() for its accuracy."""
+
+    def tau(px):
+        d = 1 / sqrt((c + px * s) ** 2 / l**2 + (px * c - s) ** 2)
+        return (px * c - s) * d, (c + s * px) * d / l
+
+    tau_alpha, tau_beta = tau(alpha), tau(beta)
+    w = s * c * (tau_beta[1] - tau_alpha[1])
+    z = c * c * tau_beta[0] + s * s * tau_alpha[0]
+    u = s * c * (tau_beta[0] - tau_alpha[0])
+    v = s * s * tau_beta[1] + c * c * tau_alpha[1]
+    return (w / l + z) ** 2 + (l * u + v) ** 2 - 1
+
+
+def calc_invariant_denominator_float_tolerance(l: float) -> float:
+    """Absolute error bound of calc_invariant_denominator_float() for values near the validity threshold (large values
+    additionally have a relative error of about 1e-13). The error grows with lambda b/c the tau values are multiplied
+    by it in (A chi)_y = lambda * u + v."""
+    return 1e-14 * l + 1e-15
+
+
+def _bisect_boundary(is_valid, valid: float, invalid: float, steps: int = 64) -> float:
+    """Point close to the boundary between `valid` and `invalid` (in either order) where is_valid() still holds."""
+    for _ in range(steps):
+        mid = (valid + invalid) / 2
+        if is_valid(mid):
+            valid = mid
+        else:
+            invalid = mid
+    return valid
+
+
 @st.composite
-def gen_params(draw):
-    phi_degrees = draw(st.floats(10, 80))
+def gen_params_valid(
+    draw,
+    min_price_separation: D = MIN_PRICE_SEPARATION,
+    price_range=("0.05", "20.0"),
+    alpha_max_peg_factor: D = D("1.3"),
+    beta_min_peg_factor: D = D("0.7"),
+    phi_degrees_range=(10, 80),
+    l_range=("1", MAX_STRETCH_FACTOR),
+    verify: bool = False,
+    stats: AcceptanceStats = gen_params_stats,
+):
+    """Parameters that pass validateParams() and validateDerivedParamsLimits(), constructed without rejection.
+
+    The only non-trivial constraint is the invariant denominator. Widening [alpha, beta] never decreases it, so for
+    given phi and lambda the valid alphas are an interval [price_range[0], alpha_max] (test [alpha, price_range[1]])
+    and, given alpha, the valid betas are an interval [beta_min, price_range[1]]. We find both ends by bisection on the
+    float approximation and draw inside.
+
+    The peg factors restrict alpha <= peg * alpha_max_peg_factor and beta >= peg * beta_min_peg_factor, where peg is
+    the price at the flattest point of the ellipse; we clamp phi s.t. these leave room for alpha and beta. If even
+    [price_range[0], price_range[1]] is too narrow for the drawn lambda, we clamp lambda to the valid side of the
+    boundary (bisecting towards l_range[0]). Raises ValueError if the arguments admit no parameters at all. With
+    verify=True, each draw is checked against the exact calculation, recorded in `stats` and rejected if it fails, which
+    should never happen. Without verify, nothing is checked and nothing is recorded."""
+    price_min, price_max = map(D, price_range)
+    l_min = D(l_range[0])
+    if price_max - min_price_separation < price_min:
+        raise ValueError("price_range is narrower than min_price_separation")
+    # Price bounds. Choose s.t. the 'peg' lies approximately within the bounds.
+    # It'd be nonsensical if this was not the case: Why are we using an ellipse then?!
+    phi_degrees_min = max(
+        phi_degrees_range[0], degrees(atan(float(price_min / alpha_max_peg_factor)))
+    )
+    phi_degrees_max = min(
+        phi_degrees_range[1], degrees(atan(float(price_max / beta_min_peg_factor)))
+    )
+    if phi_degrees_min > phi_degrees_max:
+        raise ValueError("phi_degrees_range admits no peg within price_range")
+    phi_degrees = draw(st.floats(phi_degrees_min, phi_degrees_max))
     phi = phi_degrees / 360 * 2 * pi
+    c, s = D(cos(phi)), D(sin(phi))
+    l = draw(qdecimals(*l_range))
 
-    # Price bounds. Choose s.t. the 'peg' lies approximately within the bounds (within 30%).
-    # It'd be nonsensical if this was not the case: Why are we using an ellipse then?!
-    peg = tan(phi)  # = price where the flattest point of the ellipse lies.
-    peg = D(peg)
-    alpha_high = peg * D("1.3")
-    beta_low = peg * D("0.7")
-    alpha = draw(qdecimals("0.05", alpha_high.raw))
-    beta = draw(
-        qdecimals(max(beta_low.raw, (alpha + MIN_PRICE_SEPARATION).raw), "20.0")
+    peg = D(tan(phi))
+    # The outer max() / min() here and below only absorb float rounding at the ends of the ranges.
+    alpha_max = max(
+        min(peg * alpha_max_peg_factor, price_max - min_price_separation), price_min
     )
 
-    s = sin(phi)
-    c = cos(phi)
-    l = draw(qdecimals("1", "1e8"))
-    return ECLPMathParams(alpha, beta, D(c), D(s), l)
+    fc, fs = float(c), float(s)
+
+    def threshold(l: float) -> float:
+        return float(
+            MIN_INVARIANT_DENOMINATOR
+        ) + 2 * calc_invariant_denominator_float_tolerance(l)
+
+    def range_valid(l: float) -> bool:
+        return (
+            calc_invariant_denominator_float(
+                float(price_min), float(price_max), fc, fs, l
+            )
+            >= threshold(l)
+        )
+
+    if not range_valid(float(l)):
+        # At lambda = 1, the denominator only depends on the price range, not on phi, so with the usual
+        # l_range[0] = 1 this is a check of the arguments.
+        if not range_valid(float(l_min)):
+            raise ValueError("price_range is too narrow for l_range[0]")
+        l = D(_bisect_boundary(range_valid, float(l_min), float(l)))
+
+    fl = float(l)
+
+    def alpha_valid(alpha: float) -> bool:
+        return (
+            calc_invariant_denominator_float(alpha, float(price_max), fc, fs, fl)
+            >= threshold(fl)
+        )
+
+    if not alpha_valid(float(alpha_max)):
+        alpha_max = max(
+            D(_bisect_boundary(alpha_valid, float(price_min), float(alpha_max))),
+            price_min,
+        )
+    alpha = draw(qdecimals(price_min, alpha_max))
+
+    def beta_valid(beta: float) -> bool:
+        return (
+            calc_invariant_denominator_float(float(alpha), beta, fc, fs, fl)
+            >= threshold(fl)
+        )
+
+    beta_min = min(
+        max(peg * beta_min_peg_factor, alpha + min_price_separation), price_max
+    )
+    if not beta_valid(float(beta_min)):
+        beta_min = min(
+            D(_bisect_boundary(beta_valid, float(price_max), float(beta_min))),
+            price_max,
+        )
+    beta = draw(qdecimals(beta_min, price_max))
+
+    params = ECLPMathParams(alpha, beta, c, s, l)
+    if verify:
+        derived = prec_impl.calc_derived_values(params)
+        denominator = prec_impl.calcAChiAChiInXp(params, derived) - D2(1)
+        accepted = denominator >= D2(MIN_INVARIANT_DENOMINATOR.raw)
+        stats.record(accepted, "rejected by exact check")
+        assume(accepted)
+    return params
+
+
+def gen_params():
+    return gen_params_valid()
 
 
 @st.composite
@@ -76,7 +219,8 @@ def gen_params_eclp_dinvariant(draw):
 @st.composite
 def gen_params_eclp_liquidityUpdate(draw):
     params = draw(gen_params())
-    balances = draw(gen_balances(2, bpool_params))
+    # The sum condition is required by mtest_invariant_across_liquidityInvariantUpdate().
+    balances = draw(gen_balances(2, bpool_params, min_sum=D(100)))
     bpt_supply = draw(qdecimals(D("1e-4") * max(balances), D("1e6") * max(balances)))
     isIncrease = draw(st.booleans())
     if isIncrease:
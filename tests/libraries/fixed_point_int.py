@@ -0,0 +1,141 @@
+# Bit-exact port of GyroFixedPoint (and the parts of Balancer's Math it uses) on python ints as uint256.
+#
+# The checked functions raise PoolRevert with Balancer's error code where the library would revert. The unchecked
+# "U" variants, and all plain `+`, `-`, `*` of Solidity 0.7, wrap around modulo 2^256; use wrap() for the latter.
+# Function names are the ones of the library, so that ports of the pool math read like the Solidity code.
+# The other integer ports, fixed_point_array and tests/support/pool_simulator.py use these rather than own copies.
+
+ONE = 10**18
+UINT256_MAX = 2**256 - 1
+MIDDECIMAL = 10**9
+
+ADD_OVERFLOW = "BAL#000"
+SUB_OVERFLOW = "BAL#001"
+MUL_OVERFLOW = "BAL#003"
+ZERO_DIVISION = "BAL#004"
+DIV_INTERNAL = "BAL#005"
+
+
+class PoolRevert(Exception):
+    """The contract would revert. `reason` is the contract's revert string, e.g. "GYR#357" or "BAL#402"."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def wrap(a: int) -> int:
+    """Result of unchecked uint256 arithmetic."""
+    return a & UINT256_MAX
+
+
+# Math
+
+
+def mul(a: int, b: int) -> int:
+    c = a * b
+    if c > UINT256_MAX:
+        raise PoolRevert(MUL_OVERFLOW)
+    return c
+
+
+def divDownInt(a: int, b: int) -> int:
+    """Math.divDown()"""
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    return a // b
+
+
+def divUpInt(a: int, b: int) -> int:
+    """Math.divUp()"""
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    return 0 if a == 0 else 1 + (a - 1) // b
+
+
+# GyroFixedPoint
+
+
+def add(a: int, b: int) -> int:
+    c = a + b
+    if c > UINT256_MAX:
+        raise PoolRevert(ADD_OVERFLOW)
+    return c
+
+
+def sub(a: int, b: int) -> int:
+    if b > a:
+        raise PoolRevert(SUB_OVERFLOW)
+    return a - b
+
+
+def mulDown(a: int, b: int) -> int:
+    return mul(a, b) // ONE
+
+
+def mulDownU(a: int, b: int) -> int:
+    return wrap(a * b) // ONE
+
+
+def mulUp(a: int, b: int) -> int:
+    product = mul(a, b)
+    return 0 if product == 0 else (product - 1) // ONE + 1
+
+
+def mulUpU(a: int, b: int) -> int:
+    product = wrap(a * b)
+    return 0 if product == 0 else (product - 1) // ONE + 1
+
+
+def divDown(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    if a == 0:
+        return 0
+    if a * ONE > UINT256_MAX:
+        raise PoolRevert(DIV_INTERNAL)
+    return a * ONE // b
+
+
+def divDownU(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    return wrap(a * ONE) // b
+
+
+def divUp(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    if a == 0:
+        return 0
+    if a * ONE > UINT256_MAX:
+        raise PoolRevert(DIV_INTERNAL)
+    return (a * ONE - 1) // b + 1
+
+
+def divUpU(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    if a == 0:
+        return 0
+    # a * ONE can wrap to 0, and then the subtraction wraps as well.
+    return wrap(wrap(wrap(a * ONE) - 1) // b + 1)
+
+
+def mulDownLargeSmall(a: int, b: int) -> int:
+    return add(mul(a // ONE, b), mulDown(a % ONE, b))
+
+
+def mulDownLargeSmallU(a: int, b: int) -> int:
+    return wrap((a // ONE) * b + mulDownU(a % ONE, b))
+
+
+def divDownLarge(a: int, b: int, d: int = MIDDECIMAL, e: int = MIDDECIMAL) -> int:
+    return divDownInt(mul(a, d), divUpInt(b, e))
+
+
+def divDownLargeU(a: int, b: int, d: int = MIDDECIMAL, e: int = MIDDECIMAL) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    denom = 1 + (b - 1) // e
+    return wrap(a * d) // denom
@@ -0,0 +1,106 @@
+# Array version of pool_math_implementation (GyroPoolMath.sol), for protocol-fee accounting and proportional
+# joins / exits over many pools and blocks at once, e.g. fee-revenue reports over a pool's whole history.
+#
+# Same conventions as tests/g2clp/math_array.py: all functions work element-wise (with broadcasting) on either
+# representation of tests.support.fixed_point_array. Exact arrays (python ints, 18 decimals) reproduce the contract
+# bit by bit, including the rounding directions (mulUp / divUp where the contract rounds up), and float64 arrays are
+# the fast mode. Rows where the contract would revert are set to `invalid` (None resp. NaN); as in math_array, the
+# float mode only marks the reverts that are checked explicitly here.
+#
+# Balances have the tokens along the last axis, i.e. shape (..., n_tokens); the other arguments have shape (...).
+
+import numpy as np
+
+from tests.support import fixed_point_array as fp
+
+
+def invalid(like: np.ndarray):
+    return None if fp.is_exact(like) else np.nan
+
+
+def _as_array(a) -> np.ndarray:
+    # Keep exact arrays exact (np.asarray() of a list of python ints would give int64).
+    return a if isinstance(a, np.ndarray) else np.asarray(a, dtype=object)
+
+
+def calcAllTokensInGivenExactBptOut(
+    balances: np.ndarray, bptAmountOut: np.ndarray, totalBPT: np.ndarray
+) -> np.ndarray:
+    bptAmountOut, totalBPT = _as_array(bptAmountOut), _as_array(totalBPT)
+    return fp.div_up(fp.mul_up(balances, bptAmountOut[..., None]), totalBPT[..., None])
+
+
+def calcTokensOutGivenExactBptIn(
+    balances: np.ndarray, bptAmountIn: np.ndarray, totalBPT: np.ndarray
+) -> np.ndarray:
+    bptAmountIn, totalBPT = _as_array(bptAmountIn), _as_array(totalBPT)
+    return fp.div_down(
+        fp.mul_down(balances, bptAmountIn[..., None]), totalBPT[..., None]
+    )
+
+
+def liquidityInvariantUpdate_deltaBptTokens(
+    uinvariant: np.ndarray,
+    changeBptSupply: np.ndarray,
+    currentBptSupply: np.ndarray,
+    isIncreaseLiq: np.ndarray,
+) -> np.ndarray:
+    """GyroPoolMath.liquidityInvariantUpdate(uinvariant, changeBptSupply, currentBptSupply, isIncreaseLiq). The new
+    invariant is rounded up in both directions, so that protocol fees aren't triggered.
+    """
+    dL_up = fp.div_up(fp.mul_up(uinvariant, changeBptSupply), currentBptSupply)
+    dL_down = fp.div_down(fp.mul_down(uinvariant, changeBptSupply), currentBptSupply)
+    return np.where(
+        isIncreaseLiq, fp.add(uinvariant, dL_up), fp.sub(uinvariant, dL_down)
+    )
+
+
+def liquidityInvariantUpdate_deltaBalances(
+    balances: np.ndarray,
+    lastInvariant: np.ndarray,
+    deltaBalances: np.ndarray,
+    isIncreaseLiq: np.ndarray,
+) -> np.ndarray:
+    """The deprecated GyroPoolMath.liquidityInvariantUpdate(balances, uinvariant, deltaBalances, isIncreaseLiq), which
+    scales the invariant by the change of the largest balance (the first one if there are several).
+    """
+    index = np.argmax(balances, axis=-1)[..., None]
+    largestBalance = np.take_along_axis(balances, index, axis=-1)[..., 0]
+    delta = np.take_along_axis(deltaBalances, index, axis=-1)[..., 0]
+    # All balances zero would be a division by zero.
+    zero = largestBalance == 0
+    safeBalance = np.where(zero, fp.fixed(1, largestBalance), largestBalance)
+    deltaInvariant = fp.div_down(fp.mul_down(lastInvariant, delta), safeBalance)
+    newInvariant = np.where(
+        isIncreaseLiq,
+        fp.add(lastInvariant, deltaInvariant),
+        fp.sub(lastInvariant, deltaInvariant),
+    )
+    return np.where(zero, invalid(lastInvariant), newInvariant)
+
+
+def calcProtocolFees(
+    previousInvariant: np.ndarray,
+    currentInvariant: np.ndarray,
+    currentBptSupply: np.ndarray,
+    protocolSwapFeePerc: np.ndarray,
+    protocolFeeGyroPortion: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(gyroFees, balancerFees) in BPT, as GyroPoolMath._calcProtocolFees(). Both are zero in rows where the
+    invariant didn't increase."""
+    increased = currentInvariant > previousInvariant
+    zero = fp.fixed(0, currentInvariant)
+    # Zero out the other rows before computing so that they can't cause a division by zero. The products are written
+    # with the array first since fixed_point_array dispatches on the first argument; this doesn't change rounding.
+    growth = np.where(increased, fp.sub(currentInvariant, previousInvariant), zero)
+    numerator = fp.mul_down(fp.mul_down(growth, currentBptSupply), protocolSwapFeePerc)
+    diffInvariant = fp.mul_down(growth, protocolSwapFeePerc)
+    denominator = np.where(
+        increased,
+        fp.sub(currentInvariant, diffInvariant),
+        fp.fixed(1, currentInvariant),
+    )
+    deltaS = fp.div_down(numerator, denominator)
+    gyroFees = fp.mul_down(deltaS, protocolFeeGyroPortion)
+    balancerFees = fp.sub(deltaS, gyroFees)
+    return np.where(increased, gyroFees, zero), np.where(increased, balancerFees, zero)
@@ -0,0 +1,210 @@
+# Bit-exact port of GyroPoolMath._sqrt() and its initial guess, on python ints as uint256.
+#
+# _sqrt() always makes SQRT_ITERATIONS Babylonian steps. sqrtWithIterations() additionally reports after how many
+# steps the guess had actually converged, and sqrts() / sqrtIterations() evaluate this for arrays of inputs, also for
+# other initial guess strategies than the contract's (see INITIAL_GUESSES), to compare them by iteration count.
+
+import math
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np
+
+from tests.libraries.fixed_point_int import (
+    ONE,
+    UINT256_MAX,
+    PoolRevert,
+    add,
+    mulDown,
+    mulUp,
+    sub,
+    wrap,
+)
+
+SQRT_FAILED = "_sqrt FAILED"
+
+# Number of Babylonian steps that _sqrt() makes, independently of the input.
+SQRT_ITERATIONS = 7
+
+SQRT_1E_NEG_1 = 316227766016837933
+SQRT_1E_NEG_3 = 31622776601683793
+SQRT_1E_NEG_5 = 3162277660168379
+SQRT_1E_NEG_7 = 316227766016837
+SQRT_1E_NEG_9 = 31622776601683
+SQRT_1E_NEG_11 = 3162277660168
+SQRT_1E_NEG_13 = 316227766016
+SQRT_1E_NEG_15 = 31622776601
+SQRT_1E_NEG_17 = 3162277660
+
+# (upper bound on the input, initial guess) for inputs below ONE, as in _makeInitialGuess().
+_SMALL_INPUT_GUESSES = [
+    (10, SQRT_1E_NEG_17),
+    (10**2, 10**10),
+    (10**3, SQRT_1E_NEG_15),
+    (10**4, 10**11),
+    (10**5, SQRT_1E_NEG_13),
+    (10**6, 10**12),
+    (10**7, SQRT_1E_NEG_11),
+    (10**8, 10**13),
+    (10**9, SQRT_1E_NEG_9),
+    (10**10, 10**14),
+    (10**11, SQRT_1E_NEG_7),
+    (10**12, 10**15),
+    (10**13, SQRT_1E_NEG_5),
+    (10**14, 10**16),
+    (10**15, SQRT_1E_NEG_3),
+    (10**16, 10**17),
+    (10**17, SQRT_1E_NEG_1),
+]
+
+
+def intLog2Halved(x: int) -> int:
+    """floor(log2(x)) // 2, computed by bisection like _intLog2Halved()."""
+    n = 0
+    for shift in (128, 64, 32, 16, 8, 4, 2):
+        if x >= 1 << shift:
+            x >>= shift
+            n += shift // 2
+    return n
+
+
+def makeInitialGuess(input: int) -> int:
+    if input >= ONE:
+        return (1 << intLog2Halved(input // ONE)) * ONE
+    for bound, guess in _SMALL_INPUT_GUESSES:
+        if input <= bound:
+            return guess
+    return input
+
+
+def makeInitialGuessBitLength(input: int) -> int:
+    """The power of two just above the root, without the lookup table for small inputs."""
+    return 1 << (wrap(input * ONE).bit_length() + 1) // 2
+
+
+def makeInitialGuessOne(input: int) -> int:
+    return ONE
+
+
+INITIAL_GUESSES: Dict[str, Callable[[int], int]] = {
+    "contract": makeInitialGuess,
+    "bit_length": makeInitialGuessBitLength,
+    "one": makeInitialGuessOne,
+}
+
+# Cap for counting iterations from bad initial guesses.
+MAX_ITERATIONS = 255
+
+
+class SqrtResult(NamedTuple):
+    root: int
+    iterations: int  # steps until the guess is within 1 of the floor of the root; > SQRT_ITERATIONS if it never is
+
+
+def _step(input: int, guess: int) -> int:
+    return wrap(guess + wrap(input * ONE) // guess) // 2
+
+
+def sqrt(input: int, tolerance: int) -> int:
+    """GyroPoolMath._sqrt(input, tolerance): the fixed-point square root of `input`, with the contract's check that
+    the result is within `tolerance`."""
+    return sqrtWithIterations(input, tolerance).root
+
+
+def sqrtWithIterations(
+    input: int, tolerance: int, initial_guess: Callable[[int], int] = makeInitialGuess
+) -> SqrtResult:
+    if input == 0:
+        return SqrtResult(0, 0)
+    target = math.isqrt(wrap(input * ONE))
+    guess = initial_guess(input)
+    root = iterations = None
+    for k in range(MAX_ITERATIONS + 1):
+        if iterations is None and 0 <= guess - target <= 1:
+            iterations = k
+        if k == SQRT_ITERATIONS:
+            root = guess
+        if root is not None and iterations is not None:
+            break
+        guess = _step(input, guess)
+    _checkSqrt(input, root, tolerance)
+    return SqrtResult(root, MAX_ITERATIONS if iterations is None else iterations)
+
+
+def _checkSqrt(input: int, guess: int, tolerance: int):
+    guess_squared = mulDown(guess, guess)
+    if not (
+        guess_squared <= add(input, mulUp(guess, tolerance))
+        and guess_squared >= sub(input, mulUp(guess, tolerance))
+    ):
+        raise PoolRevert(SQRT_FAILED)
+
+
+def sqrtIterations(
+    inputs, initial_guess: Callable[[int], int] = makeInitialGuess
+) -> np.ndarray:
+    """Number of Babylonian steps until convergence (as in sqrtWithIterations()) for an array of inputs, capped at
+    MAX_ITERATIONS."""
+    inputs = np.asarray(inputs, dtype=object).ravel()
+    iterations = np.zeros(len(inputs), dtype=np.int64)
+    (remaining,) = np.nonzero(inputs != 0)
+    scaled = inputs[remaining] * ONE & UINT256_MAX
+    target = _isqrt(scaled)
+    guess = np.frompyfunc(initial_guess, 1, 1)(inputs[remaining])
+    for k in range(MAX_ITERATIONS + 1):
+        converged = (guess >= target) & (guess - target <= 1)
+        iterations[remaining[converged]] = k
+        remaining, guess, scaled, target = (
+            v[~converged] for v in (remaining, guess, scaled, target)
+        )
+        if len(remaining) == 0:
+            break
+        guess = ((guess + scaled // guess) & UINT256_MAX) // 2
+    iterations[remaining] = MAX_ITERATIONS
+    return iterations
+
+
+def sqrtsWithCheck(inputs, tolerance: int) -> tuple[np.ndarray, np.ndarray]:
+    """_sqrt() for many inputs (of any shape), without reverting: (roots, ok), where `ok` is False where the final
+    check of _sqrt() fails, and the root is the result of the Babylonian steps there."""
+    inputs = np.asarray(inputs, dtype=object)
+    nonzero = inputs != 0
+    input = np.where(nonzero, inputs, ONE)
+    scaled = input * ONE & UINT256_MAX
+    guess = np.frompyfunc(makeInitialGuess, 1, 1)(input)
+    for _ in range(SQRT_ITERATIONS):
+        guess = ((guess + scaled // guess) & UINT256_MAX) // 2
+
+    # The final check of _sqrt(), where each of mulDown, mulUp, add and sub reverts on overflow.
+    guess_product = guess * guess
+    margin_product = guess * tolerance
+    margin = np.where(margin_product == 0, 0, (margin_product - 1) // ONE + 1)
+    guess_squared = guess_product // ONE
+    ok = (
+        (guess_product <= UINT256_MAX)
+        & (margin_product <= UINT256_MAX)
+        & (input + margin <= UINT256_MAX)
+        & (margin <= input)
+        & (guess_squared <= input + margin)
+        & (guess_squared >= input - margin)
+    )
+    return np.where(nonzero, guess, 0), ok | ~nonzero
+
+
+def sqrts(inputs, tolerance: int) -> tuple[np.ndarray, np.ndarray]:
+    """sqrtWithIterations() for many inputs: (roots, iterations). Where _sqrt() would revert, the root is None."""
+    inputs = np.asarray(inputs, dtype=object).ravel()
+    roots, ok = sqrtsWithCheck(inputs, tolerance)
+    return np.where(ok, roots, None), sqrtIterations(inputs)
+
+
+def compareInitialGuesses(
+    inputs, strategies: Dict[str, Callable[[int], int]] = INITIAL_GUESSES
+) -> Dict[str, np.ndarray]:
+    """Iteration counts of sqrtIterations() for each initial guess strategy."""
+    return {
+        name: sqrtIterations(inputs, initial_guess)
+        for name, initial_guess in strategies.items()
+    }
+
+
+_isqrt = np.frompyfunc(math.isqrt, 1, 1)
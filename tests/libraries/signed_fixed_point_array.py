@@ -0,0 +1,220 @@
+# Array version of signed_fixed_point_int: the functions of SignedFixedPoint element-wise (with broadcasting) on
+# object arrays of python ints, bit-exact with the contract.
+#
+# Branches of the library become np.where() over both sides, so every function costs a handful of numpy operations
+# for the whole array, rather than a python call per element. The checked functions raise PoolRevert if the library
+# would revert for any element (use the "U" variants where all rows must be evaluated).
+
+import numpy as np
+
+from tests.libraries.fixed_point_int import (
+    ADD_OVERFLOW,
+    DIV_INTERNAL,
+    MUL_OVERFLOW,
+    SUB_OVERFLOW,
+    ZERO_DIVISION,
+)
+from tests.libraries.signed_fixed_point_int import (
+    _XP_TO_NP,
+    INT256_MIN,
+    ONE,
+    ONE_XP,
+)
+from tests.support.pool_simulator import UINT256_MAX, PoolRevert
+
+
+def to_array(values) -> np.ndarray:
+    """Raw int256 values (python or numpy ints, or arrays of them) to an object array of python ints. Object arrays
+    are assumed to hold python ints already and are passed through."""
+    values = np.asarray(values)
+    if values.dtype == object:
+        return values
+    return np.array(values.tolist(), dtype=object)
+
+
+def wrap(a: np.ndarray) -> np.ndarray:
+    return ((a - INT256_MIN) & UINT256_MAX) + INT256_MIN
+
+
+def div(a: np.ndarray, b) -> np.ndarray:
+    """Solidity's int256 `a / b` element-wise; b must be nonzero."""
+    if isinstance(b, int) and b > 1:
+        # Division by a constant like ONE can't overflow, so we can skip the wrap() and one abs().
+        q = np.abs(a) // b
+        return np.where(a < 0, -q, q)
+    q = np.abs(a) // np.abs(b)
+    return wrap(np.where((a < 0) != (b < 0), -q, q))
+
+
+def mod(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a - div(a, b) * b
+
+
+def _require(ok: np.ndarray, reason: str):
+    if not np.all(ok):
+        raise PoolRevert(reason)
+
+
+def _nonzero(a: np.ndarray) -> np.ndarray:
+    """`a` with zeros replaced by 1, for divisions whose result is discarded for these elements."""
+    return np.where(a == 0, 1, a)
+
+
+def _checkedMul(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a, b = np.broadcast_arrays(to_array(a), to_array(b))
+    product = wrap(a * b)
+    _require((a == 0) | (div(product, _nonzero(a)) == b), MUL_OVERFLOW)
+    return product
+
+
+def _inflate(a: np.ndarray, one: int) -> np.ndarray:
+    """a * one with the overflow check of the library, for nonzero a."""
+    aInflated = wrap(a * one)
+    _require(div(aInflated, a) == one, DIV_INTERNAL)
+    return aInflated
+
+
+def _roundUpMag(product: np.ndarray, one: int) -> np.ndarray:
+    return np.where(
+        product > 0,
+        div(product - 1, one) + 1,
+        np.where(product < 0, div(product + 1, one) - 1, 0),
+    )
+
+
+def add(a, b) -> np.ndarray:
+    a, b = to_array(a), to_array(b)
+    c = wrap(a + b)
+    _require(np.where(b >= 0, c >= a, c < a), ADD_OVERFLOW)
+    return c
+
+
+def addMag(a, b) -> np.ndarray:
+    a, b = to_array(a), to_array(b)
+    positive = a > 0
+    c = wrap(np.where(positive, a + b, a - b))
+    _require(~positive | np.where(b >= 0, c >= a, c < a), ADD_OVERFLOW)
+    _require(positive | np.where(b <= 0, c >= a, c < a), SUB_OVERFLOW)
+    return c
+
+
+def sub(a, b) -> np.ndarray:
+    a, b = to_array(a), to_array(b)
+    c = wrap(a - b)
+    _require(np.where(b <= 0, c >= a, c < a), SUB_OVERFLOW)
+    return c
+
+
+def mulDownMag(a, b) -> np.ndarray:
+    return div(_checkedMul(a, b), ONE)
+
+
+def mulDownMagU(a, b) -> np.ndarray:
+    return div(wrap(to_array(a) * to_array(b)), ONE)
+
+
+def mulUpMag(a, b) -> np.ndarray:
+    return _roundUpMag(_checkedMul(a, b), ONE)
+
+
+def mulUpMagU(a, b) -> np.ndarray:
+    return _roundUpMag(wrap(to_array(a) * to_array(b)), ONE)
+
+
+def _divDown(a, b, one: int, checked: bool) -> np.ndarray:
+    a, b = np.broadcast_arrays(to_array(a), to_array(b))
+    _require(b != 0, ZERO_DIVISION)
+    if not checked:
+        return div(wrap(a * one), b)
+    a_safe = _nonzero(a)
+    return np.where(a == 0, 0, div(_inflate(a_safe, one), b))
+
+
+def divDownMag(a, b) -> np.ndarray:
+    return _divDown(a, b, ONE, True)
+
+
+def divDownMagU(a, b) -> np.ndarray:
+    return _divDown(a, b, ONE, False)
+
+
+def _divUp(a, b, checked: bool) -> np.ndarray:
+    a, b = np.broadcast_arrays(to_array(a), to_array(b))
+    _require(b != 0, ZERO_DIVISION)
+    negative = b < 0
+    a = np.where(negative, wrap(-a), a)
+    b = np.where(negative, wrap(-b), b)
+    a_safe = _nonzero(a)
+    aInflated = _inflate(a_safe, ONE) if checked else wrap(a_safe * ONE)
+    # In the unchecked version, the library branches on the sign of a rather than of a * ONE.
+    positive = aInflated > 0 if checked else a_safe > 0
+    result = np.where(
+        positive,
+        wrap(div(wrap(aInflated - 1), b) + 1),
+        wrap(div(wrap(aInflated + 1), b) - 1),
+    )
+    return np.where(a == 0, 0, result)
+
+
+def divUpMag(a, b) -> np.ndarray:
+    return _divUp(a, b, True)
+
+
+def divUpMagU(a, b) -> np.ndarray:
+    return _divUp(a, b, False)
+
+
+def mulXp(a, b) -> np.ndarray:
+    return div(_checkedMul(a, b), ONE_XP)
+
+
+def mulXpU(a, b) -> np.ndarray:
+    return div(wrap(to_array(a) * to_array(b)), ONE_XP)
+
+
+def divXp(a, b) -> np.ndarray:
+    return _divDown(a, b, ONE_XP, True)
+
+
+def divXpU(a, b) -> np.ndarray:
+    return _divDown(a, b, ONE_XP, False)
+
+
+def _xpToNp(a, b, round_up: bool, checked: bool) -> np.ndarray:
+    a, b = np.broadcast_arrays(to_array(a), to_array(b))
+    b1, b2 = div(b, _XP_TO_NP), mod(b, _XP_TO_NP)
+    if checked:
+        prod1, prod2 = _checkedMul(a, b1), _checkedMul(a, b2)
+    else:
+        prod1, prod2 = wrap(a * b1), wrap(a * b2)
+    s = wrap(prod1 + div(prod2, _XP_TO_NP))
+    if round_up:
+        no_rounding = (prod1 <= 0) & (prod2 <= 0)
+        return np.where(
+            no_rounding, div(s, _XP_TO_NP), wrap(div(wrap(s - 1), _XP_TO_NP) + 1)
+        )
+    no_rounding = (prod1 >= 0) & (prod2 >= 0)
+    return np.where(
+        no_rounding, div(s, _XP_TO_NP), wrap(div(wrap(s + 1), _XP_TO_NP) - 1)
+    )
+
+
+def mulDownXpToNp(a, b) -> np.ndarray:
+    return _xpToNp(a, b, False, True)
+
+
+def mulDownXpToNpU(a, b) -> np.ndarray:
+    return _xpToNp(a, b, False, False)
+
+
+def mulUpXpToNp(a, b) -> np.ndarray:
+    return _xpToNp(a, b, True, True)
+
+
+def mulUpXpToNpU(a, b) -> np.ndarray:
+    return _xpToNp(a, b, True, False)
+
+
+def complement(x) -> np.ndarray:
+    x = to_array(x)
+    return np.where((x >= ONE) | (x <= 0), 0, ONE - x)
@@ -0,0 +1,196 @@
+# Bit-exact port of SignedFixedPoint on python ints as int256.
+#
+# Like fixed_point_int, but signed: Solidity's `/` and `%` on int256 truncate towards zero (python's `//` and `%`
+# floor), and unchecked arithmetic wraps around into [INT256_MIN, INT256_MAX]. The overflow checks are the ones of
+# the library, done on the wrapped product (e.g. `product / a == b`), so they accept exactly what the contract
+# accepts. The checked functions raise PoolRevert with Balancer's error code; the "U" variants don't check.
+# signed_fixed_point_array has the same functions for numpy arrays.
+
+from tests.libraries.fixed_point_int import (
+    ADD_OVERFLOW,
+    DIV_INTERNAL,
+    MUL_OVERFLOW,
+    SUB_OVERFLOW,
+    UINT256_MAX,
+    ZERO_DIVISION,
+    PoolRevert,
+)
+
+ONE = 10**18
+ONE_XP = 10**38
+
+INT256_MIN = -(2**255)
+INT256_MAX = 2**255 - 1
+
+_XP_TO_NP = 10**19
+
+
+def wrap(a: int) -> int:
+    """Result of unchecked int256 arithmetic."""
+    return ((a - INT256_MIN) & UINT256_MAX) + INT256_MIN
+
+
+def div(a: int, b: int) -> int:
+    """Solidity's int256 `a / b`: truncates towards zero, and INT256_MIN / -1 wraps around."""
+    if b == 0:
+        raise ZeroDivisionError("int256 division by zero")
+    q = abs(a) // abs(b)
+    return wrap(-q if (a < 0) != (b < 0) else q)
+
+
+def mod(a: int, b: int) -> int:
+    """Solidity's int256 `a % b`, which has the sign of `a`."""
+    return a - div(a, b) * b
+
+
+def _checkedMul(a: int, b: int) -> int:
+    product = wrap(a * b)
+    if not (a == 0 or div(product, a) == b):
+        raise PoolRevert(MUL_OVERFLOW)
+    return product
+
+
+def _inflate(a: int, one: int) -> int:
+    aInflated = wrap(a * one)
+    if div(aInflated, a) != one:
+        raise PoolRevert(DIV_INTERNAL)
+    return aInflated
+
+
+def _roundUpMag(product: int, one: int) -> int:
+    if product > 0:
+        return div(product - 1, one) + 1
+    if product < 0:
+        return div(product + 1, one) - 1
+    return 0
+
+
+def add(a: int, b: int) -> int:
+    c = wrap(a + b)
+    if not (c >= a if b >= 0 else c < a):
+        raise PoolRevert(ADD_OVERFLOW)
+    return c
+
+
+def addMag(a: int, b: int) -> int:
+    return add(a, b) if a > 0 else sub(a, b)
+
+
+def sub(a: int, b: int) -> int:
+    c = wrap(a - b)
+    if not (c >= a if b <= 0 else c < a):
+        raise PoolRevert(SUB_OVERFLOW)
+    return c
+
+
+def mulDownMag(a: int, b: int) -> int:
+    return div(_checkedMul(a, b), ONE)
+
+
+def mulDownMagU(a: int, b: int) -> int:
+    return div(wrap(a * b), ONE)
+
+
+def mulUpMag(a: int, b: int) -> int:
+    return _roundUpMag(_checkedMul(a, b), ONE)
+
+
+def mulUpMagU(a: int, b: int) -> int:
+    return _roundUpMag(wrap(a * b), ONE)
+
+
+def divDownMag(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    if a == 0:
+        return 0
+    return div(_inflate(a, ONE), b)
+
+
+def divDownMagU(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    return div(wrap(a * ONE), b)
+
+
+def divUpMag(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    if a == 0:
+        return 0
+    if b < 0:
+        a, b = wrap(-a), wrap(-b)
+    aInflated = _inflate(a, ONE)
+    if aInflated > 0:
+        return wrap(div(wrap(aInflated - 1), b) + 1)
+    return wrap(div(wrap(aInflated + 1), b) - 1)
+
+
+def divUpMagU(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    if a == 0:
+        return 0
+    if b < 0:
+        a, b = wrap(-a), wrap(-b)
+    if a > 0:
+        return wrap(div(wrap(a * ONE - 1), b) + 1)
+    return wrap(div(wrap(a * ONE + 1), b) - 1)
+
+
+def mulXp(a: int, b: int) -> int:
+    return div(_checkedMul(a, b), ONE_XP)
+
+
+def mulXpU(a: int, b: int) -> int:
+    return div(wrap(a * b), ONE_XP)
+
+
+def divXp(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    if a == 0:
+        return 0
+    return div(_inflate(a, ONE_XP), b)
+
+
+def divXpU(a: int, b: int) -> int:
+    if b == 0:
+        raise PoolRevert(ZERO_DIVISION)
+    return div(wrap(a * ONE_XP), b)
+
+
+def _xpToNp(prod1: int, prod2: int, round_up: bool) -> int:
+    s = wrap(prod1 + div(prod2, _XP_TO_NP))
+    if round_up:
+        if prod1 <= 0 and prod2 <= 0:
+            return div(s, _XP_TO_NP)
+        return wrap(div(wrap(s - 1), _XP_TO_NP) + 1)
+    if prod1 >= 0 and prod2 >= 0:
+        return div(s, _XP_TO_NP)
+    return wrap(div(wrap(s + 1), _XP_TO_NP) - 1)
+
+
+def mulDownXpToNp(a: int, b: int) -> int:
+    """a (18 decimals) times b (38 decimals), rounded down, with 18 decimals."""
+    return _xpToNp(
+        _checkedMul(a, div(b, _XP_TO_NP)), _checkedMul(a, mod(b, _XP_TO_NP)), False
+    )
+
+
+def mulDownXpToNpU(a: int, b: int) -> int:
+    return _xpToNp(wrap(a * div(b, _XP_TO_NP)), wrap(a * mod(b, _XP_TO_NP)), False)
+
+
+def mulUpXpToNp(a: int, b: int) -> int:
+    return _xpToNp(
+        _checkedMul(a, div(b, _XP_TO_NP)), _checkedMul(a, mod(b, _XP_TO_NP)), True
+    )
+
+
+def mulUpXpToNpU(a: int, b: int) -> int:
+    return _xpToNp(wrap(a * div(b, _XP_TO_NP)), wrap(a * mod(b, _XP_TO_NP)), True)
+
+
+def complement(x: int) -> int:
+    return 0 if x >= ONE or x <= 0 else ONE - x
@@ -2,9 +2,9 @@ from decimal import Decimal
 from typing import Tuple
 
 import hypothesis.strategies as st
-from brownie import reverts
 from brownie.test import given
 from hypothesis import assume, settings
+from tests.support.reverts import reverts
 from tests.support.utils import scale, to_decimal, unscale
 
 from tests.support.quantized_decimal import QuantizedDecimal as D
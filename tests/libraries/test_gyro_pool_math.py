@@ -2,10 +2,10 @@ from decimal import Decimal
 from typing import Tuple
 
 import hypothesis.strategies as st
-from brownie import reverts
 from brownie.test import given
 from hypothesis import assume
 from tests.libraries import pool_math_implementation
+from tests.support.reverts import reverts
 from tests.support.utils import scale, to_decimal, qdecimals, unscale
 from tests.support.quantized_decimal import QuantizedDecimal as D
 
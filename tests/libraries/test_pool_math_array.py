@@ -0,0 +1,147 @@
+import hypothesis.strategies as st
+import numpy as np
+from brownie.test import given
+from hypothesis import settings
+
+from tests.libraries import pool_math_array, pool_math_implementation
+from tests.support import fixed_point_array as fp
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.utils import qdecimals
+
+amount_strategy = qdecimals(min_value="0.000001", max_value="1000000000")
+fee_strategy = qdecimals(min_value=0, max_value=1)
+
+fee_row_strategy = st.tuples(
+    amount_strategy,  # previousInvariant
+    amount_strategy,  # currentInvariant
+    amount_strategy,  # currentBptSupply
+    fee_strategy,  # protocolSwapFeePerc
+    fee_strategy,  # protocolFeeGyroPortion
+)
+
+
+def _columns(rows, to_array):
+    return [to_array(column) for column in zip(*rows)]
+
+
+@settings(max_examples=50)
+@given(rows=st.lists(fee_row_strategy, min_size=1, max_size=20))
+def test_protocol_fees_match_scalar(rows):
+    gyro, balancer = pool_math_array.calcProtocolFees(*_columns(rows, fp.to_exact))
+    for row, g, b in zip(rows, fp.from_exact(gyro), fp.from_exact(balancer)):
+        assert (g, b) == pool_math_implementation.calcProtocolFees(*row)
+
+    floats = _columns(rows, fp.to_float)
+    gyro_float, balancer_float = pool_math_array.calcProtocolFees(*floats)
+    previous, current, supply, fee, _ = floats
+    # In float, both currentInvariant - previousInvariant and the denominator lose about eps * currentInvariant to
+    # cancellation, which deltaS amplifies by supply * fee / denominator and currentInvariant / denominator respectively.
+    # The exact path's roundings (a few 1e-18 in the numerator) are amplified by 1 / denominator. Scale the tolerance
+    # per row by these instead of a fixed rtol, which fails when the invariants are far apart or close together.
+    denominator = np.maximum(current - (current - previous) * fee, 1e-18)
+    rtol = 1e-9 + 1e-15 * current / denominator
+    atol = 1e-12 + (1e-15 * current * supply * fee + 1e-17) / denominator
+    # balancerFees = deltaS - gyroFees, so both are measured relative to deltaS.
+    deltaS = fp.exact_to_float(gyro) + fp.exact_to_float(balancer)
+    for actual, expected in [(gyro_float, gyro), (balancer_float, balancer)]:
+        error = np.abs(actual - fp.exact_to_float(expected))
+        assert np.all(error <= rtol * deltaS + atol)
+
+
+@settings(max_examples=50)
+@given(
+    rows=st.lists(
+        st.tuples(
+            st.tuples(amount_strategy, amount_strategy, amount_strategy),
+            amount_strategy,
+            amount_strategy,
+        ),
+        min_size=1,
+        max_size=20,
+    )
+)
+def test_proportional_amounts_match_scalar(rows):
+    balances, bpt_amounts, total_bpts = zip(*rows)
+    args = (
+        fp.to_exact(balances),
+        fp.to_exact(bpt_amounts),
+        fp.to_exact(total_bpts),
+    )
+    amounts_in = fp.from_exact(pool_math_array.calcAllTokensInGivenExactBptOut(*args))
+    amounts_out = fp.from_exact(pool_math_array.calcTokensOutGivenExactBptIn(*args))
+    for k, (b, bpt, total) in enumerate(rows):
+        assert tuple(
+            amounts_in[k]
+        ) == pool_math_implementation.calcAllTokensInGivenExactBptOut(b, bpt, total)
+        assert tuple(
+            amounts_out[k]
+        ) == pool_math_implementation.calcTokensOutGivenExactBptIn(b, bpt, total)
+
+
+@settings(max_examples=50)
+@given(
+    rows=st.lists(
+        st.tuples(amount_strategy, amount_strategy, amount_strategy, st.booleans()),
+        min_size=1,
+        max_size=20,
+    )
+)
+def test_liquidity_invariant_update_matches_scalar(rows):
+    invariants, changes, supplies, increases = zip(*rows)
+    new_invariants = pool_math_array.liquidityInvariantUpdate_deltaBptTokens(
+        fp.to_exact(invariants),
+        fp.to_exact(changes),
+        fp.to_exact(supplies),
+        np.array(increases),
+    )
+    for (invariant, change, supply, increase), new_invariant in zip(
+        rows, new_invariants
+    ):
+        if not increase and invariant * change / supply > invariant:
+            # The contract reverts on the subtraction.
+            assert new_invariant is None
+            continue
+        expected = pool_math_implementation.liquidityInvariantUpdate_deltaBptTokens(
+            invariant, change, supply, increase
+        )
+        assert D(new_invariant) / fp.ONE == expected
+
+
+def test_liquidity_invariant_update_delta_balances():
+    balances = fp.to_exact([[1, 3, 2], [5, 5, 1], [0, 0, 0]])
+    deltas = fp.to_exact([[D("0.1"), D("0.3"), D("0.2")], [1, 2, 0], [1, 1, 1]])
+    invariants = fp.to_exact([10, 10, 10])
+    new_invariants = pool_math_array.liquidityInvariantUpdate_deltaBalances(
+        balances, invariants, deltas, np.array([True, False, True])
+    )
+    assert list(new_invariants) == [11 * fp.ONE, 8 * fp.ONE, None]
+
+
+def test_fee_history_in_one_pass():
+    """Fee splits for a long history of (previous, current) invariants at once, e.g. per block of several pools."""
+    rng = np.random.default_rng(0)
+    n = 10_000
+    previous = rng.uniform(1e6, 1e9, n)
+    current = previous * (1 + rng.normal(1e-4, 1e-4, n))
+    supply = previous * rng.uniform(0.5, 2, n)
+    fee = rng.choice([0.0, 0.1, 0.5], n)
+    portion = rng.choice([0.0, 0.5, 1.0], n)
+
+    gyro, balancer = pool_math_array.calcProtocolFees(
+        fp.to_exact(previous.tolist()),
+        fp.to_exact(current.tolist()),
+        fp.to_exact(supply.tolist()),
+        fp.to_exact(fee.tolist()),
+        fp.to_exact(portion.tolist()),
+    )
+    assert all(g >= 0 and b >= 0 for g, b in zip(gyro, balancer))
+    assert all(
+        g == b == 0
+        for g, b in zip(gyro[current <= previous], balancer[current <= previous])
+    )
+    # Spot-check rows against the scalar version.
+    for k in rng.choice(n, 100, replace=False):
+        expected = pool_math_implementation.calcProtocolFees(
+            *(D(float(v[k])) for v in (previous, current, supply, fee, portion))
+        )
+        assert (D(gyro[k]) / fp.ONE, D(balancer[k]) / fp.ONE) == expected
@@ -2,10 +2,10 @@ from decimal import Decimal
 from typing import Tuple
 
 import hypothesis.strategies as st
-from brownie import reverts
 from brownie.test import given
 from hypothesis import assume, settings
 from tests.libraries import signed_fixed_point
+from tests.support.reverts import reverts
 from tests.support.utils import scale, to_decimal, unscale
 
 from tests.support.quantized_decimal import QuantizedDecimal as D
@@ -0,0 +1,95 @@
+import hypothesis.strategies as st
+import numpy as np
+from brownie.test import given
+from hypothesis import settings
+
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.libraries import signed_fixed_point_array as sfp_array
+from tests.libraries import signed_fixed_point_int as sfp
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.quantized_decimal_38 import QuantizedDecimal as D2
+from tests.support.reverts import outcome
+
+int_strategy = st.integers(min_value=-(2**200), max_value=2**200)
+int256_strategy = st.integers(min_value=sfp.INT256_MIN, max_value=sfp.INT256_MAX)
+
+# Names of the functions in SignedMathTesting and the library functions they call.
+TESTING_FUNCTIONS = {
+    "add": "add",
+    "sub": "sub",
+    "addMag": "addMag",
+    "mulUp": "mulUpMag",
+    "mulUpU": "mulUpMagU",
+    "mulDown": "mulDownMag",
+    "mulDownU": "mulDownMagU",
+    "divUp": "divUpMag",
+    "divUpU": "divUpMagU",
+    "divDown": "divDownMag",
+    "divDownU": "divDownMagU",
+    "mulXp": "mulXp",
+    "mulXpU": "mulXpU",
+    "divXp": "divXp",
+    "divXpU": "divXpU",
+    "mulDownXpToNp": "mulDownXpToNp",
+    "mulDownXpToNpU": "mulDownXpToNpU",
+    "mulUpXpToNp": "mulUpXpToNp",
+    "mulUpXpToNpU": "mulUpXpToNpU",
+}
+
+
+@settings(max_examples=50)
+@given(
+    a=st.one_of(int_strategy, int256_strategy),
+    b=st.one_of(int_strategy, int256_strategy),
+)
+def test_matches_contract(signed_math_testing, a, b):
+    for testing_name, name in TESTING_FUNCTIONS.items():
+        assert outcome(getattr(sfp, name), a, b) == outcome(
+            getattr(signed_math_testing, testing_name), a, b
+        )
+
+
+def _operands(rng, n):
+    exponents = rng.choice([0, 5, 18, 20, 38, 40, 60, 76], n)
+    signs = rng.choice([-1, 1], n)
+    values = [
+        int(s) * int(m) * 10 ** int(e)
+        for s, m, e in zip(signs, rng.integers(0, 10**9, n), exponents)
+    ]
+    return values + [sfp.INT256_MIN, sfp.INT256_MAX, -1, 0, 1]
+
+
+def test_array_matches_scalar():
+    rng = np.random.default_rng(0)
+    a, b = _operands(rng, 500), _operands(rng, 500)
+    for name in TESTING_FUNCTIONS.values():
+        outcomes = [outcome(getattr(sfp, name), x, y) for x, y in zip(a, b)]
+        ok = [not isinstance(o, str) for o in outcomes]
+        result = getattr(sfp_array, name)(
+            np.array(a, dtype=object)[ok], np.array(b, dtype=object)[ok]
+        )
+        assert list(result) == [o for o, k in zip(outcomes, ok) if k], name
+        for x, y, o in zip(a, b, outcomes):
+            if isinstance(o, str):
+                assert outcome(getattr(sfp_array, name), [x], [y]) == o, name
+
+
+def test_truncates_towards_zero():
+    assert sfp.mulDownMag(-15 * 10**17, 1) == -1
+    assert sfp.mulUpMag(-15 * 10**17, 1) == -2
+    assert sfp.divDownMag(-1, 3 * 10**18) == 0
+    assert sfp.divUpMag(-1, 3 * 10**18) == -1
+    assert sfp.mulDownXpToNp(-(10**18), 10**38 + 10**19) == -(10**18) - 1
+    assert sfp.mulUpXpToNp(-(10**18), 10**38 + 10**19) == -(10**18)
+    # The unchecked versions wrap around; the checked ones revert.
+    assert sfp.mulDownMagU(2**200, 2**100) == sfp.div(sfp.wrap(2**300), 10**18)
+    assert outcome(sfp.mulDownMag, 2**200, 2**100) == "BAL#003"
+    assert sfp_array.divDownMag([-1, 2, 0], 3 * 10**18).tolist() == [0, 0, 0]
+
+
+def test_prec_implementation_is_exact():
+    """The Xp helpers of the ECLP model go through the exact port, also for negative operands."""
+    a, b = D("-1.5"), D2("-0.3333333333333333333333333333333333333")
+    expected = sfp.mulDownXpToNpU(int(a * D("1e18")), int(b * D2("1e38")))
+    assert prec_impl.mulDownXpToNp(a, b) == D(expected) / D("1e18")
+    assert prec_impl.mulXp(-3, 10**37 + 1) == 0
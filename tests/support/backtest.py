@@ -0,0 +1,253 @@
+"""Replay of recorded swap / join / exit logs through the pool simulators, with per-block metrics.
+
+The event log is a CSV or Parquet file (or a directory of Parquet files) with one row per event and the columns
+
+    block      int     block number; rows must be sorted by block (replay() raises ValueError otherwise)
+    kind       str     "swap_given_in", "swap_given_out", "join" or "exit"
+    token_in   int     index of the token in (swaps only)
+    token_out  int     index of the token out (swaps only)
+    amount     int     raw amount: the given amount for swaps, the BPT amount for joins and exits. Can be a string or
+                       decimal column, since uint256 amounts don't fit into int64.
+    account    str     (optional) BPT holder for joins and exits, defaults to DEFAULT_ACCOUNT
+
+The log is read in record batches of `chunk_size` rows, so memory use doesn't depend on its length. The simulator must
+be initialized before the replay (e.g. `sim.initialize(DEFAULT_ACCOUNT, amounts)`). Events the simulator rejects are
+counted and skipped; with a faithful log and simulator there are none.
+
+For every block (or every `block_interval` blocks) with at least one event, one row is written to a chunked Arrow
+directory (see error_collector.ErrorValueCollector) after the last event of the block. The columns, as given by
+metrics_schema() for a pool with n tokens, are below; amounts are floats in units of the token resp. BPT, using the
+`token_decimals` of the simulator.
+
+    block                   last block of the bucket
+    n_events, n_reverted    events in the bucket and how many of them the simulator rejected
+    volume_in_{i}           amount of token i swapped in, fees included
+    swap_fees_{i}           swap fees paid in token i
+    protocol_fees_minted    BPT minted to the treasuries by joins / exits in the bucket
+    protocol_fees_due       BPT that would be minted by the next join / exit (GyroPoolMath._calcProtocolFees())
+    invariant               invariant on upscaled balances
+    total_supply            BPT supply
+    bpt_price               PoolSimulator.bpt_price(), in units of the last token
+    balance_{i}             pool balance of token i
+
+Events within one pool have to be processed in order, but pools are independent: replay_many() runs one process per
+(simulator, log) job.
+
+Throughput is bounded by the simulators (see tests/support/pool_simulator.py): on one core, a 2CLP replays about 10k
+events/s with one row per block and about 25k events/s with block_interval=100; the ECLP, at about 400us per swap,
+manages about 2.5k events/s. So tens of millions of events of one pool take from about 15 minutes (2CLP) to a few hours
+(ECLP); more processes only help when the events are spread over several pools.
+
+Example:
+
+    sim = Gyro2CLPPoolSimulator(sqrt_alpha, sqrt_beta, swap_fee, protocol_swap_fee=5 * 10**17)
+    sim.initialize(DEFAULT_ACCOUNT, [100 * 10**18, 100 * 10**18])
+    summary = replay(sim, "data/swaps.parquet", "data/backtest_2clp")
+    df = load_error_values("data/backtest_2clp").to_pandas()
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from tests.support.error_collector import ErrorValueCollector
+from tests.support.pool_simulator import ONE, PoolRevert, PoolSimulator
+
+DEFAULT_ACCOUNT = "lp"
+
+EVENT_KINDS = ("swap_given_in", "swap_given_out", "join", "exit")
+
+# How the CSV reader should parse the columns; everything else is inferred.
+_CSV_COLUMN_TYPES = {
+    "block": pa.int64(),
+    "kind": pa.string(),
+    "token_in": pa.int64(),
+    "token_out": pa.int64(),
+    "amount": pa.string(),
+    "account": pa.string(),
+}
+
+
+def metrics_schema(n_tokens: int) -> pa.Schema:
+    fields = [("block", pa.int64()), ("n_events", pa.int64()), ("n_reverted", pa.int64())]
+    fields += [(f"volume_in_{i}", pa.float64()) for i in range(n_tokens)]
+    fields += [(f"swap_fees_{i}", pa.float64()) for i in range(n_tokens)]
+    fields += [
+        (name, pa.float64())
+        for name in (
+            "protocol_fees_minted",
+            "protocol_fees_due",
+            "invariant",
+            "total_supply",
+            "bpt_price",
+        )
+    ]
+    fields += [(f"balance_{i}", pa.float64()) for i in range(n_tokens)]
+    return pa.schema(fields)
+
+
+def read_events(path: str, chunk_size: int = 1_000_000) -> Iterator[pa.RecordBatch]:
+    """Record batches of the event log at `path`, which is read incrementally."""
+    if path.endswith(".csv"):
+        reader = pa_csv.open_csv(
+            path,
+            # block_size is in bytes; rows are usually < 64 bytes.
+            read_options=pa_csv.ReadOptions(block_size=64 * chunk_size),
+            convert_options=pa_csv.ConvertOptions(column_types=_CSV_COLUMN_TYPES),
+        )
+        yield from reader
+    elif os.path.isdir(path):
+        for filename in sorted(os.listdir(path)):
+            if filename.endswith(".parquet"):
+                yield from read_events(os.path.join(path, filename), chunk_size)
+    else:
+        yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+
+
+def _column(batch: pa.RecordBatch, name: str, default=None) -> list:
+    index = batch.schema.get_field_index(name)
+    if index < 0:
+        return [default] * batch.num_rows
+    return batch.column(index).to_pylist()
+
+
+@dataclass
+class ReplaySummary:
+    n_events: int = 0
+    n_reverted: int = 0
+    n_rows: int = 0
+    revert_reasons: dict = field(default_factory=dict)
+
+
+class _Bucket:
+    """Accumulates the metrics of one bucket of blocks."""
+
+    def __init__(self, sim: PoolSimulator, first_block: int):
+        self.first_block = first_block
+        self.last_block = first_block
+        self.n_events = 0
+        self.n_reverted = 0
+        self.volume_in = [0] * sim.n_tokens
+        self.swap_fees_before = list(sim.swap_fees_collected)
+        self.protocol_fees_before = sim.protocol_fees_minted
+
+    def row(self, sim: PoolSimulator) -> dict:
+        token_units = [10**d for d in sim.token_decimals]
+        invariant = sim.get_invariant()
+        protocol_fees_due = sum(sim.due_protocol_fees(invariant))
+        row = dict(
+            block=self.last_block,
+            n_events=self.n_events,
+            n_reverted=self.n_reverted,
+            protocol_fees_minted=(sim.protocol_fees_minted - self.protocol_fees_before) / ONE,
+            protocol_fees_due=protocol_fees_due / ONE,
+            invariant=invariant / ONE,
+            total_supply=sim.total_supply / ONE,
+            bpt_price=sim.bpt_price() / ONE if sim.total_supply > 0 else float("nan"),
+        )
+        for i, unit in enumerate(token_units):
+            row[f"volume_in_{i}"] = self.volume_in[i] / unit
+            row[f"swap_fees_{i}"] = (sim.swap_fees_collected[i] - self.swap_fees_before[i]) / unit
+            row[f"balance_{i}"] = sim.balances[i] / unit
+        return row
+
+
+def _apply_event(sim: PoolSimulator, kind: str, token_in, token_out, amount: int, account) -> int:
+    """Applies one event and returns the amount of token_in that went into the pool (0 for joins / exits)."""
+    if kind == "swap_given_in":
+        sim.swap_given_in(token_in, token_out, amount)
+        return amount
+    if kind == "swap_given_out":
+        return sim.swap_given_out(token_in, token_out, amount)
+    if kind == "join":
+        sim.join(account, amount)
+        return 0
+    if kind == "exit":
+        sim.exit(account, amount)
+        return 0
+    raise ValueError(f"Unknown event kind: {kind}")
+
+
+def replay(
+    sim: PoolSimulator,
+    events_path: str,
+    output_dir: str,
+    chunk_size: int = 1_000_000,
+    block_interval: int = 1,
+    output_chunk_size: int = 100_000,
+) -> ReplaySummary:
+    """Replays the log at `events_path` through `sim` (which is modified) and writes the metrics of every bucket of
+    `block_interval` blocks to `output_dir`. Larger buckets save the per-bucket invariant computation, which is
+    significant for busy pools where most blocks only have a few events."""
+    summary = ReplaySummary()
+    bucket: Optional[_Bucket] = None
+    last_block = -1
+    with ErrorValueCollector(
+        output_dir,
+        metrics_schema(sim.n_tokens),
+        chunk_size=output_chunk_size,
+    ) as collector:
+        for batch in read_events(events_path, chunk_size):
+            columns = zip(
+                _column(batch, "block"),
+                _column(batch, "kind"),
+                _column(batch, "token_in"),
+                _column(batch, "token_out"),
+                _column(batch, "amount"),
+                _column(batch, "account", DEFAULT_ACCOUNT),
+            )
+            for block, kind, token_in, token_out, amount, account in columns:
+                if block < last_block:
+                    raise ValueError(
+                        f"Events are not sorted by block: block {block} after block {last_block}"
+                    )
+                last_block = block
+                if bucket is not None and block >= bucket.first_block + block_interval:
+                    collector.push(bucket.row(sim))
+                    bucket = None
+                if bucket is None:
+                    bucket = _Bucket(sim, block)
+                bucket.last_block = block
+                bucket.n_events += 1
+                summary.n_events += 1
+                try:
+                    amount_in = _apply_event(
+                        sim, kind, token_in, token_out, int(amount), account or DEFAULT_ACCOUNT
+                    )
+                except PoolRevert as e:
+                    bucket.n_reverted += 1
+                    summary.n_reverted += 1
+                    summary.revert_reasons[e.reason] = summary.revert_reasons.get(e.reason, 0) + 1
+                    continue
+                if amount_in:
+                    bucket.volume_in[token_in] += amount_in
+        if bucket is not None:
+            collector.push(bucket.row(sim))
+        summary.n_rows = collector.n_rows
+    return summary
+
+
+@dataclass
+class ReplayJob:
+    sim: PoolSimulator
+    events_path: str
+    output_dir: str
+    block_interval: int = 1
+
+
+def _run_job(job: ReplayJob) -> ReplaySummary:
+    return replay(job.sim, job.events_path, job.output_dir, block_interval=job.block_interval)
+
+
+def replay_many(jobs: Sequence[ReplayJob], max_workers: Optional[int] = None) -> List[ReplaySummary]:
+    """Runs independent replays (e.g. one per pool) in parallel processes. The simulators in `jobs` are pickled, so they
+    are not modified."""
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_run_job, jobs))
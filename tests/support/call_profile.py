@@ -0,0 +1,306 @@
+# Aggregates the Context trees of many traced transactions (see tests.support.trace_analyzer) into one tree of
+# statistics, so that gas that varies between transactions (e.g. with the number of Newton iterations of the 3CLP) can
+# be summarised rather than read off a single sample.
+#
+# Nodes are merged by call path: the sequence of (call type, qualified function name) from the root. Every call is one
+# sample, so a function called twice in a transaction contributes two samples; `transactions` counts the trees added.
+# Count, mean, min and max are exact. Percentiles come from a uniform sample of at most RESERVOIR_SIZE values per node,
+# which keeps memory bounded however many trees are added, and are exact as long as a node has fewer calls than that.
+#
+# Loops found by the Tracer (Context.loops) are merged by their label (source file and line) per node: the
+# distribution of the number of iterations per call, and the gas per iteration. Together they tell whether a change in
+# the gas of e.g. Gyro3CLPMath._runNewtonIteration comes from the cost of an iteration or from the number of iterations.
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tests.support.trace_analyzer import GAS_KINDS, CallType, Context, Loop
+
+RESERVOIR_SIZE = 1024
+
+PERCENTILE = 95
+
+
+class GasStats:
+    """Streaming statistics of one quantity (e.g. the gas_consumed of one node)."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+        self.reservoir: List[int] = []
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else float("nan")
+
+    def percentile(self, q: float = PERCENTILE) -> float:
+        if not self.reservoir:
+            return float("nan")
+        return float(np.percentile(self.reservoir, q))
+
+    def add(self, value: int, rng: np.random.Generator):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.reservoir) < RESERVOIR_SIZE:
+            self.reservoir.append(value)
+        else:
+            k = rng.integers(self.count)
+            if k < RESERVOIR_SIZE:
+                self.reservoir[k] = value
+
+    def merge(self, other: GasStats, rng: np.random.Generator):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        n, n_other = self.count, other.count
+        self.count += n_other
+        self.sum += other.sum
+
+        size = min(RESERVOIR_SIZE, len(self.reservoir) + len(other.reservoir))
+        if size == len(self.reservoir) + len(other.reservoir):
+            # Both reservoirs hold all their values.
+            self.reservoir = self.reservoir + other.reservoir
+            return
+        # Take from each side in proportion to the number of values it stands for.
+        k = rng.binomial(size, n / self.count)
+        k = min(max(k, size - len(other.reservoir)), len(self.reservoir))
+        self.reservoir = list(rng.choice(self.reservoir, k, replace=False)) + list(
+            rng.choice(other.reservoir, size - k, replace=False)
+        )
+
+    def summary(self, q: float = PERCENTILE) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            f"p{q}": self.percentile(q),
+        }
+
+
+class LoopProfile:
+    """The iterations of one loop over all calls of a node."""
+
+    def __init__(self, label: str):
+        self.label = label
+        # Per call in which the loop completed at least one iteration.
+        self.iterations = GasStats()
+        # Per iteration.
+        self.iteration_gas = GasStats()
+        self.counts: Dict[int, int] = {}
+
+    def add(self, loop: Loop, rng: np.random.Generator):
+        self.iterations.add(loop.iterations, rng)
+        self.counts[loop.iterations] = self.counts.get(loop.iterations, 0) + 1
+        for gas in loop.iteration_gas:
+            self.iteration_gas.add(gas, rng)
+
+    def merge(self, other: LoopProfile, rng: np.random.Generator):
+        self.iterations.merge(other.iterations, rng)
+        self.iteration_gas.merge(other.iteration_gas, rng)
+        for k, n in other.counts.items():
+            self.counts[k] = self.counts.get(k, 0) + n
+
+    def iteration_counts(self, calls: int) -> Dict[int, int]:
+        """Number of calls by number of iterations, out of `calls` calls of the node. The tracer doesn't see the loop in
+        calls that leave it during the first iteration; these count as 0 iterations, though they ran a partial one."""
+        counts = dict(self.counts)
+        if calls > self.iterations.count:
+            counts[0] = calls - self.iterations.count
+        return dict(sorted(counts.items()))
+
+    def summary(self, calls: int) -> str:
+        iterations, gas = self.iterations, self.iteration_gas
+        counts = ", ".join(f"{k}: {n}" for k, n in self.iteration_counts(calls).items())
+        return (
+            f"loop {self.label}: iterations {{{counts}}}, "
+            f"gas per iteration {gas.mean:,.0f} [{gas.min:,}-{gas.max:,}, p{PERCENTILE} {gas.percentile():,.0f}]"
+        )
+
+
+NodeKey = Tuple[Optional[CallType], str]
+
+
+class ProfileNode:
+    def __init__(self, call_type: Optional[CallType], name: str):
+        self.call_type = call_type
+        self.name = name
+        self.gas_consumed = GasStats()
+        self.total_gas_consumed = GasStats()
+        self.children: Dict[NodeKey, ProfileNode] = {}
+        self.loops: Dict[str, LoopProfile] = {}
+        # Sum over all calls of Context.gas_breakdown.
+        self.gas_by_kind: Dict[str, int] = dict.fromkeys(GAS_KINDS, 0)
+
+    def loop(self, label: str) -> LoopProfile:
+        if label not in self.loops:
+            self.loops[label] = LoopProfile(label)
+        return self.loops[label]
+
+    def child(self, call_type: Optional[CallType], name: str) -> ProfileNode:
+        key = (call_type, name)
+        if key not in self.children:
+            self.children[key] = ProfileNode(call_type, name)
+        return self.children[key]
+
+    def add(self, ctx: Context, rng: np.random.Generator):
+        self.gas_consumed.add(ctx.gas_consumed, rng)
+        self.total_gas_consumed.add(ctx.total_gas_consumed, rng)
+        for kind, gas in ctx.gas_breakdown.items():
+            self.gas_by_kind[kind] += gas
+        for loop in ctx.loops.values():
+            self.loop(loop.label).add(loop, rng)
+        for call_type, child in ctx.children:
+            self.child(call_type, child.qualified_function_name).add(child, rng)
+
+    def merge(self, other: ProfileNode, rng: np.random.Generator):
+        self.gas_consumed.merge(other.gas_consumed, rng)
+        self.total_gas_consumed.merge(other.total_gas_consumed, rng)
+        for kind, gas in other.gas_by_kind.items():
+            self.gas_by_kind[kind] += gas
+        for label, loop in other.loops.items():
+            self.loop(label).merge(loop, rng)
+        for (call_type, name), child in other.children.items():
+            self.child(call_type, name).merge(child, rng)
+
+    @property
+    def summary(self) -> str:
+        gas, total = self.gas_consumed, self.total_gas_consumed
+        return (
+            f"{self.name} x{gas.count} "
+            f"({gas.mean:,.0f} [{gas.min:,}-{gas.max:,}, p{PERCENTILE} {gas.percentile():,.0f}] / "
+            f"{total.mean:,.0f} [{total.min:,}-{total.max:,}, p{PERCENTILE} {total.percentile():,.0f}])"
+        )
+
+    def _format(self, prefixes: List[bool], is_last: bool, maxlvl, lvl) -> str:
+        format_prefix = lambda x: "│   " if x else "    "
+        prefix = "".join(map(format_prefix, prefixes[:-1]))
+        pipe = "└" if is_last else "│"
+        prefix += f"{pipe}─({self.call_type.char})─" if self.call_type else ""
+        line = f"{prefix} {self.summary}\n"
+        children = list(self.children.values())
+        if self.loops:
+            loop_prefix = "".join(map(format_prefix, prefixes))
+            loop_prefix += "│ " if children else "  "
+            line += "".join(
+                f"{loop_prefix}  ~ {loop.summary(self.gas_consumed.count)}\n"
+                for loop in self.loops.values()
+            )
+        if maxlvl is not None and lvl >= maxlvl:
+            return line
+        return line + "".join(
+            child._format(
+                prefixes + [i < len(children) - 1],
+                i == len(children) - 1,
+                maxlvl,
+                lvl + 1,
+            )
+            for i, child in enumerate(children)
+        )
+
+
+class CallProfile:
+    """Merged call trees of many transactions.
+
+    Example:
+        profile = CallProfile()
+        for tx in swaps:
+            profile.add(tracer.trace_tx(tx))
+        print(profile.format())
+    """
+
+    def __init__(self, seed: int = 0):
+        self.root = ProfileNode(None, "")
+        self.transactions = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, ctx: Context):
+        self.root.child(None, ctx.qualified_function_name).add(ctx, self._rng)
+        self.transactions += 1
+
+    def merge(self, other: CallProfile):
+        """Add the transactions of `other`, e.g. of a profile built in another process."""
+        self.root.merge(other.root, self._rng)
+        self.transactions += other.transactions
+
+    def find(self, path: Sequence[str]) -> Optional[ProfileNode]:
+        """The node at a path of qualified function names from the root, whatever the call types."""
+        nodes = [self.root]
+        for name in path:
+            nodes = [
+                child
+                for node in nodes
+                for (_, child_name), child in node.children.items()
+                if child_name == name
+            ]
+        return nodes[0] if nodes else None
+
+    def format(self, maxlvl=None) -> str:
+        """The tree like Context.format(), with count, mean, [min-max, p95] of gas_consumed / total_gas_consumed."""
+        return "".join(
+            node._format([], True, maxlvl, 1) for node in self.root.children.values()
+        )
+
+    def to_pandas(self) -> pd.DataFrame:
+        """One row per node, with its call path, the statistics of gas_consumed and total_gas_consumed, and the mean of
+        gas_consumed by kind (see Context.gas_breakdown)."""
+        rows = []
+
+        def visit(node: ProfileNode, path: Tuple[str, ...]):
+            for child in node.children.values():
+                child_path = path + (child.name,)
+                row = {
+                    "path": " > ".join(child_path),
+                    "depth": len(child_path),
+                    "call_type": child.call_type.value if child.call_type else None,
+                }
+                for field, stats in (
+                    ("gas_consumed", child.gas_consumed),
+                    ("total_gas_consumed", child.total_gas_consumed),
+                ):
+                    row.update({f"{field}_{k}": v for k, v in stats.summary().items()})
+                calls = child.gas_consumed.count
+                row.update(
+                    {f"{k}_mean": v / calls for k, v in child.gas_by_kind.items()}
+                )
+                rows.append(row)
+                visit(child, child_path)
+
+        visit(self.root, ())
+        return pd.DataFrame(rows)
+
+    def loops_to_pandas(self) -> pd.DataFrame:
+        """One row per loop and node, with the statistics of the iterations per call and of the gas per iteration."""
+        rows = []
+
+        def visit(node: ProfileNode, path: Tuple[str, ...]):
+            for child in node.children.values():
+                child_path = path + (child.name,)
+                for loop in child.loops.values():
+                    row = {"path": " > ".join(child_path), "loop": loop.label}
+                    row["iteration_counts"] = loop.iteration_counts(
+                        child.gas_consumed.count
+                    )
+                    for field, stats in (
+                        ("iterations", loop.iterations),
+                        ("iteration_gas", loop.iteration_gas),
+                    ):
+                        row.update(
+                            {f"{field}_{k}": v for k, v in stats.summary().items()}
+                        )
+                    rows.append(row)
+                visit(child, child_path)
+
+        visit(self.root, ())
+        return pd.DataFrame(rows)
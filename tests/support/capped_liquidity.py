@@ -0,0 +1,140 @@
+# In-process model of CappedLiquidity (as used by MockCappedPool and, through _ensureCap(), the pools' joins), for
+# replaying many joins against hypothetical cap settings without a node, e.g. to plan cap raises.
+#
+# The state is the BPT balance per address (a dict) and the total supply. Amounts are BPT (18 decimals), and the
+# checks are _ensureCap()'s with the checked additions of GyroFixedPoint.add(), so a join reverts here iff it reverts
+# in the contract. As for PoolSimulator, a reverting join raises PoolRevert before modifying any state.
+
+from typing import Hashable, Iterable, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from tests.support.pool_simulator import (
+    OVER_ADDRESS_CAP,
+    OVER_GLOBAL_CAP,
+    UINT256_MAX,
+    ZERO_ADDRESS,
+    PoolRevert,
+)
+from tests.support.types import CapParams
+
+ADD_OVERFLOW = "BAL#000"
+NOT_AUTHORIZED = "not authorized"
+UNCAPPED = "pool is uncapped"
+
+
+def add(a: int, b: int) -> int:
+    """Checked addition, like GyroFixedPoint.add()."""
+    if a + b > UINT256_MAX:
+        raise PoolRevert(ADD_OVERFLOW)
+    return a + b
+
+
+def ensure_cap(
+    cap_params: CapParams, amount_minted: int, user_balance: int, current_supply: int
+):
+    """CappedLiquidity._ensureCap(). Callers only call it if the cap is enabled."""
+    if add(amount_minted, user_balance) > cap_params.per_address_cap:
+        raise PoolRevert(OVER_ADDRESS_CAP)
+    if add(amount_minted, current_supply) > cap_params.global_cap:
+        raise PoolRevert(OVER_GLOBAL_CAP)
+
+
+class Join(NamedTuple):
+    account: Hashable
+    amount: int  # BPT minted
+
+
+class JoinReplay(NamedTuple):
+    """Result of replaying a sequence of joins. `reasons[k]` is the revert reason of the k-th join, or None if it
+    succeeded; the reverted joins don't change the state."""
+
+    reasons: list[Optional[str]]
+    balances: dict[Hashable, int]
+    total_supply: int
+
+    @property
+    def reverted(self) -> np.ndarray:
+        return np.array([reason is not None for reason in self.reasons], dtype=bool)
+
+
+class CappedLiquidityModel:
+    """State of a pool with CappedLiquidity, as seen by MockCappedPool.joinPool(): `balances` are the BPT balances by
+    address and `total_supply` their sum (plus any BPT not tracked by address, e.g. the pool's MINIMUM_BPT).
+    """
+
+    def __init__(
+        self,
+        cap_manager: Hashable,
+        cap_params: CapParams,
+        balances: Optional[dict[Hashable, int]] = None,
+        total_supply: Optional[int] = None,
+    ):
+        if cap_manager == ZERO_ADDRESS:
+            raise PoolRevert(NOT_AUTHORIZED)
+        self.cap_manager = cap_manager
+        self.cap_params = cap_params
+        self.balances: dict[Hashable, int] = dict(balances or {})
+        if total_supply is None:
+            total_supply = sum(self.balances.values())
+        assert total_supply >= sum(self.balances.values())
+        self.total_supply = total_supply
+
+    def bpt_balance(self, account: Hashable) -> int:
+        return self.balances.get(account, 0)
+
+    def set_cap_manager(self, sender: Hashable, cap_manager: Hashable):
+        if sender != self.cap_manager:
+            raise PoolRevert(NOT_AUTHORIZED)
+        self.cap_manager = cap_manager
+
+    def set_cap_params(self, sender: Hashable, cap_params: CapParams):
+        if sender != self.cap_manager:
+            raise PoolRevert(NOT_AUTHORIZED)
+        if not self.cap_params.cap_enabled:
+            raise PoolRevert(UNCAPPED)
+        self.cap_params = cap_params
+
+    def join(self, account: Hashable, amount: int):
+        """MockCappedPool.joinPool(amount) from `account`."""
+        balance = self.bpt_balance(account)
+        if self.cap_params.cap_enabled:
+            ensure_cap(self.cap_params, amount, balance, self.total_supply)
+        # ERC20._mint()
+        self.total_supply = add(self.total_supply, amount)
+        self.balances[account] = balance + amount
+
+    def replay(
+        self, joins: Iterable[Join], cap_params: Optional[CapParams] = None
+    ) -> JoinReplay:
+        """Applies the joins in order to a copy of the state, with the current cap params or `cap_params`, and records
+        which ones revert. The state of this object is left unchanged."""
+        cap_params = self.cap_params if cap_params is None else cap_params
+        balances = dict(self.balances)
+        total_supply = self.total_supply
+        reasons: list[Optional[str]] = []
+        # The same as join(), on local variables.
+        for account, amount in joins:
+            balance = balances.get(account, 0)
+            try:
+                if cap_params.cap_enabled:
+                    ensure_cap(cap_params, amount, balance, total_supply)
+                total_supply = add(total_supply, amount)
+            except PoolRevert as e:
+                reasons.append(e.reason)
+                continue
+            balances[account] = balance + amount
+            reasons.append(None)
+        return JoinReplay(reasons, balances, total_supply)
+
+    def replay_cap_settings(
+        self, joins: Sequence[Join], cap_settings: Sequence[CapParams]
+    ) -> np.ndarray:
+        """Revert reasons (or None) of the joins under each of the cap settings, as an object array of shape
+        (len(cap_settings), len(joins)). Each setting replays the whole sequence from the current state.
+        """
+        joins = list(joins)
+        reasons = np.empty((len(cap_settings), len(joins)), dtype=object)
+        for k, cap_params in enumerate(cap_settings):
+            reasons[k] = self.replay(joins, cap_params).reasons
+        return reasons
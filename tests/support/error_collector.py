@@ -0,0 +1,179 @@
+"""Streaming collection of per-example metrics (e.g. loss values) for precision studies.
+
+Rows are buffered and written in chunks as Arrow IPC (Feather v2) files into a directory. Each chunk is written under a
+temporary name and then atomically renamed, so a crash loses at most the current chunk, and every collector writes its
+own files, so parallel workers (e.g. pytest-xdist) can share one directory. Use load_error_values() to open all chunks
+memory-mapped.
+
+Example:
+
+    with ErrorValueCollector("data/errors_solidity", {"loss_ub": float, "loss_ub_sol": float}) as collector:
+        ...
+        collector.push(dict(loss_ub=..., loss_ub_sol=...))
+
+    df = load_error_values("data/errors_solidity").to_pandas()
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import secrets
+import threading
+from decimal import Decimal
+from os import path
+from typing import Dict, Iterable, List, Optional, Union
+
+import pyarrow as pa
+
+from tests.support.quantized_decimal import QuantizedDecimal
+
+CHUNK_SUFFIX = ".arrow"
+LEGACY_SUFFIX = ".feather"
+
+_PYTHON_TYPES = {
+    float: pa.float64(),
+    int: pa.int64(),
+    bool: pa.bool_(),
+    str: pa.string(),
+}
+
+SchemaLike = Union[pa.Schema, Dict[str, Union[type, pa.DataType]]]
+
+
+def make_schema(schema: SchemaLike) -> pa.Schema:
+    """Accepts a pyarrow schema or a dict mapping column names to python types (float, int, bool, str) or pyarrow
+    types."""
+    if isinstance(schema, pa.Schema):
+        return schema
+    return pa.schema(
+        [(name, _PYTHON_TYPES.get(t, t)) for name, t in schema.items()]
+    )
+
+
+def _convert_value(value, dtype: pa.DataType):
+    """Convert decimal-like values to what pyarrow expects for the column type."""
+    if isinstance(value, QuantizedDecimal):
+        value = value.raw
+    if isinstance(value, Decimal):
+        if pa.types.is_floating(dtype):
+            return float(value)
+        if pa.types.is_integer(dtype):
+            return int(value)
+    return value
+
+
+def worker_name() -> str:
+    return os.environ.get("PYTEST_XDIST_WORKER", "main")
+
+
+class ErrorValueCollector:
+    """Appends rows with a fixed schema to chunked Arrow files in `directory`.
+
+    A collector is meant to be used by one process; push() is thread-safe. Chunks are named by worker (`worker_id`,
+    by default the pytest-xdist worker or "main"), pid and a random suffix, so chunks from previous runs in the same
+    directory are kept, even with an explicit worker_id; call clear() first to drop those of the same worker."""
+
+    def __init__(
+        self,
+        directory: str,
+        schema: SchemaLike,
+        chunk_size: int = 10_000,
+        worker_id: Optional[str] = None,
+    ):
+        self.directory = directory
+        self.schema = make_schema(schema)
+        self.chunk_size = chunk_size
+        self.worker_id = worker_id if worker_id is not None else worker_name()
+        self._file_prefix = f"{self.worker_id}-{os.getpid()}-{secrets.token_hex(4)}"
+        self.n_rows = 0
+        self._columns: Dict[str, list] = {name: [] for name in self.schema.names}
+        self._n_buffered = 0
+        self._n_chunks = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def push(self, row: dict):
+        with self._lock:
+            for field in self.schema:
+                self._columns[field.name].append(
+                    _convert_value(row[field.name], field.type)
+                )
+            self._n_buffered += 1
+            self.n_rows += 1
+            if self._n_buffered >= self.chunk_size:
+                self._write_chunk()
+
+    def extend(self, rows: Iterable[dict]):
+        for row in rows:
+            self.push(row)
+
+    def flush(self):
+        with self._lock:
+            if self._n_buffered > 0:
+                self._write_chunk()
+
+    def close(self):
+        self.flush()
+
+    def clear(self):
+        """Delete the chunks of this worker, including those of earlier runs with the same worker_id. The chunks of
+        other pytest-xdist workers, which may be writing to the same directory right now, are kept."""
+        for filename in chunk_files(self.directory):
+            if path.basename(filename).startswith(self.worker_id + "-"):
+                os.remove(filename)
+
+    def _write_chunk(self):
+        batch = pa.record_batch(
+            [pa.array(self._columns[f.name], type=f.type) for f in self.schema],
+            schema=self.schema,
+        )
+        filename = path.join(
+            self.directory,
+            f"{self._file_prefix}-{self._n_chunks:06d}{CHUNK_SUFFIX}",
+        )
+        tmp_filename = filename + ".tmp"
+        # Uncompressed so that the chunks can be memory-mapped without copying.
+        with pa.OSFile(tmp_filename, "wb") as sink:
+            with pa.ipc.new_file(sink, self.schema) as writer:
+                writer.write_batch(batch)
+        os.replace(tmp_filename, filename)
+
+        self._n_chunks += 1
+        self._n_buffered = 0
+        self._columns = {name: [] for name in self.schema.names}
+
+    def __enter__(self) -> ErrorValueCollector:
+        return self
+
+    def __exit__(self, *exc_info):
+        # We also flush on error: the point is to keep what we have.
+        self.close()
+
+
+def chunk_files(directory: str) -> List[str]:
+    return sorted(glob.glob(path.join(directory, "*" + CHUNK_SUFFIX)))
+
+
+def load_error_values(
+    directory: str, columns: Optional[List[str]] = None, memory_map: bool = True
+) -> pa.Table:
+    """Concatenation of all chunks in `directory`. With memory_map=True (the default), the table's buffers point into
+    the memory-mapped files, so loading is cheap even for very large collections. Call `.to_pandas()` on the result
+    for a DataFrame.
+
+    If there are no chunks, but a single file `directory + ".feather"` as written by earlier versions of the scripts
+    (e.g. data/errors_solidity.feather), that file is loaded instead."""
+    filenames = chunk_files(directory)
+    if not filenames and path.isfile(directory + LEGACY_SUFFIX):
+        filenames = [directory + LEGACY_SUFFIX]
+    tables = []
+    for filename in filenames:
+        source = pa.memory_map(filename) if memory_map else pa.OSFile(filename)
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        tables.append(table)
+    if not tables:
+        raise FileNotFoundError(f"No error value chunks found in {directory}")
+    return pa.concat_tables(tables)
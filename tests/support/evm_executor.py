@@ -0,0 +1,356 @@
+# In-process execution of the pure / view functions of the compiled contracts, without brownie and a node.
+#
+# The property tests compare the Python math against Gyro2CLPMathTesting, Gyro3CLPMathTesting, GyroECLPMathTesting,
+# SignedMathTesting, GyroFixedPointTesting etc. Through brownie, each of these calls is a JSON-RPC round trip to
+# ganache, which costs milliseconds for (usually) microseconds of EVM work. Here, the deployed bytecode from
+# build/contracts/<name>.json is placed into an in-memory py-evm state and the calls are executed directly, with the
+# ABI encoding and decoding done by eth_abi.
+#
+# InProcessContract can be used in place of a deployed brownie contract for calls to pure and view functions:
+# `contract.calculateInvariant(balances, sqrtAlpha, sqrtBeta)` returns the decoded return value (a tuple for several
+# return values or a struct), Decimal arguments are converted to ints like brownie does, and a revert raises
+# PoolRevert with the revert string (e.g. "BAL#001" or "GYR#357"). tests.support.reverts.reverts() accepts these as well
+# as brownie's VirtualMachineError, so `with reverts(...)` checks work either way. A trailing transaction dict can set
+# the gas limit, like `{"gas": 1_000_000}` with brownie. The gas of each call is recorded in `gas_records`.
+#
+# Speed: a call costs about 0.3ms of fixed overhead plus roughly 2.5us per executed opcode. Cheap functions (fixed
+# point, signed math, the 2CLP) run well over 10x faster than an RPC round trip to ganache. The heavy routines (the
+# ECLP invariant and swaps, the 3CLP Newton iteration) execute tens of thousands of opcodes per call and are bound by
+# py-evm's interpreter, so for them the speedup falls short of 10x.
+#
+# The constructor is not run, so this is only meant for contracts without constructor arguments or immutables.
+# Contracts that call public functions of libraries (e.g. GyroECLPMathTesting, which calls GyroECLPMath) are linked:
+# the libraries are loaded from the build directory as well, placed into the same InProcessEVM (once per EVM), and
+# their addresses are filled into the placeholders of the bytecode. The state is shared between the contracts of one
+# InProcessEVM, but calls never modify it.
+
+from decimal import Decimal
+import json
+from os import path
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from eth import constants
+from eth.chains.base import MiningChain
+from eth.db.atomic import AtomicDB
+from eth.vm.forks.london import LondonVM
+from eth.vm.message import Message
+from eth_utils import keccak
+
+try:
+    from eth_abi import decode, encode
+except ImportError:  # eth-abi < 4, as pinned by brownie
+    from eth_abi import decode_abi as decode, encode_abi as encode
+
+from tests.support.pool_simulator import PoolRevert
+
+BUILD_DIR = path.join(path.dirname(__file__), "../../build/contracts")
+
+# ganache's default block gas limit
+GAS_LIMIT = 12_000_000
+
+TX_BASE_GAS = 21_000
+CALLDATA_ZERO_BYTE_GAS = 4
+CALLDATA_NONZERO_BYTE_GAS = 16
+
+# Error(string)
+ERROR_SELECTOR = keccak(text="Error(string)")[:4]
+
+SENDER = b"\x10" * 20
+ADDRESS_PREFIX = b"\xc0\xde"
+
+# Placeholders for library addresses in unlinked bytecode (hex), 40 characters each: solc's __$<34 hex digits of the
+# keccak256 of "<source path>:<library name>">$__, and the __<library name, padded with _ to 36 characters>__ that
+# brownie writes into its build files instead.
+LIBRARY_PLACEHOLDER = re.compile(r"__\$([0-9a-fA-F]{34})\$__|__([A-Za-z0-9_]{36})__")
+
+# A library's deployed code starts with PUSH20 <its own address>, which the constructor fills in.
+PUSH20 = 0x73
+
+_GENESIS_PARAMS = {
+    "difficulty": 0,
+    "gas_limit": GAS_LIMIT,
+    "timestamp": 0,
+    "coinbase": constants.ZERO_ADDRESS,
+    "extra_data": b"",
+    "nonce": constants.GENESIS_NONCE,
+    "mix_hash": constants.ZERO_HASH32,
+}
+
+
+class CallResult(NamedTuple):
+    output: bytes
+    gas_used: int  # execution gas, without the intrinsic gas of a transaction
+    reverted: bool
+
+
+class GasRecord(NamedTuple):
+    function: str
+    gas_used: int
+    tx_gas: int  # gas_used plus intrinsic gas, i.e., what the same call would cost as a transaction
+
+
+def intrinsic_gas(data: bytes) -> int:
+    zeros = data.count(0)
+    return (
+        TX_BASE_GAS
+        + CALLDATA_ZERO_BYTE_GAS * zeros
+        + CALLDATA_NONZERO_BYTE_GAS * (len(data) - zeros)
+    )
+
+
+def _load_build(name: str, build_dir: str) -> dict:
+    with open(path.join(build_dir, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def _placeholder_hash(source_path: str, name: str) -> str:
+    return keccak(text=f"{source_path}:{name}").hex()[:34]
+
+
+def link_bytecode(
+    bytecode: str,
+    library_address: Callable[[str], bytes],
+    hashes: Optional[Dict[str, str]] = None,
+) -> bytes:
+    """Replaces the library placeholders in hex bytecode by the addresses from library_address(library name). hashes maps
+    the hashes of solc's placeholders to library names."""
+    hashes = hashes or {}
+    if bytecode.startswith("0x"):
+        bytecode = bytecode[2:]
+
+    def replace(match: re.Match) -> str:
+        if match.group(1) is not None:
+            try:
+                name = hashes[match.group(1).lower()]
+            except KeyError:
+                raise ValueError(
+                    f"Unknown library placeholder {match.group(0)}"
+                ) from None
+        else:
+            name = match.group(2).rstrip("_")
+        return library_address(name).hex()
+
+    return bytes.fromhex(LIBRARY_PLACEHOLDER.sub(replace, bytecode))
+
+
+def revert_reason(output: bytes) -> str:
+    """The string of a revert with Error(string), which includes Balancer's _require() and GyroErrors, or "" for
+    anything else."""
+    if output[:4] != ERROR_SELECTOR:
+        return ""
+    return decode(["string"], output[4:])[0]
+
+
+class InProcessEVM:
+    """An in-memory EVM state (London rules, like the ganache of brownie-config.yaml) to place bytecode in and call."""
+
+    def __init__(self):
+        chain_class = MiningChain.configure(
+            vm_configuration=((constants.GENESIS_BLOCK_NUMBER, LondonVM),),
+            chain_id=1337,
+        )
+        chain = chain_class.from_genesis(AtomicDB(), _GENESIS_PARAMS)
+        self.state = chain.get_vm().state
+        self._transaction_context = self.state.get_transaction_context_class()(
+            gas_price=0, origin=SENDER
+        )
+        self._code: Dict[bytes, bytes] = {}
+        self._libraries: Dict[str, bytes] = {}
+
+    def place(self, code: bytes, is_library: bool = False) -> bytes:
+        """Puts deployed bytecode at a fresh address and returns the address."""
+        # Away from the precompiles at the low addresses.
+        address = ADDRESS_PREFIX + len(self._code).to_bytes(18, "big")
+        if is_library and code[:21] == bytes([PUSH20]) + bytes(20):
+            code = code[:1] + address + code[21:]
+        self.state.set_code(address, code)
+        self._code[address] = code
+        return address
+
+    def library_address(self, name: str, build_dir: str = BUILD_DIR) -> bytes:
+        """Address of the library `name` from the build directory, which is placed (and linked itself) on first use."""
+        if name not in self._libraries:
+            build_data = _load_build(name, build_dir)
+            code = self.link(build_data, build_dir)
+            self._libraries[name] = self.place(code, is_library=True)
+        return self._libraries[name]
+
+    def link(self, build_data: dict, build_dir: str = BUILD_DIR) -> bytes:
+        """The deployed bytecode of a build file, linked against the libraries of this EVM."""
+        hashes = {}
+        for dependency in build_data.get("dependencies", []):
+            dependency_path = path.join(build_dir, f"{dependency}.json")
+            if path.exists(dependency_path):
+                source_path = _load_build(dependency, build_dir)["sourcePath"]
+                hashes[_placeholder_hash(source_path, dependency)] = dependency
+        return link_bytecode(
+            build_data["deployedBytecode"],
+            lambda library: self.library_address(library, build_dir),
+            hashes,
+        )
+
+    def call(self, address: bytes, data: bytes, gas: int = GAS_LIMIT) -> CallResult:
+        """Like eth_call: executes the call and throws away any changes to the state."""
+        message = Message(
+            gas=gas,
+            to=address,
+            sender=SENDER,
+            value=0,
+            data=data,
+            code=self._code[address],
+        )
+        snapshot = self.state.snapshot()
+        # A transaction starts with the sender and the target warm (EIP-2929).
+        self.state.mark_address_warm(SENDER)
+        self.state.mark_address_warm(address)
+        try:
+            computation = self.state.computation_class.apply_message(
+                self.state, message, self._transaction_context
+            )
+        finally:
+            self.state.revert(snapshot)
+        return CallResult(
+            bytes(computation.output), computation.get_gas_used(), computation.is_error
+        )
+
+
+def _abi_type(param: dict) -> str:
+    """ABI type string of a function input / output, with structs as tuple types."""
+    abi_type = param["type"]
+    if abi_type.startswith("tuple"):
+        components = ",".join(_abi_type(c) for c in param["components"])
+        return f"({components}){abi_type[len('tuple'):]}"
+    return abi_type
+
+
+def _to_abi(value: Any) -> Any:
+    """Converts arguments the way brownie accepts them: integral Decimals (e.g. QuantizedDecimal) to ints, and
+    nested lists / tuples element-wise."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_to_abi(v) for v in value)
+    if isinstance(value, Decimal):
+        if value != value.to_integral_value():
+            raise TypeError(f"Cannot convert non-integral {value!r} to an integer")
+        return int(value)
+    return value
+
+
+class ContractFunction:
+    def __init__(self, contract: "InProcessContract", abi: dict):
+        self.contract = contract
+        self.name = abi["name"]
+        self.input_types = [_abi_type(p) for p in abi["inputs"]]
+        self.output_types = [_abi_type(p) for p in abi["outputs"]]
+        self.signature = f"{self.name}({','.join(self.input_types)})"
+        self.selector = keccak(text=self.signature)[:4]
+
+    def _split_tx(self, args: tuple) -> tuple[tuple, dict]:
+        """Like brownie, accept a transaction dict as the last argument. Its "gas" is the gas limit of the call and
+        "from" is ignored; anything else is rejected rather than silently ignored."""
+        if len(args) == len(self.input_types) + 1 and isinstance(args[-1], dict):
+            args, tx = args[:-1], args[-1]
+            unsupported = set(tx) - {"gas", "from"}
+            if unsupported:
+                raise TypeError(
+                    f"Unsupported transaction fields for {self.signature}: {sorted(unsupported)}"
+                )
+            return args, tx
+        return args, {}
+
+    def encode_input(self, *args) -> bytes:
+        args, _ = self._split_tx(args)
+        if len(args) != len(self.input_types):
+            raise TypeError(
+                f"{self.signature} takes {len(self.input_types)} arguments, got {len(args)}"
+            )
+        return self.selector + encode(self.input_types, _to_abi(args))
+
+    def decode_output(self, output: bytes) -> Any:
+        values = decode(self.output_types, output)
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def call_with_gas(self, *args) -> tuple[Any, GasRecord]:
+        """The decoded return value and the gas of the call. Running out of gas raises PoolRevert with an empty
+        reason, like any revert without a reason string."""
+        args, tx = self._split_tx(args)
+        data = self.encode_input(*args)
+        result = self.contract.evm.call(
+            self.contract.address, data, int(tx.get("gas", GAS_LIMIT))
+        )
+        record = GasRecord(
+            self.signature, result.gas_used, result.gas_used + intrinsic_gas(data)
+        )
+        self.contract.gas_records.append(record)
+        if result.reverted:
+            raise PoolRevert(revert_reason(result.output))
+        return self.decode_output(result.output), record
+
+    def __call__(self, *args) -> Any:
+        return self.call_with_gas(*args)[0]
+
+    # brownie's ContractCall.call()
+    call = __call__
+
+    def __repr__(self):
+        return f"<ContractFunction {self.contract.name}.{self.signature}>"
+
+
+class InProcessContract:
+    """A contract from the brownie build directory, placed into an InProcessEVM. Functions are accessed as attributes
+    like on brownie's Contract. Overloaded functions are dispatched on the number of arguments.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        abi: List[dict],
+        deployed_bytecode: bytes,
+        evm: Optional[InProcessEVM] = None,
+    ):
+        self.name = name
+        self.abi = abi
+        self.evm = InProcessEVM() if evm is None else evm
+        self.address = self.evm.place(deployed_bytecode)
+        self.gas_records: List[GasRecord] = []
+        self._functions: Dict[str, List[ContractFunction]] = {}
+        for entry in abi:
+            if entry["type"] == "function":
+                function = ContractFunction(self, entry)
+                self._functions.setdefault(function.name, []).append(function)
+
+    @classmethod
+    def from_build(
+        cls, name: str, evm: Optional[InProcessEVM] = None, build_dir: str = BUILD_DIR
+    ) -> "InProcessContract":
+        evm = InProcessEVM() if evm is None else evm
+        build_data = _load_build(name, build_dir)
+        return cls(name, build_data["abi"], evm.link(build_data, build_dir), evm)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            functions = self._functions[name]
+        except KeyError:
+            raise AttributeError(f"{self.name} has no function {name}") from None
+        if len(functions) == 1:
+            return functions[0]
+        return _Overloaded(functions)
+
+    def clear_gas_records(self) -> List[GasRecord]:
+        records, self.gas_records = self.gas_records, []
+        return records
+
+    def __repr__(self):
+        return f"<InProcessContract {self.name} at 0x{self.address.hex()}>"
+
+
+class _Overloaded:
+    def __init__(self, functions: Sequence[ContractFunction]):
+        self.functions = {len(f.input_types): f for f in functions}
+        assert len(self.functions) == len(functions), "Ambiguous overloads"
+
+    def __call__(self, *args) -> Any:
+        n_args = len(args) - 1 if args and isinstance(args[-1], dict) else len(args)
+        return self.functions[n_args](*args)
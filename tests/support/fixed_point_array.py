@@ -0,0 +1,140 @@
+# Element-wise versions of the GyroFixedPoint operations (and GyroPoolMath._sqrt) on numpy arrays.
+#
+# There are two representations, and each function dispatches on the dtype of its first argument:
+# - exact: dtype=object arrays of python ints holding the raw 18-decimal values, as in the contracts. The operations
+#   are the checked ones of tests.libraries.fixed_point_int (and pool_math_int for the square root), applied element
+#   by element, so results match Solidity bit by bit, including rounding direction. Where the contract would revert
+#   (overflow, underflow, division by zero), the element is None (`invalid`), and operations on None give None.
+# - float: float64 arrays holding the unscaled values. Rounding directions are ignored, and there are no overflows; a
+#   division by zero gives inf or NaN as usual in numpy.
+# Use to_exact() / to_float() to create arrays and from_exact() / exact_to_float() to convert back. is_valid() tells
+# the invalid elements of either representation apart.
+
+from decimal import Decimal
+from typing import Callable, Iterable, Union
+
+import numpy as np
+
+from tests.libraries import fixed_point_int, pool_math_int
+from tests.libraries.fixed_point_int import ONE, PoolRevert
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+Numeric = Union[int, float, str, Decimal, D]
+
+
+def to_exact(values: Union[Numeric, Iterable[Numeric]]) -> np.ndarray:
+    """Unscaled values (e.g. D("1.5")) to an exact array of raw values (1500000000000000000). Rounds down."""
+    return np.array(
+        [int(D(v).raw * ONE) for v in np.ravel(np.asarray(values, dtype=object))],
+        dtype=object,
+    ).reshape(np.shape(values))
+
+
+def to_float(values: Union[Numeric, Iterable[Numeric]]) -> np.ndarray:
+    """Unscaled values to a float array."""
+    values = np.asarray(values, dtype=object)
+    return np.array([float(v) for v in values.flat]).reshape(values.shape)
+
+
+def exact_to_float(values: np.ndarray) -> np.ndarray:
+    return np.array([v / ONE for v in values.flat]).reshape(values.shape)
+
+
+def from_exact(values: np.ndarray) -> np.ndarray:
+    """Exact array to an array of (unscaled) D."""
+    return np.array([D(v) / ONE for v in values.flat], dtype=object).reshape(
+        values.shape
+    )
+
+
+def is_exact(a) -> bool:
+    return np.asarray(a).dtype == object
+
+
+_is_not_none = np.frompyfunc(lambda v: v is not None, 1, 1)
+
+
+def is_valid(a) -> np.ndarray:
+    """False where `a` is invalid: None in exact arrays, NaN in float arrays."""
+    if is_exact(a):
+        return _is_not_none(a).astype(bool)
+    return ~np.isnan(a)
+
+
+def _checked(f: Callable[[int, int], int]):
+    """f element by element, with None where an argument is None or where f reverts."""
+
+    def checked(a, b):
+        if a is None or b is None:
+            return None
+        try:
+            return f(a, b)
+        except PoolRevert:
+            return None
+
+    return np.frompyfunc(checked, 2, 1)
+
+
+_add = _checked(fixed_point_int.add)
+_sub = _checked(fixed_point_int.sub)
+_mul_down = _checked(fixed_point_int.mulDown)
+_mul_up = _checked(fixed_point_int.mulUp)
+_div_down = _checked(fixed_point_int.divDown)
+_div_up = _checked(fixed_point_int.divUp)
+
+
+def add(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if is_exact(a):
+        return _add(a, b)
+    return a + b
+
+
+def sub(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if is_exact(a):
+        return _sub(a, b)
+    return a - b
+
+
+def mul_down(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if is_exact(a):
+        return _mul_down(a, b)
+    return a * b
+
+
+def mul_up(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if is_exact(a):
+        return _mul_up(a, b)
+    return a * b
+
+
+def div_down(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if is_exact(a):
+        return _div_down(a, b)
+    return a / b
+
+
+def div_up(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if is_exact(a):
+        return _div_up(a, b)
+    return a / b
+
+
+def fixed(value: Numeric, like: np.ndarray):
+    """A constant in the representation of `like`, e.g. fixed(4, a) is 4e18 if a is exact."""
+    if is_exact(like):
+        return int(D(value).raw * ONE)
+    return float(value)
+
+
+def sqrt(input: np.ndarray, tolerance: int = 5, check: bool = False) -> np.ndarray:
+    """GyroPoolMath._sqrt(), see pool_math_int.sqrt(). `tolerance` is raw (i.e., in units of 1e-18). With check=True,
+    we replicate the contract's final check, which reverts with "_sqrt FAILED"; otherwise, the result is the guess
+    that the check is run on. Invalid inputs give invalid results."""
+    if not is_exact(input):
+        return np.sqrt(input)
+    input = np.asarray(input, dtype=object)
+    valid = is_valid(input)
+    roots, ok = pool_math_int.sqrtsWithCheck(np.where(valid, input, 0), tolerance)
+    if check and not np.all(ok):
+        raise AssertionError(f"{pool_math_int.SQRT_FAILED} for inputs {input[~ok]}")
+    return np.where(valid, roots, None)
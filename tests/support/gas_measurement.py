@@ -0,0 +1,124 @@
+# Driver for the *GasTesting contracts (e.g. Gyro3CLPMathGasTesting), which call a library function in a loop over an
+# array of inputs and return the result and the gas of each call, measured with gasleft(). This replaces one
+# transaction per input (as with ContractAsPureWrapper) by one eth_call per chunk of inputs.
+#
+# Chunks are sized so that a call stays below `max_gas`. The first input of each chunk is measured twice and the first
+# measurement is discarded, since the first call in a chunk also pays for memory expansion. If a chunk reverts, it is
+# bisected until the reverting inputs are isolated; these are reported with gas -1 and result None.
+#
+# Works with brownie contracts and with tests.support.evm_executor.InProcessContract.
+#
+# Note: Gyro3CLPMathGasTesting and GyroECLPMathGasTesting have not been compiled yet (they were written without a
+# Solidity compiler at hand), so neither they nor tests/test_gas_measurement.py have been run. Run `brownie compile`
+# and `brownie test tests/test_gas_measurement.py` before relying on any numbers from them.
+
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import pandas as pd
+from brownie.exceptions import VirtualMachineError
+
+from tests.support.pool_simulator import PoolRevert
+
+# Below ganache's default block gas limit, which is also brownie's default gas for eth_call.
+DEFAULT_MAX_GAS = 10_000_000
+
+# Size of the first chunk, used to estimate the gas per input.
+INITIAL_CHUNK_SIZE = 8
+
+# Safety factor on the largest gas per input seen so far when sizing chunks.
+GAS_MARGIN = 1.5
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class GasMeasurement:
+    """Per-input gas and results of measure_gas(). `gas` is -1 and the results are None for inputs that revert."""
+
+    def __init__(self, inputs: Sequence, results: list[tuple], gas: np.ndarray):
+        self.inputs = list(inputs)
+        self.results = results
+        self.gas = gas
+
+    @property
+    def reverted(self) -> np.ndarray:
+        return self.gas < 0
+
+    def to_pandas(self, result_names: Sequence[str] = ()) -> pd.DataFrame:
+        """One row per input, with columns `gas`, `reverted` and one column per result (named `result0`, ... unless
+        given)."""
+        df = pd.DataFrame({"gas": self.gas, "reverted": self.reverted})
+        n_results = max((len(r) for r in self.results if r is not None), default=0)
+        names = list(result_names) + [
+            f"result{k}" for k in range(len(result_names), n_results)
+        ]
+        for k, name in enumerate(names[:n_results]):
+            df[name] = [None if r is None else r[k] for r in self.results]
+        return df
+
+    def percentiles(self, q: Sequence[float] = PERCENTILES) -> dict[str, float]:
+        """Percentiles of the gas over the inputs that didn't revert, plus min, mean and max."""
+        gas = self.gas[~self.reverted]
+        if len(gas) == 0:
+            return {}
+        stats = {f"p{p}": float(np.percentile(gas, p)) for p in q}
+        stats.update(min=float(gas.min()), mean=float(gas.mean()), max=float(gas.max()))
+        return stats
+
+
+def _call_chunk(
+    function: Callable, chunk: list, args: tuple, max_gas: int
+) -> tuple[list, list]:
+    """(results per input, gas per input) for one call; raises if the call reverts. The last output of the measure*
+    functions is the gas, the ones before are the results."""
+    outputs = function([chunk[0]] + chunk, *args, {"gas": max_gas})
+    *result_columns, gas = (list(column) for column in outputs)
+    results = list(zip(*result_columns)) if result_columns else [()] * len(gas)
+    return results[1:], [int(g) for g in gas[1:]]
+
+
+def _measure_chunk(
+    function: Callable, chunk: list, args: tuple, max_gas: int
+) -> tuple[list, list]:
+    try:
+        return _call_chunk(function, chunk, args, max_gas)
+    # Raised by brownie and by InProcessContract, respectively, for reverts and for running out of gas.
+    except (VirtualMachineError, PoolRevert):
+        if len(chunk) == 1:
+            return [None], [-1]
+    mid = len(chunk) // 2
+    results0, gas0 = _measure_chunk(function, chunk[:mid], args, max_gas)
+    results1, gas1 = _measure_chunk(function, chunk[mid:], args, max_gas)
+    return results0 + results1, gas0 + gas1
+
+
+def measure_gas(
+    function: Callable,
+    inputs: Sequence[Any],
+    *args,
+    max_gas: int = DEFAULT_MAX_GAS,
+    max_chunk_size: int = 1000,
+) -> GasMeasurement:
+    """Gas of the library function behind `function` (a measure* function of a *GasTesting contract) for each of
+    `inputs`. `args` are passed to each call unchanged, e.g. the pool parameters.
+
+    Example: measure_gas(gyro_three_math_gas_testing.measureCalculateInvariant, balances, root3Alpha).percentiles()
+    """
+    results: list = []
+    gas: list = []
+    chunk_size = min(INITIAL_CHUNK_SIZE, max_chunk_size)
+    max_gas_per_input = 0
+    start = 0
+    while start < len(inputs):
+        chunk = list(inputs[start : start + chunk_size])
+        chunk_results, chunk_gas = _measure_chunk(function, chunk, args, max_gas)
+        results += chunk_results
+        gas += chunk_gas
+        start += len(chunk)
+
+        max_gas_per_input = max([max_gas_per_input] + chunk_gas)
+        if max_gas_per_input > 0:
+            # The warm-up call counts as well.
+            chunk_size = int(max_gas / (GAS_MARGIN * max_gas_per_input)) - 1
+            chunk_size = max(1, min(chunk_size, max_chunk_size))
+    return GasMeasurement(inputs, results, np.array(gas, dtype=np.int64))
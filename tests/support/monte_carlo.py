@@ -0,0 +1,192 @@
+# Multiprocess Monte Carlo driver for risk and precision studies on the Python pool models.
+#
+# A study says how to draw one scenario from a numpy Generator and how to evaluate it to a dict of float metrics (see
+# MonteCarloStudy). run_monte_carlo() splits the scenarios into chunks, evaluates the chunks in a ProcessPoolExecutor
+# and aggregates the metrics into RunningStats as the chunks complete, so nothing per-scenario is kept in memory.
+#
+# Seeding is per chunk: chunk k draws from SeedSequence(seed, spawn_key=(k,)). The results therefore only depend on
+# (study, seed, chunk_size, n_scenarios) and not on the number of workers or the order in which chunks complete (chunks
+# are merged in index order). After each merged chunk, the state is written to `checkpoint_path` (atomically), and a run
+# with the same arguments resumes from there.
+#
+# Example:
+#
+#     study = TwoCLPRiskStudy(n_steps=100)  # tests/g2clp/risk_study.py
+#     stats = run_monte_carlo(study, 100_000, seed=0, checkpoint_path="data/mc_2clp.json")
+#     print(format_stats(stats))
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from tabulate import tabulate
+
+# Metric value of a scenario that failed, e.g. because the pool reverted. Failures are counted separately.
+FAILED = float("nan")
+
+
+class MonteCarloStudy:
+    """Subclasses must be picklable (e.g. dataclasses defined at module level) since they are sent to the workers."""
+
+    def draw(self, rng: np.random.Generator) -> Any:
+        raise NotImplementedError
+
+    def evaluate(self, scenario) -> Dict[str, float]:
+        raise NotImplementedError
+
+
+@dataclass
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of floats. NaNs are counted as failures and otherwise ignored.
+    Two RunningStats can be merged (Chan et al.), which is how per-chunk results are combined."""
+
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+    n_failed: int = 0
+
+    def push(self, x: float):
+        if math.isnan(x):
+            self.n_failed += 1
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def merge(self, other: RunningStats):
+        self.n_failed += other.n_failed
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+
+def chunk_rng(seed: int, chunk_index: int) -> np.random.Generator:
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+
+def evaluate_chunk(
+    study: MonteCarloStudy, seed: int, chunk_index: int, n_scenarios: int
+) -> Dict[str, RunningStats]:
+    rng = chunk_rng(seed, chunk_index)
+    stats: Dict[str, RunningStats] = {}
+    for _ in range(n_scenarios):
+        metrics = study.evaluate(study.draw(rng))
+        for name, value in metrics.items():
+            stats.setdefault(name, RunningStats()).push(float(value))
+    return stats
+
+
+def _merge_into(total: Dict[str, RunningStats], chunk: Dict[str, RunningStats]):
+    for name, stats in chunk.items():
+        total.setdefault(name, RunningStats()).merge(stats)
+
+
+def _load_checkpoint(path: str, config: dict) -> tuple[int, Dict[str, RunningStats]]:
+    if not os.path.exists(path):
+        return 0, {}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["config"] != config:
+        raise ValueError(
+            f"Checkpoint {path} is for {checkpoint['config']}, not {config}. Delete it to start over."
+        )
+    stats = {name: RunningStats(**s) for name, s in checkpoint["stats"].items()}
+    return checkpoint["n_chunks_done"], stats
+
+
+def _save_checkpoint(path: str, config: dict, n_chunks_done: int, stats: Dict[str, RunningStats]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            dict(
+                config=config,
+                n_chunks_done=n_chunks_done,
+                stats={name: asdict(s) for name, s in stats.items()},
+            ),
+            f,
+        )
+    os.replace(tmp_path, path)
+
+
+def run_monte_carlo(
+    study: MonteCarloStudy,
+    n_scenarios: int,
+    seed: int = 0,
+    chunk_size: int = 100,
+    max_workers: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    max_chunks: Optional[int] = None,
+) -> Dict[str, RunningStats]:
+    """Statistics of each metric of `study` over `n_scenarios` scenarios. `max_workers=0` evaluates in this process
+    (useful for debugging and profiling). `max_chunks` stops after that many chunks of this call, e.g. to spread a
+    long study over several jobs via the checkpoint."""
+    n_chunks = -(-n_scenarios // chunk_size)
+    config = dict(study=repr(study), n_scenarios=n_scenarios, seed=seed, chunk_size=chunk_size)
+    n_done, total = 0, {}
+    if checkpoint_path is not None:
+        n_done, total = _load_checkpoint(checkpoint_path, config)
+    todo = list(range(n_done, n_chunks))
+    if max_chunks is not None:
+        todo = todo[:max_chunks]
+
+    def chunk_length(k):
+        return min(chunk_size, n_scenarios - k * chunk_size)
+
+    def merged(k, chunk_stats):
+        _merge_into(total, chunk_stats)
+        if checkpoint_path is not None:
+            _save_checkpoint(checkpoint_path, config, k + 1, total)
+
+    if max_workers == 0:
+        for k in todo:
+            merged(k, evaluate_chunk(study, seed, k, chunk_length(k)))
+        return total
+
+    # Chunks are merged in index order, so we hold back the ones that complete early.
+    completed: Dict[int, Dict[str, RunningStats]] = {}
+    next_to_merge = todo[0] if todo else n_chunks
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(evaluate_chunk, study, seed, k, chunk_length(k)): k for k in todo
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                completed[futures[future]] = future.result()
+            while next_to_merge in completed:
+                merged(next_to_merge, completed.pop(next_to_merge))
+                next_to_merge += 1
+    return total
+
+
+def format_stats(stats: Dict[str, RunningStats]) -> str:
+    rows: List[list] = [
+        [name, s.n, s.n_failed, s.mean, s.std, s.min, s.max] for name, s in sorted(stats.items())
+    ]
+    return tabulate(rows, headers=["metric", "n", "failed", "mean", "std", "min", "max"])
@@ -0,0 +1,448 @@
+"""Python model of the Balancer pool price oracle: the packed samples of libraries/Samples.sol in the 1024-slot ring
+buffer of Buffer.sol, the writes of PoolPriceOracle._processPriceData() and the reads of QueryProcessor.sol.
+
+Samples are kept bit-packed exactly as in storage: each entry of PriceOracle.samples is the 256-bit sample word as
+four little-endian uint64 limbs (SAMPLE_DTYPE), and the fields are decoded with shifts and masks (sign-extending the
+int22 / int53 fields like WordCodec). sample_word() gives the word as an int, for comparing with the contract's
+storage.
+
+There are two versions of the operations:
+
+- process_price_data() and get_past_accumulator() / get_time_weighted_average() follow the Solidity code step by step
+  (including the binary search of findNearestSample()). They are the reference.
+- ingest() and get_past_accumulators() / get_time_weighted_averages() do the same in bulk: ingest() takes the
+  (timestamp, log values) of many oracle updates at once and only writes the samples that survive in the buffer, and
+  the queries take arrays of `ago` (and `secs`) and look up all of them with one np.searchsorted().
+
+Everything up to the log-average is integer math with the contract's truncating divisions and the wrapping of the
+accumulators to 53 bits, so it is exact. from_low_res_log() / to_low_res_log() use Decimal exp / ln instead of
+LogExpMath, which is itself only accurate to about 1e-18 relative, so the final averages can differ from the
+contract's in the last digits.
+
+Values are as in the contract: log values are LogCompression low-resolution logs (4 decimals) and timestamps are
+seconds. Like the pools, the model assumes that there is at most one update per block and that timestamps don't
+decrease.
+"""
+
+import decimal
+from enum import IntEnum
+from typing import Dict, Sequence, Union
+
+import numpy as np
+
+from tests.support.pool_simulator import PoolRevert
+
+BUFFER_SIZE = 1024
+MAX_SAMPLE_DURATION = 120  # PoolPriceOracle._MAX_SAMPLE_DURATION
+LOG_COMPRESSION_FACTOR = 10**14
+HALF_LOG_COMPRESSION_FACTOR = LOG_COMPRESSION_FACTOR // 2
+
+ORACLE_INVALID_SECONDS_QUERY = "ORACLE_INVALID_SECONDS_QUERY"
+ORACLE_NOT_INITIALIZED = "ORACLE_NOT_INITIALIZED"
+ORACLE_QUERY_TOO_OLD = "ORACLE_QUERY_TOO_OLD"
+ORACLE_BAD_SECS = "ORACLE_BAD_SECS"
+
+# The 256-bit sample word, least significant limb first.
+SAMPLE_DTYPE = np.dtype([("word", "<u8", (4,))])
+
+ArrayLike = Union[int, Sequence[int], np.ndarray]
+
+
+class Variable(IntEnum):
+    PAIR_PRICE = 0
+    BPT_PRICE = 1
+    INVARIANT = 2
+
+
+# (offset, bits) of the fields, as in Samples.sol.
+TIMESTAMP_FIELD = (0, 31)
+INSTANT_FIELDS = {
+    Variable.PAIR_PRICE: (234, 22),
+    Variable.BPT_PRICE: (159, 22),
+    Variable.INVARIANT: (84, 22),
+}
+ACCUMULATOR_FIELDS = {
+    Variable.PAIR_PRICE: (181, 53),
+    Variable.BPT_PRICE: (106, 53),
+    Variable.INVARIANT: (31, 53),
+}
+
+
+# Packing
+
+
+def decode_field(
+    samples: np.ndarray, offset: int, bits: int, signed: bool = True
+) -> np.ndarray:
+    """The field at `offset` of each sample, as int64 (sign-extended if `signed`)."""
+    words = samples["word"]
+    limb, shift = divmod(offset, 64)
+    value = words[..., limb] >> np.uint64(shift)
+    if shift + bits > 64:
+        value |= words[..., limb + 1] << np.uint64(64 - shift)
+    value &= np.uint64((1 << bits) - 1)
+    value = value.astype(np.int64)
+    if signed:
+        value -= (value >> (bits - 1)) << bits
+    return value
+
+
+def _encode_field(words: np.ndarray, values: np.ndarray, offset: int, bits: int):
+    """ORs `values` (masked to `bits` bits, i.e., two's complement for negative values) into `words` at `offset`."""
+    value = np.asarray(values, dtype=np.int64).astype(np.uint64) & np.uint64(
+        (1 << bits) - 1
+    )
+    limb, shift = divmod(offset, 64)
+    words[..., limb] |= value << np.uint64(shift)
+    if shift + bits > 64:
+        words[..., limb + 1] |= value >> np.uint64(64 - shift)
+
+
+def pack(
+    inst_log_pair_price: ArrayLike,
+    acc_log_pair_price: ArrayLike,
+    inst_log_bpt_price: ArrayLike,
+    acc_log_bpt_price: ArrayLike,
+    inst_log_invariant: ArrayLike,
+    acc_log_invariant: ArrayLike,
+    timestamp: ArrayLike,
+) -> np.ndarray:
+    """Samples.pack(), element-wise."""
+    fields = np.broadcast_arrays(
+        *map(
+            np.asarray,
+            (
+                inst_log_pair_price,
+                acc_log_pair_price,
+                inst_log_bpt_price,
+                acc_log_bpt_price,
+                inst_log_invariant,
+                acc_log_invariant,
+                timestamp,
+            ),
+        )
+    )
+    samples = np.zeros(fields[0].shape, dtype=SAMPLE_DTYPE)
+    words = samples["word"]
+    for variable, inst, acc in zip(Variable, fields[0:6:2], fields[1:6:2]):
+        _encode_field(words, inst, *INSTANT_FIELDS[variable])
+        _encode_field(words, acc, *ACCUMULATOR_FIELDS[variable])
+    _encode_field(words, fields[6], *TIMESTAMP_FIELD)
+    return samples
+
+
+def timestamps(samples: np.ndarray) -> np.ndarray:
+    return decode_field(samples, *TIMESTAMP_FIELD, signed=False)
+
+
+def instant(samples: np.ndarray, variable: Variable) -> np.ndarray:
+    return decode_field(samples, *INSTANT_FIELDS[variable])
+
+
+def accumulator(samples: np.ndarray, variable: Variable) -> np.ndarray:
+    return decode_field(samples, *ACCUMULATOR_FIELDS[variable])
+
+
+def unpack(samples: np.ndarray) -> Dict[str, np.ndarray]:
+    """Samples.unpack(), with the names of its return values."""
+    return dict(
+        logPairPrice=instant(samples, Variable.PAIR_PRICE),
+        accLogPairPrice=accumulator(samples, Variable.PAIR_PRICE),
+        logBptPrice=instant(samples, Variable.BPT_PRICE),
+        accLogBptPrice=accumulator(samples, Variable.BPT_PRICE),
+        logInvariant=instant(samples, Variable.INVARIANT),
+        accLogInvariant=accumulator(samples, Variable.INVARIANT),
+        timestamp=timestamps(samples),
+    )
+
+
+def sample_word(sample: np.ndarray) -> int:
+    """The sample as a 256-bit integer (the bytes32 in storage)."""
+    return sum(int(limb) << (64 * i) for i, limb in enumerate(sample["word"]))
+
+
+def sample_from_word(word: int) -> np.ndarray:
+    sample = np.zeros((), dtype=SAMPLE_DTYPE)
+    sample["word"] = [(word >> (64 * i)) & (2**64 - 1) for i in range(4)]
+    return sample
+
+
+# LogCompression
+
+
+def to_low_res_log(value: int) -> int:
+    """LogCompression.toLowResLog() for an 18-decimal value."""
+    with decimal.localcontext() as ctx:
+        ctx.prec = 60
+        ln = int((decimal.Decimal(value) / 10**18).ln() * 10**18)
+    ln_with_error = (
+        ln + HALF_LOG_COMPRESSION_FACTOR if ln > 0 else ln - HALF_LOG_COMPRESSION_FACTOR
+    )
+    return _div_trunc(ln_with_error, LOG_COMPRESSION_FACTOR)
+
+
+def from_low_res_log(value: int) -> int:
+    """LogCompression.fromLowResLog(), as an 18-decimal value."""
+    with decimal.localcontext() as ctx:
+        ctx.prec = 60
+        return int((decimal.Decimal(int(value)) / 10**4).exp() * 10**18)
+
+
+def _div_trunc(a, b):
+    """Solidity's signed division (rounding towards zero), for ints or object arrays of ints."""
+    q = abs(a) // abs(b)
+    return (
+        np.where((a < 0) != (b < 0), -q, q)
+        if isinstance(q, np.ndarray)
+        else (-q if (a < 0) != (b < 0) else q)
+    )
+
+
+# The oracle
+
+
+class PriceOracle:
+    """The oracle state of one pool: the sample buffer, the index of the latest sample and the creation timestamp of
+    the latest sample (the `oracleIndex` and `oracleSampleCreationTimestamp` of the pool's misc data).
+    """
+
+    def __init__(self):
+        self.samples = np.zeros(BUFFER_SIZE, dtype=SAMPLE_DTYPE)
+        self.latest_index = 0
+        self.sample_creation_timestamp = 0
+
+    # Writes
+
+    def process_price_data(
+        self,
+        timestamp: int,
+        log_pair_price: int,
+        log_bpt_price: int,
+        log_invariant: int,
+    ):
+        """PoolPriceOracle._processPriceData() together with the index / creation timestamp bookkeeping of the pool's
+        _updateOracle(), at block.timestamp = `timestamp`."""
+        sample = self.samples[self.latest_index]
+        elapsed = timestamp - int(timestamps(sample))
+        values = (log_pair_price, log_bpt_price, log_invariant)
+        accumulators = [
+            int(accumulator(sample, variable)) + value * elapsed
+            for variable, value in zip(Variable, values)
+        ]
+        new_sample = timestamp - self.sample_creation_timestamp >= MAX_SAMPLE_DURATION
+        if new_sample:
+            self.latest_index = (self.latest_index + 1) % BUFFER_SIZE
+            self.sample_creation_timestamp = timestamp
+        self.samples[self.latest_index] = pack(
+            values[0],
+            accumulators[0],
+            values[1],
+            accumulators[1],
+            values[2],
+            accumulators[2],
+            timestamp,
+        )
+
+    def ingest(
+        self,
+        timestamps_: ArrayLike,
+        log_pair_prices: ArrayLike,
+        log_bpt_prices: ArrayLike,
+        log_invariants: ArrayLike,
+    ):
+        """Same as process_price_data() for each update in order, but vectorized."""
+        ts = np.asarray(timestamps_, dtype=np.int64)
+        if len(ts) == 0:
+            return
+        values = [
+            np.asarray(v, dtype=np.int64)
+            for v in (log_pair_prices, log_bpt_prices, log_invariants)
+        ]
+        latest = self.samples[self.latest_index]
+
+        # Every update adds value * elapsed to the accumulators of the latest sample, so the accumulators are
+        # cumulative sums, whichever slot they end up in. int64 wraps around, which is fine since we only keep 53 bits.
+        elapsed = np.diff(ts, prepend=timestamps(latest))
+        with np.errstate(over="ignore"):
+            accumulators = [
+                accumulator(latest, variable) + np.cumsum(value * elapsed)
+                for variable, value in zip(Variable, values)
+            ]
+
+        # Which updates start a new sample. Each one is the first update at least MAX_SAMPLE_DURATION after the
+        # previous one, so we jump from one to the next.
+        new_sample = np.zeros(len(ts), dtype=bool)
+        creation = self.sample_creation_timestamp
+        k = 0
+        while True:
+            k = int(np.searchsorted(ts[k:], creation + MAX_SAMPLE_DURATION)) + k
+            if k == len(ts):
+                break
+            new_sample[k] = True
+            creation = int(ts[k])
+        groups = np.cumsum(new_sample)
+
+        # The slot of a group holds its last update. Only the last BUFFER_SIZE groups are still in the buffer.
+        last_in_group = np.nonzero(np.append(groups[1:] != groups[:-1], True))[0][
+            -BUFFER_SIZE:
+        ]
+        slots = (self.latest_index + groups[last_in_group]) % BUFFER_SIZE
+        self.samples[slots] = pack(
+            values[0][last_in_group],
+            accumulators[0][last_in_group],
+            values[1][last_in_group],
+            accumulators[1][last_in_group],
+            values[2][last_in_group],
+            accumulators[2][last_in_group],
+            ts[last_in_group],
+        )
+        self.latest_index = int(slots[-1])
+        self.sample_creation_timestamp = creation
+
+    # Reads, as in QueryProcessor
+
+    def get_instant_value(self, variable: Variable, index: int) -> int:
+        sample = self.samples[index]
+        if timestamps(sample) == 0:
+            raise PoolRevert(ORACLE_NOT_INITIALIZED)
+        return from_low_res_log(int(instant(sample, variable)))
+
+    def get_latest(self, variable: Variable) -> int:
+        return self.get_instant_value(variable, self.latest_index)
+
+    def get_time_weighted_average(
+        self, variable: Variable, ago: int, secs: int, now: int
+    ) -> int:
+        """The average over the `secs` seconds that ended `ago` seconds before block.timestamp = `now`."""
+        if secs == 0:
+            raise PoolRevert(ORACLE_BAD_SECS)
+        begin = self.get_past_accumulator(variable, ago + secs, now)
+        end = self.get_past_accumulator(variable, ago, now)
+        return from_low_res_log(_div_trunc(end - begin, secs))
+
+    def get_past_accumulator(self, variable: Variable, ago: int, now: int) -> int:
+        if now < ago:
+            raise PoolRevert(ORACLE_INVALID_SECONDS_QUERY)
+        look_up_time = now - ago
+
+        latest_sample = self.samples[self.latest_index]
+        latest_timestamp = int(timestamps(latest_sample))
+        if latest_timestamp == 0:
+            raise PoolRevert(ORACLE_NOT_INITIALIZED)
+
+        if latest_timestamp <= look_up_time:
+            elapsed = look_up_time - latest_timestamp
+            return (
+                int(accumulator(latest_sample, variable))
+                + int(instant(latest_sample, variable)) * elapsed
+            )
+
+        oldest_index = (self.latest_index + 1) % BUFFER_SIZE
+        oldest_timestamp = int(timestamps(self.samples[oldest_index]))
+        if oldest_timestamp > 0:
+            buffer_length = BUFFER_SIZE
+        else:
+            buffer_length = oldest_index
+            oldest_index = 0
+            oldest_timestamp = int(timestamps(self.samples[0]))
+        if oldest_timestamp > look_up_time:
+            raise PoolRevert(ORACLE_QUERY_TOO_OLD)
+
+        prev, next_ = self.find_nearest_sample(
+            look_up_time, oldest_index, buffer_length
+        )
+        samples_time_diff = int(timestamps(next_)) - int(timestamps(prev))
+        prev_acc = int(accumulator(prev, variable))
+        if samples_time_diff > 0:
+            samples_acc_diff = int(accumulator(next_, variable)) - prev_acc
+            elapsed = look_up_time - int(timestamps(prev))
+            return prev_acc + _div_trunc(samples_acc_diff * elapsed, samples_time_diff)
+        return prev_acc
+
+    def find_nearest_sample(
+        self, look_up_date: int, offset: int, length: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        low, high = 0, length - 1
+        while low <= high:
+            mid_without_offset = (high + low) // 2
+            mid = (mid_without_offset + offset) % BUFFER_SIZE
+            sample = self.samples[mid]
+            sample_timestamp = int(timestamps(sample))
+            if sample_timestamp < look_up_date:
+                low = mid_without_offset + 1
+            elif sample_timestamp > look_up_date:
+                high = mid_without_offset - 1
+            else:
+                return sample, sample
+        if sample_timestamp < look_up_date:
+            return sample, self.samples[(mid + 1) % BUFFER_SIZE]
+        return self.samples[(mid - 1) % BUFFER_SIZE], sample
+
+    # Vectorized reads
+
+    def _chronological(self) -> np.ndarray:
+        """The samples in the buffer, oldest first, as seen by getPastAccumulator()."""
+        oldest_index = (self.latest_index + 1) % BUFFER_SIZE
+        if timestamps(self.samples[oldest_index]) > 0:
+            return np.roll(self.samples, -oldest_index)
+        return self.samples[: self.latest_index + 1]
+
+    def get_past_accumulators(
+        self, variable: Variable, agos: ArrayLike, now: int
+    ) -> np.ndarray:
+        """get_past_accumulator() for each of `agos`, as an object array of ints. Raises if any of them would revert."""
+        agos = np.asarray(agos, dtype=np.int64)
+        if np.any(agos > now):
+            raise PoolRevert(ORACLE_INVALID_SECONDS_QUERY)
+        look_up_times = now - agos
+
+        samples = self._chronological()
+        ts = timestamps(samples)
+        accs = accumulator(samples, variable).astype(object)
+        latest_timestamp = ts[-1]
+        if latest_timestamp == 0:
+            raise PoolRevert(ORACLE_NOT_INITIALIZED)
+
+        future = look_up_times >= latest_timestamp
+        if np.any(look_up_times[~future] < ts[0]):
+            raise PoolRevert(ORACLE_QUERY_TOO_OLD)
+
+        result = np.empty(len(look_up_times), dtype=object)
+        result[future] = accs[-1] + int(instant(samples[-1], variable)) * (
+            look_up_times[future] - latest_timestamp
+        ).astype(object)
+
+        past = ~future
+        look_up = look_up_times[past]
+        nxt = np.searchsorted(ts, look_up)
+        exact = ts[nxt] == look_up
+        prev = np.where(exact, nxt, nxt - 1)
+        time_diff = (ts[nxt] - ts[prev]).astype(object)
+        interpolated = accs[prev] + _div_trunc(
+            (accs[nxt] - accs[prev]) * (look_up - ts[prev]).astype(object),
+            np.where(exact, 1, time_diff),
+        )
+        result[past] = np.where(exact, accs[prev], interpolated)
+        return result
+
+    def log_time_weighted_averages(
+        self, variable: Variable, agos: ArrayLike, secs: ArrayLike, now: int
+    ) -> np.ndarray:
+        """The averages of the low-resolution log over the windows (ago, secs), before fromLowResLog()."""
+        agos, secs = np.broadcast_arrays(
+            np.asarray(agos, dtype=np.int64), np.asarray(secs, dtype=np.int64)
+        )
+        if np.any(secs == 0):
+            raise PoolRevert(ORACLE_BAD_SECS)
+        begin = self.get_past_accumulators(variable, agos + secs, now)
+        end = self.get_past_accumulators(variable, agos, now)
+        return _div_trunc(end - begin, secs.astype(object)).astype(np.int64)
+
+    def get_time_weighted_averages(
+        self, variable: Variable, agos: ArrayLike, secs: ArrayLike, now: int
+    ) -> list[int]:
+        """get_time_weighted_average() for each window (ago, secs)."""
+        return [
+            from_low_res_log(v)
+            for v in self.log_time_weighted_averages(variable, agos, secs, now)
+        ]
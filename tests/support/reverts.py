@@ -0,0 +1,37 @@
+# Revert checks that work for the math testing contracts both on the node and in the in-process EVM.
+#
+# On the node, a reverting call raises brownie's VirtualMachineError, with the revert string in `revert_msg`. With
+# --inprocess-evm, the math testing fixtures are InProcessContracts, and a revert raises PoolRevert, with the revert
+# string in `reason`, like the python ports in tests/libraries. Use `reverts` from here instead of brownie's in tests
+# that call math testing contracts, and outcome() to compare the results or revert strings of a contract and a port.
+
+from contextlib import contextmanager
+from typing import Optional
+
+from brownie.exceptions import VirtualMachineError
+from brownie.test.managers.runner import RevertContextManager
+
+from tests.libraries.fixed_point_int import PoolRevert
+
+
+@contextmanager
+def reverts(revert_msg: Optional[str] = None):
+    """brownie.reverts() that also accepts PoolRevert. With revert_msg=None, any revert string is accepted."""
+    try:
+        with RevertContextManager(revert_msg):
+            yield
+    except PoolRevert as e:
+        # brownie's context manager re-raises any exception other than VirtualMachineError.
+        if revert_msg is not None and e.reason != revert_msg:
+            raise AssertionError(f"Unexpected revert string '{e.reason}'") from e
+
+
+def outcome(f, *args):
+    """f(*args), or the revert string if it reverts: on the node (VirtualMachineError), in an InProcessContract or in a
+    python port (PoolRevert). Any other exception propagates."""
+    try:
+        return f(*args)
+    except VirtualMachineError as e:
+        return e.revert_msg
+    except PoolRevert as e:
+        return e.reason
@@ -0,0 +1,288 @@
+"""Smart order router over a set of Gyro pool simulators.
+
+Given pools (PoolSimulator instances with token names), route() splits an exact amount in of one token across all
+paths of up to `max_hops` pools to another token so as to maximize the total amount out, and then computes the exact
+amounts by executing the split on copies of the simulators. With execute=True, the resulting states are then written
+back to the simulators, but only if every swap succeeded, so a failing route leaves all pools unchanged.
+
+The optimization is done in float on swap models of the pools (see swap_models.py): the amount out of a swap as a
+function of the amount in, with its first and second derivative, which are the marginal price and price impact
+formulas used by the external SOR (see eclp_derivatives_array.py for the ECLP and ConstantProductSwapModel for the 2CLP
+and 3CLP, whose curves are constant product on virtual reserves). A path composes the models of its pools. The amount
+out of a path is concave in the amount in, so the optimal split equalizes the marginal rates lam of all paths that are
+used:
+
+    maximize sum_i out_i(x_i)  s.t.  sum_i x_i = amount_in, 0 <= x_i <= x_max_i
+
+For a given lam, each path's x_i(lam) solves out_i'(x) = lam (safeguarded Newton), and we solve sum_i x_i(lam) =
+amount_in for lam by Newton's method with dx_i/dlam = 1 / out_i''(x_i), falling back to bisection. The initial split
+is proportional to the normalized liquidity of the paths, and the router remembers lam per token pair as a warm start
+for the next trade.
+
+Paths are treated as independent. If two paths share a pool, the optimization overestimates what they get, but the
+exact amounts returned by route() account for it since the paths are executed one after the other.
+
+Amounts are in token units (raw amount / 10**decimals) in the models and raw integers in the Route.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from tests.support.pool_simulator import PoolRevert, PoolSimulator
+from tests.support.swap_models import SwapModel
+
+
+class Hop(NamedTuple):
+    pool: str
+    i_in: int
+    i_out: int
+
+
+class PathModel:
+    """Composition of the swap models of the hops of a path."""
+
+    def __init__(self, hops: Sequence[Hop], models: Sequence[SwapModel]):
+        self.hops = tuple(hops)
+        self.models = list(models)
+        self.x_max = self._max_in()
+
+    def _max_in(self) -> float:
+        """Largest amount in such that no hop exceeds its own limit."""
+        x_max = self.models[0].x_max
+        for k in range(1, len(self.models)):
+            if self._out(x_max, k) <= self.models[k].x_max:
+                continue
+            # The amount into hop k is increasing in x, so we can bisect.
+            lo, hi = 0.0, x_max
+            for _ in range(100):
+                mid = (lo + hi) / 2
+                if self._out(mid, k) <= self.models[k].x_max:
+                    lo = mid
+                else:
+                    hi = mid
+            x_max = lo
+        return x_max
+
+    def _out(self, x: float, n_hops: int) -> float:
+        for model in self.models[:n_hops]:
+            x = model.out(x)
+        return x
+
+    def out(self, x: float) -> float:
+        return self._out(x, len(self.models))
+
+    def derivatives(self, x: float) -> Tuple[float, float]:
+        """(out'(x), out''(x)) by the chain rule."""
+        d1, d2 = 1.0, 0.0
+        for model in self.models:
+            m1, m2 = model.d_out(x), model.d2_out(x)
+            d1, d2 = m1 * d1, m2 * d1 * d1 + m1 * d2
+            x = model.out(x)
+        return d1, d2
+
+    def normalized_liquidity(self) -> float:
+        """0.5 / (derivative of the effective price x / out(x) at 0) = out'(0)^2 / -out''(0). For one hop, this is the
+        normalized liquidity of its model."""
+        if len(self.models) == 1:
+            return self.models[0].normalized_liquidity()
+        d1, d2 = self.derivatives(0.0)
+        return d1 * d1 / -d2 if d2 < 0 else math.inf
+
+    def amount_for_rate(self, lam: float, x0: float) -> float:
+        """The amount in x in [0, x_max] where out'(x) = lam, starting from x0."""
+        if self.derivatives(0.0)[0] <= lam:
+            return 0.0
+        if math.isfinite(self.x_max) and self.derivatives(self.x_max)[0] >= lam:
+            return self.x_max
+        lo, hi = 0.0, self.x_max
+        x = min(max(x0, lo), hi) if math.isfinite(hi) else max(x0, lo)
+        for _ in range(100):
+            d1, d2 = self.derivatives(x)
+            if d1 > lam:
+                lo = x
+            else:
+                hi = x
+            x_new = x - (d1 - lam) / d2 if d2 < 0 else math.nan
+            if not (lo < x_new < hi):
+                x_new = (lo + hi) / 2 if math.isfinite(hi) else 2 * x + 1
+            if abs(x_new - x) <= 1e-12 * max(x, 1e-18):
+                return x_new
+            x = x_new
+        return x
+
+
+class PathAmounts(NamedTuple):
+    hops: Tuple[Hop, ...]
+    amount_in: int
+    amount_out: int
+
+
+@dataclass
+class Route:
+    token_in: str
+    token_out: str
+    amount_in: int
+    amount_out: int
+    paths: List[PathAmounts]
+    predicted_amount_out: float  # from the swap models, in token units
+    n_iterations: int
+
+
+class Router:
+    """`pools` maps pool names to (simulator, token names), where the token names are in the simulator's token order."""
+
+    def __init__(
+        self, pools: Dict[str, Tuple[PoolSimulator, Sequence[str]]], max_hops: int = 2
+    ):
+        self.pools = {
+            name: (sim, list(tokens)) for name, (sim, tokens) in pools.items()
+        }
+        self.max_hops = max_hops
+        self._last_rates: Dict[Tuple[str, str], float] = {}
+
+    def token_decimals(self, token: str) -> int:
+        for sim, tokens in self.pools.values():
+            if token in tokens:
+                return sim.token_decimals[tokens.index(token)]
+        raise KeyError(token)
+
+    def find_paths(self, token_in: str, token_out: str) -> List[Tuple[Hop, ...]]:
+        """All paths of at most max_hops pools that don't visit a token or pool twice."""
+        paths = []
+
+        def extend(path: Tuple[Hop, ...], token: str, visited_tokens: set):
+            if token == token_out:
+                paths.append(path)
+                return
+            if len(path) == self.max_hops:
+                return
+            used_pools = {hop.pool for hop in path}
+            for name, (sim, tokens) in self.pools.items():
+                if name in used_pools or token not in tokens:
+                    continue
+                i_in = tokens.index(token)
+                for i_out, next_token in enumerate(tokens):
+                    if i_out != i_in and next_token not in visited_tokens:
+                        extend(
+                            path + (Hop(name, i_in, i_out),),
+                            next_token,
+                            visited_tokens | {next_token},
+                        )
+
+        extend((), token_in, {token_in})
+        return paths
+
+    def path_models(self, token_in: str, token_out: str) -> List[PathModel]:
+        models = []
+        for hops in self.find_paths(token_in, token_out):
+            try:
+                models.append(
+                    PathModel(
+                        hops,
+                        [
+                            self.pools[h.pool][0].swap_model(h.i_in, h.i_out)
+                            for h in hops
+                        ],
+                    )
+                )
+            except PoolRevert:
+                # E.g. the pool is paused or uninitialized.
+                continue
+        return models
+
+    def optimize(
+        self, paths: List[PathModel], amount_in: float, lam0: Optional[float] = None
+    ) -> Tuple[List[float], float, int]:
+        """(split, lam, number of iterations) for the problem in the module docstring."""
+        if amount_in <= 0:
+            return [0.0] * len(paths), lam0, 0
+        total_max = sum(p.x_max for p in paths)
+        if amount_in >= total_max:
+            raise PoolRevert("Amount in exceeds the capacity of all paths")
+        if lam0 is None:
+            # Warm start: split proportionally to liquidity and take the resulting average marginal rate.
+            liquidity = [p.normalized_liquidity() for p in paths]
+            total_liquidity = sum(liquidity)
+            xs = [
+                min(amount_in * l / total_liquidity, p.x_max)
+                for p, l in zip(paths, liquidity)
+            ]
+            lam = sum(p.derivatives(x)[0] * x for p, x in zip(paths, xs)) / amount_in
+        else:
+            lam = lam0
+            xs = [0.0] * len(paths)
+
+        lam_lo, lam_hi = 0.0, max(p.derivatives(0.0)[0] for p in paths)
+        lam = min(max(lam, lam_lo), lam_hi)
+        for iteration in range(1, 101):
+            xs = [p.amount_for_rate(lam, x) for p, x in zip(paths, xs)]
+            excess = sum(xs) - amount_in
+            if abs(excess) <= 1e-12 * amount_in:
+                break
+            # More volume means a lower marginal rate.
+            if excess > 0:
+                lam_lo = lam
+            else:
+                lam_hi = lam
+            slope = sum(
+                1 / p.derivatives(x)[1] for p, x in zip(paths, xs) if 0 < x < p.x_max
+            )
+            lam_new = lam - excess / slope if slope < 0 else math.nan
+            if not (lam_lo < lam_new < lam_hi):
+                lam_new = (lam_lo + lam_hi) / 2
+            lam = lam_new
+        # Distribute the remaining excess (if any) proportionally, so that the split adds up.
+        total = sum(xs)
+        xs = [x * amount_in / total for x in xs]
+        return xs, lam, iteration
+
+    def route(
+        self, token_in: str, token_out: str, amount_in: int, execute: bool = False
+    ) -> Route:
+        """Best split of `amount_in` (raw) of token_in. With execute=True, the swaps are also applied to the pools if
+        they all succeed. A zero amount gives an empty route."""
+        paths = self.path_models(token_in, token_out)
+        if not paths:
+            raise PoolRevert(f"No path from {token_in} to {token_out}")
+        if amount_in == 0:
+            return Route(token_in, token_out, 0, 0, [], 0.0, 0)
+        unit_in = 10 ** self.token_decimals(token_in)
+        split, lam, n_iterations = self.optimize(
+            paths, amount_in / unit_in, self._last_rates.get((token_in, token_out))
+        )
+        self._last_rates[(token_in, token_out)] = lam
+
+        raw_split = [int(x * unit_in) for x in split]
+        # Rounding leftovers go to the largest share.
+        raw_split[max(range(len(split)), key=lambda k: split[k])] += amount_in - sum(
+            raw_split
+        )
+
+        sims = copy.deepcopy({name: sim for name, (sim, _) in self.pools.items()})
+        path_amounts = []
+        for path, x in zip(paths, raw_split):
+            if x == 0:
+                continue
+            amount = x
+            for hop in path.hops:
+                amount = sims[hop.pool].swap_given_in(hop.i_in, hop.i_out, amount)
+            path_amounts.append(PathAmounts(path.hops, x, amount))
+        if execute:
+            # All paths succeeded, so commit the new states. The simulator objects are kept since callers may hold
+            # references to them.
+            for name, sim in sims.items():
+                self.pools[name][0].__dict__.update(sim.__dict__)
+
+        return Route(
+            token_in=token_in,
+            token_out=token_out,
+            amount_in=amount_in,
+            amount_out=sum(p.amount_out for p in path_amounts),
+            paths=path_amounts,
+            predicted_amount_out=sum(p.out(x) for p, x in zip(paths, split)),
+            n_iterations=n_iterations,
+        )
@@ -0,0 +1,222 @@
+# Drives a pool deployed against MockVault and a PoolSimulator through the same random sequence of joins, exits and
+# swaps (and, with a pause manager, pauses and unpauses), and checks after every step that they agree, including the
+# revert reason wherever one of them reverts. Used by tests/*/test_pool_simulator.py, which also run it on pools with
+# a liquidity cap, tokens with fewer than 18 decimals and rate providers.
+#
+# speedup() measures how much faster swaps are in the simulator than through MockVault, for the benchmarks in the same
+# tests.
+
+import time
+
+import numpy as np
+from brownie import reverts
+
+from tests.support.pool_simulator import (
+    ONE,
+    ZERO_ADDRESS,
+    PoolRevert,
+    PoolSimulator,
+)
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import CallJoinPoolGyroParams, SwapKind, SwapRequest
+
+PROTOCOL_SWAP_FEE_PERC_KEY = b"PROTOCOL_SWAP_FEE_PERC".ljust(32, b"\0")
+
+ACTIONS = ("join", "exit", "swap_given_in", "swap_given_out")
+PAUSE_ACTIONS = ("pause", "unpause")
+
+
+class VaultDriver:
+    """Calls into MockVault the way the Balancer vault would, fixing up the balances where MockVault doesn't."""
+
+    def __init__(self, vault, pool, tokens):
+        self.vault = vault
+        self.pool = pool
+        self.tokens = tokens
+        self.pool_id = pool.getPoolId()
+
+    @property
+    def balances(self) -> list[int]:
+        return list(self.vault.getPoolTokens(self.pool_id)[1])
+
+    def _join(self, user, amounts_in, bpt_out) -> list[int]:
+        tx = self.vault.callJoinPoolGyro(
+            CallJoinPoolGyroParams(
+                self.pool.address,
+                self.pool_id,
+                user,
+                user,
+                self.balances,
+                0,
+                0,
+                amounts_in,
+                bpt_out,
+            ),
+            {"from": user},
+        )
+        return list(tx.events["PoolBalanceChanged"]["deltas"])
+
+    def initialize(self, user, amounts_in) -> list[int]:
+        return self._join(user, amounts_in, 0)
+
+    def join(self, user, bpt_out: int) -> list[int]:
+        return self._join(user, [0] * len(self.tokens), bpt_out)
+
+    def exit(self, user, bpt_in: int) -> list[int]:
+        tx = self.vault.callExitPoolGyro(
+            self.pool.address, self.pool_id, user, user, self.balances, 0, 0, bpt_in, {"from": user}
+        )
+        return list(tx.events["PoolBalanceChanged"]["deltas"])
+
+    def swap(self, user, kind: int, i_in: int, i_out: int, amount: int) -> int:
+        balances = self.balances
+        request = SwapRequest(
+            kind=kind,
+            tokenIn=self.tokens[i_in].address,
+            tokenOut=self.tokens[i_out].address,
+            amount=amount,
+            poolId=self.pool_id,
+            lastChangeBlock=0,
+            from_aux=user,
+            to=user,
+            userData=(0).to_bytes(32, "big"),
+        )
+        tx = self.vault.callMinimalGyroPoolSwap(
+            self.pool.address, request, balances[i_in], balances[i_out], {"from": user}
+        )
+        result = tx.events["Swap"][0]["amount"]
+        if kind == SwapKind.GivenOut:
+            # MockVault books every swap as GIVEN_IN.
+            balances[i_in] += result
+            balances[i_out] -= amount
+            self.vault.updateBalances(self.pool_id, balances, {"from": user})
+        return result
+
+
+def random_action(
+    rng: np.random.Generator, n_tokens: int, n_users: int, actions=ACTIONS
+):
+    """(action, user index, token in, token out, fraction)"""
+    i_in = int(rng.integers(n_tokens))
+    i_out = (i_in + int(rng.integers(1, n_tokens))) % n_tokens
+    fraction = D(float(np.exp(rng.uniform(np.log(1e-4), np.log(0.5)))))
+    return actions[rng.integers(len(actions))], int(rng.integers(n_users)), i_in, i_out, fraction
+
+
+def _apply(target, action, user, holder, i_in, i_out, amount):
+    if action == "join":
+        return target.join(user if holder is None else holder, amount)
+    if action == "exit":
+        return target.exit(user if holder is None else holder, amount)
+    if holder is None:
+        kind = SwapKind.GivenIn if action == "swap_given_in" else SwapKind.GivenOut
+        return target.swap(user, kind, i_in, i_out, amount)
+    return getattr(target, action)(i_in, i_out, amount)
+
+
+def assert_same_state(driver: VaultDriver, sim: PoolSimulator, users):
+    pool = driver.pool
+    pairs = [
+        (driver.balances, sim.balances),
+        (pool.totalSupply(), sim.total_supply),
+        (pool.getLastInvariant(), sim.last_invariant),
+        ([pool.balanceOf(u) for u in users], [sim.bpt_balance(str(u)) for u in users]),
+        (pool.balanceOf(ZERO_ADDRESS), sim.bpt_balance(ZERO_ADDRESS)),
+        (pool.getPausedState()[0], sim.paused),
+    ]
+    for chain_value, sim_value in pairs:
+        assert_matches(chain_value, sim_value)
+
+
+def assert_matches(chain_value, sim_value):
+    if isinstance(chain_value, (list, tuple)):
+        assert len(chain_value) == len(sim_value)
+        for c, s in zip(chain_value, sim_value):
+            assert_matches(c, s)
+    else:
+        assert chain_value == sim_value
+
+
+def run_conformance(
+    driver: VaultDriver,
+    sim: PoolSimulator,
+    users,
+    initial_amounts: list[int],
+    seed: int,
+    n_steps: int = 20,
+    pause_manager=None,
+):
+    """Runs `n_steps` random actions on both and requires exact agreement. With `pause_manager`, the actions also
+    include pausing and unpausing the pool."""
+    rng = np.random.default_rng(seed)
+    actions = ACTIONS if pause_manager is None else ACTIONS + PAUSE_ACTIONS
+
+    assert_matches(
+        driver.initialize(users[0], initial_amounts),
+        sim.initialize(str(users[0]), initial_amounts),
+    )
+    assert_same_state(driver, sim, users)
+
+    for _ in range(n_steps):
+        action, user_ix, i_in, i_out, fraction = random_action(
+            rng, sim.n_tokens, len(users), actions
+        )
+        user = users[user_ix]
+        if action in PAUSE_ACTIONS:
+            getattr(driver.pool, action)({"from": pause_manager})
+            sim.paused = action == "pause"
+            assert_same_state(driver, sim, users)
+            continue
+        if action == "join":
+            amount = int(D(sim.total_supply) * fraction)
+        elif action == "exit":
+            amount = int(D(sim.bpt_balance(str(user))) * fraction)
+        elif action == "swap_given_in":
+            amount = int(D(sim.balances[i_in]) * fraction)
+        else:
+            amount = int(D(sim.balances[i_out]) * fraction)
+        if amount == 0:
+            continue
+
+        try:
+            sim_result = _apply(sim, action, user, str(user), i_in, i_out, amount)
+        except PoolRevert as e:
+            with reverts(e.reason):
+                _apply(driver, action, user, None, i_in, i_out, amount)
+        else:
+            chain_result = _apply(driver, action, user, None, i_in, i_out, amount)
+            assert_matches(chain_result, sim_result)
+        assert_same_state(driver, sim, users)
+
+
+def set_protocol_swap_fee(gyro_config, fee: int = ONE // 2):
+    gyro_config.setUint(PROTOCOL_SWAP_FEE_PERC_KEY, fee)
+
+
+def swap_seconds(target, user, amount: int, n_swaps: int = 20) -> float:
+    """Average time of a given-in swap of `amount` back and forth between tokens 0 and 1, on a VaultDriver (a
+    transaction through MockVault) or a PoolSimulator."""
+    start = time.perf_counter()
+    for k in range(n_swaps):
+        i_in = k % 2
+        if isinstance(target, VaultDriver):
+            target.swap(user, SwapKind.GivenIn, i_in, 1 - i_in, amount)
+        else:
+            target.swap_given_in(i_in, 1 - i_in, amount)
+    return (time.perf_counter() - start) / n_swaps
+
+
+def speedup(
+    driver: VaultDriver,
+    sim: PoolSimulator,
+    user,
+    initial_amounts: list[int],
+    amount: int,
+) -> float:
+    """Time per swap of `amount` through MockVault over the time per swap in the simulator, after initializing both
+    with `initial_amounts`."""
+    driver.initialize(user, initial_amounts)
+    sim.initialize(str(user), initial_amounts)
+    return swap_seconds(driver, user, amount) / swap_seconds(
+        sim, str(user), amount, n_swaps=200
+    )
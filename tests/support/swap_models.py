@@ -0,0 +1,77 @@
+"""Float models of the swap curves of the pools, for routing (see router.py) and other analytics where we need the
+amount out of a swap and its derivatives in closed form. Get one from PoolSimulator.swap_model()."""
+
+import math
+
+# Fraction of the maximum input of a pool that we allow, so that rounding in the exact execution doesn't take us past
+# the pool's price bounds.
+MAX_IN_MARGIN = 1e-9
+
+
+class SwapModel:
+    """Amount out as a function of the amount in x (fees included), for 0 <= x <= x_max, in float. Subclasses implement
+    the pool type specific curve."""
+
+    x_max: float
+
+    def out(self, x: float) -> float:
+        raise NotImplementedError
+
+    def d_out(self, x: float) -> float:
+        """Marginal rate: units of the token out per unit of the token in, fees included."""
+        raise NotImplementedError
+
+    def d2_out(self, x: float) -> float:
+        """Derivative of the marginal rate, <= 0."""
+        raise NotImplementedError
+
+    def normalized_liquidity(self) -> float:
+        """0.5 / (derivative of the effective price in the limit x -> 0), as in the SOR."""
+        raise NotImplementedError
+
+
+class ConstantProductSwapModel(SwapModel):
+    """(X + f x) (Y - out) = X Y with virtual reserves X = balance_in + virtual offset in, Y = balance_out + virtual
+    offset out and f = 1 - fee. This is the swap curve of the 2CLP and of each pair of tokens in the 3CLP. The amount
+    out is limited by the real balance out."""
+
+    def __init__(self, virtual_in: float, virtual_out: float, balance_out: float, fee: float):
+        self.X, self.Y, self.f = virtual_in, virtual_out, 1 - fee
+        offset_out = virtual_out - balance_out
+        if offset_out <= 0:
+            self.x_max = math.inf
+        else:
+            self.x_max = self.X * balance_out / (self.f * offset_out) * (1 - MAX_IN_MARGIN)
+
+    def out(self, x):
+        return self.Y * self.f * x / (self.X + self.f * x)
+
+    def d_out(self, x):
+        return self.Y * self.X * self.f / (self.X + self.f * x) ** 2
+
+    def d2_out(self, x):
+        return -2 * self.Y * self.X * self.f**2 / (self.X + self.f * x) ** 3
+
+    def normalized_liquidity(self):
+        return self.Y / 2
+
+
+class ScaledSwapModel(SwapModel):
+    """A model on upscaled amounts (18 decimals, including rate providers) seen in token units: with rates r_in and
+    r_out, x token units in are x r_in upscaled units, and y upscaled units out are y / r_out token units."""
+
+    def __init__(self, model: SwapModel, rate_in: float, rate_out: float):
+        self.model, self.rate_in, self.rate_out = model, rate_in, rate_out
+        self.x_max = model.x_max / rate_in
+
+    def out(self, x):
+        return self.model.out(x * self.rate_in) / self.rate_out
+
+    def d_out(self, x):
+        return self.model.d_out(x * self.rate_in) * self.rate_in / self.rate_out
+
+    def d2_out(self, x):
+        return self.model.d2_out(x * self.rate_in) * self.rate_in**2 / self.rate_out
+
+    def normalized_liquidity(self):
+        return self.model.normalized_liquidity() / self.rate_out
@@ -0,0 +1,257 @@
+"""Lookup tables of the pools' swap curves for fast approximate quotes (UI previews, pre-filtering routes).
+
+Every pool's swap curve between two tokens can be written in normalized coordinates as v = g(u), where u and v are
+the (virtual) balances of the token in and out divided by a scale that grows with the invariant (see SwapCurve and
+PoolSimulator.swap_curve()):
+
+- 2CLP: (x + a) (y + b) = L^2, so with u = (x + a) / L and v = (y + b) / L, g(u) = 1 / u.
+- 3CLP, for a pair with the third balance z fixed: (x + a) (y + a) = L^3 / (z + a) =: K, so g(u) = 1 / u with scale
+  sqrt(K).
+- ECLP: the curve scales with the invariant r, so g(u) = calcYGivenX(u, r=1) (resp. calcXGivenY).
+
+The table stores g at adaptively chosen knots, with the exact derivatives as slopes of a cubic Hermite interpolant.
+Intervals are refined until the Hermite remainder bound |error| <= h^4 / 384 max |g''''| is below `abs_tol` (in
+normalized units), and until the interpolant is monotone (Fritsch-Carlson: hypot(alpha, beta) <= 3). Both curves have a
+closed form for g'''': 24 / u^5 for g(u) = 1 / u, and for the ECLP g(u) = affine - k sqrt(R^2 - t^2) with t = u - a
+(see ellipse_d4_bound()), so table.max_error is a rigorous bound on the interpolation error against g.
+
+Quoting an amount in x from the current position u0 is then out = scale * (g(u0) - g(u0 + f x / scale)), which is
+accurate to 2 * scale * table.max_error against the float curve g. The pool's exact (integer) swap differs from g by
+rounding, which we have not bounded analytically: MODEL_ERROR is an empirical allowance for it, and for the float
+rounding of the difference (see tests/test_swap_table.py). SwapQuoter.error_bound includes both.
+
+Swaps only move u0 along the curve, and joins, exits and fee accrual change the scale but (for the 2CLP and ECLP) not
+g, so SwapQuoter.refresh() only rebuilds the table when the shape changes or the current domain isn't covered anymore.
+For g(u) = 1 / u we build the table with a margin around the domain so that small changes of a 3CLP's third balance
+are also covered.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from typing import Callable, Hashable, NamedTuple, Optional
+
+import numpy as np
+
+ArrayFunction = Callable[[np.ndarray], np.ndarray]
+
+# Empirical bound on |exact swap - float curve|, relative to the scale. Not derived, see the module docstring.
+MODEL_ERROR = 1e-14
+
+
+class SwapCurve(NamedTuple):
+    """The swap curve of one pool and direction at the current state, in upscaled units divided by ONE."""
+
+    shape: Hashable  # Curves with the same shape share g.
+    g: ArrayFunction
+    dg: ArrayFunction
+    d4_bound: Callable[[float, float], float]  # bound on |g''''| on an interval
+    u_min: float  # domain given by the pool's price range (resp. balances >= 0)
+    u_max: float
+    u0: float  # current position
+    scale: float
+    fee: float
+
+
+def hyperbola_curve(
+    shape: Hashable, u_min: float, u_max: float, u0: float, scale: float, fee: float
+) -> SwapCurve:
+    return SwapCurve(
+        shape=shape,
+        g=lambda u: 1 / u,
+        dg=lambda u: -1 / u**2,
+        d4_bound=lambda lo, hi: 24 / lo**5,
+        u_min=u_min,
+        u_max=u_max,
+        u0=u0,
+        scale=scale,
+        fee=fee,
+    )
+
+
+def ellipse_d4_bound(
+    center: float, radius: float, factor: float
+) -> Callable[[float, float], float]:
+    """Bound on |g''''| for g(u) = affine - factor * sqrt(radius^2 - (u - center)^2), the form of the ECLP's curve.
+    |g''''(u)| = factor * 3 R^2 (R^2 + 4 t^2) / (R^2 - t^2)^(7/2) with t = u - center increases with |t|, so the
+    maximum on an interval is at one of its ends."""
+    r2 = radius * radius
+
+    def d4_bound(lo: float, hi: float) -> float:
+        t2 = max((lo - center) ** 2, (hi - center) ** 2)
+        if t2 >= r2:
+            return math.inf
+        return factor * 3 * r2 * (r2 + 4 * t2) / (r2 - t2) ** 3.5
+
+    return d4_bound
+
+
+class CurveTable:
+    """Cubic Hermite interpolant through (u, v) with slopes dv. Evaluate with table(u) (scalar, fast) or
+    table.evaluate(u) (arrays)."""
+
+    def __init__(
+        self,
+        shape: Hashable,
+        u: np.ndarray,
+        v: np.ndarray,
+        dv: np.ndarray,
+        max_error: float,
+    ):
+        self.shape = shape
+        self.u, self.v, self.dv = u, v, dv
+        self.max_error = max_error
+        # Python lists make the scalar path several times faster than indexing numpy arrays.
+        self._u, self._v, self._dv = u.tolist(), v.tolist(), dv.tolist()
+
+    @property
+    def u_min(self) -> float:
+        return self._u[0]
+
+    @property
+    def u_max(self) -> float:
+        return self._u[-1]
+
+    def covers(self, u_min: float, u_max: float) -> bool:
+        return self.u_min <= u_min and u_max <= self.u_max
+
+    def __len__(self):
+        return len(self._u)
+
+    def __call__(self, u: float) -> float:
+        us = self._u
+        if not (us[0] <= u <= us[-1]):
+            return math.nan
+        i = min(bisect.bisect_right(us, u), len(us) - 1) - 1
+        h = us[i + 1] - us[i]
+        t = (u - us[i]) / h
+        t2 = t * t
+        t3 = t2 * t
+        return (
+            (2 * t3 - 3 * t2 + 1) * self._v[i]
+            + (t3 - 2 * t2 + t) * h * self._dv[i]
+            + (-2 * t3 + 3 * t2) * self._v[i + 1]
+            + (t3 - t2) * h * self._dv[i + 1]
+        )
+
+    def evaluate(self, u: np.ndarray) -> np.ndarray:
+        u = np.asarray(u, dtype=np.float64)
+        i = np.clip(np.searchsorted(self.u, u, side="right") - 1, 0, len(self.u) - 2)
+        result = _hermite(
+            self.u[i],
+            self.u[i + 1],
+            self.v[i],
+            self.v[i + 1],
+            self.dv[i],
+            self.dv[i + 1],
+            u,
+        )
+        return np.where((u >= self.u[0]) & (u <= self.u[-1]), result, np.nan)
+
+
+def _hermite(u0, u1, v0, v1, d0, d1, u):
+    h = u1 - u0
+    t = (u - u0) / h
+    t2, t3 = t * t, t * t * t
+    return (
+        (2 * t3 - 3 * t2 + 1) * v0
+        + (t3 - 2 * t2 + t) * h * d0
+        + (-2 * t3 + 3 * t2) * v1
+        + (t3 - t2) * h * d1
+    )
+
+
+def _non_monotone(u: np.ndarray, v: np.ndarray, dv: np.ndarray) -> np.ndarray:
+    """Intervals where the Hermite interpolant may not be monotone (outside the Fritsch-Carlson circle)."""
+    secant = np.diff(v) / np.diff(u)
+    return np.hypot(dv[:-1] / secant, dv[1:] / secant) > 3
+
+
+def build_curve_table(
+    curve: SwapCurve,
+    u_min: float,
+    u_max: float,
+    abs_tol: float = 1e-12,
+    n_initial: int = 16,
+    max_knots: int = 1_000_000,
+) -> CurveTable:
+    """Table of curve.g on [u_min, u_max] with interpolation error at most abs_tol."""
+    u = np.linspace(u_min, u_max, n_initial + 1)
+    while True:
+        v, dv = curve.g(u), curve.dg(u)
+        lo, hi = u[:-1], u[1:]
+        bounds = np.array([curve.d4_bound(a, b) for a, b in zip(lo, hi)])
+        errors = (hi - lo) ** 4 / 384 * bounds
+        # Refine non-monotone intervals too; on fine enough intervals the exact slopes are monotone.
+        errors[_non_monotone(u, v, dv)] = math.inf
+        too_large = errors > abs_tol
+        if not too_large.any():
+            return CurveTable(curve.shape, u, v, dv, float(errors.max()))
+        if len(u) + too_large.sum() > max_knots:
+            raise ValueError(
+                f"More than {max_knots} knots needed for tolerance {abs_tol}"
+            )
+        midpoints = (lo + hi)[too_large] / 2
+        u = np.sort(np.concatenate([u, midpoints]))
+
+
+class SwapQuoter:
+    """Approximate swap_given_in() quotes for one pool and direction, in token units (like PoolSimulator.swap_model()).
+    Call refresh() after the pool's state changed."""
+
+    def __init__(
+        self, sim, i_in: int, i_out: int, abs_tol: float = 1e-12, margin: float = 2.0
+    ):
+        self.sim, self.i_in, self.i_out = sim, i_in, i_out
+        self.abs_tol = abs_tol
+        self.margin = margin
+        self.table: Optional[CurveTable] = None
+        self.n_builds = 0
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Re-read the pool state. Returns True if the table had to be rebuilt."""
+        curve, self.rate_in, self.rate_out = self.sim.swap_curve(self.i_in, self.i_out)
+        self.curve = curve
+        self._f_over_scale = (1 - curve.fee) / curve.scale
+        self._v0 = None
+        if (
+            self.table is not None
+            and self.table.shape == curve.shape
+            and self.table.covers(curve.u_min, curve.u_max)
+        ):
+            self._v0 = self.table(curve.u0)
+            return False
+        u_min, u_max = curve.u_min, curve.u_max
+        if curve.shape == "hyperbola":
+            # Hyperbola: leave room for the domain to move (3CLP).
+            u_min, u_max = u_min / self.margin, u_max * self.margin
+        self.table = build_curve_table(curve, u_min, u_max, self.abs_tol)
+        self.n_builds += 1
+        self._v0 = self.table(curve.u0)
+        return True
+
+    @property
+    def max_amount_in(self) -> float:
+        return (self.curve.u_max - self.curve.u0) / self._f_over_scale / self.rate_in
+
+    @property
+    def error_bound(self) -> float:
+        """Bound on |quote(x) - swap_given_in(x)| (the exact swap), in units of the token out. The interpolation part is
+        rigorous, MODEL_ERROR is empirical."""
+        return (
+            (2 * self.table.max_error + MODEL_ERROR) * self.curve.scale / self.rate_out
+        )
+
+    def quote(self, amount_in: float) -> float:
+        """Approximate amount out for `amount_in` token units in (fees included), or NaN beyond the pool's range."""
+        u = self.curve.u0 + amount_in * self.rate_in * self._f_over_scale
+        if u > self.curve.u_max:
+            return math.nan
+        return (self._v0 - self.table(u)) * self.curve.scale / self.rate_out
+
+    def quote_many(self, amounts_in: np.ndarray) -> np.ndarray:
+        u = self.curve.u0 + np.asarray(amounts_in) * self.rate_in * self._f_over_scale
+        out = (self._v0 - self.table.evaluate(u)) * self.curve.scale / self.rate_out
+        return np.where(u <= self.curve.u_max, out, np.nan)
@@ -9,8 +9,19 @@ from dataclasses import dataclass, field
 from enum import Enum
 from functools import lru_cache
 from os import path
-from typing import Callable, Dict, List, Optional, Set, Tuple, TypeVar, Union
-
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
 import web3
 
 ROOT_DIR = path.join(path.dirname(__file__), "../../")
@@ -21,6 +32,23 @@ PUSH1 = 0x60
 PUSH32 = 0x7F
 CALL_OPS = ("CALL", "DELEGATECALL", "STATICCALL")
 
+# Kinds of gas in Context.gas_breakdown. "call" is the cost of the call instructions themselves (not of the code run
+# by the callee), plus account accesses like the EXTCODESIZE that Solidity does before a call.
+GAS_KINDS = ("storage_read", "storage_write", "call", "memory", "compute")
+GAS_KIND_BY_OP = {
+    "SLOAD": "storage_read",
+    "SSTORE": "storage_write",
+    "BALANCE": "call",
+    "EXTCODESIZE": "call",
+    "EXTCODECOPY": "call",
+    "EXTCODEHASH": "call",
+}
+# Ops that end the current call. STOP is what a function without return values ends with.
+HALT_OPS = ("RETURN", "REVERT", "STOP")
+# Ops whose only cost apart from memory expansion is this, to tell memory expansion apart when the trace doesn't have
+# the memory size.
+MEMORY_WORD_OPS = {"MLOAD": 3, "MSTORE": 3, "MSTORE8": 3}
+
 
 class JumpType(Enum):
     In = "i"
@@ -311,6 +339,33 @@ class CallType(Enum):
         }[self]
 
 
+@dataclass
+class Loop:
+    """A loop in one call of a function, found by the backward jumps to its head (at `pc`) within the function, from at
+    most `end_pc`. `iterations` counts these jumps, plus an iteration that leaves the loop early through an unconditional
+    jump or a halt from within the loop (the `return` of a converged Newton iteration as in _runNewtonIteration, or a
+    `break`); leaving through a conditional jump is taken to be the loop condition failing. A loop is only found once it
+    jumped back, so a loop left in its first iteration isn't reported. `iteration_gas` is the gas of each iteration, from
+    a visit of the loop head to the next or to leaving the loop, including the calls made in the body.
+    """
+
+    pc: int
+    label: str
+    iterations: int = 0
+    iteration_gas: List[int] = field(default_factory=list)
+    end_pc: int = 0
+
+    @property
+    def gas_per_iteration(self) -> float:
+        if not self.iteration_gas:
+            return float("nan")
+        return sum(self.iteration_gas) / len(self.iteration_gas)
+
+    @property
+    def summary(self):
+        return f"loop {self.label}: {self.iterations} x {self.gas_per_iteration:,.0f}"
+
+
 @dataclass
 class Context:
     contract_name: str
@@ -318,6 +373,9 @@ class Context:
     initial_gas: int
     final_gas: int = 0
     children: List[Tuple[CallType, Context]] = field(default_factory=list)
+    loops: Dict[int, Loop] = field(default_factory=dict)
+    # Gas of the kinds in GAS_KINDS other than "compute", see gas_breakdown.
+    gas_by_kind: Dict[str, int] = field(default_factory=dict)
 
     @property
     def total_gas_consumed(self):
@@ -329,6 +387,32 @@ class Context:
             child.total_gas_consumed for _, child in self.children
         )
 
+    @property
+    def gas_breakdown(self) -> Dict[str, int]:
+        """gas_consumed by kind (see GAS_KINDS), based on the ops of this call. "compute" is what isn't of any other
+        kind, so the kinds add up to gas_consumed."""
+        breakdown = {kind: self.gas_by_kind.get(kind, 0) for kind in GAS_KINDS}
+        breakdown["compute"] = self.gas_consumed - sum(breakdown.values())
+        return breakdown
+
+    def gas_by_function(self) -> Dict[str, Dict[str, int]]:
+        """gas_breakdown summed over all calls of each function in the tree, with the number of calls under "calls".
+        The gas of all functions adds up to total_gas_consumed."""
+        result: Dict[str, Dict[str, int]] = {}
+
+        def visit(ctx: Context):
+            row = result.setdefault(
+                ctx.qualified_function_name, dict.fromkeys(("calls",) + GAS_KINDS, 0)
+            )
+            row["calls"] += 1
+            for kind, gas in ctx.gas_breakdown.items():
+                row[kind] += gas
+            for _, child in ctx.children:
+                visit(child)
+
+        visit(self)
+        return result
+
     @property
     def qualified_function_name(self):
         if self.contract_name:
@@ -341,7 +425,10 @@ class Context:
 
     @property
     def summary(self):
-        return f"{self.qualified_function_name} ({self.gas_consumed:,} / {self.total_gas_consumed:,})"
+        summary = f"{self.qualified_function_name} ({self.gas_consumed:,} / {self.total_gas_consumed:,})"
+        if self.loops:
+            summary += " [" + "; ".join(l.summary for l in self.loops.values()) + "]"
+        return summary
 
     def format(self, maxlvl=None):
         return self._format([], maxlvl=maxlvl)
@@ -388,12 +475,136 @@ class Context:
                 self.function_name = function.name
 
 
+def memory_cost(words: int) -> int:
+    """Gas for having `words` words of memory, see the yellow paper."""
+    return 3 * words + words * words // 512
+
+
 def normalize_address(address: str) -> str:
     return web3.Web3.toChecksumAddress(
         int.from_bytes(bytes.fromhex(address), "big").to_bytes(20, "big").hex()
     )
 
 
+@dataclass
+class CompactTrace:
+    """The parts of a struct log trace (e.g. brownie's `tx.trace`) that Tracer.trace() reads, as arrays: opcode, pc
+    and remaining gas of each step, and the target address (the raw stack value) of the steps in CALL_OPS.
+    `memory_words` is the memory size of each step in words, if the trace has it (it's only used to tell memory
+    expansion apart exactly).
+    """
+
+    ops: np.ndarray
+    pcs: np.ndarray
+    gas: np.ndarray
+    call_targets: Dict[int, str] = field(default_factory=dict)
+    memory_words: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.ops)
+
+    @classmethod
+    def from_struct_logs(cls, struct_logs: Iterable[dict]) -> CompactTrace:
+        ops, pcs, gas, call_targets, memory_words = [], [], [], {}, []
+        for i, step in enumerate(struct_logs):
+            ops.append(step["op"])
+            pcs.append(step["pc"])
+            gas.append(step["gas"])
+            memory_words.append(len(step.get("memory") or ()))
+            if step["op"] in CALL_OPS:
+                call_targets[i] = _stack_word(step["stack"][-2])
+        return cls(
+            ops=np.array(ops, dtype=str),
+            pcs=np.array(pcs, dtype=np.int64),
+            gas=np.array(gas, dtype=np.int64),
+            call_targets=call_targets,
+            # Without memory (e.g. with disableMemory) there's no memory at all, since Solidity starts by writing
+            # the free memory pointer.
+            memory_words=(
+                np.array(memory_words, dtype=np.int64) if any(memory_words) else None
+            ),
+        )
+
+    @classmethod
+    def from_tracer_result(cls, result: dict) -> CompactTrace:
+        """From the output of COMPACT_TRACER."""
+        return cls(
+            ops=np.array(result["ops"], dtype=str),
+            pcs=np.array(result["pcs"], dtype=np.int64),
+            gas=np.array(result["gas"], dtype=np.int64),
+            call_targets={
+                int(i): _stack_word(target) for i, target in result["calls"].items()
+            },
+            memory_words=(
+                np.array(result["memory"], dtype=np.int64) // 32
+                if "memory" in result
+                else None
+            ),
+        )
+
+
+def _stack_word(value: str) -> str:
+    """Stack values as 64 hex digits without 0x, whatever the node returned."""
+    if value.startswith("0x"):
+        value = value[2:]
+    return value.rjust(64, "0")
+
+
+# debug_traceTransaction tracer (for nodes that support JavaScript tracers, like geth) that returns CompactTrace's
+# fields instead of struct logs with the full stack, memory and storage of each step.
+COMPACT_TRACER = """{
+    ops: [], pcs: [], gas: [], memory: [], calls: {},
+    step: function(log, db) {
+        var op = log.op.toString();
+        this.ops.push(op);
+        this.pcs.push(log.getPC());
+        this.gas.push(log.getGas());
+        this.memory.push(log.memory.length());
+        if (op == "CALL" || op == "DELEGATECALL" || op == "STATICCALL") {
+            this.calls[this.ops.length - 1] = log.stack.peek(1).toString(16);
+        }
+    },
+    fault: function(log, db) {},
+    result: function(ctx, db) {
+        return {ops: this.ops, pcs: this.pcs, gas: this.gas, memory: this.memory, calls: this.calls};
+    }
+}"""
+
+# Struct log options for nodes without JavaScript tracers (like ganache). The stack is still needed for the targets of
+# calls, but memory and storage make up most of the payload.
+STRUCT_LOG_OPTIONS = {
+    "disableMemory": True,
+    "enableMemory": False,
+    "disableStorage": True,
+    "enableReturnData": False,
+}
+
+
+def _debug_trace(w3, tx_hash: str, options: dict) -> dict:
+    response = w3.provider.make_request("debug_traceTransaction", [tx_hash, options])
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response["result"]
+
+
+def fetch_trace(tx_hash: str, w3=None) -> CompactTrace:
+    """The trace of a transaction, as far as Tracer.trace() needs it. Much smaller and faster to fetch than brownie's
+    `tx.trace`, which has the full stack, memory and storage of each step."""
+    if w3 is None:
+        from brownie import web3 as w3
+
+    # Nodes that don't know the tracer ignore it and return struct logs without memory and storage.
+    try:
+        result = _debug_trace(
+            w3, tx_hash, dict(STRUCT_LOG_OPTIONS, tracer=COMPACT_TRACER)
+        )
+    except ValueError:
+        result = _debug_trace(w3, tx_hash, STRUCT_LOG_OPTIONS)
+    if "structLogs" in result:
+        return CompactTrace.from_struct_logs(result["structLogs"])
+    return CompactTrace.from_tracer_result(result)
+
+
 class Tracer:
     def __init__(self, sources: Sources, deployments: Dict[str, List[str]]):
         self.sources = sources
@@ -407,45 +618,91 @@ class Tracer:
         return "<Unknown>"
 
     def trace_tx(self, tx) -> Context:
-        return self.trace(tx.contract_name, tx.trace)
+        return self.trace(tx.contract_name, fetch_trace(tx.txid))
+
+    def trace(
+        self, contract_name: str, traces: Union[List[dict], CompactTrace]
+    ) -> Context:
+        if not isinstance(traces, CompactTrace):
+            traces = CompactTrace.from_struct_logs(traces)
+        ops, pcs, gas = traces.ops.tolist(), traces.pcs.tolist(), traces.gas.tolist()
 
-    def trace(self, contract_name: str, traces: List[dict]) -> Context:
         root_context = Context(
             contract_name=contract_name,
             function_name="",
-            initial_gas=traces[0]["gas"],
+            initial_gas=gas[0],
         )
 
         call_stack = [(root_context, [])]
+        # Gas at the last visit of each JUMPDEST, per (internal) call, to measure loop iterations.
+        jumpdest_gas: Dict[Tuple[int, int], int] = {}
+        memory = (
+            traces.memory_words.tolist() if traces.memory_words is not None else None
+        )
+        # (caller, gas and memory size before the call, callee) of the calls that haven't returned yet, to get the cost
+        # of the call instruction once back in the caller.
+        pending_calls: List[Tuple[Context, int, Optional[int], Context]] = []
+        returned_call = None
 
-        for i, trace in enumerate(traces):
+        for i, op in enumerate(ops):
             context, internal_call_stack = call_stack[-1]
+            owner = internal_call_stack[-1] if internal_call_stack else context
+
+            if returned_call is not None:
+                caller, gas_before, memory_before, callee = returned_call
+                cost = gas_before - gas[i] - callee.total_gas_consumed
+                self._add_gas(
+                    caller, cost, memory_before, memory[i] if memory else None, "call"
+                )
+                returned_call = None
+            if op not in CALL_OPS and op not in HALT_OPS and i + 1 < len(ops):
+                kind = GAS_KIND_BY_OP.get(op)
+                if (
+                    kind
+                    or op in MEMORY_WORD_OPS
+                    or (memory and memory[i + 1] != memory[i])
+                ):
+                    self._add_gas(
+                        owner,
+                        gas[i] - gas[i + 1],
+                        memory[i] if memory else None,
+                        memory[i + 1] if memory else None,
+                        kind,
+                        MEMORY_WORD_OPS.get(op),
+                    )
+
             source = self.sources.find_contract(context.contract_name)
-            location = source.get_pc_location(trace["pc"])
+            location = source.get_pc_location(pcs[i])
             if location.source_index == "-1":
                 continue
 
             context.update_names(self.sources, location)
 
-            op = trace["op"]
+            if op == "JUMPDEST":
+                jumpdest_gas[(id(owner), pcs[i])] = gas[i]
 
             if op in CALL_OPS:
-                target_address = normalize_address(trace["stack"][-2])
+                target_address = normalize_address(traces.call_targets[i])
                 contract_name = self.find_contract_name(target_address)
                 new_context = Context(
                     contract_name=contract_name,
                     function_name="",
-                    initial_gas=traces[i + 1]["gas"],
+                    initial_gas=gas[i + 1],
                 )
                 context.children.append((CallType.from_op(op), new_context))
                 call_stack.append((new_context, []))
+                pending_calls.append(
+                    (owner, gas[i], memory[i] if memory else None, new_context)
+                )
 
-            elif op in ("RETURN", "REVERT"):
-                context.final_gas = trace["gas"]
+            elif op in HALT_OPS:
+                context.final_gas = gas[i]
                 call_stack.pop()
+                if pending_calls and pending_calls[-1][3] is context:
+                    returned_call = pending_calls.pop()
 
             elif op == "JUMP" and location.jump_type == JumpType.In:
-                next_location = source.get_pc_location(traces[i + 1]["pc"])
+                next_location = source.get_pc_location(pcs[i + 1])
                 func = self.sources.get_location_function(next_location)
                 parent_context = (
                     internal_call_stack[-1] if internal_call_stack else context
@@ -458,20 +715,100 @@ class Tracer:
                 new_context = Context(
                     contract_name=func.contract_name,
                     function_name=func.name,
-                    initial_gas=trace["gas"],
+                    initial_gas=gas[i],
                 )
                 parent_context.children.append((CallType.INTERNAL, new_context))
                 internal_call_stack.append(new_context)
 
             elif op == "JUMP" and location.jump_type == JumpType.Out:
                 if internal_call_stack:
-                    internal_call_stack[-1].final_gas = trace["gas"]
+                    internal_call_stack[-1].final_gas = gas[i]
                     internal_call_stack.pop()
 
-        root_context.final_gas = traces[-1]["gas"]
+            elif op in ("JUMP", "JUMPI") and pcs[i + 1] < pcs[i]:
+                loop = self._find_loop(owner, source, location, pcs[i], pcs[i + 1])
+                if loop is not None:
+                    loop.iterations += 1
+                    head_gas = jumpdest_gas.get((id(owner), pcs[i + 1]))
+                    if head_gas is not None:
+                        loop.iteration_gas.append(head_gas - gas[i + 1])
+
+            if (op == "JUMP" and location.jump_type != JumpType.In) or op in HALT_OPS:
+                # Leaving a loop from within its body: count the iteration that was cut short.
+                halted = op in HALT_OPS
+                target = None if halted else pcs[i + 1]
+                for loop in owner.loops.values():
+                    if not loop.pc < pcs[i] < loop.end_pc or (
+                        target is not None and loop.pc <= target <= loop.end_pc
+                    ):
+                        continue
+                    head_gas = jumpdest_gas.pop((id(owner), loop.pc), None)
+                    if head_gas is not None:
+                        loop.iterations += 1
+                        loop.iteration_gas.append(
+                            head_gas - gas[i if halted else i + 1]
+                        )
+
+        root_context.final_gas = gas[-1]
 
         return root_context
 
+    @staticmethod
+    def _add_gas(
+        owner: Context,
+        cost: int,
+        memory_before: Optional[int],
+        memory_after: Optional[int],
+        kind: Optional[str],
+        static_cost: Optional[int] = None,
+    ):
+        """Add the `cost` of a step to owner.gas_by_kind: memory expansion to "memory", the rest to `kind` (if any,
+        otherwise it's compute). Without the memory size, memory expansion is only told apart for ops with a
+        `static_cost`."""
+        if memory_before is not None and memory_after is not None:
+            expansion = memory_cost(memory_after) - memory_cost(memory_before)
+        elif static_cost is not None:
+            expansion = cost - static_cost
+        else:
+            expansion = 0
+        gas_by_kind = owner.gas_by_kind
+        if expansion:
+            gas_by_kind["memory"] = gas_by_kind.get("memory", 0) + expansion
+        if kind:
+            gas_by_kind[kind] = gas_by_kind.get(kind, 0) + cost - expansion
+
+    def _find_loop(
+        self,
+        owner: Context,
+        source: SourceData,
+        location: Location,
+        jump_pc: int,
+        head_pc: int,
+    ) -> Optional[Loop]:
+        """The loop of `owner` for a backward jump from `jump_pc` to `head_pc`, if the jump and its target are in the
+        same function (rather than e.g. code shared by the compiler)."""
+        if head_pc in owner.loops:
+            loop = owner.loops[head_pc]
+            loop.end_pc = max(loop.end_pc, jump_pc)
+            return loop
+        func = self.sources.get_location_function(location)
+        head_location = source.get_pc_location(head_pc)
+        if (
+            not func
+            or head_location.source_index != func.location.source_index
+            or not head_location.is_within(func.location)
+        ):
+            return None
+        head_source = self.sources._sources[head_location.source_index]
+        line = head_source.content.count("\n", 0, head_location.offset) + 1
+        loop = Loop(
+            pc=head_pc,
+            label=f"{path.basename(head_source.path)}:{line}",
+            end_pc=jump_pc,
+        )
+        owner.loops[head_pc] = loop
+        return loop
+
     @classmethod
     def load(cls):
         sources = Sources.load()
@@ -0,0 +1,148 @@
+# On-disk store of the traces recorded by scripts/show_gas_usage_*.py, so that the gas reports can be rebuilt (and
+# new analyses run) without a chain and without replaying the transactions.
+#
+# Only the fields that Tracer.trace() reads are kept (see CompactTrace), and each trace goes into one compressed .npz
+# file together with what else the Tracer needs offline: the contract the transaction was sent to and the addresses of
+# the deployed contracts. Traces are keyed by scenario (pool type and label, e.g. "3clp", "3: Swap (After Join)") and
+# by a hash of the compiled bytecode: pcs only map to source locations for the build they were recorded with, so a
+# recompile with changed code starts a new directory rather than silently mixing builds.
+#
+# Layout: <root>/<code hash>/<pool>/<label slug>.npz
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from os import makedirs, path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from tests.support.trace_analyzer import ROOT_DIR, CompactTrace, Sources, Tracer
+
+DEFAULT_ROOT = path.join(ROOT_DIR, "analysis", "traces")
+
+# Length of the prefix of the sha256 used as directory name.
+CODE_HASH_LENGTH = 16
+
+
+def code_hash(sources: Sources) -> str:
+    """Hash of the deployed bytecode of all contracts in the build."""
+    h = hashlib.sha256()
+    for source in sorted(sources._sources.values(), key=lambda s: s.path):
+        h.update(source.path.encode())
+        h.update(source.bytecode)
+    return h.hexdigest()[:CODE_HASH_LENGTH]
+
+
+def _slug(label: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", label.lower()).strip("-")
+
+
+@dataclass
+class StoredTrace:
+    pool: str
+    label: str
+    contract_name: str
+    gas_used: int
+    deployments: Dict[str, List[str]]
+    trace: CompactTrace
+
+    def tracer(self, sources: Sources) -> Tracer:
+        return Tracer(sources, self.deployments)
+
+
+class TraceStore:
+    def __init__(self, code_hash: str, root: str = DEFAULT_ROOT):
+        self.code_hash = code_hash
+        self.root = root
+
+    @classmethod
+    def for_sources(cls, sources: Sources, root: str = DEFAULT_ROOT) -> TraceStore:
+        return cls(code_hash(sources), root)
+
+    @property
+    def directory(self) -> str:
+        return path.join(self.root, self.code_hash)
+
+    def path(self, pool: str, label: str) -> str:
+        return path.join(self.directory, pool, f"{_slug(label)}.npz")
+
+    def save(
+        self,
+        pool: str,
+        label: str,
+        contract_name: str,
+        trace: Union[List[dict], CompactTrace],
+        deployments: Dict[str, List[str]],
+        gas_used: int,
+    ) -> str:
+        if not isinstance(trace, CompactTrace):
+            trace = CompactTrace.from_struct_logs(trace)
+        meta = dict(
+            pool=pool,
+            label=label,
+            contract_name=contract_name,
+            gas_used=gas_used,
+            deployments=deployments,
+        )
+        call_steps = sorted(trace.call_targets)
+        arrays = dict(
+            ops=trace.ops,
+            pcs=trace.pcs,
+            gas=trace.gas,
+            call_steps=np.array(call_steps, dtype=np.int64),
+            call_targets=np.array(
+                [trace.call_targets[i] for i in call_steps], dtype=str
+            ),
+        )
+        if trace.memory_words is not None:
+            arrays["memory_words"] = trace.memory_words
+        filename = self.path(pool, label)
+        makedirs(path.dirname(filename), exist_ok=True)
+        np.savez_compressed(filename, meta=np.array(json.dumps(meta)), **arrays)
+        return filename
+
+    @staticmethod
+    def load_file(filename: str) -> StoredTrace:
+        with np.load(filename) as data:
+            meta = json.loads(str(data["meta"]))
+            trace = CompactTrace(
+                ops=data["ops"],
+                pcs=data["pcs"],
+                gas=data["gas"],
+                call_targets=dict(
+                    zip(data["call_steps"].tolist(), data["call_targets"].tolist())
+                ),
+                memory_words=data["memory_words"] if "memory_words" in data else None,
+            )
+        return StoredTrace(trace=trace, **meta)
+
+    def load(self, pool: str, label: str) -> StoredTrace:
+        return self.load_file(self.path(pool, label))
+
+    def pools(self) -> List[str]:
+        return sorted(
+            path.basename(d)
+            for d in glob.glob(path.join(self.directory, "*"))
+            if path.isdir(d)
+        )
+
+    def load_all(self, pool: Optional[str] = None) -> List[StoredTrace]:
+        """All traces of `pool` (or of all pools), in the order of their labels."""
+        pools = [pool] if pool is not None else self.pools()
+        return [
+            self.load_file(filename)
+            for p in pools
+            for filename in sorted(glob.glob(path.join(self.directory, p, "*.npz")))
+        ]
+
+    def available_code_hashes(self) -> List[str]:
+        return sorted(
+            path.basename(d)
+            for d in glob.glob(path.join(self.root, "*"))
+            if path.isdir(d)
+        )
@@ -2,6 +2,8 @@ from dataclasses import field
 from typing import NamedTuple, Tuple, Iterable
 
 from tests.support.quantized_decimal import DecimalLike
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.quantized_decimal_38 import QuantizedDecimal as D2
 from brownie import accounts
 
 
@@ -9,6 +11,7 @@ address = str
 
 DEFAULT_CAP_MANAGER = "0x66aB6D9362d4F35596279692F0251Db635165871"
 DEFAULT_PAUSE_MANAGER = "0x66aB6D9362d4F35596279692F0251Db635165871"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
 
 class SwapKind:
@@ -86,7 +89,7 @@ class Vector2(NamedTuple):
     y: DecimalLike
 
 
-class CEMMMathParams(NamedTuple):
+class ECLPMathParams(NamedTuple):
     alpha: DecimalLike
     beta: DecimalLike
     c: DecimalLike
@@ -94,13 +97,21 @@ class CEMMMathParams(NamedTuple):
     l: DecimalLike
 
 
-class CEMMMathQParams(NamedTuple):
+class ECLPMathParamsQD(NamedTuple):
+    alpha: D
+    beta: D
+    c: D
+    s: D
+    l: D
+
+
+class ECLPMathQParams(NamedTuple):
     a: DecimalLike
     b: DecimalLike
     c: DecimalLike
 
 
-class CEMMMathDerivedParams(NamedTuple):
+class ECLPMathDerivedParams(NamedTuple):
     tauAlpha: Vector2
     tauBeta: Vector2
     u: DecimalLike
@@ -110,6 +121,27 @@ class CEMMMathDerivedParams(NamedTuple):
     dSq: DecimalLike
 
 
+class ECLPMathDerivedParamsQD38(NamedTuple):
+    tauAlpha: Vector2
+    tauBeta: Vector2
+    u: D2
+    v: D2
+    w: D2
+    z: D2
+    dSq: D2
+
+
+class ECLPPoolParams(NamedTuple):
+    baseParams: TwoPoolBaseParams
+    eclpParams: ECLPMathParams  # should already be upscaled
+    derivedEclpParams: ECLPMathDerivedParams  # should already be upscaled
+    rateProvider0: address = ZERO_ADDRESS
+    rateProvider1: address = ZERO_ADDRESS
+    capManager: address = DEFAULT_CAP_MANAGER
+    capParams: CapParams = CapParams()
+    pauseManager: address = DEFAULT_PAUSE_MANAGER
+
+
 class ThreePoolFactoryCreateParams(NamedTuple):
     name: str
     symbol: str
@@ -131,6 +163,9 @@ class ThreePoolParams(NamedTuple):
 
 
 # Legacy Aliases
+CEMMMathParams = ECLPMathParams
+CEMMMathQParams = ECLPMathQParams
+CEMMMathDerivedParams = ECLPMathDerivedParams
 GyroCEMMMathParams = CEMMMathParams
 GyroCEMMMathDerivedParams = CEMMMathDerivedParams
 
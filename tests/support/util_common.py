@@ -2,7 +2,7 @@ from contextlib import contextmanager
 from dataclasses import dataclass
 from unicodedata import decimal
 
-from hypothesis import strategies as st, assume
+from hypothesis import strategies as st, assume, event
 
 from tests.support.types import Vector2
 from tests.support.utils import qdecimals
@@ -22,22 +22,92 @@ class BasicPoolParameters:
 billion_balance_strategy = st.integers(min_value=0, max_value=100_000_000_000)
 
 
+@dataclass
+class AcceptanceStats:
+    """Acceptance-rate bookkeeping for a strategy.
+
+    Every draw is recorded as a hypothesis event (visible with `--hypothesis-show-statistics`) and counted here, so
+    that the rate is also available across tests, e.g. via `print(stats)` at the end of a session."""
+
+    name: str
+    drawn: int = 0
+    accepted: int = 0
+
+    def record(self, accepted: bool, reason: str = "rejected"):
+        self.drawn += 1
+        if accepted:
+            self.accepted += 1
+        event(f"{self.name}: {'accepted' if accepted else reason}")
+
+    @property
+    def rate(self) -> float:
+        return self.accepted / self.drawn if self.drawn else 1.0
+
+    def reset(self):
+        self.drawn = self.accepted = 0
+
+    def __str__(self):
+        return f"{self.name}: {self.accepted}/{self.drawn} accepted ({self.rate:.2%})"
+
+
+gen_balances_stats = AcceptanceStats("gen_balances")
+
+
+def _checked_balances(
+    balances: list, bparams: BasicPoolParameters, min_balance: D, min_sum: D
+) -> list:
+    """`balances` if they satisfy the constraints of gen_balances(). They should by construction, but the bounds are
+    rounded to 18 decimals, so we check, record the outcome in gen_balances_stats and reject violations."""
+    mbr = bparams.min_balance_ratio
+    accepted = (
+        all(min_balance <= b <= bparams.max_balances for b in balances)
+        and min(balances) >= max(balances) * mbr
+        and (min_sum is None or sum(balances) >= min_sum)
+    )
+    gen_balances_stats.record(accepted, "rejected by rounding of the bounds")
+    assume(accepted)
+    return balances
+
+
 @st.composite
-def gen_balances(draw, n: int, bparams: BasicPoolParameters):
-    """Draw n balances respecting max_balances and min_balance_ratio. Only implemented for n = 1, 2, 3"""
+def gen_balances(
+    draw, n: int, bparams: BasicPoolParameters, min_balance: D = None, min_sum: D = None
+):
+    """Draw n balances respecting max_balances and min_balance_ratio. Only implemented for n = 1, 2, 3
+
+    If given, min_balance (all n) and min_sum (n <= 2) are respected by construction, so tests don't have to
+    `assume()` them."""
     mbr = bparams.min_balance_ratio
     mbr2 = D("1e-18") if mbr == 0 else mbr
-    x = D(draw(qdecimals(1, bparams.max_balances)))
+    min_balance = D(0) if min_balance is None else D(min_balance)
+    xmin = max(D(1), min_balance)
+    if min_sum is not None:
+        if n > 2:
+            raise NotImplementedError("min_sum is only implemented for n <= 2")
+        # Lowest x such that the other balance can still make up the difference within ratio and max bounds.
+        xmin = max(
+            xmin,
+            D(min_sum) / (1 + (n - 1) / mbr2),
+            D(min_sum) - (n - 1) * bparams.max_balances,
+        )
+    if xmin > bparams.max_balances:
+        raise ValueError("min_balance / min_sum are incompatible with max_balances")
+    x = D(draw(qdecimals(xmin, bparams.max_balances)))
     if n == 1:
-        return [x]
+        return _checked_balances([x], bparams, min_balance, min_sum)
 
-    y = draw(qdecimals(x * mbr, min(x / mbr2, bparams.max_balances)))
+    ymax = min(x / mbr2, bparams.max_balances)
+    ymin = max(x * mbr, min_balance)
+    if min_sum is not None and n == 2:
+        ymin = max(ymin, D(min_sum) - x)
+    y = draw(qdecimals(ymin, ymax))
     if n == 2:
-        return [x, y]
+        return _checked_balances([x, y], bparams, min_balance, min_sum)
 
-    z = draw(qdecimals(max(x, y) * mbr, min(min(x, y) / mbr2, bparams.max_balances)))
+    zmin = max(max(x, y) * mbr, min_balance)
+    z = draw(qdecimals(zmin, min(min(x, y) / mbr2, bparams.max_balances)))
     if n == 3:
-        return [x, y, z]
+        return _checked_balances([x, y, z], bparams, min_balance, min_sum)
 
     raise NotImplementedError("generating > 3 assets is not implemented")
 
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from tests.g2clp.pool_simulator import Gyro2CLPPoolSimulator
+from tests.support.backtest import (
+    DEFAULT_ACCOUNT,
+    ReplayJob,
+    replay,
+    replay_many,
+)
+from tests.support.error_collector import load_error_values
+from tests.support.pool_simulator import BURN_EXCEEDS_BALANCE
+
+INITIAL_BALANCES = [100 * 10**18, 100 * 10**18]
+
+
+def make_sim():
+    sim = Gyro2CLPPoolSimulator(
+        97 * 10**16, 102 * 10**16, 10**15, protocol_swap_fee=5 * 10**17
+    )
+    sim.initialize(DEFAULT_ACCOUNT, INITIAL_BALANCES)
+    return sim
+
+
+def make_events(sim, n_events, seed=0):
+    """Random events that are valid for `sim`, which is advanced along the way."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    block = 100
+    kinds = ["swap_given_in", "swap_given_out", "join", "exit"]
+    for _ in range(n_events):
+        block += int(rng.integers(0, 3))
+        kind = kinds[rng.choice(4, p=[0.45, 0.45, 0.05, 0.05])]
+        # Mostly swap the scarcer token in, so that the pool doesn't drift out of its price range.
+        scarce = 0 if sim.balances[0] < sim.balances[1] else 1
+        token_in = scarce if rng.uniform() < 0.7 else 1 - scarce
+        fraction = rng.uniform(1e-4, 0.05)
+        if kind == "swap_given_in":
+            amount = int(sim.balances[token_in] * fraction)
+            sim.swap_given_in(token_in, 1 - token_in, amount)
+        elif kind == "swap_given_out":
+            amount = int(sim.balances[1 - token_in] * fraction)
+            sim.swap_given_out(token_in, 1 - token_in, amount)
+        elif kind == "join":
+            amount = int(sim.total_supply * fraction)
+            sim.join(DEFAULT_ACCOUNT, amount)
+        else:
+            amount = int(sim.bpt_balance(DEFAULT_ACCOUNT) * fraction)
+            sim.exit(DEFAULT_ACCOUNT, amount)
+        rows.append(dict(block=block, kind=kind, token_in=token_in, token_out=1 - token_in, amount=str(amount)))
+    return pa.Table.from_pylist(rows)
+
+
+def test_replay_reproduces_state(tmp_path):
+    reference = make_sim()
+    events = make_events(reference, 300)
+    pq.write_table(events, str(tmp_path / "events.parquet"))
+
+    sim = make_sim()
+    summary = replay(sim, str(tmp_path / "events.parquet"), str(tmp_path / "out"), chunk_size=64)
+
+    assert summary.n_events == 300 and summary.n_reverted == 0
+    assert sim.balances == reference.balances
+    assert sim.total_supply == reference.total_supply
+    assert sim.swap_fees_collected == reference.swap_fees_collected
+
+    metrics = load_error_values(str(tmp_path / "out")).to_pandas()
+    blocks = events.column("block").to_pylist()
+    assert list(metrics["block"]) == sorted(set(blocks))
+    assert metrics["n_events"].sum() == 300
+    assert np.isclose(metrics["swap_fees_0"].sum(), reference.swap_fees_collected[0] / 1e18)
+    assert np.isclose(metrics["protocol_fees_minted"].sum(), reference.protocol_fees_minted / 1e18)
+    assert metrics["bpt_price"].iloc[-1] == reference.bpt_price() / 1e18
+    assert (metrics["protocol_fees_due"] >= 0).all()
+
+
+def test_csv_and_buckets(tmp_path):
+    events = make_events(make_sim(), 100)
+    pa_csv.write_csv(events, str(tmp_path / "events.csv"))
+
+    sim = make_sim()
+    summary = replay(sim, str(tmp_path / "events.csv"), str(tmp_path / "out"), block_interval=10)
+    metrics = load_error_values(str(tmp_path / "out")).to_pandas()
+    assert summary.n_rows == len(metrics)
+    assert metrics["n_events"].sum() == 100
+    assert (np.diff(metrics["block"]) > 0).all()
+    assert len(metrics) < len(set(events.column("block").to_pylist()))
+
+
+def test_reverted_events_are_skipped(tmp_path):
+    events = pa.Table.from_pylist(
+        [
+            dict(block=1, kind="exit", token_in=0, token_out=1, amount=str(10**30), account="nobody"),
+            dict(block=2, kind="swap_given_in", token_in=0, token_out=1, amount=str(10**18)),
+        ]
+    )
+    pq.write_table(events, str(tmp_path / "events.parquet"))
+    summary = replay(make_sim(), str(tmp_path / "events.parquet"), str(tmp_path / "out"))
+    assert summary.n_reverted == 1
+    assert summary.revert_reasons == {BURN_EXCEEDS_BALANCE: 1}
+
+
+def test_replay_many(tmp_path):
+    jobs = []
+    for i in range(2):
+        path = str(tmp_path / f"events{i}.parquet")
+        pq.write_table(make_events(make_sim(), 50, seed=i), path)
+        jobs.append(ReplayJob(make_sim(), path, str(tmp_path / f"out{i}")))
+    summaries = replay_many(jobs, max_workers=2)
+    assert [s.n_events for s in summaries] == [50, 50]
+    assert all(s.n_reverted == 0 for s in summaries)
+
+
+def test_unsorted_blocks_raise(tmp_path):
+    events = make_events(make_sim(), 20)
+    blocks = events.column("block").to_pylist()
+    blocks[10] = blocks[9] - 1
+    events = events.set_column(0, "block", pa.array(blocks))
+    pq.write_table(events, str(tmp_path / "events.parquet"))
+
+    with pytest.raises(ValueError, match="not sorted by block"):
+        replay(make_sim(), str(tmp_path / "events.parquet"), str(tmp_path / "out"))
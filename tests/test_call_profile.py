@@ -0,0 +1,111 @@
+import numpy as np
+
+from tests.support import call_profile
+from tests.support.call_profile import CallProfile
+from tests.support.trace_analyzer import CallType, Context, Loop
+
+
+def _swap(newton_gas: int, sqrt_calls: int = 1) -> Context:
+    """Vault.swap -> Pool.onSwap -> Math.calculateInvariant (+ internal Math._sqrt calls)."""
+    invariant = Context("Math", "calculateInvariant", 10_000, 10_000 - newton_gas)
+    gas = invariant.final_gas
+    for _ in range(sqrt_calls):
+        sqrt = Context("Math", "_sqrt", gas, gas - 100)
+        invariant.children.append((CallType.INTERNAL, sqrt))
+        gas -= 100
+    pool = Context("Pool", "onSwap", 20_000, 20_000 - newton_gas - 1_000)
+    pool.children.append((CallType.DELEGATE, invariant))
+    vault = Context("Vault", "swap", 30_000, 30_000 - newton_gas - 3_000)
+    vault.children.append((CallType.CALL, pool))
+    return vault
+
+
+def test_stats_by_call_path():
+    newton_gas = [2_000, 3_000, 3_000, 5_000]
+    profile = CallProfile()
+    for i, g in enumerate(newton_gas):
+        profile.add(_swap(g, sqrt_calls=i % 2 + 1))
+
+    assert profile.transactions == 4
+    invariant = profile.find(["Vault.swap", "Pool.onSwap", "Math.calculateInvariant"])
+    assert invariant.total_gas_consumed.summary() == {
+        "count": 4,
+        "mean": np.mean(newton_gas),
+        "min": 2_000,
+        "max": 5_000,
+        "p95": np.percentile(newton_gas, 95),
+    }
+    # Two of the swaps call _sqrt twice.
+    sqrt = profile.find(
+        ["Vault.swap", "Pool.onSwap", "Math.calculateInvariant", "Math._sqrt"]
+    )
+    assert sqrt.gas_consumed.count == 6
+    assert profile.find(["Vault.swap"]).gas_consumed.mean == 2_000
+
+    df = profile.to_pandas()
+    assert list(df["depth"]) == [1, 2, 3, 4]
+    assert list(df["call_type"].fillna("")) == [
+        "",
+        "CALL",
+        "DELEGATECALL",
+        "INTERNAL_CALL",
+    ]
+    # Without storage, calls or memory in the trees, all gas is compute.
+    assert list(df["compute_mean"]) == list(df["gas_consumed_mean"])
+    assert "Math.calculateInvariant x4" in profile.format()
+    assert "Math._sqrt" not in profile.format(maxlvl=3)
+
+
+def test_bounded_memory_and_merge():
+    rng = np.random.default_rng(0)
+    newton_gas = rng.integers(1_000, 6_000, 3 * call_profile.RESERVOIR_SIZE).tolist()
+    whole, part0, part1 = CallProfile(), CallProfile(seed=1), CallProfile(seed=2)
+    for i, g in enumerate(newton_gas):
+        whole.add(_swap(g))
+        (part0 if i % 3 else part1).add(_swap(g))
+    part0.merge(part1)
+
+    path = ["Vault.swap", "Pool.onSwap", "Math.calculateInvariant"]
+    for profile in (whole, part0):
+        stats = profile.find(path).total_gas_consumed
+        assert len(stats.reservoir) == call_profile.RESERVOIR_SIZE
+        assert (stats.count, stats.min, stats.max) == (
+            len(newton_gas),
+            min(newton_gas),
+            max(newton_gas),
+        )
+        assert stats.mean == np.mean(newton_gas)
+        # The sampled percentile is close to the exact one.
+        assert abs(stats.percentile() - np.percentile(newton_gas, 95)) < 150
+
+
+def test_loops():
+    profiles = [CallProfile(), CallProfile()]
+    # Iterations per call; the swap with 0 iterations has no Loop in its Context.
+    iterations = [0, 3, 3, 4, 5]
+    for k, n in enumerate(iterations):
+        swap = _swap(2_000 + 500 * n)
+        newton = swap.children[0][1].children[0][1]
+        if n:
+            newton.loops[7] = Loop(7, "Math.sol:42", n, [500 + k] * n)
+        profiles[k % 2].add(swap)
+    profile, other = profiles
+    profile.merge(other)
+
+    path = ["Vault.swap", "Pool.onSwap", "Math.calculateInvariant"]
+    loop = profile.find(path).loops["Math.sol:42"]
+    assert loop.iteration_counts(len(iterations)) == {0: 1, 3: 2, 4: 1, 5: 1}
+    assert loop.iterations.mean == 15 / 4
+    assert (
+        loop.iteration_gas.count,
+        loop.iteration_gas.min,
+        loop.iteration_gas.max,
+    ) == (
+        15,
+        501,
+        504,
+    )
+    assert "~ loop Math.sol:42: iterations {0: 1, 3: 2, 4: 1, 5: 1}" in profile.format()
+    df = profile.loops_to_pandas()
+    assert list(df["path"]) == [" > ".join(path)]
+    assert df["iteration_gas_count"][0] == 15
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from tests.support.capped_liquidity import (
+    ADD_OVERFLOW,
+    NOT_AUTHORIZED,
+    UNCAPPED,
+    CappedLiquidityModel,
+    Join,
+)
+from tests.support.pool_simulator import (
+    OVER_ADDRESS_CAP,
+    OVER_GLOBAL_CAP,
+    UINT256_MAX,
+    PoolRevert,
+)
+from tests.support.types import CapParams
+
+# As in test_capped_liquidity.py
+PER_ADDRESS_CAP = 5_000 * 10**18
+INITIAL_CAP_PARAMS = CapParams(True, PER_ADDRESS_CAP, 10_000 * 10**18)
+HIGHER_CAP_PARAMS = CapParams(True, 10_000 * 10**18, 20_000 * 10**18)
+
+
+def make_model():
+    return CappedLiquidityModel("admin", INITIAL_CAP_PARAMS)
+
+
+def test_params():
+    """As test_capped_liquidity.test_params."""
+    model = make_model()
+    model.set_cap_params("admin", HIGHER_CAP_PARAMS)
+    assert model.cap_params == HIGHER_CAP_PARAMS
+    with pytest.raises(PoolRevert, match=NOT_AUTHORIZED):
+        model.set_cap_params("alice", HIGHER_CAP_PARAMS)
+    uncapped = CapParams(cap_enabled=False, global_cap=0, per_address_cap=0)
+    model.set_cap_params("admin", uncapped)
+    with pytest.raises(PoolRevert, match=UNCAPPED):
+        model.set_cap_params("admin", uncapped)
+
+
+def test_caps():
+    """As test_capped_liquidity.test_per_address_cap and test_global_cap."""
+    model = make_model()
+    model.join("alice", PER_ADDRESS_CAP)
+    with pytest.raises(PoolRevert, match=OVER_ADDRESS_CAP):
+        model.join("alice", 1)
+    model.join("bob", PER_ADDRESS_CAP)
+    with pytest.raises(PoolRevert, match=OVER_GLOBAL_CAP):
+        model.join("admin", 1)
+    assert model.total_supply == 2 * PER_ADDRESS_CAP
+    assert model.bpt_balance("admin") == 0
+
+    model.set_cap_params("admin", HIGHER_CAP_PARAMS)
+    model.join("alice", PER_ADDRESS_CAP)
+    model.join("admin", PER_ADDRESS_CAP)
+
+    model.set_cap_params("admin", CapParams())
+    with pytest.raises(PoolRevert, match=ADD_OVERFLOW):
+        model.join("alice", UINT256_MAX)
+
+
+def test_replay_matches_sequential_joins():
+    rng = np.random.default_rng(0)
+    accounts = [f"lp{i}" for i in range(50)]
+    joins = [
+        Join(
+            accounts[rng.integers(len(accounts))], int(rng.integers(1, 10**6)) * 10**15
+        )
+        for _ in range(5000)
+    ]
+    cap_settings = [
+        CapParams(True, per_address_cap=cap * 10**18, global_cap=glob * 10**18)
+        for cap in (500, 5_000, 50_000)
+        for glob in (10_000, 100_000, 10**6)
+    ] + [CapParams()]
+
+    model = CappedLiquidityModel("admin", cap_settings[0], {"lp0": 10**18})
+    reasons = model.replay_cap_settings(joins, cap_settings)
+    # The model itself is unchanged.
+    assert model.balances == {"lp0": 10**18} and model.total_supply == 10**18
+
+    for cap_params, row in zip(cap_settings, reasons):
+        sequential = CappedLiquidityModel("admin", cap_params, {"lp0": 10**18})
+        for join, reason in zip(joins, row):
+            try:
+                sequential.join(*join)
+                assert reason is None
+            except PoolRevert as e:
+                assert reason == e.reason
+        replay = model.replay(joins, cap_params)
+        assert replay.balances == sequential.balances
+        assert replay.total_supply == sequential.total_supply
+
+    # Both caps bind in the tightest setting, and nothing reverts without caps.
+    assert {OVER_ADDRESS_CAP, OVER_GLOBAL_CAP} <= set(reasons[0])
+    assert set(reasons[-1]) == {None}
@@ -0,0 +1,80 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.feather
+
+from tests.support.error_collector import (
+    ErrorValueCollector,
+    chunk_files,
+    load_error_values,
+)
+from tests.support.quantized_decimal import QuantizedDecimal as D
+
+SCHEMA = {"loss": float, "n": int, "label": str}
+
+
+def _collect(directory, worker_id, n):
+    with ErrorValueCollector(directory, SCHEMA, chunk_size=7, worker_id=worker_id) as c:
+        for i in range(n):
+            c.push(dict(loss=D(i) / 4, n=i, label=worker_id))
+    return n
+
+
+def test_chunks_and_load(tmp_path):
+    directory = str(tmp_path / "errors")
+    collector = ErrorValueCollector(directory, SCHEMA, chunk_size=10, worker_id="w")
+    for i in range(25):
+        collector.push(dict(loss=D(i) / 2, n=i, label="a"))
+
+    # Full chunks are on disk before close(); the rest is still buffered.
+    assert len(chunk_files(directory)) == 2
+    assert load_error_values(directory).num_rows == 20
+
+    collector.close()
+    table = load_error_values(directory)
+    assert table.schema.field("loss").type == pa.float64()
+    assert table.num_rows == 25
+    assert table.column("n").to_pylist() == list(range(25))
+    assert table.column("loss").to_pylist()[3] == 1.5
+
+    df = load_error_values(directory, columns=["loss"]).to_pandas()
+    assert list(df.columns) == ["loss"]
+
+
+def test_parallel_workers(tmp_path):
+    directory = str(tmp_path / "errors")
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        counts = list(
+            executor.map(
+                _collect, [directory] * 3, [f"w{i}" for i in range(3)], [20, 30, 40]
+            )
+        )
+    table = load_error_values(directory)
+    assert table.num_rows == sum(counts)
+    assert sorted(set(table.column("label").to_pylist())) == ["w0", "w1", "w2"]
+
+
+def test_rerun_with_same_worker_id_keeps_chunks(tmp_path):
+    directory = str(tmp_path / "errors")
+    _collect(directory, "w", 10)
+    _collect(directory, "w", 10)
+    assert load_error_values(directory).num_rows == 20
+
+
+def test_clear_keeps_other_workers(tmp_path):
+    directory = str(tmp_path / "errors")
+    _collect(directory, "gw1", 10)
+    _collect(directory, "gw10", 10)
+    _collect(directory, "gw2", 10)
+
+    collector = ErrorValueCollector(directory, SCHEMA, worker_id="gw1")
+    collector.clear()
+    table = load_error_values(directory)
+    assert sorted(set(table.column("label").to_pylist())) == ["gw10", "gw2"]
+
+
+def test_load_legacy_feather(tmp_path):
+    directory = str(tmp_path / "errors")
+    table = pa.table({"loss": [0.5, 1.5]})
+    pa.feather.write_feather(table, directory + ".feather")
+    assert load_error_values(directory).column("loss").to_pylist() == [0.5, 1.5]
@@ -0,0 +1,156 @@
+import json
+import time
+
+import hypothesis.strategies as st
+import pytest
+from brownie.test import given
+from eth_utils import keccak
+from hypothesis import settings
+
+from tests.support.evm_executor import InProcessContract, InProcessEVM
+from tests.support.pool_simulator import PoolRevert
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.reverts import outcome, reverts
+from tests.support.utils import scale
+
+uint_strategy = st.integers(min_value=0, max_value=2**128)
+int_strategy = st.integers(min_value=-(2**127), max_value=2**127)
+
+FIXED_POINT_FUNCTIONS = ["add", "sub", "mulUp", "mulDown", "divUp", "divDown"]
+
+
+@pytest.fixture(scope="module")
+def inprocess_fixed_point():
+    return InProcessContract.from_build("GyroFixedPointTesting")
+
+
+@pytest.fixture(scope="module")
+def inprocess_signed_math():
+    return InProcessContract.from_build("SignedMathTesting")
+
+
+@settings(max_examples=20)
+@given(a=uint_strategy, b=uint_strategy)
+def test_fixed_point_matches_chain(
+    gyro_fixed_point_testing, inprocess_fixed_point, a, b
+):
+    for name in FIXED_POINT_FUNCTIONS:
+        assert outcome(getattr(inprocess_fixed_point, name), a, b) == outcome(
+            getattr(gyro_fixed_point_testing, name), a, b
+        )
+
+
+@settings(max_examples=20)
+@given(a=int_strategy, b=int_strategy)
+def test_signed_math_matches_chain(signed_math_testing, inprocess_signed_math, a, b):
+    for name in ["add", "sub", "mulUp", "mulDown", "divUp", "divDown", "addMag"]:
+        assert outcome(getattr(inprocess_signed_math, name), a, b) == outcome(
+            getattr(signed_math_testing, name), a, b
+        )
+
+
+def test_gas_matches_transaction(gyro_fixed_point_testing, inprocess_fixed_point):
+    a, b = 3 * 10**18, 7 * 10**17
+    for name in FIXED_POINT_FUNCTIONS:
+        tx = getattr(gyro_fixed_point_testing, name).transact(a, b)
+        _, record = getattr(inprocess_fixed_point, name).call_with_gas(a, b)
+        assert record.tx_gas == tx.gas_used
+    assert len(inprocess_fixed_point.gas_records) >= len(FIXED_POINT_FUNCTIONS)
+
+
+def test_arguments_like_brownie(inprocess_fixed_point):
+    # Integral decimals (as returned by scale()) are accepted, and a trailing transaction dict is ignored.
+    assert inprocess_fixed_point.mulDown(scale(D(2)), scale(D("1.5")), {}) == 3 * 10**18
+    with pytest.raises(TypeError):
+        inprocess_fixed_point.mulDown(D("1.5"), 1)
+    # Overloads are dispatched on the number of arguments.
+    assert inprocess_fixed_point.divDownLarge(6 * 10**18, 2 * 10**18) == 3 * 10**18
+    assert (
+        inprocess_fixed_point.divDownLarge(6 * 10**18, 2 * 10**18, 10**9, 10**9)
+        == 3 * 10**18
+    )
+    with pytest.raises(PoolRevert, match="BAL#001"):
+        inprocess_fixed_point.sub(0, 1)
+    # The revert checks of the tests accept PoolRevert like VirtualMachineError.
+    with reverts("BAL#001"):
+        inprocess_fixed_point.sub(0, 1)
+    with pytest.raises(AssertionError):
+        with reverts("BAL#003"):
+            inprocess_fixed_point.sub(0, 1)
+
+
+def test_contracts_share_evm():
+    evm = InProcessEVM()
+    fixed_point = InProcessContract.from_build("GyroFixedPointTesting", evm)
+    signed_math = InProcessContract.from_build("SignedMathTesting", evm)
+    assert fixed_point.address != signed_math.address
+    assert signed_math.mulDown(-(10**18), 2 * 10**18) == -2 * 10**18
+
+
+def test_faster_than_chain(gyro_fixed_point_testing, inprocess_fixed_point):
+    def time_calls(contract):
+        start = time.perf_counter()
+        for k in range(50):
+            contract.mulDown(k * 10**18, 10**18)
+        return time.perf_counter() - start
+
+    assert time_calls(inprocess_fixed_point) * 10 < time_calls(gyro_fixed_point_testing)
+
+
+def _library_build_files(build_dir, placeholder: str):
+    """A library whose code returns 42 and a contract that returns what a STATICCALL to the library returns, with the
+    library address as `placeholder` (hex)."""
+    library = "73" + "00" * 20 + "50" + "602a60005260206000f3"
+    caller = "6020600060006000" + "73" + placeholder + "5afa50" + "60206000f3"
+    abi = [
+        {
+            "type": "function",
+            "name": "value",
+            "inputs": [],
+            "outputs": [{"name": "", "type": "uint256"}],
+            "stateMutability": "view",
+        }
+    ]
+    builds = {
+        "Lib": dict(abi=[], deployedBytecode=library, sourcePath="contracts/Lib.sol"),
+        "Caller": dict(
+            abi=abi,
+            deployedBytecode="0x" + caller,
+            sourcePath="contracts/Caller.sol",
+            dependencies=["Lib"],
+        ),
+    }
+    for name, build in builds.items():
+        (build_dir / f"{name}.json").write_text(json.dumps(build))
+
+
+@pytest.mark.parametrize(
+    "placeholder",
+    [
+        "__$" + keccak(text="contracts/Lib.sol:Lib").hex()[:34] + "$__",
+        "__Lib" + "_" * 35,
+    ],
+)
+def test_links_libraries(tmp_path, placeholder):
+    _library_build_files(tmp_path, placeholder)
+    evm = InProcessEVM()
+    caller = InProcessContract.from_build("Caller", evm, str(tmp_path))
+    assert caller.value() == 42
+
+    # The library is placed once per EVM, with its own address in its code.
+    other = InProcessContract.from_build("Caller", evm, str(tmp_path))
+    library = evm.library_address("Lib", str(tmp_path))
+    assert evm._code[library][1:21] == library
+    assert library.hex() in evm._code[other.address].hex()
+    assert len(evm._code) == 3
+
+
+def test_gas_limit(tmp_path):
+    _library_build_files(tmp_path, "__Lib" + "_" * 35)
+    caller = InProcessContract.from_build("Caller", build_dir=str(tmp_path))
+    _, record = caller.value.call_with_gas()
+    assert caller.value({"gas": record.gas_used}) == 42
+    with pytest.raises(PoolRevert):
+        caller.value({"gas": record.gas_used - 1})
+    with pytest.raises(TypeError):
+        caller.value({"value": 1})
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from tests.g3clp import math_int
+from tests.geclp import eclp_prec_implementation as prec_impl
+from tests.support.evm_executor import InProcessContract, InProcessEVM
+from tests.support.gas_measurement import measure_gas
+from tests.support.pool_simulator import PoolRevert
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.types import ECLPMathParams
+from tests.support.utils import scale
+
+ROOT_3_ALPHA = int(scale(D("0.97") ** (D(1) / D(3))))
+
+
+@pytest.fixture(scope="module", params=["node", "inprocess"])
+def backend(request):
+    return request.param
+
+
+def _contracts(request, backend, fixtures, names):
+    """The testing contracts from the conftest fixtures or, for the "inprocess" backend, in one InProcessEVM."""
+    if backend == "inprocess":
+        evm = InProcessEVM()
+        return tuple(InProcessContract.from_build(name, evm) for name in names)
+    return tuple(request.getfixturevalue(fixture) for fixture in fixtures)
+
+
+@pytest.fixture(scope="module")
+def three_math(request, backend):
+    return _contracts(
+        request,
+        backend,
+        ("gyro_three_math_gas_testing", "gyro_three_math_testing"),
+        ("Gyro3CLPMathGasTesting", "Gyro3CLPMathTesting"),
+    )
+
+
+@pytest.fixture(scope="module")
+def eclp_math(request, backend):
+    return _contracts(
+        request,
+        backend,
+        ("gyro_eclp_math_gas_testing", "gyro_eclp_math_testing"),
+        ("GyroECLPMathGasTesting", "GyroECLPMathTesting"),
+    )
+
+
+def _tx_gas(function, *args) -> int:
+    """Gas of a transaction calling `function`. brownie sends one; an InProcessContract computes it from the call."""
+    if hasattr(function, "call_with_gas"):
+        return function.call_with_gas(*args)[1].tx_gas
+    return function.transact(*args).gas_used
+
+
+def _balances(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[int(b) * 10**18 for b in rng.integers(1, 10**6, 3)] for _ in range(n)]
+
+
+class _NewtonGasStandIn:
+    """Behaves like Gyro3CLPMathGasTesting.measureCalculateInvariant, with a made-up gas of 1000 per Newton step
+    (plus 500 memory expansion for the first call), to test the driver without a chain.
+    """
+
+    def __init__(self, gas_limit):
+        self.gas_limit = gas_limit
+        self.chunk_sizes = []
+
+    def __call__(self, balances, root3Alpha, tx):
+        assert tx["gas"] <= self.gas_limit
+        self.chunk_sizes.append(len(balances))
+        invariants, gas = [], []
+        for b in balances:
+            result = math_int.calculateInvariantWithIterations(b, root3Alpha)
+            invariants.append(result.root)
+            gas.append(1000 * result.iterations + (500 if not gas else 0))
+        if sum(gas) > self.gas_limit:
+            raise PoolRevert("out of gas")
+        return invariants, gas
+
+
+def test_chunks_and_reverts():
+    balances = _balances(300)
+    balances[17] = [10**30, 1, 1]  # BALANCES_TOO_LARGE
+    stand_in = _NewtonGasStandIn(gas_limit=100_000)
+    measurement = measure_gas(stand_in, balances, ROOT_3_ALPHA, max_gas=100_000)
+
+    invariants, iterations, _ = math_int.calculateInvariants(balances, ROOT_3_ALPHA)
+    assert list(np.flatnonzero(measurement.reverted)) == [17]
+    assert np.array_equal(
+        measurement.gas[~measurement.reverted], 1000 * iterations[~measurement.reverted]
+    )
+    df = measurement.to_pandas(["invariant"])
+    assert list(df.columns) == ["gas", "reverted", "invariant"]
+    assert df["invariant"].tolist() == list(invariants)
+    # Chunks grow from the initial size to what fits the gas limit, which is much less than one call per input.
+    assert max(stand_in.chunk_sizes) > 8
+    assert len(stand_in.chunk_sizes) < len(balances) // 4
+    stats = measurement.percentiles()
+    assert stats["min"] <= stats["p50"] <= stats["p95"] <= stats["max"]
+
+
+def test_3clp_invariant_gas(three_math):
+    gyro_three_math_gas_testing, gyro_three_math_testing = three_math
+    balances = _balances(50, seed=1)
+    balances.append([10**30, 1, 1])  # BALANCES_TOO_LARGE
+    measurement = measure_gas(
+        gyro_three_math_gas_testing.measureCalculateInvariant, balances, ROOT_3_ALPHA
+    )
+    assert list(np.flatnonzero(measurement.reverted)) == [50]
+    for k in range(0, 50, 10):
+        assert measurement.results[k] == (
+            gyro_three_math_testing.calculateInvariant(balances[k], ROOT_3_ALPHA),
+        )
+    # The measured gas excludes the transaction and ABI overhead of a call to the testing contract.
+    tx_gas = _tx_gas(
+        gyro_three_math_testing.calculateInvariant, balances[0], ROOT_3_ALPHA
+    )
+    assert 0 < measurement.gas[0] < tx_gas - 21_000
+    # Gas grows with the number of Newton steps.
+    _, iterations, _ = math_int.calculateInvariants(balances[:50], ROOT_3_ALPHA)
+    assert np.corrcoef(iterations, measurement.gas[:50])[0, 1] > 0.9
+
+
+def test_eclp_invariant_gas(eclp_math):
+    gyro_eclp_math_gas_testing, gyro_eclp_math_testing = eclp_math
+    params = ECLPMathParams(
+        alpha=D("0.97"),
+        beta=D("1.02"),
+        c=D("0.707106781186547524"),
+        s=D("0.707106781186547524"),
+        l=D(2),
+    )
+    derived = prec_impl.scale_derived_values(prec_impl.calc_derived_values(params))
+    balances = [scale(b) for b in ([D(100), D(100)], [D(1), D(500)], [D(500), D(1)])]
+    measurement = measure_gas(
+        gyro_eclp_math_gas_testing.measureCalculateInvariantWithError,
+        balances,
+        scale(params),
+        derived,
+    )
+    assert not measurement.reverted.any()
+    for b, result in zip(balances, measurement.results):
+        assert result == tuple(
+            gyro_eclp_math_testing.calculateInvariantWithError(
+                b, scale(params), derived
+            )
+        )
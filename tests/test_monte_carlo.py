@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from tests.g2clp.risk_study import TwoCLPRiskStudy
+from tests.support.monte_carlo import (
+    FAILED,
+    MonteCarloStudy,
+    RunningStats,
+    run_monte_carlo,
+)
+
+
+@dataclass
+class NormalStudy(MonteCarloStudy):
+    failure_rate: float = 0.1
+
+    def draw(self, rng):
+        return rng.normal(), rng.uniform()
+
+    def evaluate(self, scenario):
+        x, u = scenario
+        return dict(x=x, x_or_failed=FAILED if u < self.failure_rate else x)
+
+
+def assert_same_stats(a, b):
+    assert a.keys() == b.keys()
+    for name in a:
+        assert a[name] == b[name]
+
+
+def test_running_stats_merge():
+    values = np.random.default_rng(0).normal(size=1000)
+    total, part1, part2 = RunningStats(), RunningStats(), RunningStats()
+    for i, v in enumerate(values):
+        total.push(v)
+        (part1 if i < 300 else part2).push(v)
+    part1.merge(part2)
+    assert part1.n == total.n == 1000
+    assert np.isclose(part1.mean, values.mean())
+    assert np.isclose(part1.std, values.std(ddof=1))
+    assert np.isclose(total.std, values.std(ddof=1))
+    assert part1.min == values.min() and part1.max == values.max()
+
+
+def test_deterministic_across_workers():
+    in_process = run_monte_carlo(NormalStudy(), 1000, seed=1, chunk_size=64, max_workers=0)
+    parallel = run_monte_carlo(NormalStudy(), 1000, seed=1, chunk_size=64, max_workers=3)
+    assert_same_stats(in_process, parallel)
+    assert in_process["x"].n == 1000
+    assert in_process["x_or_failed"].n + in_process["x_or_failed"].n_failed == 1000
+    assert 50 < in_process["x_or_failed"].n_failed < 150
+
+
+def test_resume_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    full = run_monte_carlo(NormalStudy(), 500, seed=2, chunk_size=50, max_workers=0)
+
+    partial = run_monte_carlo(
+        NormalStudy(), 500, seed=2, chunk_size=50, max_workers=0, checkpoint_path=checkpoint, max_chunks=4
+    )
+    assert partial["x"].n == 200
+    resumed = run_monte_carlo(
+        NormalStudy(), 500, seed=2, chunk_size=50, max_workers=2, checkpoint_path=checkpoint
+    )
+    assert_same_stats(full, resumed)
+
+
+def test_two_clp_risk_study():
+    stats = run_monte_carlo(TwoCLPRiskStudy(n_steps=10), 8, chunk_size=4, max_workers=0)
+    assert stats["fee_return"].n == 8
+    assert stats["fee_return"].min >= 0
+    # The contract rounds in favor of the pool, so swaps never decrease the invariant.
+    assert stats["min_invariant_change"].min >= 0
@@ -0,0 +1,182 @@
+import math
+
+import numpy as np
+import pytest
+
+from tests.support import price_oracle
+from tests.support.pool_simulator import PoolRevert
+from tests.support.price_oracle import (
+    BUFFER_SIZE,
+    PriceOracle,
+    Variable,
+    from_low_res_log,
+    pack,
+    sample_from_word,
+    sample_word,
+    to_low_res_log,
+    unpack,
+)
+
+
+def reference_word(
+    inst_pair, acc_pair, inst_bpt, acc_bpt, inst_inv, acc_inv, timestamp
+):
+    """Samples.pack() on Python ints."""
+    fields = [
+        (inst_pair, 234, 22),
+        (acc_pair, 181, 53),
+        (inst_bpt, 159, 22),
+        (acc_bpt, 106, 53),
+        (inst_inv, 84, 22),
+        (acc_inv, 31, 53),
+        (timestamp, 0, 31),
+    ]
+    return sum((value & ((1 << bits) - 1)) << offset for value, offset, bits in fields)
+
+
+def random_history(rng, n, start=1_600_000_000, max_gap=400):
+    timestamps = start + np.cumsum(rng.integers(1, max_gap, n))
+    values = [rng.integers(-(2**21), 2**21, n) for _ in range(3)]
+    return timestamps, *values
+
+
+def test_pack_matches_word_codec():
+    rng = np.random.default_rng(0)
+    n = 1000
+    insts = [rng.integers(-(2**21), 2**21, n) for _ in range(3)]
+    accs = [rng.integers(-(2**52), 2**52, n) for _ in range(3)]
+    ts = rng.integers(0, 2**31, n)
+    args = (insts[0], accs[0], insts[1], accs[1], insts[2], accs[2], ts)
+    samples = pack(*args)
+    for i in range(n):
+        word = reference_word(*(int(a[i]) for a in args))
+        assert sample_word(samples[i]) == word
+        assert sample_from_word(word) == samples[i]
+    unpacked = unpack(samples)
+    for name, values in zip(
+        [
+            "logPairPrice",
+            "accLogPairPrice",
+            "logBptPrice",
+            "accLogBptPrice",
+            "logInvariant",
+            "accLogInvariant",
+            "timestamp",
+        ],
+        args,
+    ):
+        np.testing.assert_array_equal(unpacked[name], values)
+
+
+@pytest.mark.parametrize("n_updates", [1, 50, 3000])
+def test_ingest_matches_process_price_data(n_updates):
+    rng = np.random.default_rng(n_updates)
+    history = random_history(rng, n_updates)
+    sequential, bulk = PriceOracle(), PriceOracle()
+    for update in zip(*history):
+        sequential.process_price_data(*map(int, update))
+    # In two parts, to check that ingest() continues from the current state.
+    half = n_updates // 2
+    bulk.ingest(*(h[:half] for h in history))
+    bulk.ingest(*(h[half:] for h in history))
+    np.testing.assert_array_equal(bulk.samples, sequential.samples)
+    assert bulk.latest_index == sequential.latest_index
+    assert bulk.sample_creation_timestamp == sequential.sample_creation_timestamp
+
+
+def test_accumulators_wrap_like_the_contract():
+    oracle = PriceOracle()
+    # The accumulator of a constant maximal value overflows 53 bits after ~2^31 seconds.
+    oracle.ingest([2**30, 2**31 - 1], [2**21 - 1] * 2, [0, 0], [0, 0])
+    acc = int(
+        price_oracle.accumulator(
+            oracle.samples[oracle.latest_index], Variable.PAIR_PRICE
+        )
+    )
+    exact = (2**21 - 1) * (2**31 - 1)
+    assert acc == (exact + 2**52) % 2**53 - 2**52
+
+
+@pytest.mark.parametrize("n_updates", [30, 3000])
+@pytest.mark.parametrize("variable", list(Variable))
+def test_vectorized_queries_match_reference(n_updates, variable):
+    rng = np.random.default_rng(n_updates)
+    history = random_history(rng, n_updates)
+    oracle = PriceOracle()
+    oracle.ingest(*history)
+    now = int(history[0][-1]) + 100
+    oldest = int(price_oracle.timestamps(oracle._chronological()[0]))
+
+    # Windows ending anywhere between the oldest sample and after the latest one, including on sample timestamps.
+    agos = np.concatenate(
+        [
+            rng.integers(0, now - oldest, 500),
+            now - price_oracle.timestamps(oracle._chronological()[-5:]),
+            [0, now - oldest],
+        ]
+    )
+    accumulators = oracle.get_past_accumulators(variable, agos, now)
+    for ago, acc in zip(agos, accumulators):
+        assert acc == oracle.get_past_accumulator(variable, int(ago), now)
+
+    secs = np.minimum(rng.integers(1, 3600, len(agos)), now - oldest - agos)
+    ok = secs > 0
+    averages = oracle.log_time_weighted_averages(variable, agos[ok], secs[ok], now)
+    for ago, sec, average in zip(agos[ok], secs[ok], averages):
+        expected = oracle.get_time_weighted_average(variable, int(ago), int(sec), now)
+        assert from_low_res_log(average) == expected
+
+
+def test_query_reverts():
+    oracle = PriceOracle()
+    with pytest.raises(PoolRevert, match=price_oracle.ORACLE_NOT_INITIALIZED):
+        oracle.get_past_accumulators(Variable.PAIR_PRICE, [0], 1000)
+
+    rng = np.random.default_rng(1)
+    history = random_history(rng, 2 * BUFFER_SIZE, max_gap=300)
+    oracle.ingest(*history)
+    now = int(history[0][-1])
+    too_old = now - int(price_oracle.timestamps(oracle._chronological()[0])) + 1
+    for query in (
+        lambda: oracle.get_past_accumulator(Variable.PAIR_PRICE, too_old, now),
+        lambda: oracle.get_past_accumulators(Variable.PAIR_PRICE, [0, too_old], now),
+    ):
+        with pytest.raises(PoolRevert, match=price_oracle.ORACLE_QUERY_TOO_OLD):
+            query()
+    with pytest.raises(PoolRevert, match=price_oracle.ORACLE_INVALID_SECONDS_QUERY):
+        oracle.get_past_accumulators(Variable.PAIR_PRICE, [now + 1], now)
+    with pytest.raises(PoolRevert, match=price_oracle.ORACLE_BAD_SECS):
+        oracle.log_time_weighted_averages(Variable.PAIR_PRICE, [0], [0], now)
+
+
+def test_twap_of_step_function():
+    """With one sample per update, the accumulators are exact at the samples and linear in between, so the TWAP is the
+    time average of the logged values up to the truncation of the divisions."""
+    rng = np.random.default_rng(2)
+    n = 500
+    timestamps = 1_600_000_000 + np.cumsum(rng.integers(120, 600, n))
+    log_prices = rng.integers(-5000, 5000, n)
+    oracle = PriceOracle()
+    oracle.ingest(timestamps, log_prices, np.zeros(n), np.zeros(n))
+    now = int(timestamps[-1])
+
+    # The value logged at t_k holds on (t_{k-1}, t_k].
+    def integral(t):
+        k = np.searchsorted(timestamps, t)
+        return np.sum(log_prices[1:k] * np.diff(timestamps[:k])) + log_prices[k] * (
+            t - timestamps[k - 1]
+        )
+
+    agos = rng.integers(0, 3600, 200)
+    secs = rng.integers(1, 3600 * 24, 200)
+    averages = oracle.log_time_weighted_averages(Variable.PAIR_PRICE, agos, secs, now)
+    for ago, sec, average in zip(agos, secs, averages):
+        expected = (integral(now - ago) - integral(now - ago - sec)) / sec
+        assert abs(average - expected) <= 1 + 2 / sec
+
+
+def test_low_res_log():
+    for value in (1, 10**17, 10**18, 123456789 * 10**18, 3 * 10**30):
+        low_res = to_low_res_log(value)
+        assert low_res == round(math.log(value / 10**18) * 10**4)
+        assert from_low_res_log(low_res) == pytest.approx(value, rel=1e-4)
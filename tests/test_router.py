@@ -0,0 +1,149 @@
+import copy
+
+import pytest
+
+from tests.g2clp.pool_simulator import Gyro2CLPPoolSimulator
+from tests.g3clp.pool_simulator import Gyro3CLPPoolSimulator
+from tests.geclp.pool_simulator import GyroECLPPoolSimulator
+from tests.support.pool_simulator import PoolRevert
+from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.router import Router
+from tests.support.types import ECLPMathParamsQD
+
+E18 = 10**18
+
+
+def make_pools():
+    two_pool_narrow = Gyro2CLPPoolSimulator(99 * 10**16, 101 * 10**16, 10**15)
+    two_pool_narrow.initialize("lp", [100 * E18, 100 * E18])
+    two_pool_wide = Gyro2CLPPoolSimulator(8 * 10**17, 12 * 10**17, 3 * 10**15)
+    two_pool_wide.initialize("lp", [1_000 * E18, 1_000 * E18])
+    eclp = GyroECLPPoolSimulator(
+        ECLPMathParamsQD(
+            D("0.97"), D("1.02"), D("0.7071067811865475244"), D("0.7071067811865475244"), D(2)
+        ),
+        5 * 10**14,
+    )
+    eclp.initialize("lp", [200 * E18, 200 * E18])
+    three_pool = Gyro3CLPPoolSimulator(95 * 10**16, 10**15)
+    three_pool.initialize("lp", [300 * E18, 300 * E18, 300 * E18])
+    bc_pool = Gyro2CLPPoolSimulator(9 * 10**17, 11 * 10**17, 10**15)
+    bc_pool.initialize("lp", [500 * E18, 500 * E18])
+    return {
+        "narrow": (two_pool_narrow, ["A", "B"]),
+        "wide": (two_pool_wide, ["A", "B"]),
+        "eclp": (eclp, ["A", "B"]),
+        "three": (three_pool, ["A", "B", "C"]),
+        "bc": (bc_pool, ["B", "C"]),
+    }
+
+
+def execute_split(pools, paths, amounts):
+    """Total amount out, or 0 if one of the pools' bounds is exceeded."""
+    pools = copy.deepcopy(pools)
+    total = 0
+    try:
+        for hops, x in zip(paths, amounts):
+            for hop in hops:
+                x = pools[hop.pool][0].swap_given_in(hop.i_in, hop.i_out, x)
+            total += x
+    except PoolRevert:
+        return 0
+    return total
+
+
+def test_find_paths():
+    router = Router(make_pools())
+    paths = router.find_paths("A", "B")
+    # Direct through 4 pools plus A -> C (three) -> B (bc).
+    assert len(paths) == 5
+    assert sorted(len(p) for p in paths) == [1, 1, 1, 1, 2]
+    assert len(Router(make_pools(), max_hops=1).find_paths("A", "C")) == 1
+
+
+def make_disjoint_pools():
+    """A -> B directly and through C, without any pool on two paths."""
+    pools = make_pools()
+    ac_pool = Gyro2CLPPoolSimulator(9 * 10**17, 11 * 10**17, 10**15)
+    ac_pool.initialize("lp", [500 * E18, 500 * E18])
+    del pools["three"]
+    pools["ac"] = (ac_pool, ["A", "C"])
+    return pools
+
+
+@pytest.mark.parametrize("amount_in", [E18, 50 * E18, 400 * E18])
+@pytest.mark.parametrize("max_hops", [1, 2])
+def test_route_is_optimal(amount_in, max_hops):
+    pools = make_pools() if max_hops == 1 else make_disjoint_pools()
+    router = Router(pools, max_hops=max_hops)
+    route = router.route("A", "B", amount_in)
+
+    assert sum(p.amount_in for p in route.paths) == amount_in
+    assert route.amount_out / E18 == pytest.approx(route.predicted_amount_out, rel=1e-8)
+
+    # The pools were not modified.
+    assert pools["narrow"][0].balances == [100 * E18, 100 * E18]
+
+    # Moving some volume between any two paths doesn't help.
+    paths = [p.hops for p in route.paths]
+    amounts = [p.amount_in for p in route.paths]
+    for i in range(len(paths)):
+        for j in range(len(paths)):
+            if i == j:
+                continue
+            delta = amounts[i] // 100
+            perturbed = list(amounts)
+            perturbed[i] -= delta
+            perturbed[j] += delta
+            assert execute_split(pools, paths, perturbed) <= route.amount_out
+
+    best_single = max(
+        execute_split(pools, [path], [amount_in]) for path in router.find_paths("A", "B")
+    )
+    assert route.amount_out >= best_single
+
+
+def test_warm_start_and_execute():
+    pools = make_pools()
+    router = Router(pools)
+    first = router.route("A", "B", 10 * E18)
+    second = router.route("A", "B", 12 * E18)
+    assert second.n_iterations <= first.n_iterations + 2
+    # The warm start doesn't make the solution worse than a cold start, up to the optimizer's tolerance of 1e-12.
+    cold = Router(make_pools()).route("A", "B", 12 * E18)
+    assert second.amount_out >= cold.amount_out - cold.amount_out // 10**12
+
+    balance_before = pools["wide"][0].balances[0]
+    route = router.route("A", "B", 10 * E18, execute=True)
+    wide_in = sum(p.amount_in for p in route.paths if p.hops[0].pool == "wide")
+    assert pools["wide"][0].balances[0] == balance_before + wide_in
+
+
+def test_capacity_exceeded():
+    router = Router(make_pools(), max_hops=1)
+    with pytest.raises(PoolRevert):
+        router.route("A", "C", 10**9 * E18)
+
+
+def test_zero_amount():
+    pools = make_pools()
+    route = Router(pools).route("A", "B", 0, execute=True)
+    assert (route.amount_in, route.amount_out, route.paths) == (0, 0, [])
+    assert pools["narrow"][0].balances == [100 * E18, 100 * E18]
+
+
+def test_execute_is_atomic():
+    pools = make_pools()
+    balances_before = {name: list(sim.balances) for name, (sim, _) in pools.items()}
+    router = Router(pools, max_hops=1)
+    route = router.route("A", "B", 50 * E18)
+    assert len(route.paths) >= 2
+
+    def revert(*args):
+        raise PoolRevert("PAUSED")
+
+    # The swaps on the other paths succeed on the copies before the one on the last path reverts.
+    pools[route.paths[-1].hops[0].pool][0].swap_given_in = revert
+    with pytest.raises(PoolRevert):
+        router.route("A", "B", 50 * E18, execute=True)
+    assert {name: sim.balances for name, (sim, _) in pools.items()} == balances_before
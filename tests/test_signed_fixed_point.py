@@ -3,10 +3,10 @@ import operator
 
 import hypothesis.strategies as st
 from brownie.test import given
-from brownie import reverts
 from hypothesis import settings, note
 
 from tests.support.quantized_decimal import QuantizedDecimal as D
+from tests.support.reverts import reverts
 from tests.support.utils import scale, unscale
 
 operators = ["add", "sub", "mul", "truediv"]
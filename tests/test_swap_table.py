@@ -0,0 +1,105 @@
+import copy
+import math
+
+import numpy as np
+import pytest
+
+from tests.support.swap_table import (
+    SwapQuoter,
+    build_curve_table,
+    ellipse_d4_bound,
+    hyperbola_curve,
+)
+from tests.test_router import make_pools
+
+E18 = 10**18
+
+
+def assert_quotes_match_swap(quoter: SwapQuoter):
+    sim = quoter.sim
+    decimals = 10 ** sim.token_decimals[quoter.i_in]
+    # Amount 0 is left out: the ECLP reverts on it, as its invariant is rounded against the trader.
+    raw_amounts = [
+        int(x * decimals)
+        for x in np.concatenate(
+            [
+                np.geomspace(1e-9, quoter.max_amount_in * 0.99, 30),
+                np.linspace(0, quoter.max_amount_in * 0.99, 31)[1:],
+            ]
+        )
+    ]
+    amounts = np.array(raw_amounts) / decimals
+    quotes = quoter.quote_many(amounts)
+    for raw, amount, quote in zip(raw_amounts, amounts, quotes):
+        assert quote == quoter.quote(amount)
+        out = copy.deepcopy(sim).swap_given_in(quoter.i_in, quoter.i_out, raw)
+        expected = out / 10 ** sim.token_decimals[quoter.i_out]
+        assert quote == pytest.approx(expected, abs=quoter.error_bound)
+
+
+@pytest.mark.parametrize("pool", ["narrow", "wide", "eclp", "three", "bc"])
+@pytest.mark.parametrize("direction", [(0, 1), (1, 0)])
+def test_quotes_within_error_bound(pool, direction):
+    sim, _ = make_pools()[pool]
+    quoter = SwapQuoter(sim, *direction)
+    assert_quotes_match_swap(quoter)
+
+    amounts = np.linspace(0, quoter.max_amount_in, 1000)
+    assert np.all(np.diff(quoter.quote_many(amounts)) >= 0)
+    assert math.isnan(quoter.quote(quoter.max_amount_in * 1.01))
+
+
+def test_hyperbola_table_error():
+    curve = hyperbola_curve("hyperbola", 0.1, 10.0, 1.0, 1.0, 0.0)
+    table = build_curve_table(curve, 0.1, 10.0, abs_tol=1e-10)
+    assert table.max_error <= 1e-10
+    u = np.linspace(0.1, 10.0, 100_001)
+    assert np.max(np.abs(table.evaluate(u) - 1 / u)) <= table.max_error
+
+
+@pytest.mark.parametrize("i_in", [0, 1])
+def test_eclp_table_error(i_in):
+    sim, _ = make_pools()["eclp"]
+    curve, _, _ = sim.swap_curve(i_in, 1 - i_in)
+    table = build_curve_table(curve, curve.u_min, curve.u_max, abs_tol=1e-10)
+    assert table.max_error <= 1e-10
+    u = np.linspace(curve.u_min, curve.u_max, 100_001)
+    assert np.max(np.abs(table.evaluate(u) - curve.g(u))) <= table.max_error + 1e-15
+
+
+def test_ellipse_d4_bound():
+    # g(u) = -sqrt(1 - u^2) on [-0.9, 0.9]; compare with fourth differences.
+    bound = ellipse_d4_bound(0.0, 1.0, 1.0)
+    h = 1e-3
+    u = np.linspace(-0.9, 0.9, 181)
+    g = lambda u: -np.sqrt(1 - u**2)
+    d4 = (g(u - 2 * h) - 4 * g(u - h) + 6 * g(u) - 4 * g(u + h) + g(u + 2 * h)) / h**4
+    for lo, hi in zip(u[:-1], u[1:]):
+        assert max(abs(d4[u == lo][0]), abs(d4[u == hi][0])) <= bound(lo, hi) * 1.01
+    assert bound(0.5, 1.0) == math.inf
+
+
+@pytest.mark.parametrize("pool", ["narrow", "eclp", "three"])
+def test_refresh_reuses_table(pool):
+    sim, _ = make_pools()[pool]
+    quoter = SwapQuoter(sim, 0, 1)
+    for step in range(12):
+        if step % 4 == 3:
+            sim.join("lp", sim.total_supply // 10)
+        elif step % 4 == 2:
+            sim.exit("lp", sim.total_supply // 20)
+        else:
+            i_in = step % sim.n_tokens
+            i_out = (i_in + 1) % sim.n_tokens
+            sim.swap_given_in(i_in, i_out, sim.balances[i_in] // 7)
+        assert not quoter.refresh()
+        assert_quotes_match_swap(quoter)
+    assert quoter.n_builds == 1
+
+
+def test_refresh_with_rates():
+    sim, _ = make_pools()["eclp"]
+    quoter = SwapQuoter(sim, 1, 0)
+    sim.rates = [E18 * 11 // 10, None]
+    assert not quoter.refresh()
+    assert_quotes_match_swap(quoter)
@@ -0,0 +1,269 @@
+from tests.support.trace_analyzer import (
+    GAS_KINDS,
+    CompactTrace,
+    ContractDefinition,
+    FunctionDefinition,
+    JumpType,
+    Location,
+    SourceData,
+    Sources,
+    Tracer,
+    fetch_trace,
+    normalize_address,
+)
+from tests.support.trace_store import TraceStore, code_hash
+
+TOKEN_ADDRESS = "00000000000000000000000000000000000000000000000000000000000000aa"
+
+
+def _source(index, contract, functions, locations, content=" " * 1000) -> SourceData:
+    """A made-up source whose code has one instruction per byte (no PUSH), so that pc == instruction index."""
+    return SourceData(
+        path=f"contracts/{contract}.sol",
+        ast={},
+        index=index,
+        contracts=[ContractDefinition(contract, Location(index, 0, 1000))],
+        functions=[
+            FunctionDefinition(name, Location(index, offset, 100), contract)
+            for name, offset in functions
+        ],
+        instruction_mapping={pc: pc for pc in range(len(locations))},
+        content=content,
+        source_map=[
+            Location(index, offset, 5, jump_type) for offset, jump_type in locations
+        ],
+        bytecode=bytes(len(locations)),
+    )
+
+
+def _sources() -> Sources:
+    # Pool.swap calls the internal function helper (pc 1 -> 2, back at pc 4) and then Token.transfer (pc 6).
+    r, i, o = JumpType.Regular, JumpType.In, JumpType.Out
+    pool = _source(
+        "0",
+        "Pool",
+        [("swap", 100), ("helper", 300)],
+        [
+            (110, r),
+            (120, i),
+            (310, r),
+            (320, r),
+            (330, o),
+            (130, r),
+            (140, r),
+            (150, r),
+        ],
+    )
+    token = _source("1", "Token", [("transfer", 0)], [(10, r), (20, r), (30, r)])
+    return Sources({"0": pool, "1": token})
+
+
+def _step(op, pc, gas, stack=()):
+    return {"op": op, "pc": pc, "gas": gas, "depth": 1, "stack": list(stack)}
+
+
+STRUCT_LOGS = [
+    _step("ADD", 0, 1000),
+    _step("JUMP", 1, 990),
+    _step("ADD", 2, 980),
+    _step("ADD", 3, 970),
+    _step("JUMP", 4, 960),
+    _step("ADD", 5, 950),
+    _step("CALL", 6, 940, ["00", TOKEN_ADDRESS, "1000"]),
+    _step("ADD", 0, 500),
+    _step("ADD", 1, 490),
+    _step("RETURN", 2, 480),
+    _step("RETURN", 7, 400),
+]
+
+DEPLOYMENTS = {"Token": [normalize_address(TOKEN_ADDRESS)]}
+
+
+def test_trace():
+    ctx = Tracer(_sources(), DEPLOYMENTS).trace("Pool", STRUCT_LOGS)
+    assert ctx.qualified_function_name == "Pool.swap"
+    assert ctx.total_gas_consumed == 600
+    (t0, helper), (t1, transfer) = ctx.children
+    assert (t0.char, helper.qualified_function_name, helper.total_gas_consumed) == (
+        "I",
+        "Pool.helper",
+        30,
+    )
+    assert (t1.char, transfer.qualified_function_name) == ("C", "Token.transfer")
+    assert transfer.total_gas_consumed == 20
+    assert ctx.gas_consumed == 550
+
+
+def test_trace_store_round_trip(tmp_path):
+    sources = _sources()
+    tracer = Tracer(sources, DEPLOYMENTS)
+    store = TraceStore.for_sources(sources, str(tmp_path))
+    store.save("3clp", "3: Swap (After Join)", "Pool", STRUCT_LOGS, DEPLOYMENTS, 650)
+    store.save("3clp", "1: Join (Initial)", "Pool", STRUCT_LOGS[:1], {}, 10)
+
+    assert store.pools() == ["3clp"]
+    stored = store.load("3clp", "3: Swap (After Join)")
+    assert (stored.contract_name, stored.gas_used) == ("Pool", 650)
+    assert len(stored.trace) == len(STRUCT_LOGS)
+    assert (
+        stored.tracer(sources).trace(stored.contract_name, stored.trace).format()
+        == tracer.trace("Pool", STRUCT_LOGS).format()
+    )
+    assert [s.label for s in store.load_all("3clp")] == [
+        "1: Join (Initial)",
+        "3: Swap (After Join)",
+    ]
+
+    # A different build is stored separately.
+    sources._sources["1"].bytecode = bytes(4)
+    assert code_hash(sources) != store.code_hash
+
+
+def test_compact_trace_keeps_call_targets_only():
+    trace = CompactTrace.from_struct_logs(STRUCT_LOGS)
+    assert trace.call_targets == {6: TOKEN_ADDRESS}
+    assert trace.gas.tolist() == [step["gas"] for step in STRUCT_LOGS]
+
+
+class _NodeStandIn:
+    """Answers debug_traceTransaction with STRUCT_LOGS, like ganache (which ignores the tracer) or like geth (which runs
+    it; emulated here)."""
+
+    def __init__(self, supports_tracer):
+        self.supports_tracer = supports_tracer
+        self.requests = []
+        self.provider = self
+
+    def make_request(self, method, params):
+        assert method == "debug_traceTransaction"
+        _, options = params
+        self.requests.append(options)
+        assert options["disableMemory"] and options["disableStorage"]
+        if not self.supports_tracer:
+            return {"result": {"structLogs": STRUCT_LOGS}}
+        calls = {
+            str(i): hex(int(step["stack"][-2], 16))
+            for i, step in enumerate(STRUCT_LOGS)
+            if step["op"] == "CALL"
+        }
+        return {
+            "result": {
+                "ops": [step["op"] for step in STRUCT_LOGS],
+                "pcs": [step["pc"] for step in STRUCT_LOGS],
+                "gas": [step["gas"] for step in STRUCT_LOGS],
+                "calls": calls,
+            }
+        }
+
+
+def test_fetch_trace():
+    expected = Tracer(_sources(), DEPLOYMENTS).trace("Pool", STRUCT_LOGS).format()
+    for supports_tracer in (False, True):
+        node = _NodeStandIn(supports_tracer)
+        trace = fetch_trace("0x01", node)
+        assert len(node.requests) == 1 and "tracer" in node.requests[0]
+        assert trace.call_targets == {6: TOKEN_ADDRESS}
+        assert Tracer(_sources(), DEPLOYMENTS).trace("Pool", trace).format() == expected
+
+
+def test_loops():
+    r = JumpType.Regular
+    # newton (offsets 0-100) loops from pc 3 back to its head at pc 1, on line 11. pc 6 and 7 are outside of newton.
+    offsets = [10, 20, 30, 40, 50, 60, 600, 610]
+    math = _source("0", "Math", [("newton", 0)], [(o, r) for o in offsets], "x\n" * 500)
+    struct_logs = [
+        _step("ADD", 0, 1000),
+        _step("JUMPDEST", 1, 990),
+        _step("ADD", 2, 980),
+        _step("JUMP", 3, 970),
+        _step("JUMPDEST", 1, 960),
+        _step("ADD", 2, 950),
+        _step("JUMP", 3, 940),
+        _step("JUMPDEST", 1, 935),
+        _step("JUMPI", 5, 930),
+        _step("JUMPDEST", 6, 920),
+        _step("JUMP", 7, 910),
+        _step("RETURN", 4, 900),
+    ]
+    ctx = Tracer(Sources({"0": math}), {}).trace("Math", struct_logs)
+    (loop,) = ctx.loops.values()
+    assert (loop.pc, loop.label, loop.iterations) == (1, "Math.sol:11", 2)
+    assert loop.iteration_gas == [30, 25]
+    assert "[loop Math.sol:11: 2 x 28]" in ctx.format()
+
+
+def test_loop_left_by_return():
+    r = JumpType.Regular
+    # newton loops from pc 4 back to its head at pc 1; in the second iteration, pc 3 (a `return`) jumps out to pc 6.
+    offsets = [10, 20, 30, 40, 50, 60, 600, 610]
+    math = _source("0", "Math", [("newton", 0)], [(o, r) for o in offsets], "x\n" * 500)
+    struct_logs = [
+        _step("ADD", 0, 1000),
+        _step("JUMPDEST", 1, 990),
+        _step("ADD", 2, 980),
+        _step("JUMP", 4, 970),
+        _step("JUMPDEST", 1, 960),
+        _step("ADD", 2, 950),
+        _step("JUMP", 3, 945),
+        _step("JUMPDEST", 6, 935),
+        _step("JUMP", 7, 925),
+        _step("RETURN", 5, 900),
+    ]
+    ctx = Tracer(Sources({"0": math}), {}).trace("Math", struct_logs)
+    (loop,) = ctx.loops.values()
+    assert (loop.pc, loop.end_pc, loop.iterations) == (1, 4, 2)
+    assert loop.iteration_gas == [30, 25]
+
+
+def _storage_and_call_logs(memory_words=None):
+    steps = [
+        _step("SLOAD", 0, 1000),
+        _step("JUMP", 1, 900),
+        _step("MSTORE", 2, 890),
+        _step("SSTORE", 3, 880),
+        _step("JUMP", 4, 780),
+        _step("ADD", 5, 770),
+        _step("CALL", 6, 760, ["00", TOKEN_ADDRESS, "1000"]),
+        _step("ADD", 0, 500),
+        _step("SLOAD", 1, 490),
+        _step("RETURN", 2, 390),
+        _step("RETURN", 7, 600),
+    ]
+    for step, words in zip(steps, memory_words or ()):
+        step["memory"] = ["00" * 32] * words
+    return steps
+
+
+def test_gas_breakdown():
+    def breakdown(ctx):
+        return {k: v for k, v in ctx.gas_breakdown.items() if v}
+
+    # Without memory sizes, memory expansion is only known for MLOAD/MSTORE (whose cost is 3 otherwise).
+    ctx = Tracer(_sources(), DEPLOYMENTS).trace("Pool", _storage_and_call_logs())
+    (_, helper), (_, transfer) = ctx.children
+    # The CALL costs 760 - 600 in the caller, of which 110 are spent in Token.transfer.
+    assert breakdown(ctx) == {"storage_read": 100, "call": 50, "compute": 20}
+    assert breakdown(helper) == {"storage_write": 100, "memory": 7, "compute": 13}
+    assert breakdown(transfer) == {"storage_read": 100, "compute": 10}
+
+    memory_words = [2, 2, 2, 4, 4, 4, 4, 0, 1, 1, 5]
+    ctx = Tracer(_sources(), DEPLOYMENTS).trace(
+        "Pool", _storage_and_call_logs(memory_words)
+    )
+    (_, helper), (_, transfer) = ctx.children
+    # 2 -> 4 words cost 3 * 2 + 0 gas, 4 -> 5 words in the caller (for the call's return data) 3 gas.
+    assert breakdown(ctx) == {
+        "storage_read": 100,
+        "call": 47,
+        "memory": 3,
+        "compute": 20,
+    }
+    assert breakdown(helper) == {"storage_write": 100, "memory": 6, "compute": 14}
+    assert breakdown(transfer) == {"storage_read": 100, "memory": 3, "compute": 7}
+
+    by_function = ctx.gas_by_function()
+    assert by_function["Pool.helper"]["calls"] == 1
+    assert (
+        sum(row[kind] for row in by_function.values() for kind in GAS_KINDS)
+        == ctx.total_gas_consumed
+    )